@@ -0,0 +1,223 @@
+"""
+LiveConsumer fan-out: one shared group vs topic groups.
+
+Runs many simulated LiveConsumer sockets on the in-memory channel layer,
+either on the default subscription (every channel, broad groups) or each
+following one market symbol and the regime of its market. The script
+publishes a mix of market, regime and strategy messages through
+BroadcastService, then reports group_send calls (each one a Redis round
+trip with channels_redis, even for an empty group), channel-layer
+deliveries, the bytes they would put on Redis (msgpack, as channels_redis
+encodes them), frames that reach the sockets, and CPU time:
+
+    python -m benchmarks.live_consumer_bench --consumers 300
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+
+import msgpack
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "django_core"))
+
+import django
+from django.conf import settings
+
+settings.configure(
+    CHANNEL_LAYERS={
+        "default": {
+            "BACKEND": "channels.layers.InMemoryChannelLayer",
+            "CONFIG": {"capacity": 100_000},
+        }
+    },
+    INSTALLED_APPS=[]
+)
+django.setup()
+
+from channels.layers import channel_layers, get_channel_layer
+from channels.testing import WebsocketCommunicator
+
+from core.routing import LiveConsumer
+from system.services.broadcast_service import BroadcastService
+
+LEGACY_GROUP = "live_updates"
+
+MARKETS = {
+    "CRYPTO": [f"COIN{i}USDT" for i in range(10)],
+    "NASDAQ": [f"NASDAQ:T{i}" for i in range(10)],
+    "NYSE": [f"NYSE:S{i}" for i in range(10)],
+}
+
+
+counters = {"group_sends": 0, "deliveries": 0, "bytes": 0}
+
+
+def count_deliveries(layer):
+    """
+    Counts group_send calls and every per-channel send the layer makes
+    (group_send fans out to send()), with the size channels_redis would
+    push to Redis.
+    """
+
+    original_send = layer.send
+    original_group_send = layer.group_send
+
+    async def send(channel, message):
+        counters["deliveries"] += 1
+        counters["bytes"] += len(msgpack.packb(message))
+        await original_send(channel, message)
+
+    async def group_send(group, message):
+        counters["group_sends"] += 1
+        await original_group_send(group, message)
+
+    layer.send = send
+    layer.group_send = group_send
+
+
+class LegacyLiveConsumer(LiveConsumer):
+    """
+    The previous behaviour: one group for everyone, serialized per socket.
+    """
+
+    async def connect(self):
+        await self.channel_layer.group_add(LEGACY_GROUP, self.channel_name)
+        await self.accept()
+
+    async def disconnect(self, close_code):
+        await self.channel_layer.group_discard(LEGACY_GROUP, self.channel_name)
+
+    async def live_message(self, event):
+        await self.send(text_data=json.dumps({
+            "channel": event.get("channel"),
+            "data": event.get("data")
+        }))
+
+
+async def legacy_send(channel, data, market=None, symbol=None):
+    await get_channel_layer().group_send(LEGACY_GROUP, {
+        "type": "live_message",
+        "channel": channel,
+        "data": data
+    })
+
+
+class _User:
+    is_anonymous = False
+
+
+def with_user(app):
+    async def wrapped(scope, receive, send):
+        return await app({**scope, "user": _User()}, receive, send)
+    return wrapped
+
+
+def workload(rng, n_market, n_regime, n_strategy):
+    messages = []
+
+    for channel, count in (("market", n_market), ("regime", n_regime), ("strategy", n_strategy)):
+        for i in range(count):
+            market = rng.choice(list(MARKETS))
+            symbol = rng.choice(MARKETS[market])
+            messages.append((channel, {
+                "market": market,
+                "symbol": symbol,
+                "price": 100 + i,
+                "payload": "x" * 200
+            }, market, symbol))
+
+    rng.shuffle(messages)
+    return messages
+
+
+async def run(consumer_cls, send, args, topic_subscriptions=False):
+    rng = random.Random(7)
+
+    # A fresh layer per run, bound to this event loop
+    channel_layers.backends.clear()
+    count_deliveries(get_channel_layer())
+    app = with_user(consumer_cls.as_asgi())
+
+    communicators = []
+    for i in range(args.consumers):
+        market = list(MARKETS)[i % len(MARKETS)]
+        symbol = MARKETS[market][(i // len(MARKETS)) % len(MARKETS[market])]
+
+        comm = WebsocketCommunicator(app, "/ws/live/")
+        await comm.connect()
+
+        if topic_subscriptions:
+            await comm.receive_from()
+            for request in (
+                {"action": "unsubscribe", "channel": "market"},
+                {"action": "unsubscribe", "channel": "regime"},
+                {"action": "unsubscribe", "channel": "strategy"},
+                {"action": "subscribe", "channel": "market", "market": market, "symbol": symbol},
+                {"action": "subscribe", "channel": "regime", "market": market},
+            ):
+                await comm.send_to(text_data=json.dumps(request))
+                await comm.receive_from()
+
+        communicators.append(comm)
+
+    messages = workload(rng, args.market_messages, args.regime_messages, args.strategy_messages)
+
+    counters.update(group_sends=0, deliveries=0, bytes=0)
+
+    started_wall = time.perf_counter()
+    started_cpu = time.process_time()
+
+    for channel, data, market, symbol in messages:
+        await send(channel, data, market, symbol)
+
+    # Let every consumer drain its channel
+    layer = get_channel_layer()
+    while any(queue.qsize() for queue in layer.channels.values()):
+        await asyncio.sleep(0.01)
+    await asyncio.sleep(0.1)
+
+    cpu = time.process_time() - started_cpu
+    wall = time.perf_counter() - started_wall
+
+    frames = sum(comm.output_queue.qsize() for comm in communicators)
+
+    for comm in communicators:
+        await comm.disconnect()
+
+    return {
+        "group_sends": counters["group_sends"],
+        "deliveries": counters["deliveries"],
+        "megabytes": counters["bytes"] / 1e6,
+        "frames": frames,
+        "cpu_s": cpu,
+        "wall_s": wall,
+        "cpu_us_per_frame": cpu / max(frames, 1) * 1e6,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--consumers", type=int, default=300)
+    parser.add_argument("--market-messages", type=int, default=300)
+    parser.add_argument("--regime-messages", type=int, default=30)
+    parser.add_argument("--strategy-messages", type=int, default=30)
+    args = parser.parse_args()
+
+    runs = {
+        "single group": asyncio.run(run(LegacyLiveConsumer, legacy_send, args)),
+        "topics default": asyncio.run(run(LiveConsumer, BroadcastService.send_async, args)),
+        "topics narrowed": asyncio.run(run(LiveConsumer, BroadcastService.send_async, args, True)),
+    }
+
+    print(f"{'':<18}" + "".join(f"{name:>17}" for name in runs))
+    for key in ("group_sends", "deliveries", "megabytes", "frames", "cpu_s", "wall_s", "cpu_us_per_frame"):
+        print(f"{key:<18}" + "".join(f"{result[key]:>17.2f}" for result in runs.values()))
+
+
+if __name__ == "__main__":
+    main()
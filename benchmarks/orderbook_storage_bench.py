@@ -0,0 +1,109 @@
+"""
+Order book storage: one document per depth diff vs snapshot + delta frames.
+
+Simulates an hour of Binance-style depth@100ms diffs for one symbol and
+compares the BSON bytes of the documents each layout would insert. It also
+checks that replaying snapshot + deltas rebuilds the same top of book as
+applying every diff:
+
+    python -m benchmarks.orderbook_storage_bench --minutes 60
+"""
+
+import argparse
+import random
+import time
+
+import bson
+
+from fastapi_market.market_stream import OrderBookView
+from fastapi_market.orderbook_store import (
+    OrderBookRecorder,
+    SNAPSHOT_DEPTH,
+    unpack_updates,
+)
+from fastapi_market.schemas import unified_orderbook_schema
+from fastapi_market.timeseries import time_series_doc
+
+
+def simulate_diffs(minutes, seed=7):
+    rng = random.Random(seed)
+    mid = 65_000.0
+    ts = 1_700_000_000_000
+
+    for _ in range(minutes * 600):
+        mid += rng.gauss(0, 2)
+        ts += 100
+
+        def levels(sign):
+            out = []
+            for _ in range(rng.randint(10, 40)):
+                price = round(mid + sign * rng.randint(1, 2000) * 0.01, 2)
+                qty = 0.0 if rng.random() < 0.35 else round(rng.expovariate(4), 5)
+                out.append([f"{price:.2f}", f"{qty:.8f}"])
+            # Binance sends bids best-first, asks best-first
+            return sorted(out, key=lambda level: sign * float(level[0]))
+
+        yield unified_orderbook_schema(
+            market_type="CRYPTO",
+            symbol="BTCUSDT",
+            bids=levels(-1),
+            asks=levels(1),
+            exchange_timestamp=ts - 5,
+            receive_timestamp=ts
+        )
+
+
+def replay(frames):
+    view = OrderBookView()
+
+    for frame in frames:
+        for _, bids, asks in unpack_updates(frame):
+            view.apply(bids, asks)
+
+    return view
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--minutes", type=int, default=60)
+    args = parser.parse_args()
+
+    recorder = OrderBookRecorder("CRYPTO", "BTCUSDT")
+    reference = OrderBookView()
+
+    raw_bytes = 0
+    raw_docs = 0
+    frames = []
+
+    started = time.perf_counter()
+
+    for diff in simulate_diffs(args.minutes):
+        raw_bytes += len(bson.encode(time_series_doc(diff)))
+        raw_docs += 1
+
+        reference.apply(diff["bids"], diff["asks"])
+        frames.extend(recorder.record(diff))
+
+    frames.extend(recorder.flush())
+    elapsed = time.perf_counter() - started
+
+    frame_bytes = sum(len(bson.encode(f)) for f in frames)
+
+    snapshots = [i for i, f in enumerate(frames) if f["kind"] == "snapshot"]
+    rebuilt = replay(frames[snapshots[-1]:])
+
+    exact = rebuilt.top(SNAPSHOT_DEPTH // 2) == reference.top(SNAPSHOT_DEPTH // 2)
+
+    per_hour = 60 / args.minutes
+
+    print(f"diffs            {raw_docs}")
+    print(f"per-diff docs    {raw_bytes * per_hour / 1e6:8.2f} MB/symbol-hour")
+    print(f"frames           {len(frames)} ({len(snapshots)} snapshots)")
+    print(f"frame docs       {frame_bytes * per_hour / 1e6:8.2f} MB/symbol-hour")
+    print(f"reduction        {raw_bytes / frame_bytes:8.1f}x")
+    print(f"encode time      {elapsed:8.2f}s")
+    print(f"replay matches   {exact}")
+
+
+if __name__ == "__main__":
+    main()
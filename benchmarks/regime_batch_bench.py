@@ -0,0 +1,192 @@
+"""
+Batch regime state machine vs the scalar poller path.
+
+Checks that BatchRegimeEngine reproduces majority_state -> RegimeFusion ->
+StrategyEngine -> generate_decision tick for tick, then times a large
+symbol universe.
+
+    python -m benchmarks.regime_batch_bench
+"""
+
+import contextlib
+import io
+import time
+from collections import deque
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+
+from fastapi_market import decision_engine
+from fastapi_market.regime_batch import (
+    BatchRegimeEngine,
+    DEFAULT_LABELS,
+    EMPTY,
+    META_REGIMES,
+    STRATEGIES
+)
+from fastapi_market.regime_fusion import RegimeFusion
+from fastapi_market.regime_stability import (
+    STABILITY_WINDOW,
+    MIN_CONFIRMATIONS,
+    majority_state
+)
+from fastapi_market.strategy_engine import StrategyEngine
+
+TIMEFRAMES = ["1m", "5m", "15m", "1h"]
+POLL_SECONDS = 10
+START = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+def random_observations(rng, n_ticks, n_symbols):
+    """
+    Sticky random walk over state codes with ~5% missing timeframes.
+    """
+
+    shape = (n_ticks, n_symbols, len(TIMEFRAMES))
+    obs = np.empty(shape, dtype=np.int16)
+    obs[0] = rng.integers(0, len(DEFAULT_LABELS), shape[1:])
+
+    for t in range(1, n_ticks):
+        flip = rng.random(shape[1:]) < 0.3
+        fresh = rng.integers(0, len(DEFAULT_LABELS), shape[1:])
+        obs[t] = np.where(flip, fresh, obs[t - 1])
+
+    missing = rng.random(shape) < 0.05
+    return np.where(missing, EMPTY, obs)
+
+
+def run_scalar(symbols, observations, window, min_confirmations):
+
+    decision_engine._last_decision_cache.clear()
+    fusion = RegimeFusion()
+
+    buffers = {
+        s: {tf: deque(maxlen=window) for tf in TIMEFRAMES}
+        for s in symbols
+    }
+    stable = {s: {tf: None for tf in TIMEFRAMES} for s in symbols}
+    engines = {s: StrategyEngine() for s in symbols}
+
+    rows = []
+
+    for t, tick in enumerate(observations):
+        now = START + timedelta(seconds=t * POLL_SECONDS)
+
+        for i, symbol in enumerate(symbols):
+            for j, tf in enumerate(TIMEFRAMES):
+                code = tick[i, j]
+                if code == EMPTY:
+                    continue
+
+                buffers[symbol][tf].append(DEFAULT_LABELS[code])
+                confirmed = majority_state(
+                    buffers[symbol][tf], window, min_confirmations
+                )
+
+                if confirmed is not None:
+                    stable[symbol][tf] = confirmed
+
+            meta = fusion.fuse(stable[symbol])
+            strategy = engines[symbol].select_strategy(meta)["strategy"]
+
+            decision = decision_engine.generate_decision(
+                market="CRYPTO",
+                symbol=symbol,
+                meta_regime=meta["meta_regime"],
+                strategy=strategy,
+                confidence=meta["confidence"],
+                now=now
+            )
+
+            rows.append((
+                meta["meta_regime"],
+                meta["confidence"],
+                strategy,
+                decision is not None
+            ))
+
+    return rows
+
+
+def run_batch(symbols, observations, window, min_confirmations):
+
+    engine = BatchRegimeEngine(
+        symbols,
+        TIMEFRAMES,
+        window=window,
+        min_confirmations=min_confirmations
+    )
+    rows = []
+
+    for t, tick in enumerate(observations):
+        now = START + timedelta(seconds=t * POLL_SECONDS)
+        result = engine.step(tick, now)
+
+        for i in range(len(symbols)):
+            rows.append((
+                META_REGIMES[result["meta"][i]],
+                float(result["confidence"][i]),
+                STRATEGIES[result["strategy"][i]],
+                bool(result["decided"][i])
+            ))
+
+    return rows
+
+
+def check_parity(window, min_confirmations,
+                 n_symbols=200, n_ticks=300, seed=7):
+
+    rng = np.random.default_rng(seed)
+    symbols = [f"SYM{i}" for i in range(n_symbols)]
+    observations = random_observations(rng, n_ticks, n_symbols)
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        scalar = run_scalar(symbols, observations, window, min_confirmations)
+
+    batch = run_batch(symbols, observations, window, min_confirmations)
+
+    mismatches = sum(1 for a, b in zip(scalar, batch) if a != b)
+    decisions = sum(1 for row in scalar if row[3])
+
+    print(
+        f"parity (window={window}, min={min_confirmations}): "
+        f"{len(scalar)} symbol-ticks, {decisions} decisions, "
+        f"{mismatches} mismatches"
+    )
+
+    return mismatches == 0
+
+
+def time_batch(n_symbols=5000, n_ticks=200, seed=11):
+
+    rng = np.random.default_rng(seed)
+    symbols = [f"SYM{i}" for i in range(n_symbols)]
+    observations = random_observations(rng, n_ticks, n_symbols)
+
+    engine = BatchRegimeEngine(symbols, TIMEFRAMES)
+    timings = []
+
+    for t, tick in enumerate(observations):
+        now = START + timedelta(seconds=t * POLL_SECONDS)
+
+        started = time.perf_counter()
+        engine.step(tick, now)
+        timings.append(time.perf_counter() - started)
+
+    timings = np.array(timings) * 1000
+
+    print(
+        f"batch: {n_symbols} symbols x {len(TIMEFRAMES)} timeframes, "
+        f"p50 {np.percentile(timings, 50):.2f} ms, "
+        f"p99 {np.percentile(timings, 99):.2f} ms per tick"
+    )
+
+
+if __name__ == "__main__":
+    # 4/2 allows tied majorities, exercising the first-seen tie-break
+    ok = all([
+        check_parity(STABILITY_WINDOW, MIN_CONFIRMATIONS),
+        check_parity(4, 2),
+    ])
+    time_batch()
+    raise SystemExit(0 if ok else 1)
@@ -0,0 +1,101 @@
+"""
+State board: read latency and consistency under a busy writer.
+
+A writer process publishes trades for a few symbols as fast as it can,
+with quantity always equal to price * 2 and receive_timestamp equal to
+the update number. The main process reads the same slots through
+StateBoardReader and reports read latency, torn reads (a trade whose
+fields come from different updates) and the writer's update rate:
+
+    python -m benchmarks.state_board_bench --seconds 5
+"""
+
+import argparse
+import multiprocessing
+import os
+import time
+
+from fastapi_market.state_board import StateBoardReader, StateBoardWriter
+
+SYMBOLS = [f"COIN{i}USDT" for i in range(8)]
+
+
+def write(name, seconds, counter):
+    writer = StateBoardWriter(name=name).open()
+    deadline = time.perf_counter() + seconds
+    n = 0
+
+    while time.perf_counter() < deadline:
+        n += 1
+        price = float(n)
+        writer.trade({
+            "market_type": "CRYPTO",
+            "symbol": SYMBOLS[n % len(SYMBOLS)],
+            "price": price,
+            "quantity": price * 2,
+            "side": "BUY" if n & 1 else "SELL",
+            "exchange_timestamp": n,
+            "receive_timestamp": n,
+        })
+
+        if n % 10_000 == 0:
+            writer.heartbeat()
+
+    counter.value = n
+    writer.close()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seconds", type=float, default=5)
+    args = parser.parse_args()
+
+    name = f"aetherion_board_bench_{os.getpid()}"
+    counter = multiprocessing.Value("q", 0)
+
+    process = multiprocessing.Process(target=write, args=(name, args.seconds, counter))
+    process.start()
+
+    reader = StateBoardReader(name=name)
+
+    while reader.latest_trade("CRYPTO", SYMBOLS[0]) is None:
+        time.sleep(0.01)
+
+    reads = torn = misses = 0
+    latencies = []
+
+    while process.is_alive():
+        symbol = SYMBOLS[reads % len(SYMBOLS)]
+
+        started = time.perf_counter_ns()
+        trade = reader.latest_trade("CRYPTO", symbol)
+        latencies.append(time.perf_counter_ns() - started)
+
+        reads += 1
+
+        if trade is None:
+            misses += 1
+        elif trade["quantity"] != trade["price"] * 2 \
+                or trade["receive_timestamp"] != int(trade["price"]) \
+                or trade["side"] != ("BUY" if trade["receive_timestamp"] & 1 else "SELL"):
+            torn += 1
+
+    process.join()
+
+    # The writer closed without unlinking; remove the benchmark's segment
+    from multiprocessing import shared_memory
+    segment = shared_memory.SharedMemory(name=name)
+    segment.close()
+    segment.unlink()
+
+    latencies.sort()
+
+    print(f"writer updates   {counter.value / args.seconds:12,.0f} /s")
+    print(f"reads            {reads:12,} ({misses} without an answer)")
+    print(f"read p50         {latencies[len(latencies) // 2] / 1000:12.2f} µs")
+    print(f"read p99         {latencies[int(len(latencies) * 0.99)] / 1000:12.2f} µs")
+    print(f"torn reads       {torn:12}")
+
+
+if __name__ == "__main__":
+    main()
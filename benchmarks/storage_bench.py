@@ -0,0 +1,136 @@
+"""
+Embedded SQLite backend: end-to-end ingest and repository write throughput.
+
+Runs the live pipeline (save_tick -> candle engine -> feature engine ->
+background sinks) on STORAGE_BACKEND=sqlite in a temporary directory, then
+times bulk repository writes and the reads the engine does at startup and
+per regime poll:
+
+    python -m benchmarks.storage_bench --ticks 200000 --symbols 4
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+
+_workdir = tempfile.mkdtemp(prefix="aetherion_storage_bench_")
+
+os.environ["STORAGE_BACKEND"] = "sqlite"
+os.environ["SQLITE_PATH"] = os.path.join(_workdir, "aetherion.db")
+os.environ["TICK_LOG_DIR"] = os.path.join(_workdir, "tick_log")
+os.environ["WRITE_JOURNAL_DIR"] = os.path.join(_workdir, "write_journal")
+
+from fastapi_market.candle_engine import MultiTimeframeCandleEngine
+from fastapi_market.mongo_sink import SINKS, flush_sinks
+from fastapi_market.service import register_candle_engine, save_tick
+from fastapi_market.storage import get_storage
+
+
+def simulate_ticks(n, symbols, seed=7):
+    rng = random.Random(seed)
+    prices = {f"COIN{i}USDT": 100.0 * (i + 1) for i in range(symbols)}
+    ts = 1_700_000_000_000
+
+    for i in range(n):
+        symbol = f"COIN{i % symbols}USDT"
+        prices[symbol] *= 1 + rng.gauss(0, 0.0005)
+        ts += rng.randint(50, 250)
+
+        yield {
+            "market_type": "CRYPTO",
+            "symbol": symbol,
+            "price": prices[symbol],
+            "quantity": round(rng.expovariate(2), 6),
+            "side": rng.choice(("BUY", "SELL")),
+            "exchange_timestamp": ts - 3,
+            "receive_timestamp": ts
+        }
+
+
+async def timed(fn, *args):
+    started = time.perf_counter()
+    result = await fn(*args)
+    return result, time.perf_counter() - started
+
+
+async def run(args):
+    storage = get_storage()
+    await storage.open()
+
+    engine = MultiTimeframeCandleEngine(None)
+    register_candle_engine(engine)
+
+    tasks = [asyncio.create_task(sink.run()) for sink in SINKS.values()]
+
+    started = time.perf_counter()
+
+    for i, tick in enumerate(simulate_ticks(args.ticks, args.symbols)):
+        await save_tick(tick)
+
+        # Let the sinks drain like they would between socket reads
+        if i % 1000 == 0:
+            await asyncio.sleep(0)
+
+    await engine.flush_all()
+
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    await flush_sinks()
+
+    ingest = time.perf_counter() - started
+
+    print(f"ticks            {args.ticks} over {args.symbols} symbols")
+    print(f"end to end       {args.ticks / ingest:10,.0f} ticks/s ({ingest:.2f}s)")
+
+    for name, sink in SINKS.items():
+        row = await storage.database.fetch_one(f'SELECT COUNT(*) AS n FROM "{name}"')
+        print(f"  {name:<24} stored={row['n']:<8} errors={sink.status()['errors']}")
+
+    # Bulk writes straight to the repositories
+    rows = [
+        {
+            "market": "CRYPTO", "symbol": "BULK", "timeframe": "1m",
+            "bucket_start": i * 60_000, "open": 1.0, "high": 2.0, "low": 0.5,
+            "close": 1.5, "volume": 10.0, "partial": False,
+        }
+        for i in range(args.bulk)
+    ]
+
+    _, elapsed = await timed(storage.candles.write_many, rows)
+    print(f"candle upserts   {args.bulk / elapsed:10,.0f} rows/s (new)")
+
+    _, elapsed = await timed(storage.candles.write_many, rows)
+    print(f"candle upserts   {args.bulk / elapsed:10,.0f} rows/s (existing)")
+
+    symbol = "COIN0USDT"
+    _, elapsed = await timed(storage.features.series, "CRYPTO", symbol, "1m", None, None, 200, True)
+    print(f"predict read     {elapsed * 1e3:10.2f} ms (200 newest features)")
+
+    _, elapsed = await timed(storage.ticks.latest, "CRYPTO", 2048)
+    print(f"trade warm read  {elapsed * 1e3:10.2f} ms (2048 newest ticks)")
+
+    await storage.close()
+
+    size = sum(
+        os.path.getsize(os.path.join(_workdir, f))
+        for f in os.listdir(_workdir) if f.startswith("aetherion.db")
+    )
+    print(f"database         {size / 1e6:10.1f} MB in {_workdir}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--ticks", type=int, default=200_000)
+    parser.add_argument("--symbols", type=int, default=4)
+    parser.add_argument("--bulk", type=int, default=100_000)
+    args = parser.parse_args()
+
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
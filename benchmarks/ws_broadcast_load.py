@@ -0,0 +1,212 @@
+"""
+BroadcastHub fan-out under load.
+
+Starts a uvicorn server whose /ws endpoint is served by a BroadcastHub,
+connects thousands of local websocket clients (optionally some that never
+read), publishes timestamped messages and reports delivery latency:
+
+    python -m benchmarks.ws_broadcast_load --clients 5000 --messages 50
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+import httpx
+import numpy as np
+import websockets
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect
+
+from fastapi_market.broadcast_hub import BroadcastHub, CONFLATE, DISCONNECT
+
+# =========================================
+# SERVER
+# =========================================
+hub = BroadcastHub(policy=os.getenv("HUB_POLICY", CONFLATE))
+
+app = FastAPI()
+
+
+@app.websocket("/ws")
+async def ws_endpoint(websocket: WebSocket):
+    await hub.connect(websocket)
+    try:
+        while True:
+            await websocket.receive_text()
+    except WebSocketDisconnect:
+        pass
+    finally:
+        hub.disconnect(websocket)
+
+
+@app.get("/stats")
+async def stats():
+    return {"clients": len(hub.clients), **hub.stats}
+
+
+@app.post("/publish")
+async def publish(count: int = 1, interval_ms: float = 20, size: int = 200):
+    padding = "x" * size
+    publish_seconds = []
+
+    for seq in range(count):
+        started = time.perf_counter()
+
+        await hub.broadcast({
+            "type": "regime_update",
+            "seq": seq,
+            "sent": time.time(),
+            "padding": padding
+        })
+
+        publish_seconds.append(time.perf_counter() - started)
+        await asyncio.sleep(interval_ms / 1000)
+
+    return {"publish_max_ms": max(publish_seconds) * 1000}
+
+
+# =========================================
+# CLIENTS
+# =========================================
+async def reader(url, gate, latencies, arrivals):
+    async with gate:
+        ws = await websockets.connect(url, max_size=None)
+
+    async with ws:
+        async for raw in ws:
+            message = json.loads(raw)
+            latency = time.time() - message["sent"]
+            latencies.append(latency)
+            arrivals.setdefault(message["seq"], []).append(latency)
+
+
+async def stalled(url, gate):
+    # Never reads: the socket backs up and the hub must route around it
+    async with gate:
+        ws = await websockets.connect(url, max_queue=1)
+
+    async with ws:
+        await asyncio.Event().wait()
+
+
+async def open_clients(url, n_clients, n_slow, latencies, arrivals, concurrency=200):
+    gate = asyncio.Semaphore(concurrency)
+
+    tasks = [
+        asyncio.create_task(
+            stalled(url, gate) if i < n_slow
+            else reader(url, gate, latencies, arrivals)
+        )
+        for i in range(n_clients)
+    ]
+
+    return tasks
+
+
+def raise_fd_limit():
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+    return hard
+
+
+async def run(args):
+    base = f"http://127.0.0.1:{args.port}"
+    url = f"ws://127.0.0.1:{args.port}/ws"
+
+    latencies, arrivals = [], {}
+
+    async with httpx.AsyncClient(base_url=base, timeout=None) as http:
+        started = time.perf_counter()
+        tasks = await open_clients(
+            url, args.clients, args.slow, latencies, arrivals
+        )
+
+        connected = 0
+        while connected < args.clients and time.perf_counter() - started < 120:
+            await asyncio.sleep(0.2)
+            connected = (await http.get("/stats")).json()["clients"]
+
+        print(
+            f"🔌 {connected}/{args.clients} clients connected "
+            f"in {time.perf_counter() - started:.1f}s"
+        )
+
+        response = await http.post("/publish", params={
+            "count": args.messages,
+            "interval_ms": args.interval_ms,
+            "size": args.size
+        })
+        publish_max_ms = response.json()["publish_max_ms"]
+
+        expected = (args.clients - args.slow) * args.messages
+        deadline = time.time() + 30
+        while len(latencies) < expected and time.time() < deadline:
+            await asyncio.sleep(0.1)
+
+        stats = (await http.get("/stats")).json()
+
+    for task in tasks:
+        task.cancel()
+
+    lat = np.array(latencies) * 1000
+    # Time until the last reader received each message
+    fanout = np.array([max(seq_latencies) for seq_latencies in arrivals.values()]) * 1000
+
+    print(f"📨 delivered {len(latencies)}/{expected} messages")
+    print(f"⏱  publish call max: {publish_max_ms:.2f} ms")
+    for name, values in (("latency", lat), ("last client", fanout)):
+        if len(values):
+            p50, p95, p99 = np.percentile(values, [50, 95, 99])
+            print(
+                f"   {name:<12} p50={p50:.1f} ms p95={p95:.1f} ms "
+                f"p99={p99:.1f} ms max={values.max():.1f} ms"
+            )
+    print(f"📊 hub stats: {stats}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--clients", type=int, default=5000)
+    parser.add_argument("--slow", type=int, default=50, help="clients that never read")
+    parser.add_argument("--messages", type=int, default=50)
+    parser.add_argument("--interval-ms", type=float, default=20)
+    parser.add_argument("--size", type=int, default=200, help="payload padding bytes")
+    parser.add_argument("--policy", default=CONFLATE, choices=[CONFLATE, DISCONNECT])
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    raise_fd_limit()
+
+    server = subprocess.Popen(
+        [
+            sys.executable, "-m", "uvicorn",
+            "benchmarks.ws_broadcast_load:app",
+            "--port", str(args.port),
+            "--log-level", "warning",
+            "--backlog", "4096"
+        ],
+        env={**os.environ, "HUB_POLICY": args.policy}
+    )
+
+    try:
+        for _ in range(100):
+            try:
+                httpx.get(f"http://127.0.0.1:{args.port}/stats")
+                break
+            except httpx.TransportError:
+                time.sleep(0.1)
+
+        asyncio.run(run(args))
+
+    finally:
+        server.terminate()
+        server.wait()
+
+
+if __name__ == "__main__":
+    main()
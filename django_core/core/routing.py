@@ -2,8 +2,15 @@ from django.urls import re_path
 from channels.generic.websocket import AsyncWebsocketConsumer
 import json
 
+from system.services.broadcast_service import CHANNELS, topic_group, topic_registry
+
 class LiveConsumer(AsyncWebsocketConsumer):
-    GROUP_NAME = "live_updates"
+    """
+    Clients start subscribed to every channel and narrow it down with:
+
+        {"action": "subscribe", "channel": "market", "market": "CRYPTO", "symbol": "BTCUSDT"}
+        {"action": "unsubscribe", "channel": "market"}
+    """
 
     async def connect(self):
         user = self.scope.get("user")
@@ -12,30 +19,96 @@ class LiveConsumer(AsyncWebsocketConsumer):
             await self.close()
             return
 
-        await self.channel_layer.group_add(
-            self.GROUP_NAME,
-            self.channel_name
-        )
+        # topic -> group, where topic is (channel, market, symbol)
+        self.topics = {}
+        self.groups_joined = set()
 
         await self.accept()
 
+        for channel in CHANNELS:
+            self.topics[(channel, None, None)] = topic_group(channel)
+
+        await self._sync_groups()
+
         await self.send(text_data=json.dumps({
             "message": "WebSocket authenticated and connected."
         }))
 
     async def disconnect(self, close_code):
-        await self.channel_layer.group_discard(
-            self.GROUP_NAME,
-            self.channel_name
-        )
+        for group in getattr(self, "groups_joined", ()):
+            await self.channel_layer.group_discard(
+                group,
+                self.channel_name
+            )
+            await topic_registry.discard(self.channel_layer, group)
 
     async def receive(self, text_data):
-        pass
+        try:
+            request = json.loads(text_data)
+            action = request["action"]
+            channel = request["channel"]
+
+            if channel not in CHANNELS:
+                raise ValueError(f"Unknown channel: {channel}")
+
+            market = (request.get("market") or "").upper() or None
+            symbol = ((request.get("symbol") or "").upper() or None) if market else None
+            topic = (channel, market, symbol)
+
+            if action == "subscribe":
+                self.topics[topic] = topic_group(*topic)
+            elif action == "unsubscribe":
+                self.topics.pop(topic, None)
+            else:
+                raise ValueError(f"Unknown action: {action}")
+
+        except (ValueError, KeyError, TypeError, AttributeError) as e:
+            await self.send(text_data=json.dumps({"error": str(e)}))
+            return
+
+        await self._sync_groups()
+
+        await self.send(text_data=json.dumps({
+            "message": f"{action}d",
+            "topics": sorted(self.topics.values())
+        }))
+
+    async def _sync_groups(self):
+        """
+        Join the groups for the current topics. A topic already covered by
+        a broader one (e.g. market.CRYPTO under market) is left out, since
+        messages are published to every level and would arrive twice.
+        Joins and leaves are counted in topic_registry, which senders use
+        to skip levels without members.
+        """
+
+        wanted = {
+            group for (channel, market, symbol), group in self.topics.items()
+            if not any(
+                parent in self.topics
+                for parent in ((channel, None, None), (channel, market, None))
+                if parent != (channel, market, symbol)
+            )
+        }
+
+        for group in self.groups_joined - wanted:
+            await self.channel_layer.group_discard(group, self.channel_name)
+            await topic_registry.discard(self.channel_layer, group)
+
+        for group in wanted - self.groups_joined:
+            await self.channel_layer.group_add(group, self.channel_name)
+            await topic_registry.add(self.channel_layer, group)
+
+        self.groups_joined = wanted
 
     async def live_message(self, event):
         """
-        Handler for broadcast messages sent to group.
+        Handler for broadcast messages sent to a topic group.
         """
+        if "text" in event:
+            await self.send(text_data=event["text"])
+            return
+
         await self.send(text_data=json.dumps({
             "channel": event.get("channel"),
             "data": event.get("data")
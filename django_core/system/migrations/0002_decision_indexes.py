@@ -0,0 +1,27 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    """
+    `decisions` is written by the FastAPI decision pipeline (managed=False),
+    so its indexes are created with raw SQL.
+    """
+
+    dependencies = [
+        ('system', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            sql=[
+                "CREATE INDEX idx_decisions_created_at ON decisions (created_at)",
+                "CREATE INDEX idx_decisions_market_created_at ON decisions (market, created_at)",
+                "CREATE INDEX idx_decisions_market_symbol_created_at ON decisions (market, symbol, created_at)",
+            ],
+            reverse_sql=[
+                "DROP INDEX idx_decisions_market_symbol_created_at ON decisions",
+                "DROP INDEX idx_decisions_market_created_at ON decisions",
+                "DROP INDEX idx_decisions_created_at ON decisions",
+            ],
+        ),
+    ]
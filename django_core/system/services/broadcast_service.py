@@ -1,24 +1,158 @@
+import json
+import re
+import time
+from collections import Counter
 from channels.layers import get_channel_layer
 from asgiref.sync import async_to_sync
 
+GROUP_PREFIX = "live"
+CHANNELS = ("market", "regime", "strategy")
+
+# How long a sender trusts its copy of the shared active-group counts
+ACTIVE_GROUPS_TTL_SECONDS = 1.0
+
+_INVALID_GROUP_CHARS = re.compile(r"[^A-Za-z0-9_.-]")
+
+
+def topic_group(channel: str, market: str = None, symbol: str = None):
+    """
+    Channels group for a topic: live.<channel>[.<market>[.<symbol>]].
+
+    Group names only allow ASCII letters, digits, hyphens, underscores and
+    periods, so anything else (e.g. the ':' in NASDAQ:TSLA) becomes '-'.
+    """
+
+    parts = [GROUP_PREFIX, channel]
+
+    if market:
+        parts.append(market.upper())
+
+        if symbol:
+            parts.append(symbol.upper())
+
+    return ".".join(_INVALID_GROUP_CHARS.sub("-", p) for p in parts)[:99]
+
+
+def topic_groups(channel: str, market: str = None, symbol: str = None):
+    """
+    Every group a message on this topic is delivered to, broadest first.
+    """
+
+    groups = [topic_group(channel)]
+
+    if market:
+        groups.append(topic_group(channel, market))
+
+        if symbol:
+            groups.append(topic_group(channel, market, symbol))
+
+    return groups
+
+
+class TopicRegistry:
+    """
+    Member count per topic group, maintained by LiveConsumer as it joins
+    and leaves groups, so a broadcast skips the levels nobody joined
+    (an empty group_send still costs channels_redis its round trips).
+
+    With the Redis layer the counts are a hash next to the layer's own
+    keys, shared by every worker; a sender re-reads it at most once per
+    ACTIVE_GROUPS_TTL_SECONDS, so a socket joining in another worker can
+    miss up to that long of messages. Joins in this process count at once.
+    Layers without Redis (the in-memory layer) are process-local, so the
+    local counts are exact for them.
+    """
+
+    def __init__(self):
+        self.counts = Counter()
+        self.shared = set()
+        self.read_at = None
+
+    @staticmethod
+    def _redis(channel_layer):
+        connection = getattr(channel_layer, "connection", None)
+        return connection(0) if connection else None
+
+    @staticmethod
+    def _key(channel_layer):
+        return f"{getattr(channel_layer, 'prefix', 'asgi')}:{GROUP_PREFIX}:active"
+
+    async def add(self, channel_layer, group: str):
+        self.counts[group] += 1
+
+        redis = self._redis(channel_layer)
+        if redis is not None:
+            await redis.hincrby(self._key(channel_layer), group, 1)
+
+    async def discard(self, channel_layer, group: str):
+        self.counts[group] -= 1
+        if self.counts[group] <= 0:
+            del self.counts[group]
+
+        redis = self._redis(channel_layer)
+        if redis is not None:
+            # Zero counts stay in the hash; deleting them would race a join
+            await redis.hincrby(self._key(channel_layer), group, -1)
+
+    async def active_groups(self, channel_layer):
+        redis = self._redis(channel_layer)
+
+        if redis is None:
+            return set(self.counts)
+
+        now = time.monotonic()
+
+        if self.read_at is None or now - self.read_at >= ACTIVE_GROUPS_TTL_SECONDS:
+            counts = await redis.hgetall(self._key(channel_layer))
+            self.shared = {
+                group.decode() for group, n in counts.items() if int(n) > 0
+            }
+            self.read_at = now
+
+        return self.shared | set(self.counts)
+
+
+topic_registry = TopicRegistry()
+
 
 class BroadcastService:
 
-    GROUP_NAME = "live_updates"
+    @staticmethod
+    def _event(channel: str, data: dict):
+        # Serialized once here instead of once per consumer
+        return {
+            "type": "live_message",
+            "text": json.dumps({
+                "channel": channel,
+                "data": data
+            }, default=str)
+        }
 
     @staticmethod
-    def send(channel: str, data: dict):
+    def send(channel: str, data: dict, market: str = None, symbol: str = None):
         """
-        Broadcast message to all connected WebSocket clients.
+        Broadcast message to the clients subscribed to this topic.
         """
 
-        channel_layer = get_channel_layer()
+        async_to_sync(BroadcastService.send_async)(channel, data, market, symbol)
 
-        async_to_sync(channel_layer.group_send)(
-            BroadcastService.GROUP_NAME,
-            {
-                "type": "live_message",
-                "channel": channel,
-                "data": data
-            }
-        )
\ No newline at end of file
+    @staticmethod
+    async def send_async(channel: str, data: dict, market: str = None,
+                         symbol: str = None, channel_layer=None):
+        """
+        Same as send(), for callers already running in an event loop.
+        Only levels of the topic that have members are sent to.
+        """
+
+        channel_layer = channel_layer or get_channel_layer()
+        active = await topic_registry.active_groups(channel_layer)
+
+        groups = [g for g in topic_groups(channel, market, symbol) if g in active]
+
+        if not groups:
+            return
+
+        event = BroadcastService._event(channel, data)
+
+        for group in groups:
+            await channel_layer.group_send(group, event)
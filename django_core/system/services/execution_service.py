@@ -1,10 +1,8 @@
-import requests
+from system.services.http_client import fastapi_client
 from system.services.risk_service import RiskService
 from system.services.portfolio_service import PortfolioService
 from system.models import TradeExecution
 
-FASTAPI_URL = "http://127.0.0.1:8001/api/position/size"
-
 
 class ExecutionService:
     @staticmethod
@@ -15,7 +13,11 @@ class ExecutionService:
             "atr": atr,
             "risk_config": risk_config
         }
-        response = requests.post(FASTAPI_URL, json=payload)
+        response = fastapi_client.post(
+            "position.size",
+            "/api/position/size",
+            json=payload
+        )
         if response.status_code != 200:
             raise Exception("Position sizing engine error")
         sizing_result = response.json()
@@ -0,0 +1,272 @@
+import asyncio
+import threading
+import time
+import weakref
+from collections import defaultdict, deque
+
+import httpx
+import numpy as np
+import requests
+from requests.adapters import HTTPAdapter
+
+FASTAPI_BASE = "http://127.0.0.1:8001"
+FLASK_REGIME_BASE = "http://127.0.0.1:5001"
+
+POOL_SIZE = 20
+
+# (connect, read) seconds per endpoint
+DEFAULT_TIMEOUT = (2, 10)
+ENDPOINT_TIMEOUTS = {
+    "market.snapshot": (2, 5),
+    "decision.latest": (2, 5),
+    "position.size": (2, 5),
+    "regime.detect": (2, 5),
+}
+
+FAILURE_THRESHOLD = 5
+RESET_TIMEOUT_SECONDS = 30
+
+LATENCY_WINDOW = 500
+
+
+class CircuitOpenError(requests.exceptions.RequestException):
+    """
+    Raised instead of calling a service whose circuit is open. Existing
+    `except RequestException` handlers treat it as "service unavailable".
+    """
+
+
+class CircuitBreaker:
+    """
+    Opens after FAILURE_THRESHOLD consecutive failures. Once
+    RESET_TIMEOUT_SECONDS have passed a single trial call goes through:
+    success closes the circuit, failure keeps it open for another period.
+    """
+
+    def __init__(self, name, failure_threshold=FAILURE_THRESHOLD,
+                 reset_timeout=RESET_TIMEOUT_SECONDS):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+
+        self.failures = 0
+        self.opened_at = None
+        self.lock = threading.Lock()
+
+    def before_call(self):
+        with self.lock:
+            if self.opened_at is None:
+                return
+
+            if time.monotonic() - self.opened_at < self.reset_timeout:
+                raise CircuitOpenError(f"{self.name} circuit open")
+
+            # Let this call through as the trial, hold the rest back
+            self.opened_at = time.monotonic()
+
+    def record(self, success):
+        with self.lock:
+            if success:
+                self.failures = 0
+                self.opened_at = None
+                return
+
+            self.failures += 1
+
+            if self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+
+        if time.monotonic() - self.opened_at < self.reset_timeout:
+            return "open"
+
+        return "half_open"
+
+
+class _LatencyStats:
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.recent = deque(maxlen=LATENCY_WINDOW)
+        self.lock = threading.Lock()
+
+    def record(self, elapsed_ms, success):
+        with self.lock:
+            self.calls += 1
+            self.errors += 0 if success else 1
+            self.recent.append(elapsed_ms)
+
+    def summary(self):
+        with self.lock:
+            recent = np.array(self.recent)
+            calls, errors = self.calls, self.errors
+
+        if not len(recent):
+            return {"calls": calls, "errors": errors}
+
+        p50, p95, p99 = np.percentile(recent, [50, 95, 99])
+
+        return {
+            "calls": calls,
+            "errors": errors,
+            "p50_ms": round(float(p50), 2),
+            "p95_ms": round(float(p95), 2),
+            "p99_ms": round(float(p99), 2),
+            "max_ms": round(float(recent.max()), 2),
+        }
+
+
+class ServiceClient:
+    """
+    Keep-alive client for one backend service.
+
+    request() uses a pooled requests.Session for sync code, arequest() an
+    httpx.AsyncClient (one per event loop) for async code, and submit()
+    runs arequest() on a shared background loop so sync views can overlap
+    independent calls. All three share the circuit breaker and metrics and
+    raise requests exceptions.
+    """
+
+    def __init__(self, name, base_url, pool_size=POOL_SIZE):
+        self.name = name
+        self.base_url = base_url
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self.pool_size = pool_size
+        self._async_clients = weakref.WeakKeyDictionary()
+
+        self.breaker = CircuitBreaker(name)
+        self.latency = defaultdict(_LatencyStats)
+
+    def _timeout(self, endpoint):
+        return ENDPOINT_TIMEOUTS.get(endpoint, DEFAULT_TIMEOUT)
+
+    def _record(self, endpoint, started, success):
+        self.breaker.record(success)
+        self.latency[endpoint].record(
+            (time.perf_counter() - started) * 1000,
+            success
+        )
+
+    def request(self, method, endpoint, path, **kwargs):
+        self.breaker.before_call()
+
+        started = time.perf_counter()
+
+        try:
+            response = self.session.request(
+                method,
+                f"{self.base_url}{path}",
+                timeout=self._timeout(endpoint),
+                **kwargs
+            )
+        except requests.exceptions.RequestException:
+            self._record(endpoint, started, False)
+            raise
+
+        self._record(endpoint, started, response.status_code < 500)
+        return response
+
+    def get(self, endpoint, path, **kwargs):
+        return self.request("GET", endpoint, path, **kwargs)
+
+    def post(self, endpoint, path, **kwargs):
+        return self.request("POST", endpoint, path, **kwargs)
+
+    def _async_client(self):
+        loop = asyncio.get_running_loop()
+        client = self._async_clients.get(loop)
+
+        if client is None:
+            client = httpx.AsyncClient(
+                base_url=self.base_url,
+                limits=httpx.Limits(
+                    max_connections=self.pool_size,
+                    max_keepalive_connections=self.pool_size
+                )
+            )
+            self._async_clients[loop] = client
+
+        return client
+
+    async def arequest(self, method, endpoint, path, **kwargs):
+        self.breaker.before_call()
+
+        connect, read = self._timeout(endpoint)
+        started = time.perf_counter()
+
+        try:
+            response = await self._async_client().request(
+                method,
+                path,
+                timeout=httpx.Timeout(read, connect=connect),
+                **kwargs
+            )
+        except httpx.TimeoutException as e:
+            self._record(endpoint, started, False)
+            raise requests.exceptions.Timeout(str(e))
+        except httpx.HTTPError as e:
+            self._record(endpoint, started, False)
+            raise requests.exceptions.ConnectionError(str(e))
+
+        self._record(endpoint, started, response.status_code < 500)
+        return response
+
+    def submit(self, method, endpoint, path, **kwargs):
+        """
+        Start a request on the background loop; returns a
+        concurrent.futures.Future resolving to the httpx response.
+        """
+        return asyncio.run_coroutine_threadsafe(
+            self.arequest(method, endpoint, path, **kwargs),
+            _background_loop()
+        )
+
+    def metrics(self):
+        return {
+            "circuit": self.breaker.state,
+            "consecutive_failures": self.breaker.failures,
+            "endpoints": {
+                endpoint: stats.summary()
+                for endpoint, stats in self.latency.items()
+            }
+        }
+
+
+_loop = None
+_loop_lock = threading.Lock()
+
+
+def _background_loop():
+    global _loop
+
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+
+            threading.Thread(
+                target=_loop.run_forever,
+                name="service-client-loop",
+                daemon=True
+            ).start()
+
+    return _loop
+
+
+fastapi_client = ServiceClient("fastapi_market", FASTAPI_BASE)
+flask_regime_client = ServiceClient("flask_regime", FLASK_REGIME_BASE)
+
+CLIENTS = [fastapi_client, flask_regime_client]
+
+
+def service_metrics():
+    return {client.name: client.metrics() for client in CLIENTS}
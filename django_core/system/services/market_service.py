@@ -1,22 +1,33 @@
+import asyncio
+import json
 import requests
 import threading
-import time
+import websockets
+from channels.layers import get_channel_layer
 from .broadcast_service import BroadcastService
+from .http_client import fastapi_client
+from .state_board import board
 
-FASTAPI_MARKET_BASE = "http://127.0.0.1:8001/api/market/snapshot"
+FASTAPI_MARKET_WS = "ws://127.0.0.1:8001/ws/market"
+
+STREAM_MAX_RATE = 5             # trades/second per symbol pushed by FastAPI
+RELAY_WINDOW_SECONDS = 0.02     # updates arriving together share one batch
+RELAY_MIN_INTERVAL_SECONDS = 0.2
+RECONNECT_DELAY_SECONDS = 5
 
 
 class MarketService:
 
     VALID_MARKETS = ["CRYPTO", "NASDAQ", "NYSE"]
 
-    _last_broadcasted_snapshot = {}
+    _last_sequence = {}
     _streaming_started = False
 
     @staticmethod
     def get_market_snapshot(market: str):
         """
-        Calls FastAPI market snapshot endpoint.
+        Latest trade of the market, from the state board or the FastAPI
+        snapshot endpoint.
         """
         if not market:
             return {"error": "Market parameter is required."}, 400
@@ -26,10 +37,16 @@ class MarketService:
         if market not in MarketService.VALID_MARKETS:
             return {"error": "Invalid market type."}, 400
 
+        # Same host: read the engine's latest trade from shared memory
+        trade = board.latest_trade(market) if board else None
+
+        if trade:
+            return {"data": trade}, 200
+
         try:
-            response = requests.get(
-                f"{FASTAPI_MARKET_BASE}/{market}",
-                timeout=15
+            response = fastapi_client.get(
+                "market.snapshot",
+                f"/api/market/snapshot/{market}"
             )
 
             if response.status_code != 200:
@@ -51,43 +68,97 @@ class MarketService:
     # ===============================
 
     @staticmethod
-    def _poll_market():
+    async def _relay(channel_layer, pending, wake):
         """
-        Background polling loop.
-        Runs every 5 seconds.
+        Sends the newest trade per market and symbol, one batch per relay
+        window and at most one batch per RELAY_MIN_INTERVAL_SECONDS. A
+        failed send is logged and dropped; the next trade for that symbol
+        goes out with a later batch.
         """
 
-        print("📡 Market snapshot streaming started")
+        while True:
+            await wake.wait()
+            await asyncio.sleep(RELAY_WINDOW_SECONDS)
+            wake.clear()
+
+            batch = dict(pending)
+            pending.clear()
+
+            results = await asyncio.gather(*(
+                BroadcastService.send_async(
+                    channel="market",
+                    data={
+                        "market": market,
+                        "snapshot": {"data": trade}
+                    },
+                    market=market,
+                    symbol=symbol,
+                    channel_layer=channel_layer
+                )
+                for (market, symbol), trade in batch.items()
+            ), return_exceptions=True)
+
+            for result in results:
+                if isinstance(result, Exception):
+                    print("Market relay error:", str(result))
+
+            await asyncio.sleep(RELAY_MIN_INTERVAL_SECONDS)
+
+    @staticmethod
+    async def _stream_market():
+        """
+        Long-lived subscription to the FastAPI trade stream, relayed into
+        the Channels group. FastAPI already conflates to STREAM_MAX_RATE.
+        """
+
+        channel_layer = get_channel_layer()
+
+        pending = {}
+        wake = asyncio.Event()
+        relay = asyncio.create_task(
+            MarketService._relay(channel_layer, pending, wake)
+        )
 
         while True:
             try:
-                for market in MarketService.VALID_MARKETS:
-                    response, status = MarketService.get_market_snapshot(market)
+                async with websockets.connect(
+                    f"{FASTAPI_MARKET_WS}?max_rate={STREAM_MAX_RATE}",
+                    ping_interval=20
+                ) as ws:
+
+                    await ws.send(json.dumps({
+                        "action": "subscribe",
+                        "channel": "trades",
+                        "symbols": ["*"]
+                    }))
+
+                    print("📡 Market stream subscribed")
+
+                    async for raw in ws:
+                        frame = json.loads(raw)
 
-                    if status != 200:
-                        continue
+                        if frame.get("type") != "market":
+                            continue
 
-                    previous = MarketService._last_broadcasted_snapshot.get(market)
+                        market = frame["market"]
+                        key = (market, frame["symbol"])
 
-                    # 🔥 Debounce: broadcast only if changed
-                    if response != previous:
-                        print(f"🔥 MARKET BROADCAST TRIGGERED ({market})")
+                        # 🔥 Debounce: same sequence number means same trade
+                        if MarketService._last_sequence.get(key) == frame["seq"]:
+                            continue
 
-                        BroadcastService.send(
-                            channel="market",
-                            data={
-                                "market": market,
-                                "snapshot": response
-                            }
-                        )
+                        MarketService._last_sequence[key] = frame["seq"]
 
-                        MarketService._last_broadcasted_snapshot[market] = response
+                        pending[key] = frame["data"]
+                        wake.set()
 
-                time.sleep(5)
+            except asyncio.CancelledError:
+                relay.cancel()
+                raise
 
             except Exception as e:
                 print("Market streaming error:", str(e))
-                time.sleep(5)
+                await asyncio.sleep(RECONNECT_DELAY_SECONDS)
 
     @staticmethod
     def start_streaming():
@@ -98,7 +169,8 @@ class MarketService:
             MarketService._streaming_started = True
 
             thread = threading.Thread(
-                target=MarketService._poll_market,
+                target=asyncio.run,
+                args=(MarketService._stream_market(),),
                 daemon=True
             )
             thread.start()
\ No newline at end of file
@@ -2,9 +2,7 @@
 
 import requests
 from .broadcast_service import BroadcastService
-
-
-FLASK_REGIME_URL = "http://127.0.0.1:5001/detect_regime"
+from .http_client import flask_regime_client
 
 
 class RegimeService:
@@ -24,13 +22,13 @@ class RegimeService:
             }, 400
 
         try:
-            response = requests.post(
-                FLASK_REGIME_URL,
+            response = flask_regime_client.post(
+                "regime.detect",
+                "/detect_regime",
                 json={
                     "market": market,
                     "symbol": symbol
-                },
-                timeout=5
+                }
             )
 
             if response.status_code != 200:
@@ -46,7 +44,9 @@ class RegimeService:
                 print("🔥 BROADCAST TRIGGERED")
                 BroadcastService.send(
                     channel="regime",
-                    data=regime_data
+                    data=regime_data,
+                    market=market,
+                    symbol=symbol
                 )
 
                 RegimeService._last_broadcasted_regime = regime_data
@@ -0,0 +1,24 @@
+# system/services/state_board.py
+
+"""
+Reader for the market engine's shared-memory state board
+(fastapi_market/state_board.py). Services try it first and call FastAPI
+over HTTP when it returns None (engine on another host, not running, or
+STATE_BOARD=false).
+"""
+
+import os
+import sys
+
+# The board module lives in the engine package at the repository root;
+# it only needs the standard library
+REPO_ROOT = os.path.abspath(
+    os.path.join(os.path.dirname(__file__), "..", "..", "..")
+)
+
+if REPO_ROOT not in sys.path:
+    sys.path.append(REPO_ROOT)
+
+from fastapi_market.state_board import open_reader
+
+board = open_reader()
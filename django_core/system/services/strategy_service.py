@@ -1,7 +1,7 @@
 import requests
 from .broadcast_service import BroadcastService
-
-FASTAPI_STRATEGY_URL = "http://127.0.0.1:8001/api/decision/latest"
+from .http_client import fastapi_client
+from .state_board import board
 
 class StrategyService:
 
@@ -10,23 +10,26 @@ class StrategyService:
     @staticmethod
     def get_current_strategy():
         """
-        Calls FastAPI strategy service and returns latest decision.
-        Automatically broadcasts strategy updates if changed.
+        Latest decision from the state board, or from the FastAPI strategy
+        service. Automatically broadcasts strategy updates if changed.
         """
 
         try:
-            response = requests.get(
-                FASTAPI_STRATEGY_URL,
-                timeout=5
-            )
+            strategy_data = board.latest_decision() if board else None
+
+            if strategy_data is None:
+                response = fastapi_client.get(
+                    "decision.latest",
+                    "/api/decision/latest"
+                )
 
-            if response.status_code != 200:
-                return {
-                    "error": "Strategy service error.",
-                    "details": response.json()
-                }, response.status_code
+                if response.status_code != 200:
+                    return {
+                        "error": "Strategy service error.",
+                        "details": response.json()
+                    }, response.status_code
 
-            strategy_data = response.json()
+                strategy_data = response.json()
 
             # 🔥 Broadcast only if strategy changed
             if strategy_data != StrategyService._last_broadcasted_strategy:
@@ -34,7 +37,9 @@ class StrategyService:
 
                 BroadcastService.send(
                     channel="strategy",
-                    data=strategy_data
+                    data=strategy_data,
+                    market=strategy_data.get("market"),
+                    symbol=strategy_data.get("symbol")
                 )
 
                 StrategyService._last_broadcasted_strategy = strategy_data
@@ -1,3 +1,201 @@
-from django.test import TestCase
+import asyncio
+from unittest import mock
 
-# Create your tests here.
+from django.test import SimpleTestCase
+
+from system.services.broadcast_service import (
+    BroadcastService,
+    TopicRegistry,
+    topic_registry
+)
+from system.services.market_service import MarketService
+
+
+class FlakyChannelLayer:
+    """
+    group_send fails for the groups in `failing`, records the rest.
+    """
+
+    def __init__(self, failing=()):
+        self.failing = set(failing)
+        self.sent = []
+
+    async def group_send(self, group, event):
+        if group in self.failing:
+            self.failing.discard(group)
+            raise ConnectionError(f"{group} unavailable")
+
+        self.sent.append(group)
+
+
+class MarketRelayTest(SimpleTestCase):
+
+    def setUp(self):
+        # Sockets following the relayed symbols
+        registry = TopicRegistry()
+        registry.counts.update(["live.market.CRYPTO.BTCUSDT", "live.market.CRYPTO.ETHUSDT"])
+
+        patch = mock.patch("system.services.broadcast_service.topic_registry", registry)
+        patch.start()
+        self.addCleanup(patch.stop)
+
+    def _run(self, channel_layer, batches):
+        """
+        Feed each batch of (market, symbol) -> trade to the relay and
+        return the groups it sent to.
+        """
+
+        async def scenario():
+            pending = {}
+            wake = asyncio.Event()
+            relay = asyncio.create_task(
+                MarketService._relay(channel_layer, pending, wake)
+            )
+
+            for batch in batches:
+                pending.update(batch)
+                wake.set()
+                await asyncio.sleep(0.05)
+
+            self.assertFalse(relay.done())
+            relay.cancel()
+
+        with mock.patch("system.services.market_service.RELAY_WINDOW_SECONDS", 0), \
+                mock.patch("system.services.market_service.RELAY_MIN_INTERVAL_SECONDS", 0):
+            asyncio.run(scenario())
+
+        return channel_layer.sent
+
+    def test_every_symbol_in_a_window_is_relayed(self):
+        sent = self._run(FlakyChannelLayer(), [{
+            ("CRYPTO", "BTCUSDT"): {"symbol": "BTCUSDT", "price": 1.0},
+            ("CRYPTO", "ETHUSDT"): {"symbol": "ETHUSDT", "price": 2.0},
+        }])
+
+        self.assertIn("live.market.CRYPTO.BTCUSDT", sent)
+        self.assertIn("live.market.CRYPTO.ETHUSDT", sent)
+
+    def test_relay_survives_a_channel_layer_failure(self):
+        channel_layer = FlakyChannelLayer(failing={"live.market.CRYPTO.BTCUSDT"})
+
+        sent = self._run(channel_layer, [
+            {("CRYPTO", "BTCUSDT"): {"symbol": "BTCUSDT", "price": 1.0}},
+            {("CRYPTO", "BTCUSDT"): {"symbol": "BTCUSDT", "price": 1.5}},
+        ])
+
+        self.assertIn("live.market.CRYPTO.BTCUSDT", sent)
+
+
+class FakeRedis:
+    """
+    The hash commands TopicRegistry uses, counting reads.
+    """
+
+    def __init__(self):
+        self.hashes = {}
+        self.reads = 0
+
+    async def hincrby(self, key, field, amount):
+        fields = self.hashes.setdefault(key, {})
+        fields[field] = fields.get(field, 0) + amount
+        return fields[field]
+
+    async def hgetall(self, key):
+        self.reads += 1
+        return {
+            field.encode(): str(n).encode()
+            for field, n in self.hashes.get(key, {}).items()
+        }
+
+
+class RedisChannelLayer(FlakyChannelLayer):
+
+    prefix = "asgi"
+
+    def __init__(self, redis):
+        super().__init__()
+        self.redis = redis
+
+    def connection(self, index):
+        return self.redis
+
+
+class TopicRegistryTest(SimpleTestCase):
+
+    def _send(self, channel_layer, *topic):
+        asyncio.run(BroadcastService.send_async(
+            "market", {"price": 1.0}, *topic, channel_layer=channel_layer
+        ))
+        sent, channel_layer.sent = channel_layer.sent, []
+        return sent
+
+    def test_only_levels_with_members_are_sent_to(self):
+        registry = TopicRegistry()
+        channel_layer = FlakyChannelLayer()
+
+        with mock.patch("system.services.broadcast_service.topic_registry", registry):
+            # Default subscription: every socket on the broad group
+            asyncio.run(registry.add(channel_layer, "live.market"))
+            self.assertEqual(self._send(channel_layer, "CRYPTO", "BTCUSDT"), ["live.market"])
+
+            asyncio.run(registry.discard(channel_layer, "live.market"))
+            asyncio.run(registry.add(channel_layer, "live.market.CRYPTO.BTCUSDT"))
+
+            self.assertEqual(
+                self._send(channel_layer, "CRYPTO", "BTCUSDT"),
+                ["live.market.CRYPTO.BTCUSDT"]
+            )
+            self.assertEqual(self._send(channel_layer, "CRYPTO", "ETHUSDT"), [])
+
+    def test_redis_counts_are_shared_and_read_at_most_once_per_ttl(self):
+        redis = FakeRedis()
+        channel_layer = RedisChannelLayer(redis)
+
+        joining, sending = TopicRegistry(), TopicRegistry()
+
+        with mock.patch("system.services.broadcast_service.topic_registry", sending):
+            asyncio.run(joining.add(channel_layer, "live.regime.CRYPTO"))
+
+            for _ in range(3):
+                self.assertEqual(self._send(channel_layer, "CRYPTO"), [])
+
+            self.assertEqual(redis.reads, 1)
+
+            with mock.patch("system.services.broadcast_service.ACTIVE_GROUPS_TTL_SECONDS", 0):
+                self.assertEqual(
+                    asyncio.run(sending.active_groups(channel_layer)),
+                    {"live.regime.CRYPTO"}
+                )
+
+            asyncio.run(joining.discard(channel_layer, "live.regime.CRYPTO"))
+
+            with mock.patch("system.services.broadcast_service.ACTIVE_GROUPS_TTL_SECONDS", 0):
+                self.assertEqual(asyncio.run(sending.active_groups(channel_layer)), set())
+
+
+class LiveConsumerRegistryTest(SimpleTestCase):
+
+    def test_consumer_counts_the_groups_it_joins(self):
+        from channels.layers import InMemoryChannelLayer
+
+        from core.routing import LiveConsumer
+
+        async def scenario():
+            consumer = LiveConsumer()
+            consumer.channel_layer = InMemoryChannelLayer()
+            consumer.channel_name = "test.socket"
+            consumer.topics = {("market", None, None): "live.market"}
+            consumer.groups_joined = set()
+
+            await consumer._sync_groups()
+            self.assertEqual(topic_registry.counts["live.market"], 1)
+
+            consumer.topics = {("market", "CRYPTO", None): "live.market.CRYPTO"}
+            await consumer._sync_groups()
+            self.assertNotIn("live.market", topic_registry.counts)
+            self.assertEqual(topic_registry.counts["live.market.CRYPTO"], 1)
+
+            await consumer.disconnect(1000)
+            self.assertNotIn("live.market.CRYPTO", topic_registry.counts)
+
+        asyncio.run(scenario())
@@ -8,7 +8,8 @@ from .views import (
     risk_dashboard,
     get_current_regime,
     get_current_strategy,
-    get_market_snapshot)
+    get_market_snapshot,
+    get_service_metrics)
 
 urlpatterns = [
     path("health/", health),
@@ -20,4 +21,5 @@ urlpatterns = [
     path("regime/current/", get_current_regime),
     path("strategy/current/", get_current_strategy),
     path("market/snapshot/", get_market_snapshot),
+    path("services/metrics/", get_service_metrics),
 ]
@@ -10,10 +10,8 @@ from system.serializers import TradeExecutionSerializer
 from system.services.regime_service import RegimeService
 from system.services.strategy_service import StrategyService
 from system.services.market_service import MarketService
-
-import requests
-
-FASTAPI_BASE = "http://127.0.0.1:8001"
+from system.services.http_client import fastapi_client, service_metrics
+from system.services.state_board import board
 
 def health(request):
     return JsonResponse({"status": "django_core running"})
@@ -61,22 +59,45 @@ def get_enriched_decision(request):
         if not decision:
             return Response({"message": "No decisions available yet."})
 
-        snapshot_resp = requests.get(
-            f"{FASTAPI_BASE}/api/market/snapshot/{decision.market}"
+        # Price and the engine's latest 1m ATR, from the state board when
+        # the engine runs on this host; otherwise the snapshot fetch (which
+        # carries the same ATR) runs on the pooled async client while the
+        # risk config is read from the database on this thread
+        snapshot_data = (
+            board.latest_trade(decision.market, decision.symbol) if board else None
+        )
+
+        latest_atr = None
+
+        if snapshot_data:
+            board_atr = board.atr(decision.market, decision.symbol)
+            latest_atr = board_atr[0] if board_atr else None
+
+        pending_snapshot = None if snapshot_data else fastapi_client.submit(
+            "GET",
+            "market.snapshot",
+            f"/api/market/snapshot/{decision.market}",
+            params={"symbol": decision.symbol}
         )
 
-        snapshot_data = snapshot_resp.json().get("data")
+        risk_config = RiskService.get_config()
+
+        if pending_snapshot is not None:
+            snapshot = pending_snapshot.result().json()
+            snapshot_data = snapshot.get("data")
+            latest_atr = snapshot.get("atr")
 
         if not snapshot_data:
             return Response({"error": "No market snapshot available."})
 
         price = snapshot_data["price"]
-        atr = 10
 
-        risk_config = RiskService.get_config()
+        # No ATR yet (engine just started): the previous fixed fallback
+        atr = latest_atr or 10
 
-        sizing_resp = requests.post(
-            f"{FASTAPI_BASE}/api/position/size",
+        sizing_resp = fastapi_client.post(
+            "position.size",
+            "/api/position/size",
             json={
                 "price": price,
                 "atr": atr,
@@ -163,4 +184,8 @@ def get_current_strategy(request):
 def get_market_snapshot(request):
     market = request.query_params.get("market")
     data, status_code = MarketService.get_market_snapshot(market)
-    return Response(data, status=status_code)
\ No newline at end of file
+    return Response(data, status=status_code)
+
+@api_view(["GET"])
+def get_service_metrics(request):
+    return Response(service_metrics())
\ No newline at end of file
@@ -0,0 +1,525 @@
+"""
+Bulk historical backfill of candles and features.
+
+A new symbol otherwise needs MIN_TRAIN_SIZE live feature rows per timeframe
+before the regime engine can train (over 8 days for 1h). This reads
+historical trades or klines from CSV/Parquet files (Binance dumps with or
+without a header, .gz included) or from the tick log, in chunks:
+
+    python -m fastapi_market.backfill --kind trades --ticks data/BTCUSDT-trades-2026-*.csv
+    python -m fastapi_market.backfill --kind klines --interval 1m --symbol ETHUSDT eth.parquet
+    python -m fastapi_market.backfill --source ticklog --symbols BTCUSDT --start 1760000000000
+
+Each chunk is aggregated to base candles with NumPy, the base candles are
+rolled up into every TIMEFRAMES entry, and features are computed with the
+vectorized FeatureEngine definitions in feature_kernels. Results are
+bulk-upserted on the bucket key (re-running a backfill rewrites the same
+rows), one worker process per symbol.
+
+The live pipeline resumes from the backfill end: FeatureEngine buffers are
+written to feature_state (loaded by FeatureEngine.warm() at startup), and a
+last candle whose bucket hasn't ended is stored as partial for
+restore_partials(). --ticks also appends the trades to the tick log.
+"""
+
+import argparse
+import os
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.csv as pacsv
+import pyarrow.parquet as pq
+from pymongo.errors import DuplicateKeyError
+
+from fastapi_market.bucket_sink import bucket_upserts
+from fastapi_market.candle_engine import TIMEFRAMES
+from fastapi_market.database import FEATURE_COLLECTION
+from fastapi_market.feature_engine import WINDOW_SIZE, STATE_COLLECTION, state_doc
+from fastapi_market.feature_kernels import (
+    aggregate_candles,
+    candle_features,
+    resample_candles,
+    true_range,
+)
+from fastapi_market.tick_log import tick_log, DAY_MS, SIDE_CODES
+from fastapi_market.timeseries import to_ts
+
+CHUNK_ROWS = 1_000_000
+CSV_BLOCK_BYTES = 64 * 1024 * 1024
+WRITE_BATCH_SIZE = 5_000
+
+CANDLE_FIELDS = ("open", "high", "low", "close", "volume")
+
+# Column order of the headerless data.binance.vision files
+BINANCE_COLUMNS = {
+    "trades": ["id", "price", "qty", "quote_qty", "time", "is_buyer_maker", "is_best_match"],
+    "klines": ["open_time", "open", "high", "low", "close", "volume", "close_time",
+               "quote_volume", "count", "taker_buy_volume",
+               "taker_buy_quote_volume", "ignore"],
+}
+
+# Accepted column names per field; the first present wins
+ALIASES = {
+    "timestamp": ("timestamp", "receive_timestamp", "time", "open_time"),
+    "price": ("price",),
+    "quantity": ("quantity", "qty", "volume"),
+    "is_buyer_maker": ("is_buyer_maker",),
+    **{field: (field,) for field in CANDLE_FIELDS},
+}
+
+REQUIRED = {
+    "trades": ("timestamp", "price", "quantity"),
+    "klines": ("timestamp",) + CANDLE_FIELDS,
+}
+
+
+# =========================================
+# READING
+# =========================================
+def _has_header(path):
+    with pa.input_stream(path) as f:
+        first = f.read(4096).split(b"\n", 1)[0].split(b",", 1)[0]
+
+    try:
+        float(first)
+        return False
+    except ValueError:
+        return True
+
+
+def read_batches(path, kind):
+    """
+    Record batches of a CSV or Parquet file.
+    """
+
+    if path.endswith(".parquet"):
+        yield from pq.ParquetFile(path).iter_batches(batch_size=CHUNK_ROWS)
+        return
+
+    read_options = pacsv.ReadOptions(
+        block_size=CSV_BLOCK_BYTES,
+        column_names=None if _has_header(path) else BINANCE_COLUMNS[kind]
+    )
+
+    yield from pacsv.open_csv(pa.input_stream(path), read_options=read_options)
+
+
+def _epoch_ms(column):
+    if pa.types.is_timestamp(column.type):
+        return column.cast(pa.timestamp("ms"), safe=False).cast(pa.int64()).to_numpy(
+            zero_copy_only=False
+        )
+
+    ms = column.cast(pa.int64()).to_numpy(zero_copy_only=False)
+
+    # Binance spot dumps switched to microseconds in 2025
+    return ms // 1000 if len(ms) and ms[0] > 10 ** 14 else ms
+
+
+def batch_columns(batch, kind):
+    """
+    {field: numpy array} for one batch, sorted by timestamp.
+    """
+
+    names = batch.schema.names
+    columns = {}
+
+    for field in REQUIRED[kind] + (("is_buyer_maker",) if kind == "trades" else ()):
+        name = next((alias for alias in ALIASES[field] if alias in names), None)
+
+        if name is None:
+            if field in REQUIRED[kind]:
+                raise ValueError(f"no {field} column in {names}")
+            continue
+
+        column = batch.column(name)
+
+        if field == "timestamp":
+            columns[field] = _epoch_ms(column)
+        elif field == "is_buyer_maker":
+            columns[field] = column.cast(pa.bool_()).to_numpy(zero_copy_only=False)
+        else:
+            columns[field] = column.cast(pa.float64()).to_numpy(zero_copy_only=False)
+
+    ts = columns["timestamp"]
+
+    if len(ts) > 1 and np.any(ts[1:] < ts[:-1]):
+        order = np.argsort(ts, kind="stable")
+        columns = {field: values[order] for field, values in columns.items()}
+
+    return columns
+
+
+def _in_range(columns, start, end):
+    ts = columns["timestamp"]
+    keep = np.ones(len(ts), dtype=bool)
+
+    if start is not None:
+        keep &= ts >= start
+    if end is not None:
+        keep &= ts < end
+
+    return columns if keep.all() else {field: v[keep] for field, v in columns.items()}
+
+
+def file_chunks(task):
+    for path in task["paths"]:
+        for batch in read_batches(path, task["kind"]):
+            yield _in_range(batch_columns(batch, task["kind"]), task["start"], task["end"])
+
+
+def tick_log_chunks(task):
+    """
+    One chunk per logged day, in the file_chunks trade layout.
+    """
+
+    for day in tick_log.days(task["market"], task["symbol"], task["start"], task["end"]):
+        day_start = int(np.datetime64(day, "ms").astype(np.int64))
+
+        ticks = tick_log.read(
+            task["market"],
+            task["symbol"],
+            max(day_start, task["start"] or day_start),
+            min(day_start + DAY_MS, task["end"] or day_start + DAY_MS)
+        )
+
+        yield {
+            "timestamp": ticks["receive_timestamp"],
+            "price": ticks["price"],
+            "quantity": ticks["quantity"],
+        }
+
+
+# =========================================
+# DOCUMENTS
+# =========================================
+def candle_docs(market, symbol, timeframe, candles, partial):
+    return [
+        {
+            "market": market,
+            "symbol": symbol,
+            "timeframe": timeframe,
+            "bucket_start": timestamp,
+            "timestamp": timestamp,
+            **{field: row[i] for i, field in enumerate(CANDLE_FIELDS)},
+            "partial": bool(is_partial),
+            "ts": to_ts(timestamp),
+        }
+        for timestamp, row, is_partial in zip(
+            candles["timestamp"].tolist(),
+            np.column_stack([candles[field] for field in CANDLE_FIELDS]).tolist(),
+            partial.tolist()
+        )
+    ]
+
+
+def feature_docs(market, symbol, timeframe, candles, features, first):
+    created_at = datetime.utcnow()
+    names = list(features)
+
+    rows = np.column_stack([candles["close"]] + [features[name] for name in names])
+
+    return [
+        {
+            "market": market,
+            "symbol": symbol,
+            "timeframe": timeframe,
+            "timestamp": timestamp,
+            "close": row[0],
+            **dict(zip(names, row[1:])),
+            "created_at": created_at,
+            "bucket_start": timestamp,
+            "partial": False,
+            "ts": to_ts(timestamp),
+        }
+        for timestamp, row in zip(
+            candles["timestamp"][first:].tolist(),
+            rows[first:].tolist()
+        )
+    ]
+
+
+def upsert(collection, docs, batch_size=WRITE_BATCH_SIZE):
+    for i in range(0, len(docs), batch_size):
+        _, operations = bucket_upserts(docs[i:i + batch_size])
+        collection.bulk_write(operations, ordered=False)
+
+    return len(docs)
+
+
+# =========================================
+# WORKER
+# =========================================
+_worker_db = None
+
+
+def _init_worker(mongo_uri, db_name):
+    from pymongo import MongoClient
+
+    global _worker_db
+    _worker_db = MongoClient(mongo_uri)[db_name]
+
+
+def preceding_candles(db, market, symbol, timeframe, before, limit=WINDOW_SIZE):
+    """
+    The stored candles just before the backfill, so its first rows get
+    features too.
+    """
+
+    docs = list(
+        db["candles"].find(
+            {
+                "market": market,
+                "symbol": symbol,
+                "timeframe": timeframe,
+                "bucket_start": {"$lt": before},
+                "partial": {"$ne": True},
+            },
+            {"_id": 0, "bucket_start": 1, **{field: 1 for field in CANDLE_FIELDS}}
+        ).sort("bucket_start", -1).limit(limit)
+    )[::-1]
+
+    return {
+        "timestamp": np.array([d["bucket_start"] for d in docs], dtype=np.int64),
+        **{field: np.array([d[field] for d in docs], dtype=np.float64) for field in CANDLE_FIELDS},
+    }
+
+
+def save_warm_state(db, market, symbol, timeframe, candles):
+    """
+    FeatureEngine buffers as of the last closed candle. A newer state (the
+    live engine ran past the backfill) is left alone.
+    """
+
+    doc = state_doc(
+        market,
+        symbol,
+        timeframe,
+        int(candles["timestamp"][-1]),
+        candles["close"],
+        true_range(candles["high"], candles["low"], candles["close"]),
+        candles["volume"]
+    )
+
+    try:
+        db[STATE_COLLECTION].replace_one(
+            {"_id": doc["_id"], "timestamp": {"$lte": doc["timestamp"]}},
+            doc,
+            upsert=True
+        )
+        return True
+
+    except DuplicateKeyError:
+        return False
+
+
+def concat_candles(parts):
+    return {
+        field: np.concatenate([p[field] for p in parts])
+        for field in ("timestamp",) + CANDLE_FIELDS
+    }
+
+
+def backfill_symbol(task):
+
+    started = time.perf_counter()
+    market, symbol = task["market"], task["symbol"]
+
+    base_ms = TIMEFRAMES[task["interval"]]
+    chunks = tick_log_chunks(task) if task["source"] == "ticklog" else file_chunks(task)
+
+    parts = []
+    rows = 0
+    ticks = 0
+
+    for columns in chunks:
+        if not len(columns["timestamp"]):
+            continue
+
+        rows += len(columns["timestamp"])
+
+        if task["kind"] == "klines":
+            parts.append(resample_candles(columns, base_ms))
+            continue
+
+        parts.append(
+            aggregate_candles(
+                columns["timestamp"], columns["price"], columns["quantity"], base_ms
+            )
+        )
+
+        if task["ticks"]:
+            maker = columns.get("is_buyer_maker")
+            ticks += tick_log.append_columns(market, symbol, {
+                "receive_timestamp": columns["timestamp"],
+                "exchange_timestamp": columns["timestamp"],
+                "price": columns["price"],
+                "quantity": columns["quantity"],
+                # The taker sells into a buyer's maker order
+                "side": np.where(maker, SIDE_CODES["SELL"], SIDE_CODES["BUY"])
+                if maker is not None
+                else np.full(len(columns["price"]), SIDE_CODES["BUY"]),
+            })
+
+    if not parts:
+        return symbol, None
+
+    # Chunks may split a bucket or arrive out of order
+    base = concat_candles(parts)
+    order = np.argsort(base["timestamp"], kind="stable")
+    base = resample_candles({f: v[order] for f, v in base.items()}, base_ms)
+
+    now_ms = int(time.time() * 1000)
+    result = {"rows": rows, "ticks": ticks, "candles": {}, "features": {}}
+
+    for timeframe, tf_ms in TIMEFRAMES.items():
+        if tf_ms % base_ms:
+            continue
+
+        candles = resample_candles(base, tf_ms)
+        partial = candles["timestamp"] + tf_ms > now_ms
+
+        result["candles"][timeframe] = upsert(
+            _worker_db["candles"],
+            candle_docs(market, symbol, timeframe, candles, partial)
+        )
+
+        # Features and warm state only cover closed candles; a partial one
+        # is completed by the live engine
+        closed = {f: v[~partial] for f, v in candles.items()}
+
+        if not len(closed["timestamp"]):
+            continue
+
+        before = preceding_candles(
+            _worker_db, market, symbol, timeframe, int(closed["timestamp"][0])
+        )
+        series = concat_candles([before, closed])
+
+        first = max(len(before["timestamp"]), WINDOW_SIZE - 1)
+
+        result["features"][timeframe] = upsert(
+            _worker_db[FEATURE_COLLECTION],
+            feature_docs(market, symbol, timeframe, series, candle_features(series), first)
+        )
+
+        save_warm_state(_worker_db, market, symbol, timeframe, series)
+
+    tick_log.flush()
+
+    result["seconds"] = round(time.perf_counter() - started, 2)
+    return symbol, result
+
+
+# =========================================
+# DRIVER
+# =========================================
+def _symbol_of(path):
+    # BTCUSDT-trades-2026-10-01.csv -> BTCUSDT
+    return os.path.basename(path).split("-")[0].split(".")[0].upper()
+
+
+def run_backfill(mongo_uri, db_name, market, paths=(), kind="trades",
+                 interval="1m", symbol=None, symbols=None, source="files",
+                 start=None, end=None, ticks=False, workers=None):
+    """
+    Backfill every symbol in parallel; returns {symbol: stats}.
+    """
+
+    if source == "ticklog":
+        kind = "trades"
+        by_symbol = {s: [] for s in (symbols or tick_log.symbols(market))}
+    else:
+        by_symbol = defaultdict(list)
+        for path in sorted(paths):
+            by_symbol[symbol or _symbol_of(path)].append(path)
+
+    tasks = [
+        {
+            "market": market,
+            "symbol": name,
+            "paths": files,
+            "kind": kind,
+            "interval": interval,
+            "source": source,
+            "start": start,
+            "end": end,
+            "ticks": ticks and source == "files",
+        }
+        for name, files in by_symbol.items()
+    ]
+
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_worker,
+        initargs=(mongo_uri, db_name)
+    ) as pool:
+        results = dict(pool.map(backfill_symbol, tasks))
+
+    return {name: r for name, r in results.items() if r is not None}
+
+
+# =========================================
+# CLI
+# =========================================
+def main():
+    from dotenv import load_dotenv
+
+    load_dotenv()
+
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("paths", nargs="*", help="CSV / Parquet files")
+    parser.add_argument("--market", default="CRYPTO")
+    parser.add_argument("--kind", default="trades", choices=["trades", "klines"])
+    parser.add_argument("--interval", default="1m", choices=list(TIMEFRAMES),
+                        help="kline interval; trades are aggregated at 1m")
+    parser.add_argument("--symbol", help="symbol of every file; default: from the file name")
+    parser.add_argument("--source", default="files", choices=["files", "ticklog"])
+    parser.add_argument("--symbols", help="comma separated, for --source ticklog")
+    parser.add_argument("--start", type=int, help="epoch ms, inclusive")
+    parser.add_argument("--end", type=int, help="epoch ms, exclusive")
+    parser.add_argument("--ticks", action="store_true", help="also append trades to the tick log")
+    parser.add_argument("--workers", type=int)
+    args = parser.parse_args()
+
+    if args.source == "files" and not args.paths:
+        parser.error("no input files")
+
+    started = time.perf_counter()
+
+    report = run_backfill(
+        os.getenv("MONGO_URI", "mongodb://localhost:27017"),
+        os.getenv("MONGO_DB_NAME", "aetherion"),
+        args.market.upper(),
+        paths=args.paths,
+        kind=args.kind,
+        interval=args.interval if args.kind == "klines" else "1m",
+        symbol=args.symbol.upper() if args.symbol else None,
+        symbols=args.symbols.upper().split(",") if args.symbols else None,
+        source=args.source,
+        start=args.start,
+        end=args.end,
+        ticks=args.ticks,
+        workers=args.workers
+    )
+
+    elapsed = time.perf_counter() - started
+
+    for name, r in report.items():
+        candles = " ".join(f"{tf}={n}" for tf, n in r["candles"].items())
+        print(
+            f"{name:<14} rows={r['rows']} ({r['rows'] / max(r['seconds'], 1e-9):,.0f}/s) "
+            f"candles: {candles} features={sum(r['features'].values())} "
+            f"ticks={r['ticks']} in {r['seconds']:.2f}s"
+        )
+
+    rows = sum(r["rows"] for r in report.values())
+    print(f"📥 {len(report)} symbols, {rows} rows in {elapsed:.2f}s ({rows / max(elapsed, 1e-9):,.0f} rows/s)")
+
+
+if __name__ == "__main__":
+    main()
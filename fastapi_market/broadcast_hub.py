@@ -0,0 +1,155 @@
+import asyncio
+import json
+import logging
+from collections import deque
+from typing import Dict
+
+from fastapi import WebSocket
+
+logger = logging.getLogger("broadcast_hub")
+
+SEND_QUEUE_SIZE = 256
+SEND_TIMEOUT_SECONDS = 5
+
+# What to do when a client's send queue is full
+CONFLATE = "conflate"        # replace the queued message of the same kind
+DISCONNECT = "disconnect"    # close the slow client
+
+# Fields that identify which earlier message a new one supersedes
+CONFLATION_FIELDS = ("type", "market", "symbol", "timeframe")
+
+
+class _Client:
+
+    def __init__(self, websocket: WebSocket):
+        self.websocket = websocket
+        self.queue = deque()     # (conflation key, payload)
+        self.ready = asyncio.Event()
+        self.writer = None
+
+
+class BroadcastHub:
+    """
+    Fan-out to many websocket clients without awaiting any of them.
+
+    Each message is serialized once to UTF-8 JSON bytes and every client
+    is sent that same object as a binary frame, so nothing is re-encoded
+    per connection. Every client gets a bounded send queue drained by its
+    own writer task, so a slow consumer only delays itself. Clients whose
+    sends fail or time out are reaped.
+
+    With CONFLATE, a full queue drops the oldest queued message with the
+    same conflation key (type, market, symbol, timeframe), which the new
+    one supersedes. A message of a kind not yet queued is never dropped;
+    if the queue is full of other kinds the client is disconnected.
+    """
+
+    def __init__(
+        self,
+        policy: str = CONFLATE,
+        queue_size: int = SEND_QUEUE_SIZE,
+        send_timeout: float = SEND_TIMEOUT_SECONDS
+    ):
+        self.policy = policy
+        self.queue_size = queue_size
+        self.send_timeout = send_timeout
+
+        self.clients: Dict[WebSocket, _Client] = {}
+
+        self.stats = {
+            "messages": 0,
+            "conflated": 0,
+            "slow_disconnects": 0,
+            "reaped": 0
+        }
+
+    @property
+    def active_connections(self):
+        return list(self.clients)
+
+    async def connect(self, websocket: WebSocket):
+        await websocket.accept()
+
+        client = _Client(websocket)
+        client.writer = asyncio.create_task(self._writer(client))
+
+        self.clients[websocket] = client
+
+    def disconnect(self, websocket: WebSocket):
+        client = self.clients.pop(websocket, None)
+
+        if client and client.writer is not asyncio.current_task():
+            client.writer.cancel()
+
+    async def broadcast(self, message: dict):
+        self.publish(message)
+
+    def publish(self, message: dict):
+        """
+        Serialize once and enqueue for every client. Never blocks.
+        """
+
+        payload = json.dumps(
+            message,
+            separators=(",", ":"),
+            ensure_ascii=False,
+            default=str
+        ).encode()
+        key = tuple(message.get(field) for field in CONFLATION_FIELDS)
+        self.stats["messages"] += 1
+
+        for client in list(self.clients.values()):
+            self._enqueue(client, key, payload)
+
+    def _enqueue(self, client: _Client, key: tuple, payload: bytes):
+        queue = client.queue
+
+        if len(queue) < self.queue_size:
+            queue.append((key, payload))
+            client.ready.set()
+            return
+
+        if self.policy == CONFLATE:
+            for i, (queued_key, _) in enumerate(queue):
+                if queued_key == key:
+                    del queue[i]
+                    queue.append((key, payload))
+                    self.stats["conflated"] += 1
+                    return
+
+        self.stats["slow_disconnects"] += 1
+        self.disconnect(client.websocket)
+        asyncio.create_task(self._close(client.websocket, 1013))
+
+    async def _writer(self, client: _Client):
+        websocket = client.websocket
+
+        try:
+            while True:
+                while not client.queue:
+                    client.ready.clear()
+                    await client.ready.wait()
+
+                _, payload = client.queue.popleft()
+                await asyncio.wait_for(
+                    websocket.send_bytes(payload),
+                    self.send_timeout
+                )
+
+        except asyncio.CancelledError:
+            raise
+
+        except Exception as e:
+            logger.info(f"Reaping websocket client: {e!r}")
+            self.stats["reaped"] += 1
+
+            if self.clients.get(websocket) is client:
+                self.disconnect(websocket)
+
+            await self._close(websocket, 1011)
+
+    async def _close(self, websocket: WebSocket, code: int):
+        try:
+            await websocket.close(code=code)
+        except Exception:
+            pass
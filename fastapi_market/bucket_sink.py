@@ -0,0 +1,214 @@
+"""
+Candle and feature writes as idempotent, bulk upserts.
+
+Closed candles and their features are queued like any MongoSink, but each
+flush (every BATCH_SIZE records or FLUSH_INTERVAL_SECONDS) becomes one
+unordered bulk_write of UpdateOne(upsert=True) keyed on
+(market, symbol, timeframe, bucket_start). Unique indexes on that key
+(see indexes.py) guarantee one row per bucket. A bucket written again,
+such as a partial candle flushed at shutdown and completed after restart,
+replaces the earlier row instead of adding a duplicate.
+
+Records are stamped with updated_at when submitted. Journal replay only
+upserts over an older row, and never puts a partial record over a
+complete one, so a late replay can't undo a newer live write.
+
+Existing duplicates must be removed before the unique indexes can be
+built:
+
+    python -m fastapi_market.bucket_sink --dedupe
+"""
+
+import argparse
+import asyncio
+from datetime import datetime
+
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError, PyMongoError
+
+from fastapi_market.database import db, FEATURE_COLLECTION
+from fastapi_market.mongo_sink import MongoSink, create_sink
+
+BUCKET_KEY = ("market", "symbol", "timeframe", "bucket_start")
+
+BATCH_SIZE = 500
+FLUSH_INTERVAL_SECONDS = 1.0
+
+_DUPLICATE_KEY = 11000
+
+
+def bucket_filter(doc):
+    return {field: doc[field] for field in BUCKET_KEY}
+
+
+def bucket_upserts(batch):
+    """
+    (docs, operations): one upsert per bucket, the newest record winning.
+    Also used with a sync client by the backfill.
+    """
+
+    latest = {}
+    for doc in batch:
+        latest[tuple(doc[field] for field in BUCKET_KEY)] = doc
+
+    docs = list(latest.values())
+
+    operations = [
+        UpdateOne(
+            bucket_filter(doc),
+            {"$set": {k: v for k, v in doc.items() if k != "_id"}},
+            upsert=True
+        )
+        for doc in docs
+    ]
+
+    return docs, operations
+
+
+def replay_filter(doc):
+    """
+    Bucket filter that doesn't match a row newer than `doc`, or a complete
+    row when `doc` is partial. With no match the upsert's insert hits the
+    unique bucket index (E11000), which replay treats as already stored.
+    """
+
+    newer = []
+
+    if doc.get("updated_at") is not None:
+        newer.append({"updated_at": {"$gt": doc["updated_at"]}})
+
+    if doc.get("partial"):
+        newer.append({"partial": {"$ne": True}})
+
+    query = bucket_filter(doc)
+
+    if newer:
+        query["$nor"] = newer
+
+    return query
+
+
+class BucketSink(MongoSink):
+
+    def submit(self, doc):
+        super().submit({**doc, "updated_at": datetime.utcnow()})
+
+    async def write(self, batch):
+        """
+        Bulk upsert; returns the documents that failed.
+        """
+
+        docs, operations = bucket_upserts(batch)
+
+        try:
+            await self.collection.bulk_write(operations, ordered=False)
+
+        except BulkWriteError as e:
+            # Includes E11000 from two upserts racing on a new key; a retry
+            # turns into an update
+            return [docs[err["index"]] for err in e.details.get("writeErrors", [])]
+
+        return []
+
+    async def write_missing(self, chunk):
+        """
+        Journal replay: upsert each bucket unless the stored row is newer
+        (see replay_filter). Returns how many buckets were written.
+        """
+
+        docs, _ = bucket_upserts(chunk)
+
+        operations = [
+            UpdateOne(
+                replay_filter(doc),
+                {"$set": {k: v for k, v in doc.items() if k != "_id"}},
+                upsert=True
+            )
+            for doc in docs
+        ]
+
+        try:
+            await self.collection.bulk_write(operations, ordered=False)
+
+        except BulkWriteError as e:
+            errors = e.details.get("writeErrors", [])
+
+            if any(err.get("code") != _DUPLICATE_KEY for err in errors):
+                raise PyMongoError("journal replay batch failed")
+
+            return len(docs) - len(errors)
+
+        return len(docs)
+
+
+def _bucket_sink(name):
+    return create_sink(
+        name,
+        BucketSink,
+        batch_size=BATCH_SIZE,
+        flush_interval=FLUSH_INTERVAL_SECONDS
+    )
+
+
+candle_sink = _bucket_sink("candles")
+feature_sink = _bucket_sink(FEATURE_COLLECTION)
+
+
+# =========================================
+# DEDUPE (before the unique indexes)
+# =========================================
+async def dedupe(collection):
+    """
+    Keep the newest document (highest _id) per bucket key. Features
+    written before bucket_start existed get it from their timestamp.
+    Returns documents removed.
+    """
+
+    await collection.update_many(
+        {"bucket_start": {"$exists": False}},
+        [{"$set": {"bucket_start": "$timestamp"}}]
+    )
+
+    cursor = collection.aggregate(
+        [
+            {"$sort": {"_id": 1}},
+            {"$group": {
+                "_id": {field: f"${field}" for field in BUCKET_KEY},
+                "ids": {"$push": "$_id"},
+                "n": {"$sum": 1},
+            }},
+            {"$match": {"n": {"$gt": 1}}},
+        ],
+        allowDiskUse=True
+    )
+
+    removed = 0
+
+    async for group in cursor:
+        result = await collection.delete_many({"_id": {"$in": group["ids"][:-1]}})
+        removed += result.deleted_count
+
+    return removed
+
+
+async def _main(args):
+    from fastapi_market.indexes import ensure_indexes
+
+    if args.dedupe:
+        for name in ("candles", FEATURE_COLLECTION):
+            removed = await dedupe(db[name])
+            print(f"🧹 {name}: removed {removed} duplicate buckets")
+
+    print(await ensure_indexes())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--dedupe", action="store_true")
+    args = parser.parse_args()
+
+    asyncio.run(_main(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,9 @@
 import asyncio
+import time
 from collections import defaultdict
 from fastapi_market.feature_engine import FeatureEngine
+from fastapi_market.bucket_sink import candle_sink
+from fastapi_market.timeseries import to_ts
 
 
 TIMEFRAMES = {
@@ -10,6 +13,11 @@ TIMEFRAMES = {
     "1h": 3_600_000,
 }
 
+ACTIVE_CANDLE_FIELDS = (
+    "market", "symbol", "timeframe", "bucket_start",
+    "open", "high", "low", "close", "volume",
+)
+
 
 class MultiTimeframeCandleEngine:
     def __init__(self, mongo_client):
@@ -17,6 +25,12 @@ class MultiTimeframeCandleEngine:
         self.lock = asyncio.Lock()
         self.feature_engine = FeatureEngine()
 
+        from fastapi_market.storage import get_storage
+        self.storage = get_storage()
+
+        from fastapi_market.market_stream import market_stream
+        self.stream = market_stream
+
         self.active_candles = defaultdict(
             lambda: defaultdict(dict)
         )
@@ -51,6 +65,7 @@ class MultiTimeframeCandleEngine:
                         "close": price,
                         "volume": volume,
                     }
+                    self._publish_partial(tf_name, self.active_candles[market][symbol][tf_name])
                     continue
 
                 if bucket_start == current["bucket_start"]:
@@ -58,6 +73,7 @@ class MultiTimeframeCandleEngine:
                     current["low"] = min(current["low"], price)
                     current["close"] = price
                     current["volume"] += volume
+                    self._publish_partial(tf_name, current)
 
                 else:
                     await self._finalize_candle(current)
@@ -73,23 +89,88 @@ class MultiTimeframeCandleEngine:
                         "close": price,
                         "volume": volume,
                     }
+                    self._publish_partial(tf_name, self.active_candles[market][symbol][tf_name])
+
+    def _publish_partial(self, tf_name, candle):
+        self.stream.publish(
+            f"candles.{tf_name}",
+            candle["market"],
+            candle["symbol"],
+            {**candle, "timestamp": candle["bucket_start"], "closed": False}
+        )
 
-    async def _finalize_candle(self, candle):
+    async def _finalize_candle(self, candle, partial=False):
 
         doc = {
             **candle,
-            "timestamp": candle["bucket_start"]
+            "timestamp": candle["bucket_start"],
+            "partial": partial
         }
 
-        await self.mongo["candles"].insert_one(doc)
+        # A partial candle flushed at shutdown isn't final for subscribers
+        self.stream.publish(
+            f"candles.{candle['timeframe']}",
+            candle["market"],
+            candle["symbol"],
+            {**doc, "closed": not partial}
+        )
+
+        candle_sink.submit({**doc, "ts": to_ts(doc["timestamp"])})
 
         # 🔥 Immediately compute features
         await self.feature_engine.process_candle(doc)
 
     async def flush_all(self):
+        now_ms = int(time.time() * 1000)
+
         async with self.lock:
-            for market in self.active_candles:
-                for symbol in self.active_candles[market]:
-                    for tf in self.active_candles[market][symbol]:
-                        candle = self.active_candles[market][symbol][tf]
-                        await self._finalize_candle(candle)
\ No newline at end of file
+            candles = [
+                candle
+                for market in self.active_candles.values()
+                for symbol in market.values()
+                for candle in symbol.values()
+            ]
+
+            ended, partial = [], []
+
+            for c in candles:
+                if now_ms >= c["bucket_start"] + TIMEFRAMES[c["timeframe"]]:
+                    ended.append(c)
+                else:
+                    partial.append(c)
+
+            for candle in ended:
+                await self._finalize_candle(candle)
+
+            # Saved before the partial candles reach the feature buffers;
+            # those are completed after the restart
+            try:
+                await self.feature_engine.save_state()
+            except Exception as e:
+                print(f"❌ Feature state save error: {e}")
+
+            for candle in partial:
+                await self._finalize_candle(candle, partial=True)
+
+    async def restore_partials(self):
+        """
+        Reopen partial candles from the last shutdown whose bucket is still
+        current; the rest of the bucket's ticks complete them.
+        """
+
+        now_ms = int(time.time() * 1000)
+        restored = 0
+
+        async with self.lock:
+            for tf_name, tf_ms in TIMEFRAMES.items():
+                docs = await self.storage.candles.partials(
+                    tf_name, self.get_bucket_start(now_ms, tf_ms)
+                )
+
+                for doc in docs:
+                    self.active_candles[doc["market"]][doc["symbol"]][tf_name] = {
+                        field: doc[field] for field in ACTIVE_CANDLE_FIELDS
+                    }
+                    restored += 1
+
+        return restored
\ No newline at end of file
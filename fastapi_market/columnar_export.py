@@ -0,0 +1,312 @@
+"""
+Columnar export of candles, features and regimes.
+
+Mongo cursors are read in chunks and turned into Arrow record batches,
+which are streamed as Arrow IPC (GET /api/export/{series}/{market}) or
+written as Parquet partitioned by market/symbol/day:
+
+    python -m fastapi_market.columnar_export --series features \\
+        --market CRYPTO --timeframe 1m --out data/
+
+Reading back is a columnar scan straight into NumPy:
+
+    columns = load_columns("data/features", market="CRYPTO", symbol="BTCUSDT")
+"""
+
+import argparse
+import io
+import os
+import time
+import uuid
+from typing import Optional
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.ipc as ipc
+from fastapi import APIRouter
+from fastapi.responses import StreamingResponse
+
+from fastapi_market.database import db
+from fastapi_market.history import SERIES, build_query
+
+router = APIRouter(prefix="/api/export")
+
+CHUNK_ROWS = 50_000
+_DAY_MS = 86_400_000
+
+ARROW_STREAM_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+
+FIELD_TYPES = {
+    "market": pa.string(),
+    "symbol": pa.string(),
+    "timeframe": pa.string(),
+    "timestamp": pa.int64(),
+    "open": pa.float64(),
+    "high": pa.float64(),
+    "low": pa.float64(),
+    "close": pa.float64(),
+    "volume": pa.float64(),
+    "rolling_volatility": pa.float64(),
+    "atr": pa.float64(),
+    "volume_delta": pa.float64(),
+    "regime_state": pa.int64(),
+}
+
+PARTITIONING = ds.partitioning(
+    pa.schema([
+        ("market", pa.string()),
+        ("symbol", pa.string()),
+        ("day", pa.date32()),
+    ]),
+    flavor="hive"
+)
+
+
+def series_fields(series):
+    return ["market"] + SERIES[series]["fields"]
+
+
+def series_schema(series):
+    return pa.schema([(f, FIELD_TYPES[f]) for f in series_fields(series)])
+
+
+def to_record_batch(docs, schema):
+    """
+    One Arrow batch from a chunk of projected documents.
+    """
+
+    return pa.RecordBatch.from_arrays(
+        [
+            pa.array([d.get(field.name) for d in docs], type=field.type)
+            for field in schema
+        ],
+        schema=schema
+    )
+
+
+def with_day(batch):
+    days = pc.cast(
+        pc.cast(pc.divide(batch.column("timestamp"), _DAY_MS), pa.int32()),
+        pa.date32()
+    )
+    return pa.RecordBatch.from_arrays(
+        batch.columns + [days],
+        names=batch.schema.names + ["day"]
+    )
+
+
+# =========================================
+# SYNC (CLI)
+# =========================================
+def iter_batches(collection, series, query, chunk_rows=CHUNK_ROWS):
+    schema = series_schema(series)
+    projection = {"_id": 0, **{f: 1 for f in series_fields(series)}}
+
+    cursor = (
+        collection.find(query, projection)
+        .sort([("timestamp", 1), ("_id", 1)])
+        .batch_size(chunk_rows)
+    )
+
+    chunk = []
+    for doc in cursor:
+        chunk.append(doc)
+
+        if len(chunk) == chunk_rows:
+            yield to_record_batch(chunk, schema)
+            chunk = []
+
+    if chunk:
+        yield to_record_batch(chunk, schema)
+
+
+def write_parquet(batches, series, out_dir):
+    """
+    Parquet files under out_dir/<series>/market=/symbol=/day=.
+    Returns rows written.
+    """
+
+    rows = 0
+
+    def counted():
+        nonlocal rows
+        for batch in batches:
+            rows += batch.num_rows
+            yield with_day(batch)
+
+    schema = series_schema(series).append(pa.field("day", pa.date32()))
+
+    ds.write_dataset(
+        counted(),
+        os.path.join(out_dir, series),
+        schema=schema,
+        format="parquet",
+        partitioning=PARTITIONING,
+        basename_template=f"part-{uuid.uuid4().hex}-{{i}}.parquet",
+        existing_data_behavior="overwrite_or_ignore"
+    )
+
+    return rows
+
+
+def load_columns(path, market=None, symbol=None, start=None, end=None,
+                 columns=None):
+    """
+    {column: numpy array} from an exported Parquet dataset, filtered on the
+    partition keys and timestamp range (epoch ms).
+    """
+
+    dataset = ds.dataset(path, format="parquet", partitioning=PARTITIONING)
+
+    condition = None
+    for expr in (
+        ds.field("market") == market if market else None,
+        ds.field("symbol") == symbol if symbol else None,
+        ds.field("timestamp") >= start if start is not None else None,
+        ds.field("timestamp") < end if end is not None else None,
+    ):
+        if expr is not None:
+            condition = expr if condition is None else condition & expr
+
+    table = dataset.to_table(columns=columns, filter=condition)
+    table = table.sort_by("timestamp")
+
+    return {
+        name: table.column(name).to_numpy(zero_copy_only=False)
+        for name in table.column_names
+    }
+
+
+# =========================================
+# ASYNC (ENDPOINT)
+# =========================================
+class _ByteSink(io.RawIOBase):
+    """
+    Collects what the IPC writer emits so each batch can be yielded.
+    """
+
+    def __init__(self):
+        self.parts = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.parts.append(bytes(data))
+        return len(data)
+
+    def take(self):
+        data = b"".join(self.parts)
+        self.parts = []
+        return data
+
+
+async def arrow_stream(collection, series, query, chunk_rows=CHUNK_ROWS):
+    schema = series_schema(series)
+    projection = {"_id": 0, **{f: 1 for f in series_fields(series)}}
+
+    cursor = (
+        collection.find(query, projection)
+        .sort([("timestamp", 1), ("_id", 1)])
+        .batch_size(chunk_rows)
+    )
+
+    sink = _ByteSink()
+    writer = ipc.new_stream(pa.PythonFile(sink, mode="w"), schema)
+
+    chunk = []
+    async for doc in cursor:
+        chunk.append(doc)
+
+        if len(chunk) == chunk_rows:
+            writer.write_batch(to_record_batch(chunk, schema))
+            chunk = []
+            yield sink.take()
+
+    if chunk:
+        writer.write_batch(to_record_batch(chunk, schema))
+
+    writer.close()
+    yield sink.take()
+
+
+@router.get("/{series}/{market}")
+async def export_series(
+    series: str,
+    market: str,
+    symbol: Optional[str] = None,
+    timeframe: Optional[str] = None,
+    start: Optional[int] = None,
+    end: Optional[int] = None
+):
+    if series not in SERIES:
+        return {"error": f"Unknown series: {series}"}
+
+    query = build_query(
+        market.upper(),
+        symbol.upper() if symbol else None,
+        timeframe,
+        start,
+        end
+    )
+
+    return StreamingResponse(
+        arrow_stream(db[SERIES[series]["collection"]], series, query),
+        media_type=ARROW_STREAM_MEDIA_TYPE
+    )
+
+
+# =========================================
+# CLI
+# =========================================
+def main():
+    from dotenv import load_dotenv
+    from pymongo import MongoClient
+
+    load_dotenv()
+
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--series", default="features", choices=list(SERIES))
+    parser.add_argument("--market", default="CRYPTO")
+    parser.add_argument("--symbol")
+    parser.add_argument("--timeframe")
+    parser.add_argument("--start", type=int, help="epoch ms, inclusive")
+    parser.add_argument("--end", type=int, help="epoch ms, exclusive")
+    parser.add_argument("--out", default="export")
+    parser.add_argument("--format", default="parquet", choices=["parquet", "arrow"])
+    args = parser.parse_args()
+
+    mongo = MongoClient(os.getenv("MONGO_URI", "mongodb://localhost:27017"))
+    sync_db = mongo[os.getenv("MONGO_DB_NAME", "aetherion")]
+
+    query = build_query(
+        args.market.upper(),
+        args.symbol.upper() if args.symbol else None,
+        args.timeframe,
+        args.start,
+        args.end
+    )
+
+    batches = iter_batches(sync_db[SERIES[args.series]["collection"]], args.series, query)
+
+    started = time.perf_counter()
+
+    if args.format == "parquet":
+        rows = write_parquet(batches, args.series, args.out)
+        target = os.path.join(args.out, args.series)
+    else:
+        os.makedirs(args.out, exist_ok=True)
+        target = os.path.join(args.out, f"{args.series}_{args.market.upper()}.arrow")
+        rows = 0
+
+        with ipc.new_stream(target, series_schema(args.series)) as writer:
+            for batch in batches:
+                writer.write_batch(batch)
+                rows += batch.num_rows
+
+    print(f"📦 {rows} rows -> {target} in {time.perf_counter() - started:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
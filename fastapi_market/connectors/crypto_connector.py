@@ -10,9 +10,10 @@ from fastapi_market.schemas import (
     unified_trade_schema,
     unified_orderbook_schema
 )
-from fastapi_market.database import crypto_orderbook_collection
+from fastapi_market.orderbook_store import orderbook_store
 from fastapi_market.stream_status import update_status, set_disconnected
 from fastapi_market.service import save_tick  # ✅ IMPORTANT
+from fastapi_market.market_stream import market_stream
 
 logger = logging.getLogger("crypto_connector")
 
@@ -92,7 +93,9 @@ class CryptoConnector(BaseMarketConnector):
 
                         normalized = self.normalize_orderbook(raw)
 
-                        await crypto_orderbook_collection.insert_one(normalized)
+                        market_stream.publish_orderbook(normalized)
+
+                        orderbook_store.record(normalized)
 
             except Exception as e:
                 logger.error(f"❌ Orderbook stream error: {e}")
@@ -20,12 +20,14 @@ nyse_orderbook_collection = db["nyse_orderbooks"]
 
 candle_collection = db["candles"]
 
+# Feature definitions version. Each version is stored in its own collection
+# (market_features_<version>, or market_features when unset); see
+# feature_recompute for rebuilding history under a new version.
+FEATURE_VERSION = os.getenv("FEATURE_VERSION", "")
 
-async def create_indexes():
-    await trade_collection.create_index(
-        [("symbol", 1), ("exchange_timestamp", -1)]
-    )
 
-    await candle_collection.create_index(
-        [("symbol", 1), ("timeframe", 1), ("open_time", -1)]
-    )
\ No newline at end of file
+def feature_collection_name(version=FEATURE_VERSION):
+    return f"market_features_{version}" if version else "market_features"
+
+
+FEATURE_COLLECTION = feature_collection_name()
@@ -0,0 +1,605 @@
+"""
+Historical replay of the decision pipeline.
+
+Stored market_regimes are replayed on the market_features clock through
+stability -> fusion -> strategy -> decision with simulated time, and
+parameter grids are swept across a process pool that shares the input
+arrays read-only through np.memmap.
+
+    python -m fastapi_market.decision_backtest --symbols BTCUSDT \\
+        --confidence 0.5,0.6,0.7 --cooldown 1,5,15 --window 3,5 --workers 4
+"""
+
+import argparse
+import itertools
+import json
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from fastapi_market.regime_batch import (
+    EMPTY,
+    ACTIONS,
+    build_fusion_table,
+    build_strategy_tables
+)
+from fastapi_market.regime_fusion import TIMEFRAME_WEIGHTS
+from fastapi_market.candle_engine import TIMEFRAMES as CANDLE_TIMEFRAMES
+from fastapi_market.database import FEATURE_COLLECTION
+from fastapi_market.regime_stability import STABILITY_WINDOW, MIN_CONFIRMATIONS
+from fastapi_market.decision_engine import CONFIDENCE_THRESHOLD, COOLDOWN_MINUTES
+
+# Same timeframes the live poller votes on
+DEFAULT_TIMEFRAMES = ["1m", "5m", "15m"]
+BASE_TIMEFRAME = "1m"
+DEFAULT_HORIZONS = [5, 15, 60]
+
+ACTION_DIRECTION = np.array(
+    [{"BUY": 1, "SELL": -1}.get(action, 0) for action in ACTIONS],
+    dtype=np.int8
+)
+
+_MINUTE_US = 60_000_000
+
+
+# =========================================
+# LOADING
+# =========================================
+def fetch_regimes(db, market, symbol, timeframes):
+    """
+    {timeframe: (timestamps, raw regime states)} from market_regimes.
+    """
+
+    regimes = {}
+
+    for tf in timeframes:
+        docs = list(
+            db["market_regimes"]
+            .find(
+                {"market": market, "symbol": symbol, "timeframe": tf},
+                {"_id": 0, "timestamp": 1, "regime_state": 1}
+            )
+            .sort("timestamp", 1)
+        )
+
+        regimes[tf] = (
+            np.array([d["timestamp"] for d in docs], dtype=np.int64),
+            [d["regime_state"] for d in docs]
+        )
+
+    return regimes
+
+
+def asof_observations(regimes, clock, raw_codes, timeframes):
+    """
+    Latest regime per timeframe known at every clock tick, as state codes.
+
+    A regime is stamped with the bucket start of the candle it was computed
+    from, so it only becomes visible once that candle has closed. `clock`
+    is in the same epoch ms.
+    """
+
+    obs = np.full((len(clock), len(timeframes)), EMPTY, dtype=np.int16)
+
+    for col, tf in enumerate(timeframes):
+        reg_ts, reg_states = regimes[tf]
+
+        if len(reg_ts) == 0:
+            continue
+
+        available_at = reg_ts + CANDLE_TIMEFRAMES[tf]
+
+        codes = np.array([raw_codes[s] for s in reg_states], dtype=np.int16)
+        pos = np.searchsorted(available_at, clock, side="right") - 1
+        obs[:, col] = np.where(pos >= 0, codes[np.maximum(pos, 0)], EMPTY)
+
+    return obs
+
+
+def state_codes(regime_sets, state_labels=None):
+    """
+    Code every raw state seen in the given fetch_regimes results.
+    Returns (raw value -> code, labels by code).
+    """
+
+    state_labels = state_labels or {}
+
+    raw_values = sorted({
+        state
+        for regimes in regime_sets
+        for _, states in regimes.values()
+        for state in states
+    })
+
+    raw_codes = {value: code for code, value in enumerate(raw_values)}
+    labels = [state_labels.get(value, value) for value in raw_values]
+
+    return raw_codes, labels
+
+
+def load_history(db, market, symbols, timeframes=DEFAULT_TIMEFRAMES,
+                 base_timeframe=BASE_TIMEFRAME, state_labels=None,
+                 start=None, end=None):
+    """
+    Build replay inputs from Mongo.
+
+    The clock is the close time of each base timeframe feature row. At every
+    tick each timeframe observes its latest available regime (as-of join),
+    which is what the live poller sees when it polls the HMM service.
+
+    Returns (arrays, labels): arrays holds obs (ticks x timeframes codes),
+    times_us, close and per-symbol offsets; labels decode the state codes.
+    """
+
+    time_filter = {}
+
+    if start is not None:
+        time_filter["$gte"] = start
+    if end is not None:
+        time_filter["$lt"] = end
+
+    loaded = []
+
+    for symbol in symbols:
+        query = {
+            "market": market,
+            "symbol": symbol,
+            "timeframe": base_timeframe
+        }
+        if time_filter:
+            query["timestamp"] = time_filter
+
+        rows = list(
+            db[FEATURE_COLLECTION]
+            .find(query, {"_id": 0, "timestamp": 1, "close": 1})
+            .sort("timestamp", 1)
+        )
+
+        clock = np.array([r["timestamp"] for r in rows], dtype=np.int64)
+        clock += CANDLE_TIMEFRAMES[base_timeframe]
+        close = np.array([r["close"] for r in rows], dtype=np.float64)
+
+        loaded.append(
+            (clock, close, fetch_regimes(db, market, symbol, timeframes))
+        )
+
+    raw_codes, labels = state_codes(
+        [regimes for _, _, regimes in loaded], state_labels
+    )
+
+    obs_parts, time_parts, close_parts = [], [], []
+    offsets = [0]
+
+    for clock, close, regimes in loaded:
+        obs_parts.append(
+            asof_observations(regimes, clock, raw_codes, timeframes)
+        )
+        time_parts.append(clock * 1000)
+        close_parts.append(close)
+        offsets.append(offsets[-1] + len(clock))
+
+    arrays = {
+        "obs": np.concatenate(obs_parts) if obs_parts
+        else np.empty((0, len(timeframes)), dtype=np.int16),
+        "times_us": np.concatenate(time_parts) if time_parts
+        else np.empty(0, dtype=np.int64),
+        "close": np.concatenate(close_parts) if close_parts
+        else np.empty(0, dtype=np.float64),
+        "offsets": np.array(offsets, dtype=np.int64)
+    }
+
+    return arrays, labels
+
+
+def save_arrays(arrays, directory):
+    for name, array in arrays.items():
+        np.save(os.path.join(directory, f"{name}.npy"), array)
+
+
+def open_arrays(directory):
+    return {
+        name: np.load(os.path.join(directory, f"{name}.npy"), mmap_mode="r")
+        for name in ("obs", "times_us", "close", "offsets")
+    }
+
+
+# =========================================
+# REPLAY KERNELS
+# =========================================
+def stable_states(obs, n_labels, window, min_confirmations):
+    """
+    Stable state per tick and timeframe (EMPTY until first confirmation).
+
+    Vectorized majority_state over the sliding stability window of each
+    timeframe's observed ticks, forward-filled like stable_state in the
+    poller.
+    """
+
+    n_ticks, n_timeframes = obs.shape
+    stable = np.full((n_ticks, n_timeframes), EMPTY, dtype=np.int16)
+
+    for col in range(n_timeframes):
+        ticks = np.flatnonzero(obs[:, col] != EMPTY)
+
+        if len(ticks) < window:
+            continue
+
+        windows = sliding_window_view(obs[ticks, col], window)
+        hits = windows[..., None] == np.arange(n_labels, dtype=np.int16)
+
+        counts = hits.sum(axis=1)
+        first = np.where(hits.any(axis=1), hits.argmax(axis=1), window)
+
+        # Higher count wins; ties go to the state seen first
+        score = np.where(counts > 0, counts * (window + 1) - first, -1)
+        winner = score.argmax(axis=1)
+        winner_count = np.take_along_axis(
+            counts, winner[:, None], axis=1
+        )[:, 0]
+
+        confirmed = winner_count >= min_confirmations
+
+        if not confirmed.any():
+            continue
+
+        at = ticks[window - 1:][confirmed]
+
+        filled = np.full(n_ticks, -1, dtype=np.int64)
+        filled[at] = np.arange(len(at))
+        filled = np.maximum.accumulate(filled)
+
+        values = winner[confirmed].astype(np.int16)
+        stable[:, col] = np.where(
+            filled >= 0, values[np.maximum(filled, 0)], EMPTY
+        )
+
+    return stable
+
+
+def gate_decisions(strategy, confidence, times_us,
+                   confidence_threshold, cooldown_us):
+    """
+    Tick indices where generate_decision would emit.
+
+    Walks only run boundaries and cooldown expiries instead of every tick.
+    """
+
+    n = len(strategy)
+    positions = np.arange(n)
+
+    eligible = np.where(confidence >= confidence_threshold, positions, n)
+    next_eligible = np.minimum.accumulate(eligible[::-1])[::-1]
+
+    run_starts = np.flatnonzero(strategy[1:] != strategy[:-1]) + 1
+
+    decided = []
+    last_strategy = EMPTY
+    last_time = 0
+    i = 0
+
+    while i < n:
+        i = int(next_eligible[i])
+
+        if i >= n:
+            break
+
+        if last_strategy != EMPTY:
+
+            # Duplicate strategy block: skip to the next strategy run
+            if strategy[i] == last_strategy:
+                k = np.searchsorted(run_starts, i, side="right")
+                i = int(run_starts[k]) if k < len(run_starts) else n
+                continue
+
+            # Cooldown block: skip to the first tick after expiry
+            if times_us[i] - last_time < cooldown_us:
+                i = max(i + 1, int(np.searchsorted(
+                    times_us, last_time + cooldown_us, side="left"
+                )))
+                continue
+
+        decided.append(i)
+        last_strategy = strategy[i]
+        last_time = times_us[i]
+        i += 1
+
+    return np.array(decided, dtype=np.int64)
+
+
+def replay(obs, times_us, timeframes, labels, window, min_confirmations,
+           weights=None):
+    """
+    Per-tick meta code, confidence and strategy for one symbol.
+    """
+
+    fusion_meta, fusion_confidence, strides = build_fusion_table(
+        timeframes, labels, weights
+    )
+    meta_strategy, _ = build_strategy_tables()
+
+    stable = stable_states(obs, len(labels), window, min_confirmations)
+    index = (stable.astype(np.int64) + 1) @ strides
+
+    meta = fusion_meta[index]
+
+    return meta, fusion_confidence[index], meta_strategy[meta]
+
+
+# =========================================
+# METRICS
+# =========================================
+def decision_metrics(decided, strategy, close, horizons):
+
+    _, strategy_action = build_strategy_tables()
+
+    actions = strategy_action[strategy[decided]]
+    direction = ACTION_DIRECTION[actions].astype(np.int64)
+
+    position = np.concatenate([[0], direction])
+    turnover = int(np.abs(np.diff(position)).sum())
+
+    forward = {}
+    for h in horizons:
+        ahead = decided + h
+        valid = (ahead < len(close)) & (direction != 0)
+
+        if not valid.any():
+            forward[h] = []
+            continue
+
+        ret = close[ahead[valid]] / close[decided[valid]] - 1.0
+        forward[h] = (ret * direction[valid]).tolist()
+
+    return {
+        "decisions": len(decided),
+        "actions": {
+            name: int((actions == code).sum())
+            for code, name in enumerate(ACTIONS)
+        },
+        "turnover": turnover,
+        "forward": forward
+    }
+
+
+def _summarize(params, parts, horizons):
+
+    forward = {}
+    for h in horizons:
+        pooled = np.array(
+            [r for part in parts for r in part["forward"][h]],
+            dtype=np.float64
+        )
+        forward[str(h)] = {
+            "mean": float(pooled.mean()) if len(pooled) else None,
+            "hit_rate": float((pooled > 0).mean()) if len(pooled) else None,
+            "count": int(len(pooled))
+        }
+
+    return {
+        "params": params,
+        "decisions": sum(p["decisions"] for p in parts),
+        "actions": {
+            name: sum(p["actions"][name] for p in parts) for name in ACTIONS
+        },
+        "turnover": sum(p["turnover"] for p in parts),
+        "forward_returns": forward
+    }
+
+
+# =========================================
+# PARAMETER SWEEP
+# =========================================
+_worker_arrays = None
+
+
+def _init_worker(directory):
+    global _worker_arrays
+    _worker_arrays = open_arrays(directory)
+
+
+def _run_group(task):
+    """
+    One (window, min_confirmations, weights) group: the replay is shared by
+    every confidence/cooldown combination in it.
+    """
+
+    arrays = _worker_arrays
+    offsets = arrays["offsets"]
+
+    replays = []
+    for lo, hi in zip(offsets[:-1], offsets[1:]):
+        obs = np.asarray(arrays["obs"][lo:hi])
+        times_us = np.asarray(arrays["times_us"][lo:hi])
+
+        _, confidence, strategy = replay(
+            obs,
+            times_us,
+            task["timeframes"],
+            task["labels"],
+            task["window"],
+            task["min_confirmations"],
+            task["weights"]
+        )
+        replays.append((strategy, confidence, times_us, lo, hi))
+
+    results = []
+    for threshold, cooldown in task["gates"]:
+        parts = []
+
+        for strategy, confidence, times_us, lo, hi in replays:
+            decided = gate_decisions(
+                strategy, confidence, times_us,
+                threshold, int(cooldown * _MINUTE_US)
+            )
+            parts.append(decision_metrics(
+                decided,
+                strategy,
+                np.asarray(arrays["close"][lo:hi]),
+                task["horizons"]
+            ))
+
+        params = {
+            "confidence_threshold": threshold,
+            "cooldown_minutes": cooldown,
+            "stability_window": task["window"],
+            "min_confirmations": task["min_confirmations"],
+            "weights": task["weights"] or TIMEFRAME_WEIGHTS
+        }
+        results.append(_summarize(params, parts, task["horizons"]))
+
+    return results
+
+
+def sweep(arrays, labels, timeframes, grid, horizons=DEFAULT_HORIZONS,
+          workers=None):
+    """
+    Evaluate every combination in grid:
+
+        {
+            "confidence_threshold": [...],
+            "cooldown_minutes": [...],
+            "stability_window": [...],
+            "min_confirmations": [...],
+            "weights": [None | {tf: weight}, ...]
+        }
+    """
+
+    gates = list(itertools.product(
+        grid.get("confidence_threshold", [CONFIDENCE_THRESHOLD]),
+        grid.get("cooldown_minutes", [COOLDOWN_MINUTES])
+    ))
+
+    tasks = [
+        {
+            "timeframes": timeframes,
+            "labels": labels,
+            "window": window,
+            "min_confirmations": min_confirmations,
+            "weights": weights,
+            "gates": gates,
+            "horizons": horizons
+        }
+        for window, min_confirmations, weights in itertools.product(
+            grid.get("stability_window", [STABILITY_WINDOW]),
+            grid.get("min_confirmations", [MIN_CONFIRMATIONS]),
+            grid.get("weights", [None])
+        )
+    ]
+
+    directory = tempfile.mkdtemp(prefix="aetherion_backtest_")
+
+    try:
+        save_arrays(arrays, directory)
+
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_worker,
+            initargs=(directory,)
+        ) as pool:
+            groups = list(pool.map(_run_group, tasks))
+
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+    return [result for group in groups for result in group]
+
+
+# =========================================
+# CLI
+# =========================================
+def _floats(value):
+    return [float(v) for v in value.split(",")]
+
+
+def _ints(value):
+    return [int(v) for v in value.split(",")]
+
+
+def main():
+    from pymongo import MongoClient
+    from dotenv import load_dotenv
+
+    load_dotenv()
+
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--market", default="CRYPTO")
+    parser.add_argument("--symbols", default="BTCUSDT")
+    parser.add_argument("--timeframes", default=",".join(DEFAULT_TIMEFRAMES))
+    parser.add_argument("--start", type=int, help="epoch ms, inclusive")
+    parser.add_argument("--end", type=int, help="epoch ms, exclusive")
+    parser.add_argument("--labels", help='JSON state labels, e.g. {"0": "BULL"}')
+    parser.add_argument("--confidence", type=_floats, default=[CONFIDENCE_THRESHOLD])
+    parser.add_argument("--cooldown", type=_floats, default=[COOLDOWN_MINUTES])
+    parser.add_argument("--window", type=_ints, default=[STABILITY_WINDOW])
+    parser.add_argument("--min-confirmations", type=_ints, default=[MIN_CONFIRMATIONS])
+    parser.add_argument("--weights", help="JSON list of {timeframe: weight} sets")
+    parser.add_argument("--horizons", type=_ints, default=DEFAULT_HORIZONS)
+    parser.add_argument("--workers", type=int)
+    parser.add_argument("--out", help="write results as JSON")
+    args = parser.parse_args()
+
+    client = MongoClient(os.getenv("MONGO_URI", "mongodb://localhost:27017"))
+    db = client[os.getenv("MONGO_DB_NAME", "aetherion")]
+
+    timeframes = args.timeframes.split(",")
+    state_labels = {
+        int(k): v for k, v in json.loads(args.labels).items()
+    } if args.labels else None
+
+    started = time.perf_counter()
+    arrays, labels = load_history(
+        db,
+        args.market.upper(),
+        [s.upper() for s in args.symbols.split(",")],
+        timeframes,
+        state_labels=state_labels,
+        start=args.start,
+        end=args.end
+    )
+    loaded = time.perf_counter()
+
+    grid = {
+        "confidence_threshold": args.confidence,
+        "cooldown_minutes": args.cooldown,
+        "stability_window": args.window,
+        "min_confirmations": args.min_confirmations,
+        "weights": json.loads(args.weights) if args.weights else [None]
+    }
+
+    results = sweep(
+        arrays, labels, timeframes, grid,
+        horizons=args.horizons, workers=args.workers
+    )
+    finished = time.perf_counter()
+
+    print(
+        f"📊 {len(arrays['times_us'])} ticks, {len(results)} parameter sets "
+        f"(load {loaded - started:.2f}s, sweep {finished - loaded:.2f}s)"
+    )
+
+    first = str(args.horizons[0])
+    for r in results:
+        p = r["params"]
+        fwd = r["forward_returns"][first]
+        mean = f"{fwd['mean']:+.5f}" if fwd["mean"] is not None else "n/a"
+        print(
+            f"conf={p['confidence_threshold']:.2f} "
+            f"cooldown={p['cooldown_minutes']:g}m "
+            f"window={p['stability_window']} "
+            f"min={p['min_confirmations']} | "
+            f"decisions={r['decisions']} turnover={r['turnover']} "
+            f"fwd{first}={mean}"
+        )
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,6 @@
 from pydantic import BaseModel
 from datetime import datetime, timezone, timedelta
-from typing import Optional, Dict
+from typing import Optional, Dict, Tuple
 
 class TradeDecision(BaseModel):
     market: str
@@ -24,6 +24,9 @@ STRATEGY_ACTION_MAP: Dict[str, str] = {
 
 _last_decision_cache: Dict[str, Dict] = {}
 
+# Latest persisted decision per (market, symbol), served by /api/decision/latest
+_latest_decisions: Dict[Tuple[str, str], Dict] = {}
+
 def _map_strategy_to_action(strategy: str) -> str:
     return STRATEGY_ACTION_MAP.get(strategy, "HOLD")
 
@@ -32,14 +35,18 @@ def _passes_confidence_filter(confidence: float) -> bool:
     return confidence >= CONFIDENCE_THRESHOLD
 
 
-def _passes_cooldown(symbol: str, strategy: str) -> bool:
+def _passes_cooldown(
+    symbol: str,
+    strategy: str,
+    now: Optional[datetime] = None
+) -> bool:
     """
     Prevent:
     - Duplicate strategy signals
     - Signals inside cooldown window
     """
 
-    now = datetime.now(timezone.utc)
+    now = now or datetime.now(timezone.utc)
 
     if symbol not in _last_decision_cache:
         return True
@@ -59,10 +66,10 @@ def _passes_cooldown(symbol: str, strategy: str) -> bool:
     return True
 
 
-def _update_cache(symbol: str, strategy: str):
+def _update_cache(symbol: str, strategy: str, now: Optional[datetime] = None):
     _last_decision_cache[symbol] = {
         "strategy": strategy,
-        "timestamp": datetime.now(timezone.utc)
+        "timestamp": now or datetime.now(timezone.utc)
     }
 
 def generate_decision(
@@ -70,7 +77,8 @@ def generate_decision(
     symbol: str,
     meta_regime: str,
     strategy: str,
-    confidence: float
+    confidence: float,
+    now: Optional[datetime] = None
 ) -> Optional[TradeDecision]:
     """
     Institutional Decision Policy:
@@ -79,14 +87,18 @@ def generate_decision(
     2. Enforce cooldown and duplicate protection
     3. Map strategy to action
     4. Generate structured trade intent
+
+    `now` defaults to the wall clock; replays pass simulated time.
     """
 
+    now = now or datetime.now(timezone.utc)
+
     # --- Confidence Gate ---
     if not _passes_confidence_filter(confidence):
         return None
 
     # --- Execution Guard ---
-    if not _passes_cooldown(symbol, strategy):
+    if not _passes_cooldown(symbol, strategy, now):
         return None
 
     action = _map_strategy_to_action(strategy)
@@ -98,9 +110,98 @@ def generate_decision(
         strategy=strategy,
         action=action,
         confidence=confidence,
-        timestamp=datetime.now(timezone.utc)
+        timestamp=now
     )
 
-    _update_cache(symbol, strategy)
+    _update_cache(symbol, strategy, now)
+
+    return decision
+
+
+# =========================================
+# LATEST DECISION CACHE
+# =========================================
+def remember_decision(record: Dict):
+    """
+    Store a persisted decision row as the latest for its market and symbol.
+    """
+
+    created_at = record["created_at"]
+
+    # MySQL DATETIME comes back naive; decisions are written in UTC
+    if created_at.tzinfo is None:
+        created_at = created_at.replace(tzinfo=timezone.utc)
+
+    key = (record["market"], record["symbol"])
+    current = _latest_decisions.get(key)
+
+    if current is None or created_at >= current["created_at"]:
+        _latest_decisions[key] = {**record, "created_at": created_at}
+
+
+def cache_latest_decision(decision: TradeDecision):
+    remember_decision({
+        "market": decision.market,
+        "symbol": decision.symbol,
+        "meta_regime": decision.meta_regime,
+        "strategy": decision.strategy,
+        "action": decision.action,
+        "confidence": decision.confidence,
+        "created_at": decision.timestamp
+    })
+
+
+def get_cached_decision(
+    market: Optional[str] = None,
+    symbol: Optional[str] = None
+) -> Optional[Dict]:
+    """
+    Most recent cached decision, optionally filtered by market and symbol.
+    """
+
+    matches = [
+        record
+        for (m, s), record in _latest_decisions.items()
+        if (market is None or m == market)
+        and (symbol is None or s == symbol)
+    ]
+
+    if not matches:
+        return None
+
+    return max(matches, key=lambda record: record["created_at"])
+
+
+# =========================================
+# SNAPSHOT STATE
+# =========================================
+def export_state() -> Dict:
+    return {
+        "cooldown": {
+            symbol: dict(record)
+            for symbol, record in _last_decision_cache.items()
+        },
+        "latest": [dict(record) for record in _latest_decisions.values()]
+    }
+
+
+def restore_state(state: Dict):
+    for symbol, record in state.get("cooldown", {}).items():
+        restore_cooldown(symbol, record["strategy"], record["timestamp"])
+
+    for record in state.get("latest", []):
+        remember_decision(record)
+
+
+def restore_cooldown(symbol: str, strategy: str, timestamp: datetime):
+
+    if timestamp.tzinfo is None:
+        timestamp = timestamp.replace(tzinfo=timezone.utc)
+
+    current = _last_decision_cache.get(symbol)
 
-    return decision
\ No newline at end of file
+    if current is None or timestamp >= current["timestamp"]:
+        _last_decision_cache[symbol] = {
+            "strategy": strategy,
+            "timestamp": timestamp
+        }
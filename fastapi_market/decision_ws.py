@@ -1,32 +1,12 @@
-from fastapi import WebSocket
-from typing import List
-import asyncio
+from fastapi_market.broadcast_hub import BroadcastHub, DISCONNECT
 
 
-class DecisionConnectionManager:
+class DecisionConnectionManager(BroadcastHub):
 
+    # Dropping a decision silently is worse than a reconnect; a client that
+    # falls behind is closed and can resync from /api/decision/latest
     def __init__(self):
-        self.active_connections: List[WebSocket] = []
-
-    async def connect(self, websocket: WebSocket):
-        await websocket.accept()
-        self.active_connections.append(websocket)
-
-    def disconnect(self, websocket: WebSocket):
-        if websocket in self.active_connections:
-            self.active_connections.remove(websocket)
-
-    async def broadcast(self, message: dict):
-        disconnected = []
-
-        for connection in self.active_connections:
-            try:
-                await connection.send_json(message)
-            except:
-                disconnected.append(connection)
-
-        for conn in disconnected:
-            self.disconnect(conn)
+        super().__init__(policy=DISCONNECT)
 
 
 decision_manager = DecisionConnectionManager()
\ No newline at end of file
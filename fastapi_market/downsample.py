@@ -0,0 +1,133 @@
+"""
+Downsampling kernels for chart queries.
+
+Each takes columns sorted by time and returns what to plot with at most
+`max_points` points: row indices for lttb/minmax, re-aggregated columns for
+ohlc_buckets. lttb and minmax skip NaN values (features stored as None)
+when they reduce.
+"""
+
+import numpy as np
+
+
+def _bucket_edges(n, buckets):
+    return np.linspace(0, n, buckets + 1).astype(np.int64)
+
+
+def _missing(y):
+    """
+    Indices of the non-NaN values, or None when there is no NaN.
+    """
+
+    missing = np.isnan(y)
+    return np.flatnonzero(~missing) if missing.any() else None
+
+
+def lttb(x, y, max_points):
+    """
+    Largest-Triangle-Three-Buckets: keeps first and last points and, per
+    inner bucket, the point forming the largest triangle with the previous
+    pick and the next bucket's mean. Returns indices.
+    """
+
+    n = len(x)
+
+    if max_points >= n:
+        return np.arange(n)
+
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+
+    valid = _missing(y)
+    if valid is not None:
+        return valid[lttb(x[valid], y[valid], max_points)]
+
+    if max_points < 3:
+        return np.array([0, n - 1])[:max(max_points, 0)]
+
+    # Inner points 1..n-2 split into max_points - 2 non-empty buckets
+    inner = _bucket_edges(n - 2, max_points - 2)
+    edges = inner + 1
+
+    sums_x = np.add.reduceat(x[1:n - 1], inner[:-1])
+    sums_y = np.add.reduceat(y[1:n - 1], inner[:-1])
+    sizes = np.diff(inner)
+
+    # Mean of the following bucket; the last inner bucket looks at the end point
+    next_x = np.append((sums_x / sizes)[1:], x[-1])
+    next_y = np.append((sums_y / sizes)[1:], y[-1])
+
+    picked = np.empty(max_points, dtype=np.int64)
+    picked[0] = 0
+    picked[-1] = n - 1
+
+    a = 0
+    for b in range(max_points - 2):
+        lo, hi = edges[b], edges[b + 1]
+
+        area = np.abs(
+            (x[a] - next_x[b]) * (y[lo:hi] - y[a])
+            - (x[a] - x[lo:hi]) * (next_y[b] - y[a])
+        )
+
+        a = lo + int(np.argmax(area))
+        picked[b + 1] = a
+
+    return picked
+
+
+def minmax(y, max_points):
+    """
+    Index of the minimum and maximum per bucket (max_points // 2 buckets),
+    in time order. Keeps every spike visible.
+    """
+
+    n = len(y)
+    buckets = max(max_points // 2, 1)
+
+    if max_points >= n:
+        return np.arange(n)
+
+    y = np.asarray(y, dtype=np.float64)
+
+    valid = _missing(y)
+    if valid is not None:
+        return valid[minmax(y[valid], max_points)]
+
+    edges = _bucket_edges(n, buckets)
+    starts = edges[:-1]
+    bucket = np.repeat(np.arange(buckets), np.diff(edges))
+
+    picks = []
+    for reduce in (np.minimum, np.maximum):
+        extreme = reduce.reduceat(y, starts)
+        hits = np.flatnonzero(y == extreme[bucket])
+
+        # First hit in every bucket
+        picks.append(hits[np.searchsorted(bucket[hits], np.arange(buckets))])
+
+    return np.unique(np.concatenate(picks))
+
+
+def ohlc_buckets(columns, max_points):
+    """
+    Merge consecutive candles into at most max_points wider candles:
+    first open, max high, min low, last close, summed volume.
+    """
+
+    n = len(columns["timestamp"])
+
+    if max_points >= n:
+        return columns
+
+    starts = np.unique(_bucket_edges(n, max_points)[:-1])
+    last = np.append(starts[1:], n) - 1
+
+    return {
+        "timestamp": columns["timestamp"][starts],
+        "open": columns["open"][starts],
+        "high": np.maximum.reduceat(columns["high"], starts),
+        "low": np.minimum.reduceat(columns["low"], starts),
+        "close": columns["close"][last],
+        "volume": np.add.reduceat(columns["volume"], starts),
+    }
@@ -1,22 +1,102 @@
 import numpy as np
 from collections import deque, defaultdict
 from datetime import datetime
+from fastapi_market.bucket_sink import feature_sink
+from fastapi_market.timeseries import to_ts
+from fastapi_market.state_board import ATR_TIMEFRAME, state_board
 WINDOW_SIZE = 5
 
+STATE_COLLECTION = "feature_state"
+
+
+def series_key(market, symbol, timeframe):
+    return f"{market}:{symbol}:{timeframe}"
+
+
+def state_doc(market, symbol, timeframe, timestamp, closes, true_ranges, volumes):
+    """
+    Rolling buffers of one series as stored in feature_state; written by
+    the live engine at shutdown and by the backfill.
+    """
+
+    return {
+        "_id": series_key(market, symbol, timeframe),
+        "market": market,
+        "symbol": symbol,
+        "timeframe": timeframe,
+        "timestamp": timestamp,
+        "closes": [float(v) for v in closes][-WINDOW_SIZE:],
+        "true_ranges": [float(v) for v in true_ranges][-WINDOW_SIZE:],
+        "volumes": [float(v) for v in volumes][-WINDOW_SIZE:],
+        "updated_at": datetime.utcnow()
+    }
+
 
 class FeatureEngine:
 
     def __init__(self):
-        from fastapi_market.database import db
+        from fastapi_market.database import db, FEATURE_COLLECTION
         self.db = db
-        self.collection = self.db["market_features"]
+        self.collection = self.db[FEATURE_COLLECTION]
+
+        from fastapi_market.storage import get_storage
+        self.features = get_storage().features
+
+        from fastapi_market.market_stream import market_stream
+        self.stream = market_stream
 
         self.price_buffer = defaultdict(lambda: deque(maxlen=WINDOW_SIZE))
         self.tr_buffer = defaultdict(lambda: deque(maxlen=WINDOW_SIZE))
         self.volume_buffer = defaultdict(lambda: deque(maxlen=WINDOW_SIZE))
 
+        # key -> timestamp of the last candle in the buffers
+        self.last_timestamp = {}
+
+        # (market, symbol) -> (atr, timestamp) of the latest complete
+        # ATR_TIMEFRAME candle; the same value the state board carries
+        self.latest_atr = {}
+
     def _key(self, market, symbol, timeframe):
-        return f"{market}:{symbol}:{timeframe}"
+        return series_key(market, symbol, timeframe)
+
+    # =========================================
+    # WARM STATE
+    # =========================================
+    async def warm(self):
+        """
+        Load the buffers saved by the last shutdown or backfill, so features
+        resume without waiting WINDOW_SIZE candles. Returns series loaded.
+        """
+
+        loaded = 0
+
+        for doc in await self.features.load_state():
+            key = doc["_id"]
+
+            self.price_buffer[key] = deque(doc["closes"], maxlen=WINDOW_SIZE)
+            self.tr_buffer[key] = deque(doc["true_ranges"], maxlen=WINDOW_SIZE)
+            self.volume_buffer[key] = deque(doc["volumes"], maxlen=WINDOW_SIZE)
+            self.last_timestamp[key] = doc["timestamp"]
+            loaded += 1
+
+        return loaded
+
+    async def save_state(self):
+        docs = []
+
+        for key, timestamp in self.last_timestamp.items():
+            # US symbols contain a colon themselves (NASDAQ:TSLA)
+            market, rest = key.split(":", 1)
+            symbol, timeframe = rest.rsplit(":", 1)
+            docs.append(state_doc(
+                market, symbol, timeframe, timestamp,
+                self.price_buffer[key], self.tr_buffer[key], self.volume_buffer[key]
+            ))
+
+        if docs:
+            await self.features.save_state(docs)
+
+        return len(docs)
 
     async def process_candle(self, candle: dict):
 
@@ -38,6 +118,7 @@ class FeatureEngine:
         )
         self.price_buffer[key].append(close)
         self.volume_buffer[key].append(volume)
+        self.last_timestamp[key] = timestamp
         if previous_close is not None:
             true_range = max(
                 high - low,
@@ -70,4 +151,17 @@ class FeatureEngine:
             "created_at": datetime.utcnow()
         }
 
-        await self.collection.insert_one(feature_doc)
\ No newline at end of file
+        self.stream.publish(f"features.{timeframe}", market, symbol, dict(feature_doc))
+
+        if not candle.get("partial"):
+            state_board.feature(market, symbol, timeframe, timestamp, atr)
+
+            if timeframe == ATR_TIMEFRAME:
+                self.latest_atr[(market, symbol)] = (atr, timestamp)
+
+        feature_sink.submit({
+            **feature_doc,
+            "bucket_start": timestamp,
+            "partial": candle.get("partial", False),
+            "ts": to_ts(timestamp)
+        })
\ No newline at end of file
@@ -0,0 +1,159 @@
+"""
+Vectorized versions of the FeatureEngine definitions for whole candle series.
+
+Row i holds what FeatureEngine.process_candle computes after seeing candles
+0..i of the series; rows before the window fills are NaN.
+"""
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from fastapi_market.feature_engine import WINDOW_SIZE
+
+
+def true_range(high, low, close):
+    """
+    True range for candles 1..n-1 (the first candle has no previous close).
+    """
+
+    previous_close = close[:-1]
+
+    return np.maximum(
+        high[1:] - low[1:],
+        np.maximum(
+            np.abs(high[1:] - previous_close),
+            np.abs(low[1:] - previous_close)
+        )
+    )
+
+
+def rolling_atr(high, low, close, window=WINDOW_SIZE):
+    """
+    Mean of the last `window` true ranges; the first emitted row only has
+    window - 1 of them, as in FeatureEngine's tr_buffer.
+    """
+
+    n = len(close)
+    atr = np.full(n, np.nan)
+
+    if n < window:
+        return atr
+
+    tr = true_range(high, low, close)
+
+    atr[window - 1] = tr[:window - 1].mean() if window > 1 else 0.0
+
+    if n > window:
+        atr[window:] = sliding_window_view(tr, window).mean(axis=1)[:n - window]
+
+    return atr
+
+
+def rolling_volatility(close, window=WINDOW_SIZE):
+    """
+    Population std of the log returns inside each window of closes, scaled
+    by sqrt(window).
+    """
+
+    n = len(close)
+    volatility = np.full(n, np.nan)
+
+    if n < window:
+        return volatility
+
+    if window > 2:
+        returns = np.diff(np.log(close))
+        volatility[window - 1:] = (
+            sliding_window_view(returns, window - 1).std(axis=1) * np.sqrt(window)
+        )
+    else:
+        volatility[window - 1:] = 0.0
+
+    return volatility
+
+
+def volume_delta(volume, window=WINDOW_SIZE):
+    """
+    Change in volume from the previous candle, from the first full window.
+    """
+
+    n = len(volume)
+    delta = np.full(n, np.nan)
+
+    if n < window:
+        return delta
+
+    delta[window - 1:] = np.diff(volume)[window - 2:] if window > 1 else 0.0
+
+    return delta
+
+
+def candle_features(candles, window=WINDOW_SIZE):
+    """
+    Every FeatureEngine feature for a candle series.
+    """
+
+    return {
+        "rolling_volatility": rolling_volatility(candles["close"], window),
+        "atr": rolling_atr(candles["high"], candles["low"], candles["close"], window),
+        "volume_delta": volume_delta(candles["volume"], window),
+    }
+
+
+def _bucket_bounds(buckets):
+    starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+    ends = np.r_[starts[1:], len(buckets)] - 1
+    return starts, ends
+
+
+def _empty_candles():
+    return {
+        "timestamp": np.empty(0, dtype=np.int64),
+        **{field: np.empty(0) for field in ("open", "high", "low", "close", "volume")}
+    }
+
+
+def aggregate_candles(timestamp, price, quantity, timeframe_ms):
+    """
+    OHLCV candles from trades in time order, bucketed like
+    MultiTimeframeCandleEngine (bucket_start = ts // tf * tf). The last
+    candle may still be open.
+    """
+
+    if len(timestamp) == 0:
+        return _empty_candles()
+
+    buckets = np.asarray(timestamp) // timeframe_ms * timeframe_ms
+    starts, ends = _bucket_bounds(buckets)
+
+    return {
+        "timestamp": buckets[starts],
+        "open": price[starts],
+        "high": np.maximum.reduceat(price, starts),
+        "low": np.minimum.reduceat(price, starts),
+        "close": price[ends],
+        "volume": np.add.reduceat(quantity, starts),
+    }
+
+
+def resample_candles(candles, timeframe_ms):
+    """
+    Roll candles in time order up into a larger timeframe. Resampling to
+    the same timeframe merges repeated buckets, such as a candle split
+    across two input chunks.
+    """
+
+    if len(candles["timestamp"]) == 0:
+        return _empty_candles()
+
+    buckets = np.asarray(candles["timestamp"]) // timeframe_ms * timeframe_ms
+    starts, ends = _bucket_bounds(buckets)
+
+    return {
+        "timestamp": buckets[starts],
+        "open": candles["open"][starts],
+        "high": np.maximum.reduceat(candles["high"], starts),
+        "low": np.minimum.reduceat(candles["low"], starts),
+        "close": candles["close"][ends],
+        "volume": np.add.reduceat(candles["volume"], starts),
+    }
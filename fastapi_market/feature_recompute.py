@@ -0,0 +1,282 @@
+"""
+Recompute feature history from candles into a versioned collection.
+
+When the feature definitions or WINDOW_SIZE change, the stored features no
+longer match what FeatureEngine computes. This rebuilds every
+(market, symbol, timeframe) series into market_features_<version>:
+
+    python -m fastapi_market.feature_recompute --version v2 --workers 4
+
+and FEATURE_VERSION=v2 then points the live FeatureEngine, RegimeEngine,
+the history API and the Flask regime service at it.
+
+Candles are read per series in CHUNK_ROWS chunks (by bucket_start,
+projected to OHLCV). The last `window` candles of each chunk are carried
+into the next (the oldest one only for its close, the first true range), so the sliding-window kernels in feature_kernels give the
+same rows as one pass. Rows are written with unordered insert_many, one
+process per series. After every chunk the series checkpoint in
+feature_recompute_state advances, so an interrupted run resumes where it
+stopped, and a later run only adds the candles closed since. Rows
+re-inserted from a half-written chunk hit the unique bucket index and are
+ignored.
+"""
+
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import numpy as np
+from pymongo.errors import BulkWriteError
+
+from fastapi_market.backfill import (
+    CANDLE_FIELDS,
+    concat_candles,
+    feature_docs,
+    preceding_candles,
+)
+from fastapi_market.candle_engine import TIMEFRAMES
+from fastapi_market.database import feature_collection_name
+from fastapi_market.feature_engine import WINDOW_SIZE, series_key
+from fastapi_market.feature_kernels import candle_features
+from fastapi_market.indexes import INDEXES
+
+CHUNK_ROWS = 100_000
+CHECKPOINT_COLLECTION = "feature_recompute_state"
+
+_DUPLICATE_KEY = 11000
+
+
+def series_list(db, market=None, symbols=None, timeframes=None):
+    match = {"partial": {"$ne": True}}
+
+    if market:
+        match["market"] = market
+    if symbols:
+        match["symbol"] = {"$in": symbols}
+    if timeframes:
+        match["timeframe"] = {"$in": timeframes}
+
+    cursor = db["candles"].aggregate(
+        [
+            {"$match": match},
+            {"$group": {"_id": {"market": "$market", "symbol": "$symbol", "timeframe": "$timeframe"}}},
+            {"$sort": {"_id.market": 1, "_id.symbol": 1, "_id.timeframe": 1}},
+        ],
+        allowDiskUse=True
+    )
+
+    return [doc["_id"] for doc in cursor]
+
+
+def ensure_target(db, name):
+    """
+    Same indexes as the live feature collection, unique bucket key included.
+    """
+
+    for spec in INDEXES[feature_collection_name()]:
+        db[name].create_index(spec["keys"], name=spec["name"], **spec.get("options", {}))
+
+
+def insert(collection, docs):
+    try:
+        collection.insert_many(docs, ordered=False)
+
+    except BulkWriteError as e:
+        errors = [
+            err for err in e.details.get("writeErrors", [])
+            if err.get("code") != _DUPLICATE_KEY
+        ]
+        if errors:
+            raise
+
+
+# =========================================
+# WORKER
+# =========================================
+_worker_db = None
+
+
+def _init_worker(mongo_uri, db_name):
+    from pymongo import MongoClient
+
+    global _worker_db
+    _worker_db = MongoClient(mongo_uri)[db_name]
+
+
+def read_chunk(db, market, symbol, timeframe, after, limit=CHUNK_ROWS):
+    docs = list(
+        db["candles"].find(
+            {
+                "market": market,
+                "symbol": symbol,
+                "timeframe": timeframe,
+                "bucket_start": {"$gt": after},
+                "partial": {"$ne": True},
+            },
+            {"_id": 0, "bucket_start": 1, **{field: 1 for field in CANDLE_FIELDS}}
+        ).sort("bucket_start", 1).limit(limit)
+    )
+
+    return {
+        "timestamp": np.array([d["bucket_start"] for d in docs], dtype=np.int64),
+        **{field: np.array([d[field] for d in docs], dtype=np.float64) for field in CANDLE_FIELDS},
+    }
+
+
+def recompute_series(task):
+
+    started = time.perf_counter()
+    market, symbol, timeframe = task["market"], task["symbol"], task["timeframe"]
+    window = task["window"]
+
+    target = _worker_db[task["collection"]]
+    checkpoints = _worker_db[CHECKPOINT_COLLECTION]
+    key = {"_id": f"{task['collection']}:{series_key(market, symbol, timeframe)}"}
+
+    checkpoint = checkpoints.find_one(key) or {}
+
+    after = checkpoint.get("bucket_start", -1)
+    rows = checkpoint.get("rows", 0)
+    written = 0
+
+    # Candles the first row's window (and its first true range) reach back to
+    carry = preceding_candles(_worker_db, market, symbol, timeframe, after + 1, window)
+
+    while True:
+        chunk = read_chunk(_worker_db, market, symbol, timeframe, after, task["chunk_rows"])
+
+        if not len(chunk["timestamp"]):
+            break
+
+        series = concat_candles([carry, chunk])
+        first = max(len(carry["timestamp"]), window - 1)
+
+        docs = feature_docs(
+            market, symbol, timeframe, series, candle_features(series, window), first
+        )
+
+        if docs:
+            insert(target, docs)
+
+        written += len(docs)
+        after = int(chunk["timestamp"][-1])
+        carry = {field: values[-window:] for field, values in series.items()}
+
+        checkpoints.update_one(
+            key,
+            {"$set": {
+                "market": market,
+                "symbol": symbol,
+                "timeframe": timeframe,
+                "window": window,
+                "bucket_start": after,
+                "rows": rows + written,
+                "updated_at": datetime.utcnow(),
+            }},
+            upsert=True
+        )
+
+    return task, {
+        "rows": written,
+        "resumed": bool(checkpoint),
+        "seconds": round(time.perf_counter() - started, 2)
+    }
+
+
+# =========================================
+# DRIVER
+# =========================================
+def run_recompute(mongo_uri, db_name, version, market=None, symbols=None,
+                  timeframes=None, window=WINDOW_SIZE, chunk_rows=CHUNK_ROWS,
+                  restart=False, workers=None):
+    """
+    Recompute every matching series; yields (task, stats) per series.
+    """
+
+    from pymongo import MongoClient
+
+    db = MongoClient(mongo_uri)[db_name]
+    collection = feature_collection_name(version)
+
+    if restart:
+        db[collection].drop()
+        db[CHECKPOINT_COLLECTION].delete_many({"_id": {"$regex": f"^{collection}:"}})
+
+    ensure_target(db, collection)
+
+    tasks = [
+        {
+            **series,
+            "collection": collection,
+            "window": window,
+            "chunk_rows": chunk_rows,
+        }
+        for series in series_list(db, market, symbols, timeframes)
+    ]
+
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_worker,
+        initargs=(mongo_uri, db_name)
+    ) as pool:
+        yield from pool.map(recompute_series, tasks)
+
+
+# =========================================
+# CLI
+# =========================================
+def main():
+    from dotenv import load_dotenv
+
+    load_dotenv()
+
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--version", required=True, help="writes market_features_<version>")
+    parser.add_argument("--market")
+    parser.add_argument("--symbols", help="comma separated; default: all with candles")
+    parser.add_argument("--timeframes", help="comma separated; default: all")
+    parser.add_argument("--window", type=int, default=WINDOW_SIZE)
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS)
+    parser.add_argument("--restart", action="store_true",
+                        help="drop the version's collection and checkpoints first")
+    parser.add_argument("--workers", type=int)
+    args = parser.parse_args()
+
+    if args.window < 2:
+        parser.error("--window must be at least 2")
+
+    if args.timeframes:
+        unknown = set(args.timeframes.split(",")) - set(TIMEFRAMES)
+        if unknown:
+            parser.error(f"unknown timeframes: {', '.join(sorted(unknown))}")
+
+    started = time.perf_counter()
+    total = 0
+
+    for task, stats in run_recompute(
+        os.getenv("MONGO_URI", "mongodb://localhost:27017"),
+        os.getenv("MONGO_DB_NAME", "aetherion"),
+        args.version,
+        market=args.market.upper() if args.market else None,
+        symbols=args.symbols.upper().split(",") if args.symbols else None,
+        timeframes=args.timeframes.split(",") if args.timeframes else None,
+        window=args.window,
+        chunk_rows=args.chunk_rows,
+        restart=args.restart,
+        workers=args.workers
+    ):
+        total += stats["rows"]
+        print(
+            f"{task['market']:<7} {task['symbol']:<14} {task['timeframe']:<4} "
+            f"rows={stats['rows']} in {stats['seconds']:.2f}s"
+            + (" (resumed)" if stats["resumed"] else "")
+        )
+
+    elapsed = time.perf_counter() - started
+    print(f"🧮 {total} feature rows in {elapsed:.2f}s ({total / max(elapsed, 1e-9):,.0f} rows/s)")
+
+
+if __name__ == "__main__":
+    main()
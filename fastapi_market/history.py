@@ -0,0 +1,310 @@
+"""
+History API: candles, features and regimes as NDJSON streams.
+
+Rows come back in (timestamp, _id) order straight from an async cursor,
+one JSON object per line. With `limit`, a final {"next_cursor": ...} line
+is written when more rows remain; pass it back as `cursor` to continue.
+
+Candles and features also take `max_points` for charts: the range is
+loaded into NumPy and reduced server-side (OHLC re-bucketing for candles,
+LTTB or min/max for a feature column). Reduced ranges that have fully
+closed are cached in their own byte-bounded cache (chart_cache), apart
+from the short-lived snapshot responses.
+"""
+
+import json
+import time
+from typing import Optional
+
+import numpy as np
+from bson import ObjectId
+from bson.errors import InvalidId
+from fastapi import APIRouter, Response
+from fastapi.responses import StreamingResponse
+
+from fastapi_market.candle_engine import TIMEFRAMES
+from fastapi_market.database import db, FEATURE_COLLECTION
+from fastapi_market.downsample import lttb, minmax, ohlc_buckets
+from fastapi_market.response_cache import ResponseCache
+
+router = APIRouter(prefix="/api/history")
+
+BATCH_SIZE = 1000
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+MAX_POINTS_LIMIT = 10_000
+CLOSED_RANGE_TTL_SECONDS = 600
+
+CHART_CACHE_ENTRIES = 256
+CHART_CACHE_BYTES = 64 * 1024 * 1024
+
+chart_cache = ResponseCache(
+    max_entries=CHART_CACHE_ENTRIES,
+    default_ttl=CLOSED_RANGE_TTL_SECONDS,
+    max_bytes=CHART_CACHE_BYTES
+)
+
+# Numeric columns loaded for downsampling
+NUMERIC_FIELDS = {
+    "candles": ["timestamp", "open", "high", "low", "close", "volume"],
+    "features": ["timestamp", "close", "rolling_volatility", "atr", "volume_delta"],
+}
+
+SERIES = {
+    "candles": {
+        "collection": "candles",
+        "fields": ["symbol", "timeframe", "timestamp", "open", "high", "low", "close", "volume"],
+    },
+    "features": {
+        "collection": FEATURE_COLLECTION,
+        "fields": ["symbol", "timeframe", "timestamp", "close", "rolling_volatility", "atr", "volume_delta"],
+    },
+    "regimes": {
+        "collection": "market_regimes",
+        "fields": ["symbol", "timeframe", "timestamp", "regime_state"],
+    },
+}
+
+
+def encode_cursor(doc):
+    return f"{doc['timestamp']}_{doc['_id']}"
+
+
+def decode_cursor(cursor):
+    timestamp, oid = cursor.split("_", 1)
+    return int(timestamp), ObjectId(oid)
+
+
+def build_query(market, symbol=None, timeframe=None, start=None, end=None,
+                cursor=None):
+    query = {"market": market}
+
+    if symbol:
+        query["symbol"] = symbol
+    if timeframe:
+        query["timeframe"] = timeframe
+
+    time_filter = {}
+    if start is not None:
+        time_filter["$gte"] = start
+    if end is not None:
+        time_filter["$lt"] = end
+    if time_filter:
+        query["timestamp"] = time_filter
+
+    if cursor is not None:
+        timestamp, oid = cursor
+        query["$or"] = [
+            {"timestamp": {"$gt": timestamp}},
+            {"timestamp": timestamp, "_id": {"$gt": oid}},
+        ]
+
+    return query
+
+
+def find_series(series, query, limit=None, fields=None):
+    spec = SERIES[series]
+    projection = {field: 1 for field in fields or spec["fields"]}
+
+    cursor = (
+        db[spec["collection"]]
+        .find(query, projection)
+        .sort([("timestamp", 1), ("_id", 1)])
+        .batch_size(BATCH_SIZE)
+    )
+
+    if limit:
+        # One extra row tells us whether another page exists
+        cursor = cursor.limit(limit + 1)
+
+    return cursor
+
+
+async def ndjson_rows(cursor, limit=None):
+    lines = []
+    sent = 0
+    last = None
+
+    async for doc in cursor:
+        if limit and sent == limit:
+            lines.append(json.dumps({"next_cursor": encode_cursor(last)}, separators=(",", ":")))
+            break
+
+        last = {"timestamp": doc["timestamp"], "_id": doc["_id"]}
+        del doc["_id"]
+
+        lines.append(json.dumps(doc, separators=(",", ":"), default=str))
+        sent += 1
+
+        if len(lines) >= BATCH_SIZE:
+            yield ("\n".join(lines) + "\n").encode()
+            lines = []
+
+    if lines:
+        yield ("\n".join(lines) + "\n").encode()
+
+
+async def _history(series, market, symbol, timeframe, start, end, limit, cursor):
+
+    try:
+        after = decode_cursor(cursor) if cursor else None
+    except (ValueError, InvalidId):
+        return {"error": "Invalid cursor"}
+
+    query = build_query(
+        market.upper(),
+        symbol.upper() if symbol else None,
+        timeframe,
+        start,
+        end,
+        after
+    )
+
+    return StreamingResponse(
+        ndjson_rows(find_series(series, query, limit), limit),
+        media_type=NDJSON_MEDIA_TYPE
+    )
+
+
+# =========================================
+# DOWNSAMPLED (CHARTS)
+# =========================================
+async def load_numeric(series, query):
+    fields = NUMERIC_FIELDS[series]
+    values = {field: [] for field in fields}
+
+    async for doc in find_series(series, query, fields=fields):
+        for field in fields:
+            values[field].append(doc.get(field, 0))
+
+    return {
+        field: np.array(
+            column,
+            dtype=np.int64 if field == "timestamp" else np.float64
+        )
+        for field, column in values.items()
+    }
+
+
+def ndjson_columns(columns, constants):
+    lists = {field: column.tolist() for field, column in columns.items()}
+    n = len(lists["timestamp"])
+
+    return "".join(
+        json.dumps(
+            {**constants, **{field: lists[field][i] for field in lists}},
+            separators=(",", ":")
+        ) + "\n"
+        for i in range(n)
+    ).encode()
+
+
+def range_closed(end, timeframe):
+    """
+    True once every candle starting before `end` has been finalized.
+    """
+    now_ms = int(time.time() * 1000)
+    return end is not None and end <= now_ms - TIMEFRAMES[timeframe]
+
+
+async def _downsampled(series, market, symbol, timeframe, start, end,
+                       max_points, method, field):
+
+    if not symbol or timeframe not in TIMEFRAMES:
+        return {"error": "max_points needs a symbol and a valid timeframe"}
+
+    if series == "features" and field not in NUMERIC_FIELDS["features"][1:]:
+        return {"error": f"Unknown feature field: {field}"}
+
+    if method not in ("lttb", "minmax"):
+        return {"error": f"Unknown method: {method}"}
+
+    market = market.upper()
+    symbol = symbol.upper()
+    max_points = max(1, min(max_points, MAX_POINTS_LIMIT))
+
+    async def load():
+        columns = await load_numeric(
+            series,
+            build_query(market, symbol, timeframe, start, end)
+        )
+
+        if series == "candles":
+            columns = ohlc_buckets(columns, max_points)
+        else:
+            idx = (
+                lttb(columns["timestamp"], columns[field], max_points)
+                if method == "lttb"
+                else minmax(columns[field], max_points)
+            )
+            columns = {name: column[idx] for name, column in columns.items()}
+
+        return ndjson_columns(columns, {"symbol": symbol, "timeframe": timeframe})
+
+    if range_closed(end, timeframe):
+        body = await chart_cache.get_or_load(
+            f"history:{series}:{market}:{symbol}:{timeframe}:"
+            f"{start}:{end}:{max_points}:{method}:{field}",
+            load,
+            ttl=CLOSED_RANGE_TTL_SECONDS
+        )
+    else:
+        body = await load()
+
+    return Response(content=body, media_type=NDJSON_MEDIA_TYPE)
+
+
+@router.get("/candles/{market}")
+async def candle_history(
+    market: str,
+    symbol: Optional[str] = None,
+    timeframe: Optional[str] = None,
+    start: Optional[int] = None,
+    end: Optional[int] = None,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    max_points: Optional[int] = None
+):
+    if max_points:
+        return await _downsampled(
+            "candles", market, symbol, timeframe, start, end,
+            max_points, "lttb", None
+        )
+
+    return await _history("candles", market, symbol, timeframe, start, end, limit, cursor)
+
+
+@router.get("/features/{market}")
+async def feature_history(
+    market: str,
+    symbol: Optional[str] = None,
+    timeframe: Optional[str] = None,
+    start: Optional[int] = None,
+    end: Optional[int] = None,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    max_points: Optional[int] = None,
+    method: str = "lttb",
+    field: str = "close"
+):
+    if max_points:
+        return await _downsampled(
+            "features", market, symbol, timeframe, start, end,
+            max_points, method, field
+        )
+
+    return await _history("features", market, symbol, timeframe, start, end, limit, cursor)
+
+
+@router.get("/regimes/{market}")
+async def regime_history(
+    market: str,
+    symbol: Optional[str] = None,
+    timeframe: Optional[str] = None,
+    start: Optional[int] = None,
+    end: Optional[int] = None,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None
+):
+    return await _history("regimes", market, symbol, timeframe, start, end, limit, cursor)
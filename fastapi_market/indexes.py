@@ -0,0 +1,279 @@
+"""
+Index registry for every Mongo collection the services query.
+
+INDEXES declares the indexes per collection; ensure_indexes() applies them
+at startup (creating missing ones, dropping RETIRED ones) and is safe to
+run repeatedly. QUERIES lists the query shapes the services actually run,
+so the check can explain() each of them and fail on a collection scan:
+
+    python -m fastapi_market.indexes --check
+    python -m fastapi_market.indexes --apply
+"""
+
+import argparse
+import asyncio
+import sys
+from datetime import datetime
+
+from pymongo.errors import OperationFailure
+
+from fastapi_market.database import db, FEATURE_COLLECTION
+from fastapi_market.timeseries import ttl_indexes
+
+ORDERBOOK_COLLECTIONS = ("crypto_orderbooks", "nasdaq_orderbooks", "nyse_orderbooks")
+
+# Equality on (market, symbol, timeframe), range/sort on timestamp; the _id
+# suffix keeps keyset pagination on the index
+_SERIES_INDEXES = [
+    {"name": "market_symbol_timeframe_timestamp",
+     "keys": [("market", 1), ("symbol", 1), ("timeframe", 1), ("timestamp", 1), ("_id", 1)]},
+    {"name": "market_timeframe_timestamp",
+     "keys": [("market", 1), ("timeframe", 1), ("timestamp", 1), ("_id", 1)]},
+]
+
+# One row per bucket; bucket_sink upserts on this key
+_BUCKET_INDEX = {
+    "name": "bucket_key",
+    "keys": [("market", 1), ("symbol", 1), ("timeframe", 1), ("bucket_start", 1)],
+    "options": {"unique": True},
+}
+
+INDEXES = {
+    "real_market_ticks": [
+        {"name": "market_type_receive_timestamp",
+         "keys": [("market_type", 1), ("receive_timestamp", -1)]},
+    ],
+    "candles": _SERIES_INDEXES + ttl_indexes("candles") + [
+        _BUCKET_INDEX,
+        {"name": "partial_bucket_start",
+         "keys": [("bucket_start", 1)],
+         "options": {"partialFilterExpression": {"partial": True}}},
+    ],
+    FEATURE_COLLECTION: _SERIES_INDEXES + ttl_indexes("market_features") + [
+        _BUCKET_INDEX,
+        {"name": "market_created_at",
+         "keys": [("market", 1), ("created_at", -1)]},
+    ],
+    "market_regimes": list(_SERIES_INDEXES),
+    **{
+        name: [{"name": "receive_timestamp", "keys": [("receive_timestamp", -1)]}]
+        for name in ORDERBOOK_COLLECTIONS
+    },
+    "crypto_orderbook_frames": [
+        {"name": "symbol_kind_ts",
+         "keys": [("meta.market", 1), ("meta.symbol", 1), ("kind", 1), ("ts", -1)]},
+    ],
+}
+
+# Indexes created by earlier versions that no query uses
+RETIRED = {
+    "real_market_ticks": ["symbol_1_exchange_timestamp_-1"],
+    "candles": [
+        "symbol_1_timeframe_1_open_time_-1",
+        "market_1_symbol_1_timeframe_1_timestamp_1__id_1",
+        "market_1_timeframe_1_timestamp_1__id_1",
+    ],
+    "market_features": [
+        "market_1_symbol_1_timeframe_1_timestamp_1__id_1",
+        "market_1_timeframe_1_timestamp_1__id_1",
+    ],
+    "market_regimes": [
+        "market_1_symbol_1_timeframe_1_timestamp_1__id_1",
+        "market_1_timeframe_1_timestamp_1__id_1",
+    ],
+}
+
+_SERIES_QUERY = {"market": "CRYPTO", "symbol": "BTCUSDT", "timeframe": "1m"}
+
+# (label, collection, filter, sort) for each query the services issue
+QUERIES = [
+    ("trade buffer warm-up", "real_market_ticks",
+     {"market_type": "CRYPTO"}, [("receive_timestamp", -1)]),
+    ("latest features", FEATURE_COLLECTION,
+     {"market": "CRYPTO"}, [("created_at", -1)]),
+    ("regime training / flask detect", FEATURE_COLLECTION,
+     _SERIES_QUERY, [("timestamp", 1)]),
+    ("regime prediction window", FEATURE_COLLECTION,
+     _SERIES_QUERY, [("timestamp", -1)]),
+    ("decision backtest clock", FEATURE_COLLECTION,
+     {**_SERIES_QUERY, "timestamp": {"$gte": 0}}, [("timestamp", 1)]),
+    ("decision backtest regimes", "market_regimes",
+     _SERIES_QUERY, [("timestamp", 1)]),
+    ("strategy backtest candles", "candles",
+     {**_SERIES_QUERY, "timestamp": {"$gte": 0, "$lt": 2 ** 62}}, [("timestamp", 1)]),
+    *[
+        (f"history {name} by symbol", name,
+         {**_SERIES_QUERY, "timestamp": {"$gte": 0}}, [("timestamp", 1), ("_id", 1)])
+        for name in ("candles", FEATURE_COLLECTION, "market_regimes")
+    ],
+    *[
+        (f"history {name} by timeframe", name,
+         {"market": "CRYPTO", "timeframe": "1m"}, [("timestamp", 1), ("_id", 1)])
+        for name in ("candles", FEATURE_COLLECTION, "market_regimes")
+    ],
+    *[
+        (f"latest {name}", name, {}, [("receive_timestamp", -1)])
+        for name in ORDERBOOK_COLLECTIONS
+    ],
+    ("partial candles at startup", "candles",
+     {"partial": True, "timeframe": "1m", "bucket_start": 0}, [("bucket_start", 1)]),
+    *[
+        (f"bucket upsert {name}", name,
+         {"market": "CRYPTO", "symbol": "BTCUSDT", "timeframe": "1m", "bucket_start": 0},
+         [("bucket_start", 1)])
+        for name in ("candles", FEATURE_COLLECTION)
+    ],
+    ("orderbook replay snapshot", "crypto_orderbook_frames",
+     {"meta.market": "CRYPTO", "meta.symbol": "BTCUSDT", "kind": "snapshot",
+      "ts": {"$lte": datetime(2100, 1, 1)}}, [("ts", -1)]),
+    ("orderbook replay deltas", "crypto_orderbook_frames",
+     {"meta.market": "CRYPTO", "meta.symbol": "BTCUSDT", "kind": "deltas",
+      "session": "", "first_seq": {"$gt": 0},
+      "ts": {"$gte": datetime(2000, 1, 1), "$lte": datetime(2100, 1, 1)}},
+     [("first_seq", 1)]),
+]
+
+
+# =========================================
+# APPLY
+# =========================================
+def _matches(current, spec):
+    keys = [(k, int(v)) for k, v in current["key"]]
+
+    return keys == spec["keys"] and all(
+        current.get(option) == value
+        for option, value in spec.get("options", {}).items()
+    )
+
+
+async def ensure_indexes(database=db):
+    """
+    Create missing registry indexes and drop retired ones.
+    Returns {"created": [...], "dropped": [...]}.
+    """
+
+    created, dropped = [], []
+
+    for name, specs in INDEXES.items():
+        collection = database[name]
+        existing = await collection.index_information()
+
+        for index in RETIRED.get(name, []):
+            if index in existing:
+                await collection.drop_index(index)
+                dropped.append(f"{name}.{index}")
+
+        for spec in specs:
+            current = existing.get(spec["name"])
+
+            if current is not None:
+                if _matches(current, spec):
+                    continue
+
+                # Same name, different definition: replace it
+                await collection.drop_index(spec["name"])
+
+            try:
+                await collection.create_index(
+                    spec["keys"],
+                    name=spec["name"],
+                    **spec.get("options", {})
+                )
+                created.append(f"{name}.{spec['name']}")
+
+            except OperationFailure as e:
+                print(f"❌ Index {name}.{spec['name']} failed: {e}")
+
+    return {"created": created, "dropped": dropped}
+
+
+# =========================================
+# CHECK
+# =========================================
+def plan_stages(plan):
+    """
+    Every stage name in an explain() plan tree.
+    """
+
+    stages = []
+
+    if isinstance(plan, dict):
+        if "stage" in plan:
+            stages.append(plan["stage"])
+        for value in plan.values():
+            stages.extend(plan_stages(value))
+
+    elif isinstance(plan, list):
+        for value in plan:
+            stages.extend(plan_stages(value))
+
+    return stages
+
+
+async def check_queries(database=db):
+    """
+    explain() every known query. Returns one result dict per query.
+    """
+
+    results = []
+
+    for label, name, query, sort in QUERIES:
+        cursor = database[name].find(query).sort(sort).limit(1)
+        explained = await cursor.explain()
+
+        stages = plan_stages(explained["queryPlanner"]["winningPlan"])
+
+        results.append({
+            "query": label,
+            "collection": name,
+            "stages": stages,
+            "collscan": "COLLSCAN" in stages,
+            # Blocking in-memory sort: the index doesn't match the sort
+            "sort": "SORT" in stages,
+        })
+
+    return results
+
+
+async def _main(args):
+    if args.apply:
+        result = await ensure_indexes()
+        print(f"🗂️ created={result['created']} dropped={result['dropped']}")
+
+    if not args.check:
+        return 0
+
+    failed = 0
+
+    for result in await check_queries():
+        if result["collscan"]:
+            failed += 1
+            mark = "❌"
+        elif result["sort"]:
+            mark = "⚠️"
+        else:
+            mark = "✅"
+
+        print(f"{mark} {result['collection']:<20} {result['query']:<40} {' > '.join(result['stages'])}")
+
+    if failed:
+        print(f"❌ {failed} queries use a collection scan")
+        return 1
+
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--apply", action="store_true", help="create/drop indexes first")
+    parser.add_argument("--check", action="store_true", help="explain() every known query")
+    args = parser.parse_args()
+
+    if not (args.apply or args.check):
+        args.check = True
+
+    sys.exit(asyncio.run(_main(args)))
+
+
+if __name__ == "__main__":
+    main()
@@ -6,14 +6,13 @@
 from dotenv import load_dotenv
 load_dotenv()
 
-from fastapi import FastAPI, WebSocket
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect
+from typing import Optional
 import asyncio
 from contextlib import asynccontextmanager
 from fastapi_market.simulator import MarketSimulator
 from fastapi_market.database import (
     db,
-    trade_collection,
-    crypto_orderbook_collection,
     nasdaq_orderbook_collection,
     nyse_orderbook_collection
 )
@@ -27,6 +26,20 @@ from fastapi_market.candle_engine import MultiTimeframeCandleEngine
 from fastapi_market.service import register_candle_engine
 from fastapi_market.decision_ws import decision_manager
 from fastapi_market.position_engine import PositionEngine
+from fastapi_market.decision_engine import get_cached_decision, remember_decision
+from fastapi_market.state_snapshot import save_state
+from fastapi_market.market_stream import market_stream, DEFAULT_MAX_RATE
+from fastapi_market.response_cache import response_cache
+from fastapi_market.trade_buffer import trade_buffer
+from fastapi_market.history import router as history_router
+from fastapi_market.columnar_export import router as export_router
+from fastapi_market.indexes import ensure_indexes
+from fastapi_market.timeseries import ensure_time_series, compaction_loop
+from fastapi_market.orderbook_store import orderbook_store, SNAPSHOT_DEPTH
+from fastapi_market.tick_log import tick_log
+from fastapi_market.mongo_sink import SINKS, sinks_status, flush_sinks
+from fastapi_market.storage import STORAGE_BACKEND, get_storage
+from fastapi_market.state_board import state_board, STATE_BOARD_ENABLED
 candle_engine = MultiTimeframeCandleEngine(db)
 register_candle_engine(candle_engine)
 CRYPTO_MARKETS = [{"type": MarketType.CRYPTO, "symbol": "btcusdt"}]
@@ -36,14 +49,59 @@ US_SYMBOLS = [
 ]
 DATA_MODE = "LIVE"
 
+# Per-route TTLs
+CACHE_TTL_SECONDS = {
+    "orderbook": 0.1,
+}
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
 
     tasks = []
     app.state.loop = asyncio.get_running_loop()
 
+    storage = get_storage()
+
+    try:
+        await storage.open()
+        print(f"✅ Storage backend: {storage.name}")
+    except Exception as e:
+        print(f"❌ Storage open error: {e}")
+
+    if STORAGE_BACKEND == "mongo":
+        try:
+            await ensure_time_series()
+            await ensure_indexes()
+        except Exception as e:
+            print(f"❌ Index setup error: {e}")
+
     if DATA_MODE == "LIVE":
 
+        if STATE_BOARD_ENABLED:
+            try:
+                state_board.open()
+                tasks.append(asyncio.create_task(state_board.heartbeat_loop()))
+                print(f"✅ State board: {state_board.name}")
+            except Exception as e:
+                print(f"❌ State board error: {e}")
+
+        try:
+            await trade_buffer.warm(storage.ticks)
+        except Exception as e:
+            print(f"❌ Trade buffer warm-up error: {e}")
+
+        try:
+            warmed = await candle_engine.feature_engine.warm()
+            print(f"✅ Feature buffers warmed for {warmed} series.")
+        except Exception as e:
+            print(f"❌ Feature warm-up error: {e}")
+
+        try:
+            restored = await candle_engine.restore_partials()
+            print(f"✅ Restored {restored} partial candles.")
+        except Exception as e:
+            print(f"❌ Partial candle restore error: {e}")
+
         for market in CRYPTO_MARKETS:
             connector = get_connector(
                 market["type"],
@@ -69,6 +127,20 @@ async def lifespan(app: FastAPI):
             asyncio.create_task(poll_regime())
         )
 
+        if STORAGE_BACKEND == "mongo":
+            tasks.append(
+                asyncio.create_task(compaction_loop())
+            )
+
+        tasks.append(
+            asyncio.create_task(tick_log.flush_loop())
+        )
+
+        for sink in SINKS.values():
+            tasks.append(
+                asyncio.create_task(sink.run())
+            )
+
     yield
 
     print("⚠️ Shutting down AETHERION Engine...")
@@ -79,14 +151,37 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         print(f"❌ Candle flush error: {e}")
 
+    try:
+        orderbook_store.flush()
+    except Exception as e:
+        print(f"❌ Orderbook flush error: {e}")
+
     for task in tasks:
         task.cancel()
 
     await asyncio.gather(*tasks, return_exceptions=True)
 
+    try:
+        await tick_log.flush_async()
+        await flush_sinks()
+    except Exception as e:
+        print(f"❌ Storage flush error: {e}")
+
+    if DATA_MODE == "LIVE":
+        try:
+            await save_state(force=True)
+            print("✅ Pipeline state snapshot written.")
+        except Exception as e:
+            print(f"❌ Snapshot write error: {e}")
+
+    await storage.close()
+    state_board.close()
+
     print("🛑 All background tasks stopped.")
 
 app = FastAPI(lifespan=lifespan)
+app.include_router(history_router)
+app.include_router(export_router)
 simulator = MarketSimulator()
 @app.get("/")
 def root():
@@ -105,64 +200,114 @@ async def active_markets():
     }
 
 @app.get("/api/market/snapshot/{market}")
-async def market_snapshot(market: str):
+async def market_snapshot(market: str, symbol: Optional[str] = None):
 
     market = market.upper()
 
     if market not in ["CRYPTO", "NASDAQ", "NYSE"]:
         return {"error": "Invalid market type"}
 
-    latest = await trade_collection.find_one(
-        {"market_type": market},
-        sort=[("receive_timestamp", -1)]
+    latest = trade_buffer.latest(
+        market,
+        symbol.upper() if symbol else None,
+        limit=1
     )
 
-    if latest:
-        latest["_id"] = str(latest["_id"])
+    if not latest:
+        return {"data": None, "atr": None}
+
+    # Latest 1m ATR of the trade's symbol, as on the state board
+    atr = candle_engine.feature_engine.latest_atr.get((market, latest[0]["symbol"]))
 
-    return {"data": latest}
+    return {"data": latest[0], "atr": atr[0] if atr else None}
 
 @app.get("/api/market/trades/{market}")
-async def get_trades(market: str):
+async def get_trades(
+    market: str,
+    symbol: Optional[str] = None,
+    since: Optional[int] = None,
+    limit: int = 50
+):
 
     market = market.upper()
 
     if market not in ["CRYPTO", "NASDAQ", "NYSE"]:
         return {"error": "Invalid market type"}
 
-    cursor = trade_collection.find(
-        {"market_type": market}
-    ).sort("receive_timestamp", -1).limit(50)
-
-    data = await cursor.to_list(length=50)
-
-    for item in data:
-        item["_id"] = str(item["_id"])
+    trades = trade_buffer.latest(
+        market,
+        symbol.upper() if symbol else None,
+        limit=limit,
+        since=since
+    )
 
-    return {"trades": data}
+    return {"trades": trades}
 
 @app.get("/api/market/orderbook/{market}")
 async def get_orderbook(market: str):
 
     market = market.upper()
 
+    # Served from the in-memory book, which changes with every 100 ms
+    # depth diff; a cached copy would be invalidated about as often as
+    # it's read
     if market == "CRYPTO":
-        collection = crypto_orderbook_collection
-    elif market == "NASDAQ":
+        return {"orderbook": orderbook_store.latest(market)}
+
+    if market == "NASDAQ":
         collection = nasdaq_orderbook_collection
     elif market == "NYSE":
         collection = nyse_orderbook_collection
     else:
         return {"error": "Invalid market type"}
 
-    latest = await collection.find_one(
-        sort=[("receive_timestamp", -1)]
+    async def load():
+        latest = await collection.find_one(
+            sort=[("receive_timestamp", -1)]
+        )
+
+        if latest:
+            latest["_id"] = str(latest["_id"])
+
+        return {"orderbook": latest}
+
+    return await response_cache.response(
+        f"orderbook:{market}",
+        load,
+        ttl=CACHE_TTL_SECONDS["orderbook"],
+        tags=[f"orderbook:{market}"]
+    )
+
+@app.get("/api/market/orderbook/{market}/at")
+async def get_orderbook_at(market: str, symbol: str, timestamp: int, depth: int = 20):
+
+    market = market.upper()
+
+    if market != "CRYPTO":
+        return {"error": "Orderbook history is only recorded for CRYPTO"}
+
+    book = await orderbook_store.reconstruct(
+        market,
+        symbol.upper(),
+        timestamp,
+        depth=max(1, min(depth, SNAPSHOT_DEPTH))
     )
 
-    if latest:
-        latest["_id"] = str(latest["_id"])
+    if book is None:
+        return {"error": "No orderbook snapshot before timestamp"}
 
-    return {"orderbook": latest}
+    return {"orderbook": book}
+
+@app.get("/api/market/storage/status")
+async def storage_status():
+    return {
+        "tick_log": tick_log.status(),
+        "sinks": sinks_status()
+    }
+
+@app.get("/api/cache/stats")
+async def cache_stats():
+    return response_cache.status()
 
 @app.get("/api/market/features/{market}")
 async def get_features(market: str, limit: int = 50):
@@ -210,38 +355,35 @@ async def regime_websocket(websocket: WebSocket):
     await regime_manager.connect(websocket)
     try:
         while True:
-            await asyncio.sleep(60)
-    except:
+            await websocket.receive_text()
+    except WebSocketDisconnect:
+        pass
+    finally:
         regime_manager.disconnect(websocket)
 
 @app.get("/api/decision/latest")
-async def get_latest_decision():
+async def get_latest_decision(
+    market: Optional[str] = None,
+    symbol: Optional[str] = None
+):
 
-    import mysql.connector
-    from fastapi_market.regime_poller import MYSQL_CONFIG
+    market = market.upper() if market else None
+    symbol = symbol.upper() if symbol else None
 
-    try:
-        conn = mysql.connector.connect(**MYSQL_CONFIG)
-        cursor = conn.cursor(dictionary=True)
+    cached = get_cached_decision(market, symbol)
 
-        query = """
-        SELECT market, symbol, meta_regime, strategy,
-               action, confidence, created_at
-        FROM decisions
-        ORDER BY created_at DESC
-        LIMIT 1
-        """
+    if cached:
+        return cached
 
-        cursor.execute(query)
-        result = cursor.fetchone()
-
-        cursor.close()
-        conn.close()
+    try:
+        result = await get_storage().decisions.latest(market, symbol)
 
         if not result:
             return {"message": "No decisions available yet."}
 
-        return result
+        remember_decision(result)
+
+        return get_cached_decision(result["market"], result["symbol"])
 
     except Exception as e:
         return {"error": str(e)}
@@ -251,6 +393,23 @@ async def decision_websocket(websocket: WebSocket):
     await decision_manager.connect(websocket)
     try:
         while True:
-            await asyncio.sleep(60)
-    except:
+            await websocket.receive_text()
+    except WebSocketDisconnect:
+        pass
+    finally:
         decision_manager.disconnect(websocket)
+
+@app.websocket("/ws/market")
+async def market_websocket(websocket: WebSocket, max_rate: float = DEFAULT_MAX_RATE):
+    await market_stream.connect(websocket, max_rate)
+    try:
+        while True:
+            market_stream.handle(websocket, await websocket.receive_text())
+    except WebSocketDisconnect:
+        pass
+    finally:
+        market_stream.disconnect(websocket)
+
+@app.get("/api/market/stream/status")
+async def market_stream_status():
+    return market_stream.status()
\ No newline at end of file
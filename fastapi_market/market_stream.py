@@ -0,0 +1,404 @@
+"""
+Live market-data stream for /ws/market.
+
+The ingestion pipeline publishes trades, candles, features and order book
+updates here as they happen. Clients subscribe per channel and symbol:
+
+    {"action": "subscribe", "channel": "candles.1m", "symbols": ["BTCUSDT"]}
+    {"action": "subscribe", "channel": "orderbook", "symbols": ["*"], "depth": 5}
+    {"action": "unsubscribe", "channel": "trades", "symbols": ["*"]}
+    {"action": "set_rate", "max_rate": 2}
+
+`depth` is clamped to 1..20. Replies to control messages queue behind the
+client's reads; a client that lets more than 64 pile up is disconnected
+with 1013, like a full queue on the regime and decision hubs.
+
+Every update carries a sequence number per channel+symbol. Each client's
+writer flushes at most `max_rate` times per second, and a flush sends the
+newest unsent update of every channel+symbol that changed since the last
+one. So a client gets at most `max_rate` updates per second for any
+channel+symbol, newer updates replace older unsent ones, and a jump in
+`seq` means updates were conflated (or missed) rather than lost silently.
+"""
+
+import asyncio
+import heapq
+import json
+import logging
+from collections import defaultdict
+from typing import Dict
+
+from fastapi import WebSocket
+
+from fastapi_market.candle_engine import TIMEFRAMES
+
+logger = logging.getLogger("market_stream")
+
+WILDCARD = "*"
+
+CHANNELS = (
+    ["trades", "orderbook"]
+    + [f"candles.{tf}" for tf in TIMEFRAMES]
+    + [f"features.{tf}" for tf in TIMEFRAMES]
+)
+
+DEFAULT_MAX_RATE = 10.0      # flushes per second per client
+MAX_RATE_LIMIT = 50.0
+MAX_DEPTH = 20
+DEFAULT_DEPTH = 10
+MAX_PENDING_REPLIES = 64
+SEND_TIMEOUT_SECONDS = 5
+
+
+def _dumps(message):
+    return json.dumps(
+        message,
+        separators=(",", ":"),
+        ensure_ascii=False,
+        default=str
+    )
+
+
+# =========================================
+# ORDER BOOK VIEW
+# =========================================
+class OrderBookView:
+    """
+    Price levels kept from depth updates; a zero quantity removes a level.
+    """
+
+    def __init__(self):
+        self.bids: Dict[float, float] = {}
+        self.asks: Dict[float, float] = {}
+
+        self.exchange_timestamp = None
+        self.receive_timestamp = None
+
+    def apply(self, bids, asks):
+        for side, levels in ((self.bids, bids), (self.asks, asks)):
+            for price, quantity in levels:
+                price, quantity = float(price), float(quantity)
+
+                if quantity == 0:
+                    side.pop(price, None)
+                else:
+                    side[price] = quantity
+
+    def top(self, depth=MAX_DEPTH):
+        bids = heapq.nlargest(depth, self.bids.items())
+        asks = heapq.nsmallest(depth, self.asks.items())
+
+        return (
+            [[price, qty] for price, qty in bids],
+            [[price, qty] for price, qty in asks]
+        )
+
+    def data(self, depth=MAX_DEPTH):
+        bids, asks = self.top(depth)
+
+        return {
+            "bids": bids,
+            "asks": asks,
+            "exchange_timestamp": self.exchange_timestamp,
+            "receive_timestamp": self.receive_timestamp
+        }
+
+
+# =========================================
+# SUBSCRIBERS
+# =========================================
+class _Subscriber:
+
+    def __init__(self, websocket: WebSocket, max_rate: float):
+        self.websocket = websocket
+        self.max_rate = max_rate
+
+        # (channel, symbol) -> depth for orderbook, None otherwise
+        self.topics = {}
+
+        # (channel, market, symbol) -> newest unsent frame
+        self.pending = {}
+        self.replies = []
+
+        self.wake = asyncio.Event()
+        self.writer = None
+
+    def notify(self):
+        self.wake.set()
+
+
+class MarketStream:
+
+    def __init__(self, send_timeout: float = SEND_TIMEOUT_SECONDS):
+        self.send_timeout = send_timeout
+
+        self.subscribers: Dict[WebSocket, _Subscriber] = {}
+
+        # (channel, symbol or WILDCARD) -> subscribers
+        self.routes = defaultdict(set)
+
+        self.sequences = defaultdict(int)
+        self.latest = {}
+        self.books = defaultdict(OrderBookView)
+
+        self.stats = {
+            "published": 0,
+            "sent": 0,
+            "conflated": 0,
+            "slow_disconnects": 0,
+            "reaped": 0
+        }
+
+    # -----------------------------------------
+    # Connections
+    # -----------------------------------------
+    async def connect(self, websocket: WebSocket, max_rate: float = DEFAULT_MAX_RATE):
+        await websocket.accept()
+
+        sub = _Subscriber(websocket, self._clamp_rate(max_rate))
+        sub.writer = asyncio.create_task(self._writer(sub))
+
+        self.subscribers[websocket] = sub
+
+    def disconnect(self, websocket: WebSocket):
+        sub = self.subscribers.pop(websocket, None)
+
+        if sub is None:
+            return
+
+        for topic in sub.topics:
+            self.routes[topic].discard(sub)
+
+            if not self.routes[topic]:
+                del self.routes[topic]
+
+        if sub.writer is not asyncio.current_task():
+            sub.writer.cancel()
+
+    def _clamp_rate(self, max_rate):
+        return min(max(float(max_rate), 0.1), MAX_RATE_LIMIT)
+
+    def _clamp_depth(self, depth):
+        return min(max(int(depth), 1), MAX_DEPTH)
+
+    # -----------------------------------------
+    # Client protocol
+    # -----------------------------------------
+    def handle(self, websocket: WebSocket, text: str):
+        sub = self.subscribers.get(websocket)
+
+        if sub is None:
+            return
+
+        try:
+            request = json.loads(text)
+            action = request["action"]
+
+            if action == "set_rate":
+                sub.max_rate = self._clamp_rate(request["max_rate"])
+                self._reply(sub, {"type": "rate", "max_rate": sub.max_rate})
+                return
+
+            channel = request["channel"]
+            symbols = [s.upper() for s in request.get("symbols", [WILDCARD])]
+
+            if channel not in CHANNELS:
+                raise ValueError(f"Unknown channel: {channel}")
+
+            if action == "subscribe":
+                depth = self._clamp_depth(request.get("depth", DEFAULT_DEPTH))
+                self._subscribe(sub, channel, symbols, depth)
+            elif action == "unsubscribe":
+                self._unsubscribe(sub, channel, symbols)
+            else:
+                raise ValueError(f"Unknown action: {action}")
+
+            self._reply(sub, {
+                "type": f"{action}d",
+                "channel": channel,
+                "symbols": symbols
+            })
+
+        except (ValueError, KeyError, TypeError) as e:
+            self._reply(sub, {"type": "error", "message": str(e)})
+
+    def _subscribe(self, sub, channel, symbols, depth):
+        for symbol in symbols:
+            topic = (channel, symbol)
+
+            sub.topics[topic] = depth if channel == "orderbook" else None
+            self.routes[topic].add(sub)
+
+        # Start every new subscriber from the current state
+        for (ch, market, symbol), (seq, data) in list(self.latest.items()):
+            if ch == channel and self._subscribed(sub, ch, symbol):
+                if data is None:
+                    # Order book published while nobody was subscribed
+                    data = self.books[(market, symbol)].data(MAX_DEPTH)
+                    self.latest[(ch, market, symbol)] = (seq, data)
+
+                sub.pending[(ch, market, symbol)] = self._frame(
+                    ch, market, symbol, seq, data,
+                    self._depth(sub, ch, symbol)
+                )
+
+        sub.notify()
+
+    def _unsubscribe(self, sub, channel, symbols):
+        for symbol in symbols:
+            topic = (channel, symbol)
+
+            sub.topics.pop(topic, None)
+            self.routes[topic].discard(sub)
+
+            if not self.routes[topic]:
+                del self.routes[topic]
+
+        for key in [k for k in sub.pending if k[0] == channel]:
+            if not self._subscribed(sub, channel, key[2]):
+                del sub.pending[key]
+
+    def _subscribed(self, sub, channel, symbol):
+        return (channel, symbol) in sub.topics or (channel, WILDCARD) in sub.topics
+
+    def _depth(self, sub, channel, symbol):
+        return sub.topics.get((channel, symbol), sub.topics.get((channel, WILDCARD)))
+
+    def _reply(self, sub, message):
+        if len(sub.replies) >= MAX_PENDING_REPLIES:
+            # Sends control messages without reading the answers
+            self.stats["slow_disconnects"] += 1
+            self.disconnect(sub.websocket)
+            asyncio.create_task(self._close(sub.websocket, 1013))
+            return
+
+        sub.replies.append(_dumps(message))
+        sub.notify()
+
+    # -----------------------------------------
+    # Publishing (called from the ingestion pipeline)
+    # -----------------------------------------
+    def publish(self, channel: str, market: str, symbol: str, data: dict):
+        """
+        Record and fan out one update. Never blocks; serialization only
+        happens when someone is subscribed.
+        """
+
+        key = (channel, market, symbol)
+        seq = self._record(key, data)
+
+        targets = self._targets(channel, symbol)
+
+        if not targets:
+            return
+
+        frames = {}
+
+        for sub in targets:
+            depth = self._depth(sub, channel, symbol)
+
+            if depth not in frames:
+                frames[depth] = self._frame(channel, market, symbol, seq, data, depth)
+
+            if key in sub.pending:
+                self.stats["conflated"] += 1
+
+            sub.pending[key] = frames[depth]
+            sub.notify()
+
+    def publish_orderbook(self, book: dict):
+        market = book["market_type"]
+        symbol = book["symbol"]
+
+        view = self.books[(market, symbol)]
+        view.apply(book["bids"], book["asks"])
+
+        view.exchange_timestamp = book["exchange_timestamp"]
+        view.receive_timestamp = book["receive_timestamp"]
+
+        # The top-N levels are only built for subscribers; a later
+        # subscriber builds them from the view (see _subscribe)
+        if not self._targets("orderbook", symbol):
+            self._record(("orderbook", market, symbol), None)
+            return
+
+        self.publish("orderbook", market, symbol, view.data(MAX_DEPTH))
+
+    def _record(self, key, data):
+        self.sequences[key] += 1
+        seq = self.sequences[key]
+
+        self.latest[key] = (seq, data)
+        self.stats["published"] += 1
+
+        return seq
+
+    def _targets(self, channel, symbol):
+        return self.routes.get((channel, symbol), set()) | \
+            self.routes.get((channel, WILDCARD), set())
+
+    def _frame(self, channel, market, symbol, seq, data, depth=None):
+        if depth is not None:
+            data = {**data, "bids": data["bids"][:depth], "asks": data["asks"][:depth]}
+
+        return _dumps({
+            "type": "market",
+            "channel": channel,
+            "market": market,
+            "symbol": symbol,
+            "seq": seq,
+            "data": data
+        })
+
+    # -----------------------------------------
+    # Per-client writer
+    # -----------------------------------------
+    async def _writer(self, sub: _Subscriber):
+        websocket = sub.websocket
+
+        try:
+            while True:
+                await sub.wake.wait()
+                sub.wake.clear()
+
+                replies, sub.replies = sub.replies, []
+                pending, sub.pending = sub.pending, {}
+
+                for text in replies + list(pending.values()):
+                    await asyncio.wait_for(
+                        websocket.send_text(text),
+                        self.send_timeout
+                    )
+
+                self.stats["sent"] += len(pending)
+
+                # Anything published meanwhile waits for the next slot
+                await asyncio.sleep(1 / sub.max_rate)
+
+        except asyncio.CancelledError:
+            raise
+
+        except Exception as e:
+            logger.info(f"Reaping market stream client: {e!r}")
+            self.stats["reaped"] += 1
+
+            if self.subscribers.get(websocket) is sub:
+                self.disconnect(websocket)
+
+            await self._close(websocket, 1011)
+
+    async def _close(self, websocket: WebSocket, code: int):
+        try:
+            await websocket.close(code=code)
+        except Exception:
+            pass
+
+    def status(self):
+        return {
+            "clients": len(self.subscribers),
+            "topics": len(self.routes),
+            **self.stats
+        }
+
+
+market_stream = MarketStream()
@@ -0,0 +1,270 @@
+"""
+Asynchronous, batched Mongo writes off the ingest path.
+
+submit() only queues the document. run() drains the queue with unordered
+insert_many batches of up to batch_size, and wakes early when a full batch
+is waiting. A batch that isn't acknowledged within WRITE_DEADLINE_SECONDS
+is spilled to the sink's write journal together with everything still
+queued, and the sink backs off. Once writes succeed again the journal is
+replayed, one segment per iteration between live batches. Journal writes
+and reads run in a worker thread, so ingestion never waits on Mongo or the
+disk, and memory stays bounded while the database is down. Duplicate-key
+errors are treated as already written. If the journal can't be written
+either (e.g. a full disk) the documents stay queued; any other error is
+logged and retried after the backoff, so run() never exits on its own.
+"""
+
+import asyncio
+import time
+from collections import deque
+
+from pymongo.errors import BulkWriteError, PyMongoError
+
+from fastapi_market.database import db
+from fastapi_market.write_journal import WriteJournal
+
+BATCH_SIZE = 500
+FLUSH_INTERVAL_SECONDS = 0.25
+WRITE_DEADLINE_SECONDS = 2.0
+
+RETRY_BACKOFF_SECONDS = 0.5
+MAX_BACKOFF_SECONDS = 30.0
+
+_DUPLICATE_KEY = 11000
+
+
+class MongoSink:
+
+    # Failures that spill the batch to the journal
+    errors = (PyMongoError, asyncio.TimeoutError)
+
+    def __init__(self, collection, journal, batch_size=BATCH_SIZE,
+                 flush_interval=FLUSH_INTERVAL_SECONDS,
+                 deadline=WRITE_DEADLINE_SECONDS):
+        self.collection = collection
+        self.journal = journal
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.deadline = deadline
+
+        self.queue = deque()
+        self.wake = asyncio.Event()
+        self.backoff = 0.0
+
+        self.stats = {
+            "submitted": 0,
+            "written": 0,
+            "batches": 0,
+            "errors": 0,
+            "last_error": None,
+        }
+
+    def submit(self, doc):
+        self.queue.append(doc)
+        self.stats["submitted"] += 1
+
+        if len(self.queue) >= self.batch_size:
+            self.wake.set()
+
+    async def write(self, batch):
+        """
+        Unordered insert; returns the documents that failed.
+        """
+
+        try:
+            await self.collection.insert_many(batch, ordered=False)
+
+        except BulkWriteError as e:
+            return [
+                batch[err["index"]] for err in e.details.get("writeErrors", [])
+                if err.get("code") != _DUPLICATE_KEY
+            ]
+
+        return []
+
+    async def write_missing(self, chunk):
+        """
+        Journal replay: insert only the _ids not stored yet. Time-series
+        collections don't enforce unique _ids, so duplicate-key errors
+        can't be relied on.
+        """
+
+        query = {"_id": {"$in": [doc["_id"] for doc in chunk]}}
+
+        # Lets time-series collections prune buckets
+        times = [doc["ts"] for doc in chunk if "ts" in doc]
+        if len(times) == len(chunk):
+            query["ts"] = {"$gte": min(times), "$lte": max(times)}
+
+        stored = {doc["_id"] async for doc in self.collection.find(query, {"_id": 1})}
+        missing = [doc for doc in chunk if doc["_id"] not in stored]
+
+        if missing and await self.write(missing):
+            raise PyMongoError("journal replay batch failed")
+
+        return len(missing)
+
+    async def write_batch(self):
+        """
+        Write one batch; False if Mongo failed (batch and queue spilled).
+        """
+
+        batch = [self.queue.popleft() for _ in range(min(self.batch_size, len(self.queue)))]
+
+        try:
+            failed = await asyncio.wait_for(self.write(batch), self.deadline)
+
+        except self.errors as e:
+            await self._spill(batch, e)
+            return False
+
+        if failed:
+            await self._spill(failed, PyMongoError(f"{len(failed)} writes failed"))
+            return False
+
+        self.stats["written"] += len(batch)
+        self.stats["batches"] += 1
+        self.backoff = 0.0
+        return True
+
+    async def _spill(self, batch, error):
+        docs = batch + list(self.queue)
+        self.queue.clear()
+
+        # The write and fsync stay off the event loop, so ingestion keeps
+        # its pace while the database is down
+        try:
+            await asyncio.to_thread(self.journal.spill, docs)
+
+        except OSError as e:
+            # Nowhere to put them; back in front of what arrived meanwhile
+            self.queue.extendleft(reversed(docs))
+            self._failed(f"{error!r}, journal {e!r}")
+            return
+
+        self._failed(repr(error))
+
+    def _failed(self, description):
+        self.stats["errors"] += 1
+        self.stats["last_error"] = f"{time.strftime('%H:%M:%S')} {description}"
+        self.backoff = min(max(self.backoff * 2, RETRY_BACKOFF_SECONDS), MAX_BACKOFF_SECONDS)
+
+    async def flush(self):
+        while self.queue:
+            if not await self.write_batch():
+                return False
+
+        return True
+
+    async def replay(self):
+        try:
+            await self.journal.replay(self.write_missing, self.deadline)
+            return True
+
+        except self.errors as e:
+            self._failed(f"replay {e!r}")
+            return False
+
+    async def run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self.wake.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+
+            # wait_for returns normally if the wake-up and a cancel arrive
+            # together (Python 3.11); without this shutdown never ends
+            if asyncio.current_task().cancelling():
+                raise asyncio.CancelledError
+
+            self.wake.clear()
+
+            try:
+                healthy = await self.flush()
+
+                if healthy and self.journal.has_backlog:
+                    healthy = await self.replay()
+
+            except Exception as e:
+                # A dead sink task would let the queue grow without bound
+                print(f"❌ Sink {self.journal.name} error: {e!r}")
+                self._failed(repr(e))
+                healthy = False
+
+            if not healthy:
+                await asyncio.sleep(self.backoff)
+
+    def status(self):
+        return {
+            "pending": len(self.queue),
+            "backoff_seconds": self.backoff,
+            **self.stats,
+            "journal": self.journal.status()
+        }
+
+
+# collection name -> sink, started and flushed by main.py
+SINKS = {}
+
+
+def register(sink):
+    SINKS[sink.journal.name] = sink
+    return sink
+
+
+class RepositorySink(MongoSink):
+    """
+    Same queueing and journal, writing through the configured storage
+    backend's repository (STORAGE_BACKEND other than mongo).
+    """
+
+    def __init__(self, name, journal, **kwargs):
+        from fastapi_market.storage import StorageError
+
+        super().__init__(None, journal, **kwargs)
+        self.name = name
+        self.errors = (StorageError, asyncio.TimeoutError)
+        self.repository = None
+
+    def _repository(self):
+        if self.repository is None:
+            from fastapi_market.storage import get_storage
+            self.repository = get_storage().repository(self.name)
+
+        return self.repository
+
+    async def write(self, batch):
+        await self._repository().write_many(batch)
+        return []
+
+    async def write_missing(self, chunk):
+        # Repository writes are idempotent; replay rewrites the whole chunk
+        await self._repository().write_many(chunk)
+        return len(chunk)
+
+
+def create_sink(name, sink_class=MongoSink, **kwargs):
+    from fastapi_market.storage import STORAGE_BACKEND
+
+    if STORAGE_BACKEND != "mongo":
+        return register(RepositorySink(name, WriteJournal(name), **kwargs))
+
+    return register(sink_class(db[name], WriteJournal(name), **kwargs))
+
+
+trade_sink = create_sink("real_market_ticks")
+frame_sink = create_sink("crypto_orderbook_frames")
+
+
+def sinks_status():
+    return {name: sink.status() for name, sink in SINKS.items()}
+
+
+async def flush_sinks():
+    """
+    Final flush at shutdown; anything Mongo won't take goes to the journals.
+    """
+
+    for sink in SINKS.values():
+        await sink.flush()
+        sink.journal.close()
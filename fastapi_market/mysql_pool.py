@@ -0,0 +1,79 @@
+import asyncio
+import aiomysql
+
+POOL_MIN_SIZE = 1
+POOL_MAX_SIZE = 10
+
+_pool = None
+_pool_lock = asyncio.Lock()
+
+
+async def get_pool():
+    """
+    Shared aiomysql pool, created lazily on first use.
+    """
+    global _pool
+
+    if _pool is None:
+        async with _pool_lock:
+            if _pool is None:
+                from fastapi_market.regime_poller import MYSQL_CONFIG
+
+                _pool = await aiomysql.create_pool(
+                    host=MYSQL_CONFIG["host"],
+                    user=MYSQL_CONFIG["user"],
+                    password=MYSQL_CONFIG["password"],
+                    db=MYSQL_CONFIG["database"],
+                    minsize=POOL_MIN_SIZE,
+                    maxsize=POOL_MAX_SIZE,
+                    autocommit=True
+                )
+
+    return _pool
+
+
+async def fetch_one(query, params=None):
+    pool = await get_pool()
+
+    async with pool.acquire() as conn:
+        async with conn.cursor(aiomysql.DictCursor) as cursor:
+            await cursor.execute(query, params)
+            return await cursor.fetchone()
+
+
+async def fetch_all(query, params=None):
+    pool = await get_pool()
+
+    async with pool.acquire() as conn:
+        async with conn.cursor(aiomysql.DictCursor) as cursor:
+            await cursor.execute(query, params)
+            return await cursor.fetchall()
+
+
+async def executemany(query, rows):
+    pool = await get_pool()
+
+    async with pool.acquire() as conn:
+        async with conn.cursor() as cursor:
+            await cursor.executemany(query, rows)
+            return cursor.rowcount
+
+
+async def execute(query, params=None):
+    pool = await get_pool()
+
+    async with pool.acquire() as conn:
+        async with conn.cursor() as cursor:
+            await cursor.execute(query, params)
+            return cursor.rowcount
+
+
+async def close_pool():
+    global _pool
+
+    if _pool is None:
+        return
+
+    _pool.close()
+    await _pool.wait_closed()
+    _pool = None
@@ -0,0 +1,303 @@
+"""
+Compact order book persistence.
+
+Depth diffs are no longer stored one document each. Each symbol has a
+recorder that keeps its own book and writes frames to
+crypto_orderbook_frames:
+
+- "snapshot": the top SNAPSHOT_DEPTH levels, every SNAPSHOT_INTERVAL_MS
+- "deltas": the diffs received in between, batched every DELTA_FRAME_MS
+
+Prices and quantities are stored as fixed-point int64 (PRICE_SCALE),
+divided by the frame's common tick and lot size. Timestamps and prices
+are delta-coded and byte-shuffled, then the whole frame is
+zlib-compressed into one binary field. reconstruct() rebuilds the
+book at any timestamp: it loads the latest snapshot and replays the deltas
+that follow it.
+"""
+
+import uuid
+import zlib
+
+import numpy as np
+from bson.binary import Binary
+
+from fastapi_market.market_stream import OrderBookView
+from fastapi_market.mongo_sink import frame_sink
+from fastapi_market.storage import get_storage
+from fastapi_market.timeseries import to_ts
+from fastapi_market.write_journal import deterministic_id
+
+SNAPSHOT_INTERVAL_MS = 30_000
+DELTA_FRAME_MS = 5_000
+SNAPSHOT_DEPTH = 100
+
+PRICE_SCALE = 10 ** 8
+ZLIB_LEVEL = 6
+
+
+# =========================================
+# ENCODING
+# =========================================
+def _shuffle(values):
+    """
+    int64 array as bytes grouped by significance; the mostly-zero high
+    bytes end up next to each other and compress away.
+    """
+    return values.view(np.uint8).reshape(-1, 8).T.tobytes()
+
+
+def _unshuffle(raw, n):
+    return np.frombuffer(raw, dtype=np.uint8).reshape(8, n).T.copy().view(np.int64).ravel()
+
+
+def _common_step(values):
+    step = int(np.gcd.reduce(values)) if len(values) else 0
+    return step or 1
+
+
+def pack_updates(updates):
+    """
+    [(receive_timestamp, bids, asks), ...] -> frame encoding fields.
+    Levels may be Binance strings or floats.
+    """
+
+    times = np.array([u[0] for u in updates], dtype=np.int64)
+    counts = np.array(
+        [(len(bids), len(asks)) for _, bids, asks in updates],
+        dtype=np.int32
+    ).reshape(-1, 2)
+
+    rows = [level for _, bids, asks in updates for level in (*bids, *asks)]
+    levels = np.array(rows, dtype=np.float64).reshape(-1, 2)
+    fixed = np.rint(levels * PRICE_SCALE).astype(np.int64)
+
+    tick = _common_step(fixed[:, 0])
+    lot = _common_step(fixed[:, 1])
+
+    payload = b"".join([
+        _shuffle(np.diff(times, prepend=0)),
+        counts.tobytes(),
+        _shuffle(np.diff(fixed[:, 0] // tick, prepend=0)),
+        _shuffle(fixed[:, 1] // lot),
+    ])
+
+    return {
+        "updates": len(updates),
+        "levels": len(rows),
+        "tick": tick,
+        "lot": lot,
+        "data": Binary(zlib.compress(payload, ZLIB_LEVEL)),
+    }
+
+
+def unpack_updates(frame):
+    """
+    Inverse of pack_updates, with float levels.
+    """
+
+    updates, levels = frame["updates"], frame["levels"]
+    raw = zlib.decompress(frame["data"])
+
+    offset = 0
+
+    def take(size):
+        nonlocal offset
+        chunk = raw[offset:offset + size]
+        offset += size
+        return chunk
+
+    times = np.cumsum(_unshuffle(take(8 * updates), updates))
+    counts = np.frombuffer(take(8 * updates), dtype=np.int32).reshape(-1, 2)
+    prices = np.cumsum(_unshuffle(take(8 * levels), levels)) * frame["tick"] / PRICE_SCALE
+    quantities = _unshuffle(take(8 * levels), levels) * frame["lot"] / PRICE_SCALE
+
+    pairs = np.column_stack([prices, quantities]).tolist()
+
+    result = []
+    start = 0
+    for ts, (n_bids, n_asks) in zip(times.tolist(), counts.tolist()):
+        bids = pairs[start:start + n_bids]
+        asks = pairs[start + n_bids:start + n_bids + n_asks]
+        start += n_bids + n_asks
+        result.append((ts, bids, asks))
+
+    return result
+
+
+# =========================================
+# RECORDING
+# =========================================
+class OrderBookRecorder:
+    """
+    Book and pending deltas for one symbol. Sequence numbers order frames
+    within a session (one process lifetime).
+    """
+
+    def __init__(self, market, symbol):
+        self.market = market
+        self.symbol = symbol
+        self.view = OrderBookView()
+
+        self.session = uuid.uuid4().hex
+        self.seq = 0
+
+        self.pending = []
+        self.pending_seq = None
+        self.snapshot_at = None
+        self.last_timestamp = None
+
+    def record(self, book):
+        """
+        Apply one diff; returns the frames that are now due.
+        """
+
+        ts = book["receive_timestamp"]
+
+        self.view.apply(book["bids"], book["asks"])
+        self.seq += 1
+        self.last_timestamp = ts
+
+        if self.snapshot_at is None or ts - self.snapshot_at >= SNAPSHOT_INTERVAL_MS:
+            frames = [self._deltas()] if self.pending else []
+            frames.append(self._snapshot(ts))
+            return frames
+
+        if not self.pending:
+            self.pending_seq = self.seq
+
+        self.pending.append((ts, book["bids"], book["asks"]))
+
+        if ts - self.pending[0][0] >= DELTA_FRAME_MS:
+            return [self._deltas()]
+
+        return []
+
+    def flush(self):
+        return [self._deltas()] if self.pending else []
+
+    def _frame(self, kind, updates, first_seq, last_seq):
+        best_bid = max(self.view.bids) if self.view.bids else None
+        best_ask = min(self.view.asks) if self.view.asks else None
+
+        return {
+            "_id": deterministic_id(self.session, kind, first_seq),
+            "ts": to_ts(updates[0][0]),
+            "meta": {"market": self.market, "symbol": self.symbol},
+            "kind": kind,
+            "session": self.session,
+            "first_seq": first_seq,
+            "last_seq": last_seq,
+            "timestamp": updates[0][0],
+            "end_timestamp": updates[-1][0],
+            "best_bid": best_bid,
+            "best_ask": best_ask,
+            **pack_updates(updates),
+        }
+
+    def _deltas(self):
+        updates, self.pending = self.pending, []
+        first_seq = self.pending_seq
+        return self._frame("deltas", updates, first_seq, first_seq + len(updates) - 1)
+
+    def _snapshot(self, ts):
+        self.snapshot_at = ts
+        bids, asks = self.view.top(SNAPSHOT_DEPTH)
+        return self._frame("snapshot", [(ts, bids, asks)], self.seq, self.seq)
+
+
+class OrderBookStore:
+
+    def __init__(self, sink=frame_sink):
+        self.sink = sink
+        self.recorders = {}
+
+    def recorder(self, market, symbol):
+        key = (market, symbol)
+        recorder = self.recorders.get(key)
+
+        if recorder is None:
+            recorder = self.recorders[key] = OrderBookRecorder(market, symbol)
+
+        return recorder
+
+    def record(self, book):
+        for frame in self.recorder(book["market_type"], book["symbol"]).record(book):
+            self.sink.submit(frame)
+
+    def flush(self):
+        for recorder in self.recorders.values():
+            for frame in recorder.flush():
+                self.sink.submit(frame)
+
+    def latest(self, market, symbol=None, depth=SNAPSHOT_DEPTH):
+        """
+        Current in-memory book in the unified orderbook shape.
+        """
+
+        recorders = [
+            r for (m, s), r in self.recorders.items()
+            if m == market and (symbol is None or s == symbol)
+        ]
+
+        if not recorders:
+            return None
+
+        recorder = max(recorders, key=lambda r: r.last_timestamp or 0)
+        bids, asks = recorder.view.top(depth)
+
+        return {
+            "market_type": recorder.market,
+            "symbol": recorder.symbol,
+            "bids": bids,
+            "asks": asks,
+            "receive_timestamp": recorder.last_timestamp
+        }
+
+    async def reconstruct(self, market, symbol, timestamp, depth=SNAPSHOT_DEPTH):
+        """
+        Book as of `timestamp` (epoch ms): latest snapshot at or before it,
+        plus the deltas of the same session up to it.
+        """
+
+        frames = get_storage().frames
+
+        snapshot = await frames.snapshot_before(market, symbol, timestamp)
+
+        if snapshot is None:
+            return None
+
+        view = OrderBookView()
+
+        for _, bids, asks in unpack_updates(snapshot):
+            view.apply(bids, asks)
+
+        deltas = await frames.deltas(
+            market, symbol, snapshot["session"], snapshot["last_seq"],
+            snapshot["timestamp"], timestamp
+        )
+
+        replayed = 0
+
+        for frame in deltas:
+            for ts, bids, asks in unpack_updates(frame):
+                if ts > timestamp:
+                    break
+
+                view.apply(bids, asks)
+                replayed += 1
+
+        bids, asks = view.top(depth)
+
+        return {
+            "market_type": market,
+            "symbol": symbol,
+            "bids": bids,
+            "asks": asks,
+            "receive_timestamp": timestamp,
+            "snapshot_timestamp": snapshot["timestamp"],
+            "replayed": replayed
+        }
+
+
+orderbook_store = OrderBookStore()
@@ -1,3 +1,6 @@
+import numpy as np
+
+
 class PositionEngine:
 
     @staticmethod
@@ -29,4 +32,28 @@ class PositionEngine:
             "position_size": position_size,
             "risk_amount": risk_amount,
             "capital_allocated": capital_allocated,
-        }
\ No newline at end of file
+        }
+
+    @staticmethod
+    def size_positions(price, atr, risk_config: dict):
+        """
+        Vectorized size_position over price/ATR arrays.
+        Bars without a positive stop distance get a zero position.
+        """
+
+        price = np.asarray(price, dtype=np.float64)
+        atr = np.asarray(atr, dtype=np.float64)
+
+        risk_amount = risk_config["total_capital"] * risk_config["risk_per_trade"]
+        stop_distance = atr * risk_config["atr_multiplier"]
+
+        valid = np.isfinite(stop_distance) & (stop_distance > 0)
+
+        position_size = np.zeros_like(price)
+        np.divide(risk_amount, stop_distance, out=position_size, where=valid)
+
+        return {
+            "position_size": position_size,
+            "risk_amount": risk_amount,
+            "capital_allocated": position_size * price,
+        }
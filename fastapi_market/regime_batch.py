@@ -0,0 +1,298 @@
+import numpy as np
+from datetime import datetime, timezone, timedelta
+from itertools import product
+
+from fastapi_market.regime_fusion import RegimeFusion
+from fastapi_market.strategy_engine import STRATEGY_MAP
+from fastapi_market.regime_stability import STABILITY_WINDOW, MIN_CONFIRMATIONS
+from fastapi_market.decision_engine import (
+    CONFIDENCE_THRESHOLD,
+    COOLDOWN_MINUTES,
+    STRATEGY_ACTION_MAP
+)
+
+EMPTY = -1
+
+DEFAULT_LABELS = ("BULL", "BEAR", "SIDEWAYS", "CRISIS")
+
+META_REGIMES = list(STRATEGY_MAP)
+STRATEGIES = list(dict.fromkeys(STRATEGY_MAP.values()))
+ACTIONS = ["BUY", "SELL", "HOLD"]
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def to_epoch_us(ts: datetime) -> int:
+    return (ts - _EPOCH) // timedelta(microseconds=1)
+
+
+# =========================================
+# LOOKUP TABLES
+# =========================================
+def build_fusion_table(timeframes, labels, weights=None):
+    """
+    Run RegimeFusion once for every combination of stable states.
+
+    Row index is ((stable + 1) * strides).sum(), where EMPTY (-1)
+    stands for a timeframe with no confirmed state yet.
+    """
+
+    fusion = RegimeFusion(weights)
+    values = [None, *labels]
+    base = len(values)
+
+    size = base ** len(timeframes)
+    meta = np.empty(size, dtype=np.int16)
+    confidence = np.empty(size, dtype=np.float64)
+
+    for index, combo in enumerate(product(values, repeat=len(timeframes))):
+        fused = fusion.fuse(dict(zip(timeframes, combo)))
+        meta[index] = META_REGIMES.index(fused["meta_regime"])
+        confidence[index] = fused["confidence"]
+
+    strides = base ** np.arange(len(timeframes) - 1, -1, -1, dtype=np.int64)
+
+    return meta, confidence, strides
+
+
+def build_strategy_tables():
+    """
+    meta code -> strategy code, strategy code -> action code
+    """
+
+    meta_strategy = np.array([
+        STRATEGIES.index(STRATEGY_MAP.get(meta, "Neutral"))
+        for meta in META_REGIMES
+    ], dtype=np.int16)
+
+    strategy_action = np.array([
+        ACTIONS.index(STRATEGY_ACTION_MAP.get(strategy, "HOLD"))
+        for strategy in STRATEGIES
+    ], dtype=np.int16)
+
+    return meta_strategy, strategy_action
+
+
+# =========================================
+# BATCH ENGINE
+# =========================================
+class BatchRegimeEngine:
+    """
+    Stability -> fusion -> strategy -> decision for many symbols at once.
+
+    Mirrors regime_poller / RegimeFusion / StrategyEngine / generate_decision
+    with every symbol's state held in integer-coded arrays:
+
+        buffers  (symbols x timeframes x window)
+        stable   (symbols x timeframes)
+    """
+
+    def __init__(
+        self,
+        symbols,
+        timeframes,
+        labels=DEFAULT_LABELS,
+        window=STABILITY_WINDOW,
+        min_confirmations=MIN_CONFIRMATIONS,
+        confidence_threshold=CONFIDENCE_THRESHOLD,
+        cooldown_minutes=COOLDOWN_MINUTES,
+        weights=None
+    ):
+        self.symbols = list(symbols)
+        self.timeframes = list(timeframes)
+        self.labels = list(labels)
+
+        self.symbol_index = {s: i for i, s in enumerate(self.symbols)}
+        self.label_codes = {label: i for i, label in enumerate(self.labels)}
+
+        self.window = window
+        self.min_confirmations = min_confirmations
+        self.confidence_threshold = confidence_threshold
+        self.cooldown_us = (
+            timedelta(minutes=cooldown_minutes) // timedelta(microseconds=1)
+        )
+
+        (
+            self.fusion_meta,
+            self.fusion_confidence,
+            self.fusion_strides
+        ) = build_fusion_table(self.timeframes, self.labels, weights)
+
+        self.meta_strategy, self.strategy_action = build_strategy_tables()
+
+        n_symbols = len(self.symbols)
+        n_timeframes = len(self.timeframes)
+
+        self.buffers = np.full(
+            (n_symbols, n_timeframes, window), EMPTY, dtype=np.int16
+        )
+        self.appended = np.zeros((n_symbols, n_timeframes), dtype=np.int64)
+        self.counts = np.zeros(
+            (n_symbols, n_timeframes, len(self.labels)), dtype=np.int16
+        )
+        self.stable = np.full((n_symbols, n_timeframes), EMPTY, dtype=np.int16)
+
+        self.last_meta = np.full(n_symbols, EMPTY, dtype=np.int16)
+        self.last_strategy = np.full(n_symbols, EMPTY, dtype=np.int16)
+
+        # Cooldown cache (decision_engine._last_decision_cache)
+        self.decision_strategy = np.full(n_symbols, EMPTY, dtype=np.int16)
+        self.decision_time_us = np.zeros(n_symbols, dtype=np.int64)
+
+        self._slots = np.arange(window, dtype=np.int64)
+
+    def encode(self, regimes: dict):
+        """
+        {symbol: {timeframe: state}} -> observation codes.
+        Missing symbols/timeframes are EMPTY and skip the stability buffer,
+        like an errored timeframe in the poller.
+        """
+
+        codes = np.full(self.stable.shape, EMPTY, dtype=np.int16)
+
+        for symbol, states in regimes.items():
+            row = self.symbol_index[symbol]
+
+            for col, tf in enumerate(self.timeframes):
+                state = states.get(tf)
+
+                if state is not None:
+                    codes[row, col] = self.label_codes[state]
+
+        return codes
+
+    # ================================
+    # STABILITY
+    # ================================
+    def _append(self, observations, observed):
+
+        rows, cols = np.nonzero(observed)
+        slots = self.appended[rows, cols] % self.window
+
+        # Slot being overwritten leaves the window once the buffer is full
+        evicted = self.buffers[rows, cols, slots]
+        full = evicted != EMPTY
+        self.counts[rows[full], cols[full], evicted[full]] -= 1
+
+        new = observations[rows, cols]
+        self.buffers[rows, cols, slots] = new
+        self.counts[rows, cols, new] += 1
+
+        self.appended += observed
+
+    def _confirm(self, observed):
+
+        window = self.window
+
+        best_count = self.counts.max(axis=-1)
+        best_code = self.counts.argmax(axis=-1)
+
+        qualified = (
+            observed
+            & (self.appended >= window)
+            & (best_count >= self.min_confirmations)
+        )
+
+        # Ties at the top go to the state seen first, as in majority_state
+        tied = qualified & (
+            (self.counts == best_count[..., None]).sum(axis=-1) > 1
+        )
+
+        if tied.any():
+            rows, cols = np.nonzero(tied)
+            picks = np.arange(len(rows))
+
+            oldest = self.appended[rows, cols] % window
+            rank = (self._slots - oldest[:, None]) % window
+            ordered = np.take_along_axis(
+                self.buffers[rows, cols], np.argsort(rank, axis=1), axis=1
+            )
+
+            counts = self.counts[rows, cols]
+            on_top = (
+                counts[picks[:, None], ordered]
+                == best_count[rows, cols][:, None]
+            )
+
+            best_code[rows, cols] = ordered[picks, on_top.argmax(axis=1)]
+
+        return np.where(qualified, best_code, EMPTY).astype(np.int16)
+
+    # ================================
+    # TICK
+    # ================================
+    def step(self, observations, now: datetime = None):
+        """
+        Advance every symbol by one poll.
+
+        observations: (symbols x timeframes) state codes, EMPTY = no data.
+        """
+
+        now_us = to_epoch_us(now or datetime.now(timezone.utc))
+        observed = observations != EMPTY
+
+        # 1️⃣ Timeframe stability
+        self._append(observations, observed)
+
+        confirmed = self._confirm(observed)
+        timeframe_changed = (confirmed != EMPTY) & (confirmed != self.stable)
+        self.stable = np.where(timeframe_changed, confirmed, self.stable)
+
+        # 2️⃣ Meta fusion
+        index = (self.stable.astype(np.int64) + 1) @ self.fusion_strides
+        meta = self.fusion_meta[index]
+        confidence = self.fusion_confidence[index]
+
+        meta_changed = meta != self.last_meta
+        self.last_meta = meta
+
+        # 3️⃣ Strategy switching
+        strategy = self.meta_strategy[meta]
+
+        strategy_changed = strategy != self.last_strategy
+        self.last_strategy = strategy
+
+        # 4️⃣ Confidence + cooldown gates
+        elapsed = now_us - self.decision_time_us
+
+        cooled = (self.decision_strategy == EMPTY) | (
+            (self.decision_strategy != strategy)
+            & (elapsed >= self.cooldown_us)
+        )
+
+        decided = (confidence >= self.confidence_threshold) & cooled
+
+        self.decision_strategy = np.where(
+            decided, strategy, self.decision_strategy
+        )
+        self.decision_time_us = np.where(
+            decided, now_us, self.decision_time_us
+        )
+
+        return {
+            "confirmed": confirmed,
+            "timeframe_changed": timeframe_changed,
+            "meta": meta,
+            "confidence": confidence,
+            "meta_changed": meta_changed,
+            "strategy": strategy,
+            "strategy_changed": strategy_changed,
+            "decided": decided,
+            "action": self.strategy_action[strategy]
+        }
+
+    def decisions(self, result):
+        """
+        Decode the rows that produced a decision this tick.
+        """
+
+        return [
+            {
+                "symbol": self.symbols[i],
+                "meta_regime": META_REGIMES[result["meta"][i]],
+                "strategy": STRATEGIES[result["strategy"][i]],
+                "action": ACTIONS[result["action"][i]],
+                "confidence": float(result["confidence"][i])
+            }
+            for i in np.flatnonzero(result["decided"])
+        ]
@@ -1,7 +1,8 @@
 import numpy as np
 import asyncio
 from hmmlearn.hmm import GaussianHMM
-from fastapi_market.database import db
+from fastapi_market.database import FEATURE_VERSION
+from fastapi_market.storage import get_storage
 
 TIMEFRAMES = ["1m", "5m", "15m", "1h"]
 
@@ -13,10 +14,11 @@ RETRAIN_INTERVAL_SECONDS = 300  # 5 minutes
 
 class RegimeEngine:
 
-    def __init__(self, n_states=4):
-        self.db = db
-        self.feature_collection = db["market_features"]
-        self.regime_collection = db["market_regimes"]
+    def __init__(self, n_states=4, feature_version=FEATURE_VERSION):
+        self.storage = get_storage()
+        self.feature_version = feature_version
+        self.features = self.storage.feature_repository(feature_version)
+        self.regimes = self.storage.regimes
 
         self.models = {
             tf: GaussianHMM(
@@ -37,15 +39,9 @@ class RegimeEngine:
     # ================================
     async def fetch_training_matrix(self, market, symbol, timeframe):
 
-        cursor = self.feature_collection.find(
-            {
-                "market": market,
-                "symbol": symbol,
-                "timeframe": timeframe
-            }
-        ).sort("timestamp", 1).limit(TRAIN_LIMIT)
-
-        data = await cursor.to_list(length=TRAIN_LIMIT)
+        data = await self.features.series(
+            market, symbol, timeframe, limit=TRAIN_LIMIT
+        )
 
         if len(data) < MIN_TRAIN_SIZE:
             return None
@@ -103,15 +99,9 @@ class RegimeEngine:
         if not self.trained[timeframe]:
             return None
 
-        cursor = self.feature_collection.find(
-            {
-                "market": market,
-                "symbol": symbol,
-                "timeframe": timeframe
-            }
-        ).sort("timestamp", -1).limit(PREDICT_WINDOW)
-
-        data = await cursor.to_list(length=PREDICT_WINDOW)
+        data = await self.features.series(
+            market, symbol, timeframe, limit=PREDICT_WINDOW, newest=True
+        )
 
         if len(data) < 50:
             return None
@@ -139,7 +129,7 @@ class RegimeEngine:
             "timestamp": data[0]["timestamp"]
         }
 
-        await self.regime_collection.insert_one(regime_doc)
+        await self.regimes.write_predictions([regime_doc])
 
         return current_state
 
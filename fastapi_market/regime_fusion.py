@@ -8,6 +8,9 @@ TIMEFRAME_WEIGHTS = {
 
 class RegimeFusion:
 
+    def __init__(self, weights=None):
+        self.weights = weights or TIMEFRAME_WEIGHTS
+
     def fuse(self, stable_regimes: dict):
         """
         stable_regimes example:
@@ -84,6 +87,6 @@ class RegimeFusion:
 
         for tf, regime in regimes.items():
             if regime in ["BULL", "BEAR"]:
-                score += TIMEFRAME_WEIGHTS.get(tf, 0)
+                score += self.weights.get(tf, 0)
 
         return min(score, 1.0)  
\ No newline at end of file
@@ -1,14 +1,26 @@
 import asyncio
 import httpx
-import mysql.connector
 from datetime import datetime
 from collections import deque
 
 from fastapi_market.regime_ws import regime_manager
 from fastapi_market.regime_fusion import RegimeFusion
 from fastapi_market.strategy_engine import StrategyEngine
-from fastapi_market.decision_engine import generate_decision
+from fastapi_market.decision_engine import (
+    generate_decision,
+    cache_latest_decision,
+    remember_decision,
+    restore_cooldown
+)
 from fastapi_market.decision_ws import decision_manager   # ✅ NEW
+from fastapi_market.regime_stability import (
+    STABILITY_WINDOW,
+    MIN_CONFIRMATIONS,
+    majority_state
+)
+from fastapi_market.state_snapshot import save_state, restore_state as restore_snapshot
+from fastapi_market.storage import get_storage
+from fastapi_market.state_board import state_board
 
 
 FLASK_REGIME_URL = "http://127.0.0.1:5001/detect_regime"
@@ -21,9 +33,12 @@ MYSQL_CONFIG = {
 }
 
 POLL_INTERVAL = 10
+POLL_MARKET = "CRYPTO"
+POLL_SYMBOL = "BTCUSDT"
 TIMEFRAMES = ["1m", "5m", "15m"]
-STABILITY_WINDOW = 5
-MIN_CONFIRMATIONS = 3
+
+# Rows read back from storage when no snapshot exists
+REBUILD_ROWS = 50
 
 state_buffers = {
     tf: deque(maxlen=STABILITY_WINDOW)
@@ -39,33 +54,16 @@ last_meta_regime = None
 last_strategy = None
 
 
-# =========================================
-# MYSQL CONNECTION
-# =========================================
-def get_mysql_connection():
-    return mysql.connector.connect(**MYSQL_CONFIG)
-
-
 # =========================================
 # STABILITY EVALUATION
 # =========================================
 def evaluate_stability(timeframe):
 
-    buffer = state_buffers[timeframe]
-
-    if len(buffer) < STABILITY_WINDOW:
-        return None
-
-    counts = {}
-    for state in buffer:
-        counts[state] = counts.get(state, 0) + 1
-
-    majority_state = max(counts, key=counts.get)
-
-    if counts[majority_state] >= MIN_CONFIRMATIONS:
-        return majority_state
-
-    return None
+    return majority_state(
+        state_buffers[timeframe],
+        STABILITY_WINDOW,
+        MIN_CONFIRMATIONS
+    )
 
 
 # =========================================
@@ -76,249 +74,280 @@ async def poll_regime():
     global last_meta_regime
     global last_strategy
 
-    conn = None
-    cursor = None
-
     try:
-        conn = get_mysql_connection()
-        cursor = conn.cursor()
-        print("✅ MySQL connection established.")
-
-        while True:
-            try:
-                async with httpx.AsyncClient() as client:
-
-                    payload = {
-                        "market": "CRYPTO",
-                        "symbol": "BTCUSDT"
-                    }
-
-                    response = await client.post(
-                        FLASK_REGIME_URL,
-                        json=payload,
-                        timeout=10
-                    )
-
-                    if response.status_code != 200:
-                        await asyncio.sleep(POLL_INTERVAL)
+        source = await restore_snapshot()
+        print(f"♻️ Pipeline state restored from {source}.")
+    except Exception as e:
+        print("❌ Pipeline state restore failed:", e)
+
+    while True:
+        try:
+            async with httpx.AsyncClient() as client:
+
+                payload = {
+                    "market": POLL_MARKET,
+                    "symbol": POLL_SYMBOL
+                }
+
+                response = await client.post(
+                    FLASK_REGIME_URL,
+                    json=payload,
+                    timeout=10
+                )
+
+                if response.status_code != 200:
+                    await asyncio.sleep(POLL_INTERVAL)
+                    continue
+
+                data = response.json()
+                regimes = data.get("regimes", {})
+
+                # =====================================
+                # 1️⃣ TIMEFRAME STABILITY
+                # =====================================
+                for tf in TIMEFRAMES:
+
+                    tf_data = regimes.get(tf)
+                    if not tf_data or "error" in tf_data:
                         continue
 
-                    data = response.json()
-                    regimes = data.get("regimes", {})
-
-                    # =====================================
-                    # 1️⃣ TIMEFRAME STABILITY
-                    # =====================================
-                    for tf in TIMEFRAMES:
-
-                        tf_data = regimes.get(tf)
-                        if not tf_data or "error" in tf_data:
-                            continue
-
-                        state = tf_data["state"]
-                        confidence = tf_data["confidence"]
-
-                        state_buffers[tf].append(state)
-                        confirmed_state = evaluate_stability(tf)
-
-                        if confirmed_state is None:
-                            continue
-
-                        if confirmed_state != stable_state[tf]:
-
-                            insert_timeframe_regime(
-                                cursor,
-                                conn,
-                                data["market"],
-                                data["symbol"],
-                                tf,
-                                tf_data["regime"],
-                                confidence,
-                                confirmed_state
-                            )
-
-                            await regime_manager.broadcast({
-                                "type": "timeframe",
-                                "market": data["market"],
-                                "symbol": data["symbol"],
-                                "timeframe": tf,
-                                "regime": tf_data["regime"],
-                                "confidence": confidence,
-                                "state": confirmed_state,
-                                "timestamp": datetime.utcnow().isoformat()
-                            })
-
-                            print(f"🔒 {tf} Stable Regime → {tf_data['regime']}")
-                            stable_state[tf] = confirmed_state
-
-                    # =====================================
-                    # 2️⃣ META FUSION
-                    # =====================================
-                    meta = fusion_engine.fuse(stable_state)
-
-                    if not meta:
-                        await asyncio.sleep(POLL_INTERVAL)
+                    state = tf_data["state"]
+                    confidence = tf_data["confidence"]
+
+                    state_buffers[tf].append(state)
+                    confirmed_state = evaluate_stability(tf)
+
+                    if confirmed_state is None:
                         continue
 
-                    # Insert only if meta regime changed
-                    if meta["meta_regime"] != last_meta_regime:
+                    if confirmed_state != stable_state[tf]:
 
-                        insert_meta_regime(cursor, conn, meta)
+                        await insert_timeframe_regime(
+                            data["market"],
+                            data["symbol"],
+                            tf,
+                            tf_data["regime"],
+                            confidence,
+                            confirmed_state
+                        )
 
                         await regime_manager.broadcast({
-                            "type": "meta",
-                            "meta_regime": meta["meta_regime"],
-                            "confidence": meta["confidence"],
-                            "components": meta["components"],
+                            "type": "timeframe",
+                            "market": data["market"],
+                            "symbol": data["symbol"],
+                            "timeframe": tf,
+                            "regime": tf_data["regime"],
+                            "confidence": confidence,
+                            "state": confirmed_state,
                             "timestamp": datetime.utcnow().isoformat()
                         })
 
-                        print(f"🧠 META REGIME → {meta['meta_regime']}")
-                        last_meta_regime = meta["meta_regime"]
-
-                    # =====================================
-                    # 3️⃣ STRATEGY SWITCHING
-                    # =====================================
-                    strategy_data = strategy_engine.select_strategy(meta)
-
-                    if strategy_data:
-                        strategy_name = strategy_data["strategy"]
-
-                        if strategy_name != last_strategy:
-
-                            insert_strategy_state(
-                                cursor,
-                                conn,
-                                strategy_data
-                            )
-
-                            await regime_manager.broadcast({
-                                "type": "strategy",
-                                "meta_regime": strategy_data["meta_regime"],
-                                "strategy": strategy_name,
-                                "timestamp": datetime.utcnow().isoformat()
-                            })
-
-                            print(f"🎯 Strategy Switched → {strategy_name}")
-                            last_strategy = strategy_name
-
-                    decision = generate_decision(
-                        market=data["market"],
-                        symbol=data["symbol"],
-                        meta_regime=meta["meta_regime"],
-                        strategy=last_strategy,
-                        confidence=meta["confidence"]
-                    )
-
-                    if decision:
-
-                        insert_decision(cursor, conn, decision)
-
-                        # ✅ Broadcast decision event
-                        await decision_manager.broadcast({
-                            "type": "decision",
-                            "market": decision.market,
-                            "symbol": decision.symbol,
-                            "meta_regime": decision.meta_regime,
-                            "strategy": decision.strategy,
-                            "action": decision.action,
-                            "confidence": decision.confidence,
-                            "timestamp": decision.timestamp.isoformat()
+                        print(f"🔒 {tf} Stable Regime → {tf_data['regime']}")
+                        stable_state[tf] = confirmed_state
+
+                # =====================================
+                # 2️⃣ META FUSION
+                # =====================================
+                meta = fusion_engine.fuse(stable_state)
+
+                if not meta:
+                    await asyncio.sleep(POLL_INTERVAL)
+                    continue
+
+                state_board.regime(
+                    data["market"], data["symbol"],
+                    meta["meta_regime"], meta["confidence"]
+                )
+
+                # Insert only if meta regime changed
+                if meta["meta_regime"] != last_meta_regime:
+
+                    await insert_meta_regime(meta)
+
+                    await regime_manager.broadcast({
+                        "type": "meta",
+                        "meta_regime": meta["meta_regime"],
+                        "confidence": meta["confidence"],
+                        "components": meta["components"],
+                        "timestamp": datetime.utcnow().isoformat()
+                    })
+
+                    print(f"🧠 META REGIME → {meta['meta_regime']}")
+                    last_meta_regime = meta["meta_regime"]
+
+                # =====================================
+                # 3️⃣ STRATEGY SWITCHING
+                # =====================================
+                strategy_data = strategy_engine.select_strategy(meta)
+
+                if strategy_data:
+                    strategy_name = strategy_data["strategy"]
+                    state_board.strategy(data["market"], data["symbol"], strategy_name)
+
+                    if strategy_name != last_strategy:
+
+                        await insert_strategy_state(strategy_data)
+
+                        await regime_manager.broadcast({
+                            "type": "strategy",
+                            "meta_regime": strategy_data["meta_regime"],
+                            "strategy": strategy_name,
+                            "timestamp": datetime.utcnow().isoformat()
                         })
 
-                        print(f"📈 Decision Generated → {decision.action} ({decision.strategy})")
+                        print(f"🎯 Strategy Switched → {strategy_name}")
+                        last_strategy = strategy_name
+
+                decision = generate_decision(
+                    market=data["market"],
+                    symbol=data["symbol"],
+                    meta_regime=meta["meta_regime"],
+                    strategy=last_strategy,
+                    confidence=meta["confidence"]
+                )
+
+                if decision:
 
-            except Exception as e:
-                print("❌ Polling Error:", e)
+                    await insert_decision(decision)
+                    state_board.decision(decision)
 
-            await asyncio.sleep(POLL_INTERVAL)
+                    # ✅ Broadcast decision event
+                    await decision_manager.broadcast({
+                        "type": "decision",
+                        "market": decision.market,
+                        "symbol": decision.symbol,
+                        "meta_regime": decision.meta_regime,
+                        "strategy": decision.strategy,
+                        "action": decision.action,
+                        "confidence": decision.confidence,
+                        "timestamp": decision.timestamp.isoformat()
+                    })
 
-    finally:
-        if cursor:
-            cursor.close()
-        if conn:
-            conn.close()
+                    print(f"📈 Decision Generated → {decision.action} ({decision.strategy})")
+
+                await save_state()
+
+        except Exception as e:
+            print("❌ Polling Error:", e)
+
+        await asyncio.sleep(POLL_INTERVAL)
 
 
 # =========================================
-# INSERT FUNCTIONS
+# STATE SNAPSHOT
 # =========================================
+def export_state():
+    return {
+        "state_buffers": {
+            tf: list(buffer) for tf, buffer in state_buffers.items()
+        },
+        "stable_state": dict(stable_state),
+        "last_meta_regime": last_meta_regime,
+        "last_strategy": last_strategy,
+        "current_strategy": strategy_engine.current_strategy
+    }
 
-def insert_timeframe_regime(cursor, conn, market, symbol,
-                            timeframe, regime, confidence, state):
 
-    query = """
-    INSERT INTO regime_state
-    (market, symbol, timeframe, regime, confidence, state, detected_at)
-    VALUES (%s, %s, %s, %s, %s, %s, %s)
-    """
+def restore_state(state):
 
-    values = (
-        market,
-        symbol,
-        timeframe,
-        regime,
-        confidence,
-        state,
-        datetime.utcnow()
-    )
+    global last_meta_regime
+    global last_strategy
 
-    cursor.execute(query, values)
-    conn.commit()
+    for tf in TIMEFRAMES:
+        state_buffers[tf].clear()
+        state_buffers[tf].extend(state["state_buffers"].get(tf, []))
+        stable_state[tf] = state["stable_state"].get(tf)
 
+    last_meta_regime = state["last_meta_regime"]
+    last_strategy = state["last_strategy"]
+    strategy_engine.current_strategy = state["current_strategy"]
 
-def insert_meta_regime(cursor, conn, meta):
 
-    query = """
-    INSERT INTO meta_regime_state
-    (meta_regime, confidence, detected_at)
-    VALUES (%s, %s, %s)
+async def rebuild_state():
+    """
+    Warm start from the most recent stored rows when no snapshot exists.
+    A persisted stable state already passed the stability vote, so its
+    buffer is refilled with it instead of waiting STABILITY_WINDOW polls.
     """
 
-    values = (
-        meta["meta_regime"],
-        meta["confidence"],
-        datetime.utcnow()
-    )
+    global last_meta_regime
+    global last_strategy
 
-    cursor.execute(query, values)
-    conn.commit()
+    storage = get_storage()
 
-def insert_strategy_state(cursor, conn, strategy_data):
+    rows = await storage.regimes.recent_timeframe(POLL_MARKET, POLL_SYMBOL, REBUILD_ROWS)
 
-    query = """
-    INSERT INTO strategy_state
-    (meta_regime, strategy, detected_at)
-    VALUES (%s, %s, %s)
-    """
+    for row in rows:
+        timeframe, state = row["timeframe"], row["state"]
 
-    values = (
-        strategy_data["meta_regime"],
-        strategy_data["strategy"],
-        datetime.utcnow()
-    )
+        if timeframe in stable_state and stable_state[timeframe] is None:
+            stable_state[timeframe] = state
+            state_buffers[timeframe].clear()
+            state_buffers[timeframe].extend([state] * STABILITY_WINDOW)
 
-    cursor.execute(query, values)
-    conn.commit()
+    meta_regime = await storage.regimes.latest_meta()
+    if meta_regime:
+        last_meta_regime = meta_regime
 
+    strategy = await storage.regimes.latest_strategy()
+    if strategy:
+        last_strategy = strategy
+        strategy_engine.current_strategy = strategy
 
-def insert_decision(cursor, conn, decision):
+    for record in await storage.decisions.recent(REBUILD_ROWS):
+        remember_decision(record)
+        restore_cooldown(
+            record["symbol"],
+            record["strategy"],
+            record["created_at"]
+        )
 
-    query = """
-    INSERT INTO decisions
-    (market, symbol, meta_regime, strategy, action, confidence, created_at)
-    VALUES (%s, %s, %s, %s, %s, %s, %s)
-    """
 
-    values = (
-        decision.market,
-        decision.symbol,
-        decision.meta_regime,
-        decision.strategy,
-        decision.action,
-        decision.confidence,
-        decision.timestamp
-    )
+# =========================================
+# INSERT FUNCTIONS
+# =========================================
+
+async def insert_timeframe_regime(market, symbol, timeframe, regime, confidence, state):
+
+    await get_storage().regimes.write_timeframe([{
+        "market": market,
+        "symbol": symbol,
+        "timeframe": timeframe,
+        "regime": regime,
+        "confidence": confidence,
+        "state": state,
+        "detected_at": datetime.utcnow()
+    }])
+
+
+async def insert_meta_regime(meta):
+
+    await get_storage().regimes.write_meta([{
+        "meta_regime": meta["meta_regime"],
+        "confidence": meta["confidence"],
+        "detected_at": datetime.utcnow()
+    }])
+
+
+async def insert_strategy_state(strategy_data):
+
+    await get_storage().regimes.write_strategy([{
+        "meta_regime": strategy_data["meta_regime"],
+        "strategy": strategy_data["strategy"],
+        "detected_at": datetime.utcnow()
+    }])
+
+
+async def insert_decision(decision):
+
+    await get_storage().decisions.write_many([{
+        "market": decision.market,
+        "symbol": decision.symbol,
+        "meta_regime": decision.meta_regime,
+        "strategy": decision.strategy,
+        "action": decision.action,
+        "confidence": decision.confidence,
+        "created_at": decision.timestamp
+    }])
 
-    cursor.execute(query, values)
-    conn.commit()
\ No newline at end of file
+    cache_latest_decision(decision)
@@ -0,0 +1,24 @@
+STABILITY_WINDOW = 5
+MIN_CONFIRMATIONS = 3
+
+
+def majority_state(buffer, window=STABILITY_WINDOW,
+                   min_confirmations=MIN_CONFIRMATIONS):
+    """
+    Majority vote over a full stability window.
+    Ties go to the state seen first in the buffer.
+    """
+
+    if len(buffer) < window:
+        return None
+
+    counts = {}
+    for state in buffer:
+        counts[state] = counts.get(state, 0) + 1
+
+    winner = max(counts, key=counts.get)
+
+    if counts[winner] >= min_confirmations:
+        return winner
+
+    return None
@@ -1,24 +1,10 @@
-from typing import List
-from fastapi import WebSocket
-import asyncio
+from fastapi_market.broadcast_hub import BroadcastHub, CONFLATE
 
 
-class RegimeConnectionManager:
+class RegimeConnectionManager(BroadcastHub):
+    # Regime updates supersede each other, so a lagging client only
+    # needs the newest ones
     def __init__(self):
-        self.active_connections: List[WebSocket] = []
-
-    async def connect(self, websocket: WebSocket):
-        await websocket.accept()
-        self.active_connections.append(websocket)
-
-    def disconnect(self, websocket: WebSocket):
-        self.active_connections.remove(websocket)
-
-    async def broadcast(self, message: dict):
-        for connection in self.active_connections:
-            try:
-                await connection.send_json(message)
-            except Exception:
-                pass
+        super().__init__(policy=CONFLATE)
 
 regime_manager = RegimeConnectionManager()
\ No newline at end of file
@@ -0,0 +1,209 @@
+"""
+Short-lived cache of encoded JSON responses.
+
+Entries live for a per-key TTL (tens to hundreds of milliseconds), e.g.
+the NASDAQ and NYSE order books read from Mongo, and can be dropped early
+by invalidating a tag they carry. Concurrent misses on the same key
+share one load (single flight); if the loading request is cancelled, one
+of the waiters takes the load over. Memory is bounded by an LRU entry limit
+and a byte budget.
+"""
+
+import asyncio
+import json
+import time
+from collections import OrderedDict, defaultdict
+
+from fastapi import Response
+
+MAX_ENTRIES = 1024
+MAX_BYTES = 32 * 1024 * 1024
+DEFAULT_TTL_SECONDS = 0.25
+
+
+def _default(value):
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return str(value)
+
+
+def encode(value) -> bytes:
+    return json.dumps(
+        value,
+        separators=(",", ":"),
+        ensure_ascii=False,
+        default=_default
+    ).encode()
+
+
+class _LoadCancelled(Exception):
+    """
+    Set on a single-flight future when its loader was cancelled; waiters
+    retry instead of failing.
+    """
+
+
+class _Entry:
+    __slots__ = ("body", "expires_at", "tags")
+
+    def __init__(self, body, expires_at, tags):
+        self.body = body
+        self.expires_at = expires_at
+        self.tags = tags
+
+
+class ResponseCache:
+
+    def __init__(self, max_entries=MAX_ENTRIES, default_ttl=DEFAULT_TTL_SECONDS,
+                 max_bytes=MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+
+        self.entries = OrderedDict()
+        self.size = 0
+        self.inflight = {}
+
+        self.tag_keys = defaultdict(set)
+        self.generations = defaultdict(int)
+
+        self.stats = {
+            "hits": 0,
+            "misses": 0,
+            "coalesced": 0,
+            "takeovers": 0,
+            "invalidations": 0,
+            "evictions": 0
+        }
+
+    async def get_or_load(self, key, loader, ttl=None, tags=()):
+        """
+        Encoded body for `key`, calling `await loader()` on a miss.
+        Loaders may return bytes that are already encoded.
+        """
+
+        entry = self.entries.get(key)
+
+        if entry is not None:
+            if entry.expires_at > time.monotonic():
+                self.entries.move_to_end(key)
+                self.stats["hits"] += 1
+                return entry.body
+
+            self._drop(key)
+
+        pending = self.inflight.get(key)
+
+        if pending is not None:
+            self.stats["coalesced"] += 1
+
+            try:
+                return await asyncio.shield(pending)
+
+            except _LoadCancelled:
+                # The first waiter back starts a new load, the rest join it
+                self.stats["takeovers"] += 1
+                return await self.get_or_load(key, loader, ttl, tags)
+
+        self.stats["misses"] += 1
+
+        future = asyncio.get_running_loop().create_future()
+        self.inflight[key] = future
+
+        # A load that overlaps an invalidation must not be cached
+        generations = {tag: self.generations[tag] for tag in tags}
+
+        try:
+            value = await loader()
+            body = value if isinstance(value, bytes) else encode(value)
+
+        except asyncio.CancelledError:
+            # Only this request went away; its waiters retry
+            future.set_exception(_LoadCancelled())
+            future.exception()
+            raise
+
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # waiters re-raise it; nobody else needs to
+            raise
+
+        finally:
+            del self.inflight[key]
+
+        future.set_result(body)
+
+        if all(self.generations[tag] == g for tag, g in generations.items()):
+            self._store(key, body, ttl or self.default_ttl, tags)
+
+        return body
+
+    async def response(self, key, loader, ttl=None, tags=()):
+        body = await self.get_or_load(key, loader, ttl, tags)
+        return Response(content=body, media_type="application/json")
+
+    def invalidate(self, tag):
+        self.generations[tag] += 1
+
+        keys = self.tag_keys.pop(tag, None)
+
+        if not keys:
+            return
+
+        self.stats["invalidations"] += 1
+
+        for key in keys:
+            self._drop(key)
+
+    def _store(self, key, body, ttl, tags):
+        self._drop(key)
+
+        # Larger than the whole budget: served, never cached
+        if len(body) > self.max_bytes:
+            return
+
+        self.entries[key] = _Entry(body, time.monotonic() + ttl, tags)
+        self.size += len(body)
+
+        for tag in tags:
+            self.tag_keys[tag].add(key)
+
+        while len(self.entries) > self.max_entries or self.size > self.max_bytes:
+            oldest = next(iter(self.entries))
+            self._drop(oldest)
+            self.stats["evictions"] += 1
+
+    def _drop(self, key):
+        entry = self.entries.pop(key, None)
+
+        if entry is None:
+            return
+
+        self.size -= len(entry.body)
+
+        for tag in entry.tags:
+            keys = self.tag_keys.get(tag)
+
+            if keys is not None:
+                keys.discard(key)
+
+                if not keys:
+                    del self.tag_keys[tag]
+
+    def status(self):
+        lookups = self.stats["hits"] + self.stats["misses"] + self.stats["coalesced"]
+
+        return {
+            "entries": len(self.entries),
+            "max_entries": self.max_entries,
+            "bytes": self.size,
+            "max_bytes": self.max_bytes,
+            "inflight": len(self.inflight),
+            "hit_ratio": round(
+                (self.stats["hits"] + self.stats["coalesced"]) / lookups, 4
+            ) if lookups else None,
+            **self.stats
+        }
+
+
+response_cache = ResponseCache()
@@ -1,4 +1,11 @@
 from fastapi_market.database import trade_collection
+from fastapi_market.timeseries import time_series_doc
+from fastapi_market.market_stream import market_stream
+from fastapi_market.trade_buffer import trade_buffer
+from fastapi_market.tick_log import tick_log
+from fastapi_market.mongo_sink import trade_sink
+from fastapi_market.state_board import state_board
+from fastapi_market.write_journal import deterministic_id
 
 _candle_engine = None
 
@@ -14,10 +21,26 @@ def register_candle_engine(engine):
 async def save_tick(tick):
     """
     Stores raw trade and forwards to CandleEngine.
+    The tick log is the primary store; Mongo is written in the background.
     """
 
+    market_stream.publish("trades", tick["market_type"], tick["symbol"], dict(tick))
+    trade_buffer.append(tick)
+    state_board.trade(tick)
+
     #  Store raw trade
-    result = await trade_collection.insert_one(tick)
+    tick_log.append(tick)
+    doc = time_series_doc(tick)
+    doc["_id"] = deterministic_id(
+        tick["market_type"],
+        tick["symbol"],
+        tick["exchange_timestamp"],
+        tick["receive_timestamp"],
+        tick["price"],
+        tick["quantity"],
+        tick["side"]
+    )
+    trade_sink.submit(doc)
 
     # Forward to candle engine (if registered)
     if _candle_engine is not None:
@@ -31,8 +54,6 @@ async def save_tick(tick):
 
         await _candle_engine.process_tick(tick_for_candle)
 
-    return result
-
 
 async def get_snapshot(limit=50):
     cursor = trade_collection.find() \
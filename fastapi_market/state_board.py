@@ -0,0 +1,518 @@
+"""
+Latest per-symbol state in shared memory, for co-located services.
+
+The market engine is the only writer. It publishes the last trade, the
+latest ATR, the time of the newest feature row per timeframe, the regime,
+the strategy and the last decision into a fixed-layout
+multiprocessing.shared_memory segment (STATE_BOARD_NAME). Django and Flask
+processes on the same host read it without a lock or a request. HTTP
+remains the fallback when the segment doesn't exist or its heartbeat is
+older than STALE_SECONDS, for example when the services run on different
+hosts.
+
+Layout: a 64-byte header followed by SLOTS slots of SLOT_SIZE bytes, one
+slot per (market, symbol) in order of first appearance. Each slot starts
+with a sequence counter (seqlock): the writer makes it odd, writes the
+fields and makes it even again. A reader copies the slot and keeps the
+copy only if the counter was even and unchanged around the copy,
+otherwise it retries.
+
+This module only uses the standard library, so the Django and Flask
+services can import it without the engine's dependencies.
+"""
+
+import asyncio
+import os
+import struct
+import time
+from datetime import datetime, timezone
+from multiprocessing import shared_memory
+
+STATE_BOARD_ENABLED = os.getenv("STATE_BOARD", "true").lower() == "true"
+STATE_BOARD_NAME = os.getenv("STATE_BOARD_NAME", "aetherion_state_board")
+
+MAGIC = b"AETHSB01"
+SLOTS = 256
+SLOT_SIZE = 320
+
+# Readers fall back to HTTP when the writer's heartbeat is older
+STALE_SECONDS = 15
+HEARTBEAT_SECONDS = 1.0
+
+# Copies tried before a read gives up (None); after SPIN_RETRIES the
+# reader yields its time slice so a preempted writer can finish
+READ_RETRIES = 1000
+SPIN_RETRIES = 10
+
+FEATURE_TIMEFRAMES = ("1m", "5m", "15m", "1h")
+ATR_TIMEFRAME = "1m"
+
+# magic, slots, slot_size, used, created_ms, heartbeat_ms
+HEADER = struct.Struct("<8sIIIxxxxqq")
+HEADER_SIZE = 64
+USED_OFFSET = 16
+HEARTBEAT_OFFSET = 32
+
+SEQ = struct.Struct("<Q")
+
+# Field groups, each written with one pack_into at its slot offset
+GROUPS = {
+    "key": (8, struct.Struct("<8s24s")),
+    "trade": (40, struct.Struct("<ddqq4s")),
+    "atr": (76, struct.Struct("<dq")),
+    "features": (92, struct.Struct(f"<{len(FEATURE_TIMEFRAMES)}q")),
+    "regime": (124, struct.Struct("<24sdq")),
+    "strategy": (164, struct.Struct("<24sq")),
+    "decision": (196, struct.Struct("<8s24s24sdq")),
+}
+
+SIDES = {b"BUY": "BUY", b"SELL": "SELL"}
+
+
+def _text(value, size):
+    return (value or "").encode()[:size]
+
+
+def _untext(raw):
+    return raw.rstrip(b"\0").decode() or None
+
+
+def _now_ms():
+    return int(time.time() * 1000)
+
+
+def _segment(**kwargs):
+    """
+    SharedMemory that outlives this process: its resource tracker must not
+    unlink it at exit (before Python 3.13 every opened segment is tracked).
+    """
+
+    try:
+        return shared_memory.SharedMemory(track=False, **kwargs)
+
+    except TypeError:
+        segment = shared_memory.SharedMemory(**kwargs)
+
+        if os.name == "posix":
+            from multiprocessing import resource_tracker
+            resource_tracker.unregister(segment._name, "shared_memory")
+
+        return segment
+
+
+# =========================================
+# WRITER (market engine)
+# =========================================
+class StateBoardWriter:
+
+    def __init__(self, name=STATE_BOARD_NAME, slots=SLOTS):
+        self.name = name
+        self.slots = slots
+        self.size = HEADER_SIZE + slots * SLOT_SIZE
+
+        self.segment = None
+        self.buf = None
+        self.index = {}
+        self.full = False
+
+    def open(self):
+        """
+        Create the segment, or reuse the previous run's so readers keep
+        their mapping across an engine restart.
+        """
+
+        try:
+            self.segment = _segment(name=self.name, create=True, size=self.size)
+            created = True
+
+        except FileExistsError:
+            self.segment = _segment(name=self.name)
+            created = False
+
+            magic, slots, slot_size, _, _, _ = HEADER.unpack_from(self.segment.buf, 0)
+
+            if (magic, slots, slot_size) != (MAGIC, self.slots, SLOT_SIZE) \
+                    or self.segment.size < self.size:
+                # Different layout: replace it
+                self.segment.close()
+                self.segment.unlink()
+                return self.open()
+
+        self.buf = self.segment.buf
+
+        if created:
+            self.buf[:self.size] = bytes(self.size)
+            HEADER.pack_into(self.buf, 0, MAGIC, self.slots, SLOT_SIZE, 0, _now_ms(), _now_ms())
+        else:
+            used = struct.unpack_from("<I", self.buf, USED_OFFSET)[0]
+
+            for i in range(used):
+                slot = self._slot(i)
+
+                # A crash mid-write leaves the counter odd
+                seq = SEQ.unpack_from(self.buf, slot)[0]
+                if seq & 1:
+                    SEQ.pack_into(self.buf, slot, seq + 1)
+
+                offset, group = GROUPS["key"]
+                market, symbol = group.unpack_from(self.buf, slot + offset)
+                self.index[(_untext(market), _untext(symbol))] = i
+
+        self.heartbeat()
+        return self
+
+    def close(self):
+        if self.segment is not None:
+            self.buf = None
+            self.segment.close()
+            self.segment = None
+
+    def _slot(self, i):
+        return HEADER_SIZE + i * SLOT_SIZE
+
+    def _slot_for(self, market, symbol):
+        key = (market, symbol)
+        i = self.index.get(key)
+
+        if i is not None:
+            return self._slot(i)
+
+        used = len(self.index)
+
+        if used >= self.slots:
+            if not self.full:
+                print(f"⚠️ State board full ({self.slots} slots); {market}:{symbol} not published")
+                self.full = True
+            return None
+
+        self.index[key] = used
+        slot = self._slot(used)
+
+        self._write(slot, "key", _text(market, 8), _text(symbol, 24))
+
+        # Readers only look at slots below `used`
+        struct.pack_into("<I", self.buf, USED_OFFSET, used + 1)
+
+        return slot
+
+    def _write(self, slot, group, *values):
+        offset, layout = GROUPS[group]
+        seq = SEQ.unpack_from(self.buf, slot)[0]
+
+        SEQ.pack_into(self.buf, slot, seq + 1)
+        layout.pack_into(self.buf, slot + offset, *values)
+        SEQ.pack_into(self.buf, slot, seq + 2)
+
+    def publish(self, market, symbol, group, *values):
+        if self.buf is None:
+            return
+
+        slot = self._slot_for(market, symbol)
+
+        if slot is not None:
+            self._write(slot, group, *values)
+
+    def heartbeat(self):
+        if self.buf is not None:
+            struct.pack_into("<q", self.buf, HEARTBEAT_OFFSET, _now_ms())
+
+    async def heartbeat_loop(self):
+        while True:
+            self.heartbeat()
+            await asyncio.sleep(HEARTBEAT_SECONDS)
+
+    # =========================================
+    # PUBLISHERS
+    # =========================================
+    def trade(self, tick):
+        self.publish(
+            tick["market_type"], tick["symbol"], "trade",
+            float(tick["price"]),
+            float(tick["quantity"]),
+            int(tick["exchange_timestamp"] or 0),
+            int(tick["receive_timestamp"]),
+            _text(tick["side"], 4)
+        )
+
+    def feature(self, market, symbol, timeframe, timestamp, atr):
+        """
+        A feature row was computed for `timestamp`.
+        """
+
+        if self.buf is None or timeframe not in FEATURE_TIMEFRAMES:
+            return
+
+        slot = self._slot_for(market, symbol)
+
+        if slot is None:
+            return
+
+        offset, layout = GROUPS["features"]
+        times = list(layout.unpack_from(self.buf, slot + offset))
+        times[FEATURE_TIMEFRAMES.index(timeframe)] = int(timestamp)
+
+        self._write(slot, "features", *times)
+
+        if timeframe == ATR_TIMEFRAME:
+            self._write(slot, "atr", float(atr), int(timestamp))
+
+    def regime(self, market, symbol, meta_regime, confidence):
+        self.publish(
+            market, symbol, "regime",
+            _text(meta_regime, 24), float(confidence), _now_ms()
+        )
+
+    def strategy(self, market, symbol, strategy):
+        self.publish(market, symbol, "strategy", _text(strategy, 24), _now_ms())
+
+    def decision(self, decision):
+        created_at = decision.timestamp
+
+        if created_at.tzinfo is None:
+            created_at = created_at.replace(tzinfo=timezone.utc)
+
+        self.publish(
+            decision.market, decision.symbol, "decision",
+            _text(decision.action, 8),
+            _text(decision.meta_regime, 24),
+            _text(decision.strategy, 24),
+            float(decision.confidence),
+            int(created_at.timestamp() * 1_000_000)
+        )
+
+
+# Opened by the engine at startup; until then every publish is a no-op
+state_board = StateBoardWriter()
+
+
+# =========================================
+# READER (Django, Flask)
+# =========================================
+class StateBoardReader:
+    """
+    Lock-free reads. Every method returns None when the board has no
+    fresh answer, and the caller falls back to HTTP.
+    """
+
+    def __init__(self, name=STATE_BOARD_NAME, stale_seconds=STALE_SECONDS):
+        self.name = name
+        self.stale_seconds = stale_seconds
+
+        self.segment = None
+        self.index = {}
+
+    def _buffer(self):
+        """
+        Mapped segment with a live writer, re-opened after the engine
+        recreated it; None if there is none.
+        """
+
+        if self.segment is None:
+            try:
+                self.segment = _segment(name=self.name)
+            except OSError:
+                return None
+
+            self.index = {}
+
+        buf = self.segment.buf
+        magic, _, slot_size, _, _, heartbeat = HEADER.unpack_from(buf, 0)
+
+        if magic == MAGIC and slot_size == SLOT_SIZE \
+                and _now_ms() - heartbeat <= self.stale_seconds * 1000:
+            return buf
+
+        # Stale or replaced: drop the mapping (closed once no other thread
+        # is reading it) and try again next call
+        self.segment = None
+        return None
+
+    def _read(self, buf, slot, group):
+        offset, layout = GROUPS[group]
+        start, end = slot + offset, slot + offset + layout.size
+
+        for attempt in range(READ_RETRIES):
+            before = SEQ.unpack_from(buf, slot)[0]
+
+            if not before & 1:
+                raw = bytes(buf[start:end])
+
+                if SEQ.unpack_from(buf, slot)[0] == before:
+                    return layout.unpack(raw)
+
+            if attempt >= SPIN_RETRIES:
+                time.sleep(0)
+
+        return None
+
+    def _slots(self, buf):
+        used = struct.unpack_from("<I", buf, USED_OFFSET)[0]
+        return [HEADER_SIZE + i * SLOT_SIZE for i in range(used)]
+
+    def _slot(self, buf, market, symbol):
+        key = (market, symbol)
+
+        if key not in self.index:
+            for slot in self._slots(buf):
+                fields = self._read(buf, slot, "key")
+
+                if fields and (_untext(fields[0]), _untext(fields[1])) == key:
+                    self.index[key] = slot
+                    break
+            else:
+                return None
+
+        return self.index[key]
+
+    def _keys(self, buf, market=None):
+        for slot in self._slots(buf):
+            fields = self._read(buf, slot, "key")
+
+            if fields and (market is None or _untext(fields[0]) == market):
+                yield slot, _untext(fields[0]), _untext(fields[1])
+
+    # =========================================
+    # QUERIES
+    # =========================================
+    def _trade(self, buf, slot, market, symbol):
+        fields = self._read(buf, slot, "trade")
+
+        if not fields or not fields[3]:
+            return None
+
+        price, quantity, exchange_ts, receive_ts, side = fields
+
+        return {
+            "market_type": market,
+            "symbol": symbol,
+            "price": price,
+            "quantity": quantity,
+            "side": SIDES.get(side.rstrip(b"\0"), _untext(side)),
+            "exchange_timestamp": exchange_ts or None,
+            "receive_timestamp": receive_ts
+        }
+
+    def latest_trade(self, market, symbol=None):
+        """
+        Same shape as the engine's /api/market/snapshot data: the newest
+        trade of the symbol, or of the whole market.
+        """
+
+        buf = self._buffer()
+
+        if buf is None:
+            return None
+
+        if symbol is not None:
+            slot = self._slot(buf, market, symbol)
+            return self._trade(buf, slot, market, symbol) if slot is not None else None
+
+        trades = [
+            trade for trade in (
+                self._trade(buf, slot, m, s) for slot, m, s in self._keys(buf, market)
+            )
+            if trade
+        ]
+
+        return max(trades, key=lambda t: t["receive_timestamp"]) if trades else None
+
+    def atr(self, market, symbol):
+        """
+        (atr, candle timestamp) of the latest ATR_TIMEFRAME feature.
+        """
+
+        buf = self._buffer()
+        slot = self._slot(buf, market, symbol) if buf is not None else None
+
+        if slot is None:
+            return None
+
+        fields = self._read(buf, slot, "atr")
+
+        return fields if fields and fields[1] else None
+
+    def feature_timestamp(self, market, symbol, timeframe):
+        """
+        Timestamp of the newest feature row the engine computed.
+        """
+
+        buf = self._buffer()
+        slot = self._slot(buf, market, symbol) if buf is not None else None
+
+        if slot is None or timeframe not in FEATURE_TIMEFRAMES:
+            return None
+
+        fields = self._read(buf, slot, "features")
+
+        if not fields:
+            return None
+
+        return fields[FEATURE_TIMEFRAMES.index(timeframe)] or None
+
+    def regime(self, market, symbol):
+        buf = self._buffer()
+        slot = self._slot(buf, market, symbol) if buf is not None else None
+
+        if slot is None:
+            return None
+
+        regime = self._read(buf, slot, "regime")
+        strategy = self._read(buf, slot, "strategy")
+
+        if not regime or not regime[2]:
+            return None
+
+        return {
+            "market": market,
+            "symbol": symbol,
+            "meta_regime": _untext(regime[0]),
+            "confidence": regime[1],
+            "strategy": _untext(strategy[0]) if strategy else None,
+        }
+
+    def latest_decision(self, market=None, symbol=None):
+        """
+        Same shape as the engine's /api/decision/latest, or None if no
+        decision was published.
+        """
+
+        buf = self._buffer()
+
+        if buf is None:
+            return None
+
+        latest = None
+
+        for slot, m, s in self._keys(buf, market):
+            if symbol is not None and s != symbol:
+                continue
+
+            fields = self._read(buf, slot, "decision")
+
+            if fields and fields[4] and (latest is None or fields[4] > latest[2][4]):
+                latest = (m, s, fields)
+
+        if latest is None:
+            return None
+
+        market, symbol, (action, meta_regime, strategy, confidence, created_us) = latest
+
+        return {
+            "market": market,
+            "symbol": symbol,
+            "meta_regime": _untext(meta_regime),
+            "strategy": _untext(strategy),
+            "action": _untext(action),
+            "confidence": confidence,
+            "created_at": datetime.fromtimestamp(
+                created_us / 1_000_000, timezone.utc
+            ).isoformat()
+        }
+
+
+def open_reader():
+    """
+    A reader, or None when the board is disabled (STATE_BOARD=false).
+    """
+
+    return StateBoardReader() if STATE_BOARD_ENABLED else None
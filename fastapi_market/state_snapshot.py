@@ -0,0 +1,194 @@
+import os
+import asyncio
+import hashlib
+import msgpack
+from datetime import datetime
+
+from fastapi_market.mysql_pool import execute, fetch_one
+
+SNAPSHOT_VERSION = 1
+SNAPSHOT_NAME = "decision_pipeline"
+
+SNAPSHOT_PATH = os.getenv("ENGINE_STATE_PATH", "engine_state.msgpack")
+SNAPSHOT_MYSQL = os.getenv("ENGINE_STATE_MYSQL", "false").lower() == "true"
+
+_last_digest = None
+_mysql_ready = False
+
+
+# =========================================
+# ENCODING
+# =========================================
+def encode(state) -> bytes:
+    return msgpack.packb(state, datetime=True, use_bin_type=True)
+
+
+def decode(payload: bytes):
+    return msgpack.unpackb(
+        payload,
+        timestamp=3,
+        raw=False,
+        strict_map_key=False
+    )
+
+
+def capture():
+    """
+    Everything the decision pipeline keeps in process memory.
+    """
+
+    from fastapi_market import regime_poller, decision_engine
+
+    return {
+        "version": SNAPSHOT_VERSION,
+        "poller": regime_poller.export_state(),
+        "decisions": decision_engine.export_state()
+    }
+
+
+def apply(state):
+
+    from fastapi_market import regime_poller, decision_engine
+
+    regime_poller.restore_state(state["poller"])
+    decision_engine.restore_state(state["decisions"])
+
+
+# =========================================
+# STORAGE
+# =========================================
+def _write_file(path, payload):
+
+    tmp_path = f"{path}.tmp"
+
+    with open(tmp_path, "wb") as f:
+        f.write(payload)
+        f.flush()
+        os.fsync(f.fileno())
+
+    os.replace(tmp_path, path)
+
+
+def _read_file(path):
+
+    if not os.path.exists(path):
+        return None
+
+    with open(path, "rb") as f:
+        return f.read()
+
+
+async def _ensure_mysql_table():
+
+    global _mysql_ready
+
+    if _mysql_ready:
+        return
+
+    await execute("""
+    CREATE TABLE IF NOT EXISTS engine_state (
+        name VARCHAR(64) PRIMARY KEY,
+        payload LONGBLOB NOT NULL,
+        updated_at DATETIME(6) NOT NULL
+    )
+    """)
+
+    _mysql_ready = True
+
+
+async def _write_mysql(payload):
+
+    await _ensure_mysql_table()
+
+    await execute(
+        """
+        INSERT INTO engine_state (name, payload, updated_at)
+        VALUES (%s, %s, %s)
+        ON DUPLICATE KEY UPDATE
+            payload = VALUES(payload),
+            updated_at = VALUES(updated_at)
+        """,
+        (SNAPSHOT_NAME, payload, datetime.utcnow())
+    )
+
+
+async def _read_mysql():
+
+    await _ensure_mysql_table()
+
+    row = await fetch_one(
+        "SELECT payload FROM engine_state WHERE name = %s",
+        (SNAPSHOT_NAME,)
+    )
+
+    return row["payload"] if row else None
+
+
+# =========================================
+# SAVE / RESTORE
+# =========================================
+async def save_state(force=False):
+    """
+    Write the snapshot if the pipeline state changed since the last write.
+    """
+
+    global _last_digest
+
+    payload = encode(capture())
+    digest = hashlib.blake2b(payload, digest_size=16).digest()
+
+    if not force and digest == _last_digest:
+        return False
+
+    await asyncio.to_thread(_write_file, SNAPSHOT_PATH, payload)
+
+    if SNAPSHOT_MYSQL:
+        try:
+            await _write_mysql(payload)
+        except Exception as e:
+            print("❌ Snapshot MySQL write failed:", e)
+
+    _last_digest = digest
+    return True
+
+
+async def restore_state(rebuild=True):
+    """
+    Restore from the local snapshot, then MySQL, then (with `rebuild`)
+    from the recent regime_state / decisions rows in storage. Returns the
+    source used.
+    """
+
+    global _last_digest
+
+    from fastapi_market import regime_poller
+
+    sources = [("disk", lambda: asyncio.to_thread(_read_file, SNAPSHOT_PATH))]
+
+    if SNAPSHOT_MYSQL:
+        sources.append(("mysql", _read_mysql))
+
+    for name, read in sources:
+        try:
+            payload = await read()
+
+            if payload is None:
+                continue
+
+            state = decode(payload)
+
+            if state.get("version") != SNAPSHOT_VERSION:
+                continue
+
+            apply(state)
+            _last_digest = hashlib.blake2b(payload, digest_size=16).digest()
+            return name
+
+        except Exception as e:
+            print(f"❌ Snapshot restore from {name} failed:", e)
+
+    if rebuild:
+        await regime_poller.rebuild_state()
+        return "tables"
+
+    return None
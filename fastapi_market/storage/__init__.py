@@ -0,0 +1,65 @@
+"""
+Storage backends behind one set of repositories (see base.py).
+
+STORAGE_BACKEND selects the backend:
+
+    mongo   Mongo for market data, MySQL for regimes and decisions (default)
+    sqlite  one embedded SQLite file in WAL mode (SQLITE_PATH), for
+            single-node deployments, tests and benchmarks
+
+The live pipeline (ingestion sinks, candle and feature state, regimes,
+decisions and order book replay) goes through get_storage(). The analytics
+CLIs (backfill, feature_recompute, backtests, history and export) work on
+Mongo directly.
+"""
+
+import os
+
+from fastapi_market.storage.base import (
+    CandleRepository,
+    DecisionRepository,
+    FeatureRepository,
+    OrderBookFrameRepository,
+    RegimeRepository,
+    SeriesRepository,
+    Storage,
+    StorageError,
+    TickRepository,
+)
+
+__all__ = [
+    "CandleRepository",
+    "DecisionRepository",
+    "FeatureRepository",
+    "OrderBookFrameRepository",
+    "RegimeRepository",
+    "SeriesRepository",
+    "Storage",
+    "StorageError",
+    "TickRepository",
+    "STORAGE_BACKEND",
+    "get_storage",
+]
+
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "mongo").lower()
+
+_storage = None
+
+
+def get_storage():
+    global _storage
+
+    if _storage is None:
+        if STORAGE_BACKEND == "mongo":
+            from fastapi_market.storage.mongo import MongoStorage
+            _storage = MongoStorage()
+
+        elif STORAGE_BACKEND == "sqlite":
+            from fastapi_market.storage.sqlite import SQLiteStorage
+            _storage = SQLiteStorage()
+
+        else:
+            raise ValueError(f"unknown STORAGE_BACKEND: {STORAGE_BACKEND}")
+
+    return _storage
+
@@ -0,0 +1,225 @@
+"""
+Repository interfaces shared by the storage backends.
+
+Every write takes a list and is done as one bulk operation. Writes are
+idempotent: ticks and order book frames are keyed by their deterministic
+_id, and candles and features are upserted on
+(market, symbol, timeframe, bucket_start). Timestamps are epoch ms unless
+a field is a datetime in the original document (detected_at, created_at).
+"""
+
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+
+BUCKET_KEY = ("market", "symbol", "timeframe", "bucket_start")
+
+CANDLE_FIELDS = ("open", "high", "low", "close", "volume")
+FEATURE_FIELDS = ("close", "rolling_volatility", "atr", "volume_delta")
+
+
+class StorageError(Exception):
+    """
+    A write failed; wraps the driver's exception.
+    """
+
+
+@contextmanager
+def translate(*errors):
+    """
+    Re-raise the given driver exceptions as StorageError.
+    """
+
+    try:
+        yield
+    except errors as e:
+        raise StorageError(repr(e)) from e
+
+
+class TickRepository(ABC):
+
+    @abstractmethod
+    async def write_many(self, ticks):
+        """
+        Store trades; ones already stored (same _id) are skipped.
+        """
+
+    @abstractmethod
+    async def latest(self, market, limit):
+        """
+        Newest trades of a market, newest first.
+        """
+
+
+class SeriesRepository(ABC):
+    """
+    Candles and features: one row per bucket.
+    """
+
+    @abstractmethod
+    async def write_many(self, rows):
+        """
+        Upsert on the bucket key; the last row per bucket wins.
+        """
+
+    @abstractmethod
+    async def series(self, market, symbol, timeframe, start=None, end=None,
+                     limit=None, newest=False):
+        """
+        Rows with start <= timestamp < end, oldest first, or the newest
+        `limit` rows newest first.
+        """
+
+
+class CandleRepository(SeriesRepository):
+
+    @abstractmethod
+    async def partials(self, timeframe, bucket_start):
+        """
+        Candles stored as partial for one bucket (restored at startup).
+        """
+
+
+class FeatureRepository(SeriesRepository):
+
+    @abstractmethod
+    async def load_state(self):
+        """
+        FeatureEngine buffers saved per series (feature_engine.state_doc).
+        """
+
+    @abstractmethod
+    async def save_state(self, docs):
+        """
+        Replace the saved buffers of the given series.
+        """
+
+
+class RegimeRepository(ABC):
+
+    @abstractmethod
+    async def write_predictions(self, rows):
+        """
+        RegimeEngine HMM states (market_regimes).
+        """
+
+    @abstractmethod
+    async def write_timeframe(self, rows):
+        """
+        Confirmed per-timeframe regimes (regime_state).
+        """
+
+    @abstractmethod
+    async def write_meta(self, rows):
+        """
+        Fused meta regimes (meta_regime_state).
+        """
+
+    @abstractmethod
+    async def write_strategy(self, rows):
+        """
+        Strategy switches (strategy_state).
+        """
+
+    @abstractmethod
+    async def recent_timeframe(self, market, symbol, limit):
+        """
+        [{"timeframe", "state"}] of the latest confirmed regimes, newest first.
+        """
+
+    @abstractmethod
+    async def latest_meta(self):
+        """
+        Latest meta regime name, or None.
+        """
+
+    @abstractmethod
+    async def latest_strategy(self):
+        """
+        Latest strategy name, or None.
+        """
+
+
+class DecisionRepository(ABC):
+
+    @abstractmethod
+    async def write_many(self, decisions):
+        """
+        Decision rows: market, symbol, meta_regime, strategy, action,
+        confidence, created_at.
+        """
+
+    @abstractmethod
+    async def latest(self, market=None, symbol=None):
+        """
+        Most recent decision row, optionally filtered, or None.
+        """
+
+    @abstractmethod
+    async def recent(self, limit):
+        """
+        Most recent decision rows across symbols, newest first.
+        """
+
+
+class OrderBookFrameRepository(ABC):
+
+    @abstractmethod
+    async def write_many(self, frames):
+        """
+        Snapshot and delta frames from orderbook_store; keyed by _id.
+        """
+
+    @abstractmethod
+    async def snapshot_before(self, market, symbol, timestamp):
+        """
+        Latest snapshot frame at or before `timestamp`, or None.
+        """
+
+    @abstractmethod
+    async def deltas(self, market, symbol, session, after_seq, start, end):
+        """
+        Delta frames of a session after `after_seq` with
+        start <= timestamp <= end, in sequence order.
+        """
+
+
+class Storage(ABC):
+    """
+    One backend's repositories. open() is called once at startup (and
+    lazily by the first query); close() at shutdown.
+    """
+
+    name = None
+
+    ticks: TickRepository
+    candles: CandleRepository
+    features: FeatureRepository
+    regimes: RegimeRepository
+    decisions: DecisionRepository
+    frames: OrderBookFrameRepository
+
+    async def open(self):
+        pass
+
+    async def close(self):
+        pass
+
+    @abstractmethod
+    def feature_repository(self, version):
+        """
+        Features of a given FEATURE_VERSION.
+        """
+
+    def repository(self, collection):
+        """
+        Repository behind a sink's collection name.
+        """
+
+        from fastapi_market.database import FEATURE_COLLECTION
+
+        return {
+            "real_market_ticks": self.ticks,
+            "candles": self.candles,
+            FEATURE_COLLECTION: self.features,
+            "crypto_orderbook_frames": self.frames,
+        }[collection]
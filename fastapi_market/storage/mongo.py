@@ -0,0 +1,306 @@
+"""
+Mongo (Motor) for market data and MySQL (aiomysql pool) for regimes and
+decisions; the default deployment.
+"""
+
+from pymongo import ReplaceOne
+from pymongo.errors import BulkWriteError, PyMongoError
+
+from fastapi_market.database import db, FEATURE_VERSION, feature_collection_name
+from fastapi_market.mysql_pool import close_pool, executemany, fetch_all, fetch_one
+from fastapi_market.storage.base import (
+    CandleRepository,
+    DecisionRepository,
+    FeatureRepository,
+    OrderBookFrameRepository,
+    RegimeRepository,
+    Storage,
+    TickRepository,
+    translate,
+)
+
+_DUPLICATE_KEY = 11000
+
+
+async def _insert_new(collection, docs):
+    """
+    Unordered insert; documents already stored are not an error.
+    """
+
+    try:
+        await collection.insert_many(docs, ordered=False)
+
+    except BulkWriteError as e:
+        if any(err.get("code") != _DUPLICATE_KEY for err in e.details.get("writeErrors", [])):
+            raise
+
+
+class MongoTicks(TickRepository):
+
+    def __init__(self, collection):
+        self.collection = collection
+
+    async def write_many(self, ticks):
+        with translate(PyMongoError):
+            await _insert_new(self.collection, ticks)
+
+    async def latest(self, market, limit):
+        cursor = self.collection.find(
+            {"market_type": market},
+            {"_id": 0}
+        ).sort("receive_timestamp", -1).limit(limit)
+
+        return await cursor.to_list(length=limit)
+
+
+class _MongoSeries:
+
+    def __init__(self, collection):
+        self.collection = collection
+
+    async def write_many(self, rows):
+        from fastapi_market.bucket_sink import bucket_upserts
+
+        _, operations = bucket_upserts(rows)
+
+        with translate(PyMongoError):
+            await self.collection.bulk_write(operations, ordered=False)
+
+    async def series(self, market, symbol, timeframe, start=None, end=None,
+                     limit=None, newest=False):
+
+        query = {"market": market, "symbol": symbol, "timeframe": timeframe}
+
+        time_filter = {}
+        if start is not None:
+            time_filter["$gte"] = start
+        if end is not None:
+            time_filter["$lt"] = end
+        if time_filter:
+            query["timestamp"] = time_filter
+
+        cursor = self.collection.find(query, {"_id": 0}).sort("timestamp", -1 if newest else 1)
+
+        if limit:
+            cursor = cursor.limit(limit)
+
+        return await cursor.to_list(length=limit)
+
+
+class MongoCandles(_MongoSeries, CandleRepository):
+
+    async def partials(self, timeframe, bucket_start):
+        cursor = self.collection.find(
+            {"partial": True, "timeframe": timeframe, "bucket_start": bucket_start},
+            {"_id": 0}
+        )
+
+        return await cursor.to_list(length=None)
+
+
+class MongoFeatures(_MongoSeries, FeatureRepository):
+
+    def __init__(self, collection, state_collection):
+        super().__init__(collection)
+        self.state_collection = state_collection
+
+    async def load_state(self):
+        return await self.state_collection.find({}).to_list(length=None)
+
+    async def save_state(self, docs):
+        if not docs:
+            return
+
+        with translate(PyMongoError):
+            await self.state_collection.bulk_write(
+                [ReplaceOne({"_id": doc["_id"]}, doc, upsert=True) for doc in docs],
+                ordered=False
+            )
+
+
+class MySQLRegimes(RegimeRepository):
+    """
+    HMM predictions stay in Mongo (market_regimes); the poller's tables
+    are in MySQL.
+    """
+
+    def __init__(self, predictions):
+        self.predictions = predictions
+
+    async def write_predictions(self, rows):
+        with translate(PyMongoError):
+            await self.predictions.insert_many(rows, ordered=False)
+
+    async def write_timeframe(self, rows):
+        await executemany(
+            """
+            INSERT INTO regime_state
+            (market, symbol, timeframe, regime, confidence, state, detected_at)
+            VALUES (%s, %s, %s, %s, %s, %s, %s)
+            """,
+            [
+                (r["market"], r["symbol"], r["timeframe"], r["regime"],
+                 r["confidence"], r["state"], r["detected_at"])
+                for r in rows
+            ]
+        )
+
+    async def write_meta(self, rows):
+        await executemany(
+            """
+            INSERT INTO meta_regime_state
+            (meta_regime, confidence, detected_at)
+            VALUES (%s, %s, %s)
+            """,
+            [(r["meta_regime"], r["confidence"], r["detected_at"]) for r in rows]
+        )
+
+    async def write_strategy(self, rows):
+        await executemany(
+            """
+            INSERT INTO strategy_state
+            (meta_regime, strategy, detected_at)
+            VALUES (%s, %s, %s)
+            """,
+            [(r["meta_regime"], r["strategy"], r["detected_at"]) for r in rows]
+        )
+
+    async def recent_timeframe(self, market, symbol, limit):
+        return await fetch_all(
+            """
+            SELECT timeframe, state FROM regime_state
+            WHERE market = %s AND symbol = %s
+            ORDER BY detected_at DESC
+            LIMIT %s
+            """,
+            (market, symbol, limit)
+        )
+
+    async def latest_meta(self):
+        row = await fetch_one(
+            "SELECT meta_regime FROM meta_regime_state "
+            "ORDER BY detected_at DESC LIMIT 1"
+        )
+        return row["meta_regime"] if row else None
+
+    async def latest_strategy(self):
+        row = await fetch_one(
+            "SELECT strategy FROM strategy_state "
+            "ORDER BY detected_at DESC LIMIT 1"
+        )
+        return row["strategy"] if row else None
+
+
+DECISION_COLUMNS = (
+    "market", "symbol", "meta_regime", "strategy",
+    "action", "confidence", "created_at",
+)
+
+
+class MySQLDecisions(DecisionRepository):
+
+    async def write_many(self, decisions):
+        await executemany(
+            f"""
+            INSERT INTO decisions ({", ".join(DECISION_COLUMNS)})
+            VALUES ({", ".join(["%s"] * len(DECISION_COLUMNS))})
+            """,
+            [tuple(d[c] for c in DECISION_COLUMNS) for d in decisions]
+        )
+
+    async def latest(self, market=None, symbol=None):
+        filters = []
+        params = []
+
+        if market:
+            filters.append("market = %s")
+            params.append(market)
+
+        if symbol:
+            filters.append("symbol = %s")
+            params.append(symbol)
+
+        where = f"WHERE {' AND '.join(filters)}" if filters else ""
+
+        return await fetch_one(
+            f"""
+            SELECT {", ".join(DECISION_COLUMNS)}
+            FROM decisions
+            {where}
+            ORDER BY created_at DESC
+            LIMIT 1
+            """,
+            params
+        )
+
+    async def recent(self, limit):
+        return await fetch_all(
+            f"""
+            SELECT {", ".join(DECISION_COLUMNS)}
+            FROM decisions
+            ORDER BY created_at DESC
+            LIMIT %s
+            """,
+            (limit,)
+        )
+
+
+class MongoFrames(OrderBookFrameRepository):
+
+    def __init__(self, collection):
+        self.collection = collection
+
+    async def write_many(self, frames):
+        with translate(PyMongoError):
+            await _insert_new(self.collection, frames)
+
+    async def snapshot_before(self, market, symbol, timestamp):
+        from fastapi_market.timeseries import to_ts
+
+        return await self.collection.find_one(
+            {
+                "meta.market": market,
+                "meta.symbol": symbol,
+                "kind": "snapshot",
+                "ts": {"$lte": to_ts(timestamp)},
+            },
+            sort=[("ts", -1)]
+        )
+
+    async def deltas(self, market, symbol, session, after_seq, start, end):
+        from fastapi_market.timeseries import to_ts
+
+        cursor = self.collection.find({
+            "meta.market": market,
+            "meta.symbol": symbol,
+            "kind": "deltas",
+            "session": session,
+            "first_seq": {"$gt": after_seq},
+            "ts": {"$gte": to_ts(start), "$lte": to_ts(end)},
+        }).sort("first_seq", 1)
+
+        return await cursor.to_list(length=None)
+
+
+class MongoStorage(Storage):
+
+    name = "mongo"
+
+    def __init__(self, database=db):
+        self.db = database
+
+        self.ticks = MongoTicks(database["real_market_ticks"])
+        self.candles = MongoCandles(database["candles"])
+        self.features = self.feature_repository(FEATURE_VERSION)
+        self.regimes = MySQLRegimes(database["market_regimes"])
+        self.decisions = MySQLDecisions()
+        self.frames = MongoFrames(database["crypto_orderbook_frames"])
+
+    def feature_repository(self, version):
+        return MongoFeatures(
+            self.db[feature_collection_name(version)],
+            self.db["feature_state"]
+        )
+
+    async def close(self):
+        await close_pool()
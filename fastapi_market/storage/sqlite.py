@@ -0,0 +1,589 @@
+"""
+Embedded single-node backend: one SQLite database in WAL mode.
+
+For single-box deployments, tests and benchmarks; no external service is
+needed. Every statement runs on one dedicated thread (the connection never
+changes threads), and every write is a single executemany in one
+transaction. WAL lets other processes, such as the Flask regime service,
+read while the engine writes. The latest decisions, meta regime and
+strategy are cached in memory.
+
+    STORAGE_BACKEND=sqlite SQLITE_PATH=aetherion.db uvicorn fastapi_market.main:app
+"""
+
+import asyncio
+import json
+import os
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from fastapi_market.database import FEATURE_VERSION, feature_collection_name
+from fastapi_market.storage.base import (
+    BUCKET_KEY,
+    CANDLE_FIELDS,
+    FEATURE_FIELDS,
+    CandleRepository,
+    DecisionRepository,
+    FeatureRepository,
+    OrderBookFrameRepository,
+    RegimeRepository,
+    Storage,
+    TickRepository,
+    translate,
+)
+
+SQLITE_PATH = os.getenv("SQLITE_PATH", "aetherion.db")
+
+PRAGMAS = (
+    "journal_mode=WAL",
+    "synchronous=NORMAL",
+    "temp_store=MEMORY",
+    "cache_size=-65536",
+    "busy_timeout=5000",
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS real_market_ticks (
+    id TEXT PRIMARY KEY,
+    market_type TEXT NOT NULL,
+    symbol TEXT NOT NULL,
+    price REAL NOT NULL,
+    quantity REAL NOT NULL,
+    side TEXT,
+    exchange_timestamp INTEGER,
+    receive_timestamp INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ticks_market_time
+    ON real_market_ticks (market_type, receive_timestamp);
+
+CREATE TABLE IF NOT EXISTS candles (
+    market TEXT NOT NULL,
+    symbol TEXT NOT NULL,
+    timeframe TEXT NOT NULL,
+    bucket_start INTEGER NOT NULL,
+    open REAL, high REAL, low REAL, close REAL, volume REAL,
+    partial INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (market, symbol, timeframe, bucket_start)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS candles_partial
+    ON candles (timeframe, bucket_start) WHERE partial = 1;
+
+CREATE TABLE IF NOT EXISTS feature_state (
+    id TEXT PRIMARY KEY,
+    market TEXT, symbol TEXT, timeframe TEXT,
+    timestamp INTEGER,
+    closes TEXT, true_ranges TEXT, volumes TEXT,
+    updated_at TEXT
+);
+
+CREATE TABLE IF NOT EXISTS market_regimes (
+    market TEXT, symbol TEXT, timeframe TEXT,
+    regime_state INTEGER,
+    timestamp INTEGER
+);
+
+CREATE TABLE IF NOT EXISTS regime_state (
+    id INTEGER PRIMARY KEY,
+    market TEXT, symbol TEXT, timeframe TEXT,
+    regime TEXT, confidence REAL, state INTEGER,
+    detected_at TEXT
+);
+CREATE INDEX IF NOT EXISTS regime_state_symbol
+    ON regime_state (market, symbol, detected_at);
+
+CREATE TABLE IF NOT EXISTS meta_regime_state (
+    id INTEGER PRIMARY KEY,
+    meta_regime TEXT, confidence REAL,
+    detected_at TEXT
+);
+
+CREATE TABLE IF NOT EXISTS strategy_state (
+    id INTEGER PRIMARY KEY,
+    meta_regime TEXT, strategy TEXT,
+    detected_at TEXT
+);
+
+CREATE TABLE IF NOT EXISTS decisions (
+    id INTEGER PRIMARY KEY,
+    market TEXT, symbol TEXT, meta_regime TEXT, strategy TEXT,
+    action TEXT, confidence REAL,
+    created_at TEXT
+);
+CREATE INDEX IF NOT EXISTS decisions_symbol_created
+    ON decisions (market, symbol, created_at);
+CREATE INDEX IF NOT EXISTS decisions_created ON decisions (created_at);
+
+CREATE TABLE IF NOT EXISTS crypto_orderbook_frames (
+    id TEXT PRIMARY KEY,
+    market TEXT, symbol TEXT, kind TEXT, session TEXT,
+    first_seq INTEGER, last_seq INTEGER,
+    timestamp INTEGER, end_timestamp INTEGER,
+    best_bid REAL, best_ask REAL,
+    updates INTEGER, levels INTEGER, tick INTEGER, lot INTEGER,
+    data BLOB
+);
+CREATE INDEX IF NOT EXISTS frames_lookup
+    ON crypto_orderbook_frames (market, symbol, kind, timestamp);
+"""
+
+_UNSET = object()
+
+
+def _iso(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def _datetime(value):
+    return datetime.fromisoformat(value) if isinstance(value, str) else value
+
+
+class SQLiteDatabase:
+
+    def __init__(self, path=SQLITE_PATH):
+        self.path = path
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sqlite")
+        self.conn = None
+
+    def _connect(self):
+        if self.conn is None:
+            conn = sqlite3.connect(self.path)
+            conn.row_factory = sqlite3.Row
+
+            for pragma in PRAGMAS:
+                conn.execute(f"PRAGMA {pragma}")
+
+            conn.executescript(SCHEMA)
+            self.conn = conn
+
+        return self.conn
+
+    async def run(self, fn, *args):
+        """
+        fn(connection, *args) on the database thread. Shielded: a sink
+        cancelled at shutdown still completes the batch it popped.
+        """
+
+        loop = asyncio.get_running_loop()
+
+        with translate(sqlite3.Error):
+            return await asyncio.shield(loop.run_in_executor(
+                self.executor, lambda: fn(self._connect(), *args)
+            ))
+
+    async def executemany(self, sql, rows):
+        def write(conn):
+            with conn:
+                conn.executemany(sql, rows)
+
+        if rows:
+            await self.run(write)
+
+    async def fetch_all(self, sql, params=()):
+        def read(conn):
+            return [dict(row) for row in conn.execute(sql, params).fetchall()]
+
+        return await self.run(read)
+
+    async def fetch_one(self, sql, params=()):
+        rows = await self.fetch_all(sql, params)
+        return rows[0] if rows else None
+
+    async def close(self):
+        def close(conn):
+            conn.close()
+
+        if self.conn is not None:
+            await self.run(close)
+            self.conn = None
+
+        self.executor.shutdown(wait=True)
+
+
+# =========================================
+# MARKET DATA
+# =========================================
+TICK_COLUMNS = (
+    "market_type", "symbol", "price", "quantity", "side",
+    "exchange_timestamp", "receive_timestamp",
+)
+
+
+class SQLiteTicks(TickRepository):
+
+    def __init__(self, database):
+        self.database = database
+
+    async def write_many(self, ticks):
+        await self.database.executemany(
+            f"INSERT OR IGNORE INTO real_market_ticks (id, {', '.join(TICK_COLUMNS)}) "
+            f"VALUES ({', '.join(['?'] * (len(TICK_COLUMNS) + 1))})",
+            [(str(t["_id"]), *(t[c] for c in TICK_COLUMNS)) for t in ticks]
+        )
+
+    async def latest(self, market, limit):
+        return await self.database.fetch_all(
+            f"SELECT {', '.join(TICK_COLUMNS)} FROM real_market_ticks "
+            "WHERE market_type = ? ORDER BY receive_timestamp DESC LIMIT ?",
+            (market, limit)
+        )
+
+
+class _SQLiteSeries:
+    """
+    One row per bucket in `table`; `timestamp` is bucket_start.
+    """
+
+    fields = ()
+
+    def __init__(self, database, table):
+        self.database = database
+        self.table = table
+        self.columns = BUCKET_KEY + self.fields + ("partial",)
+
+    def _row(self, doc):
+        return tuple(
+            int(bool(doc.get("partial"))) if c == "partial" else doc[c]
+            for c in self.columns
+        )
+
+    async def write_many(self, rows):
+        key = ", ".join(BUCKET_KEY)
+        updates = ", ".join(
+            f"{c} = excluded.{c}" for c in self.columns if c not in BUCKET_KEY
+        )
+
+        await self.database.executemany(
+            f'INSERT INTO "{self.table}" ({", ".join(self.columns)}) '
+            f'VALUES ({", ".join(["?"] * len(self.columns))}) '
+            f"ON CONFLICT ({key}) DO UPDATE SET {updates} "
+            # A replayed partial record never replaces a complete bucket
+            f'WHERE NOT (excluded.partial = 1 AND "{self.table}".partial = 0)',
+            [self._row(doc) for doc in rows]
+        )
+
+    async def series(self, market, symbol, timeframe, start=None, end=None,
+                     limit=None, newest=False):
+
+        sql = (
+            f'SELECT *, bucket_start AS timestamp FROM "{self.table}" '
+            "WHERE market = ? AND symbol = ? AND timeframe = ?"
+        )
+        params = [market, symbol, timeframe]
+
+        if start is not None:
+            sql += " AND bucket_start >= ?"
+            params.append(start)
+        if end is not None:
+            sql += " AND bucket_start < ?"
+            params.append(end)
+
+        sql += f" ORDER BY bucket_start {'DESC' if newest else 'ASC'}"
+
+        if limit:
+            sql += " LIMIT ?"
+            params.append(limit)
+
+        rows = await self.database.fetch_all(sql, params)
+
+        for row in rows:
+            row["partial"] = bool(row["partial"])
+
+        return rows
+
+
+class SQLiteCandles(_SQLiteSeries, CandleRepository):
+
+    fields = CANDLE_FIELDS
+
+    async def partials(self, timeframe, bucket_start):
+        rows = await self.database.fetch_all(
+            "SELECT * FROM candles WHERE partial = 1 AND timeframe = ? AND bucket_start = ?",
+            (timeframe, bucket_start)
+        )
+
+        for row in rows:
+            row["partial"] = True
+
+        return rows
+
+
+class SQLiteFeatures(_SQLiteSeries, FeatureRepository):
+
+    fields = FEATURE_FIELDS + ("created_at",)
+
+    def __init__(self, database, table):
+        super().__init__(database, table)
+        self.ready = False
+
+    def _row(self, doc):
+        return tuple(
+            _iso(value) if isinstance(value, datetime) else value
+            for value in super()._row(doc)
+        )
+
+    async def _ensure_table(self):
+        if self.ready:
+            return
+
+        def create(conn):
+            conn.execute(
+                f'CREATE TABLE IF NOT EXISTS "{self.table}" ('
+                "market TEXT NOT NULL, symbol TEXT NOT NULL, timeframe TEXT NOT NULL, "
+                "bucket_start INTEGER NOT NULL, "
+                + "".join(f"{field} REAL, " for field in FEATURE_FIELDS)
+                + "created_at TEXT, partial INTEGER NOT NULL DEFAULT 0, "
+                "PRIMARY KEY (market, symbol, timeframe, bucket_start)"
+                ") WITHOUT ROWID"
+            )
+
+        await self.database.run(create)
+        self.ready = True
+
+    async def write_many(self, rows):
+        await self._ensure_table()
+        await super().write_many(rows)
+
+    async def series(self, *args, **kwargs):
+        await self._ensure_table()
+        rows = await super().series(*args, **kwargs)
+
+        for row in rows:
+            row["created_at"] = _datetime(row["created_at"])
+
+        return rows
+
+    async def load_state(self):
+        rows = await self.database.fetch_all("SELECT * FROM feature_state")
+
+        return [
+            {
+                **row,
+                "_id": row.pop("id"),
+                "closes": json.loads(row["closes"]),
+                "true_ranges": json.loads(row["true_ranges"]),
+                "volumes": json.loads(row["volumes"]),
+            }
+            for row in rows
+        ]
+
+    async def save_state(self, docs):
+        await self.database.executemany(
+            "INSERT OR REPLACE INTO feature_state "
+            "(id, market, symbol, timeframe, timestamp, closes, true_ranges, volumes, updated_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            [
+                (
+                    d["_id"], d["market"], d["symbol"], d["timeframe"], d["timestamp"],
+                    json.dumps(d["closes"]), json.dumps(d["true_ranges"]),
+                    json.dumps(d["volumes"]), _iso(d["updated_at"]),
+                )
+                for d in docs
+            ]
+        )
+
+
+class SQLiteFrames(OrderBookFrameRepository):
+
+    columns = (
+        "kind", "session", "first_seq", "last_seq", "timestamp", "end_timestamp",
+        "best_bid", "best_ask", "updates", "levels", "tick", "lot", "data",
+    )
+
+    def __init__(self, database):
+        self.database = database
+
+    async def write_many(self, frames):
+        await self.database.executemany(
+            "INSERT OR IGNORE INTO crypto_orderbook_frames "
+            f"(id, market, symbol, {', '.join(self.columns)}) "
+            f"VALUES ({', '.join(['?'] * (len(self.columns) + 3))})",
+            [
+                (
+                    str(f["_id"]), f["meta"]["market"], f["meta"]["symbol"],
+                    *(bytes(f[c]) if c == "data" else f[c] for c in self.columns),
+                )
+                for f in frames
+            ]
+        )
+
+    async def snapshot_before(self, market, symbol, timestamp):
+        return await self.database.fetch_one(
+            "SELECT * FROM crypto_orderbook_frames "
+            "WHERE market = ? AND symbol = ? AND kind = 'snapshot' AND timestamp <= ? "
+            "ORDER BY timestamp DESC LIMIT 1",
+            (market, symbol, timestamp)
+        )
+
+    async def deltas(self, market, symbol, session, after_seq, start, end):
+        return await self.database.fetch_all(
+            "SELECT * FROM crypto_orderbook_frames "
+            "WHERE market = ? AND symbol = ? AND kind = 'deltas' AND session = ? "
+            "AND first_seq > ? AND timestamp >= ? AND timestamp <= ? "
+            "ORDER BY first_seq",
+            (market, symbol, session, after_seq, start, end)
+        )
+
+
+# =========================================
+# REGIMES AND DECISIONS
+# =========================================
+class SQLiteRegimes(RegimeRepository):
+
+    def __init__(self, database):
+        self.database = database
+        self.meta = _UNSET
+        self.strategy = _UNSET
+
+    async def write_predictions(self, rows):
+        await self.database.executemany(
+            "INSERT INTO market_regimes (market, symbol, timeframe, regime_state, timestamp) "
+            "VALUES (?, ?, ?, ?, ?)",
+            [
+                (r["market"], r["symbol"], r["timeframe"], r["regime_state"], r["timestamp"])
+                for r in rows
+            ]
+        )
+
+    async def write_timeframe(self, rows):
+        await self.database.executemany(
+            "INSERT INTO regime_state "
+            "(market, symbol, timeframe, regime, confidence, state, detected_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            [
+                (r["market"], r["symbol"], r["timeframe"], r["regime"],
+                 r["confidence"], r["state"], _iso(r["detected_at"]))
+                for r in rows
+            ]
+        )
+
+    async def write_meta(self, rows):
+        await self.database.executemany(
+            "INSERT INTO meta_regime_state (meta_regime, confidence, detected_at) "
+            "VALUES (?, ?, ?)",
+            [(r["meta_regime"], r["confidence"], _iso(r["detected_at"])) for r in rows]
+        )
+
+        if rows:
+            self.meta = rows[-1]["meta_regime"]
+
+    async def write_strategy(self, rows):
+        await self.database.executemany(
+            "INSERT INTO strategy_state (meta_regime, strategy, detected_at) "
+            "VALUES (?, ?, ?)",
+            [(r["meta_regime"], r["strategy"], _iso(r["detected_at"])) for r in rows]
+        )
+
+        if rows:
+            self.strategy = rows[-1]["strategy"]
+
+    async def recent_timeframe(self, market, symbol, limit):
+        return await self.database.fetch_all(
+            "SELECT timeframe, state FROM regime_state "
+            "WHERE market = ? AND symbol = ? ORDER BY detected_at DESC LIMIT ?",
+            (market, symbol, limit)
+        )
+
+    async def latest_meta(self):
+        if self.meta is _UNSET:
+            row = await self.database.fetch_one(
+                "SELECT meta_regime FROM meta_regime_state ORDER BY detected_at DESC LIMIT 1"
+            )
+            self.meta = row["meta_regime"] if row else None
+
+        return self.meta
+
+    async def latest_strategy(self):
+        if self.strategy is _UNSET:
+            row = await self.database.fetch_one(
+                "SELECT strategy FROM strategy_state ORDER BY detected_at DESC LIMIT 1"
+            )
+            self.strategy = row["strategy"] if row else None
+
+        return self.strategy
+
+
+DECISION_COLUMNS = (
+    "market", "symbol", "meta_regime", "strategy",
+    "action", "confidence", "created_at",
+)
+
+
+class SQLiteDecisions(DecisionRepository):
+
+    def __init__(self, database):
+        self.database = database
+
+        # (market, symbol) filter -> latest matching row
+        self.latest_rows = {}
+
+    async def write_many(self, decisions):
+        await self.database.executemany(
+            f"INSERT INTO decisions ({', '.join(DECISION_COLUMNS)}) "
+            f"VALUES ({', '.join(['?'] * len(DECISION_COLUMNS))})",
+            [tuple(_iso(d[c]) for c in DECISION_COLUMNS) for d in decisions]
+        )
+
+        for decision in decisions:
+            row = {c: decision[c] for c in DECISION_COLUMNS}
+
+            for (market, symbol), current in self.latest_rows.items():
+                if (market in (None, row["market"]) and symbol in (None, row["symbol"])
+                        and (current is None or _iso(row["created_at"]) >= _iso(current["created_at"]))):
+                    self.latest_rows[(market, symbol)] = row
+
+    async def latest(self, market=None, symbol=None):
+        key = (market, symbol)
+
+        if key not in self.latest_rows:
+            filters = [f"{c} = ?" for c, v in (("market", market), ("symbol", symbol)) if v]
+            where = f"WHERE {' AND '.join(filters)}" if filters else ""
+
+            row = await self.database.fetch_one(
+                f"SELECT {', '.join(DECISION_COLUMNS)} FROM decisions {where} "
+                "ORDER BY created_at DESC LIMIT 1",
+                [v for v in (market, symbol) if v]
+            )
+
+            if row:
+                row["created_at"] = _datetime(row["created_at"])
+
+            self.latest_rows[key] = row
+
+        return self.latest_rows[key]
+
+    async def recent(self, limit):
+        rows = await self.database.fetch_all(
+            f"SELECT {', '.join(DECISION_COLUMNS)} FROM decisions "
+            "ORDER BY created_at DESC LIMIT ?",
+            (limit,)
+        )
+
+        for row in rows:
+            row["created_at"] = _datetime(row["created_at"])
+
+        return rows
+
+
+class SQLiteStorage(Storage):
+
+    name = "sqlite"
+
+    def __init__(self, path=SQLITE_PATH):
+        self.database = SQLiteDatabase(path)
+
+        self.ticks = SQLiteTicks(self.database)
+        self.candles = SQLiteCandles(self.database, "candles")
+        self.features = self.feature_repository(FEATURE_VERSION)
+        self.regimes = SQLiteRegimes(self.database)
+        self.decisions = SQLiteDecisions(self.database)
+        self.frames = SQLiteFrames(self.database)
+
+    def feature_repository(self, version):
+        return SQLiteFeatures(self.database, feature_collection_name(version))
+
+    async def open(self):
+        await self.database.run(lambda conn: None)
+
+    async def close(self):
+        await self.database.close()
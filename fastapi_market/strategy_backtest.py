@@ -0,0 +1,403 @@
+"""
+Regime-conditioned strategy backtest over stored candles.
+
+Candles are loaded from the `candles` collection (or rebuilt from the tick
+log with --source ticklog) into columnar arrays, the stored regimes are
+replayed into a strategy per bar, and every strategy is simulated with
+PositionEngine ATR sizing and proportional fees:
+
+    python -m fastapi_market.strategy_backtest --market CRYPTO --timeframe 1m \\
+        --workers 4 --out report.json --curves curves/
+"""
+
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from fastapi_market.candle_engine import TIMEFRAMES as CANDLE_TIMEFRAMES
+from fastapi_market.decision_backtest import (
+    DEFAULT_TIMEFRAMES,
+    fetch_regimes,
+    asof_observations,
+    state_codes,
+    replay
+)
+from fastapi_market.decision_engine import STRATEGY_ACTION_MAP
+from fastapi_market.feature_engine import WINDOW_SIZE
+from fastapi_market.feature_kernels import rolling_atr, aggregate_candles
+from fastapi_market.position_engine import PositionEngine
+from fastapi_market.regime_batch import STRATEGIES
+from fastapi_market.regime_stability import STABILITY_WINDOW, MIN_CONFIRMATIONS
+from fastapi_market.tick_log import tick_log
+
+_ACTION_SIGN = {"BUY": 1, "SELL": -1, "HOLD": 0}
+
+# STRATEGY_ACTION_MAP only names the generic strategies; the directional
+# variants StrategyEngine emits are spelled out here.
+STRATEGY_DIRECTION = {
+    "TrendFollowingLong": 1,
+    "TrendFollowingShort": -1,
+    "DipBuying": 1,
+    "RallySelling": -1,
+    "MeanReversion": _ACTION_SIGN[STRATEGY_ACTION_MAP["MeanReversion"]],
+    "RiskOff": 0,
+    "Neutral": _ACTION_SIGN[STRATEGY_ACTION_MAP["Neutral"]],
+}
+
+# Position follows whichever strategy the regime selects
+REGIME_PORTFOLIO = "RegimeSwitching"
+
+CANDLE_FIELDS = ("timestamp", "open", "high", "low", "close", "volume")
+
+DEFAULT_RISK_CONFIG = {
+    "total_capital": 100000.0,
+    "risk_per_trade": 0.02,
+    "atr_multiplier": 1.5,
+}
+
+DEFAULT_FEE_BPS = 10.0
+
+
+# =========================================
+# LOADING
+# =========================================
+def load_candles(db, market, symbol, timeframe, start=None, end=None,
+                 batch_size=50_000):
+    """
+    Columnar candle arrays for one series, ordered by bucket start.
+    Repeated buckets keep the last stored row.
+    """
+
+    query = {"market": market, "symbol": symbol, "timeframe": timeframe}
+
+    time_filter = {}
+    if start is not None:
+        time_filter["$gte"] = start
+    if end is not None:
+        time_filter["$lt"] = end
+    if time_filter:
+        query["timestamp"] = time_filter
+
+    projection = {"_id": 0, **{field: 1 for field in CANDLE_FIELDS}}
+
+    cursor = (
+        db["candles"]
+        .find(query, projection)
+        .sort("timestamp", 1)
+        .batch_size(batch_size)
+    )
+
+    rows = np.array(
+        [tuple(doc[field] for field in CANDLE_FIELDS) for doc in cursor],
+        dtype=np.float64
+    ).reshape(-1, len(CANDLE_FIELDS))
+
+    candles = {field: rows[:, i] for i, field in enumerate(CANDLE_FIELDS)}
+    candles["timestamp"] = candles["timestamp"].astype(np.int64)
+
+    ts = candles["timestamp"]
+    keep = np.append(ts[1:] != ts[:-1], True) if len(ts) else ts.astype(bool)
+
+    return {field: column[keep] for field, column in candles.items()}
+
+
+def regime_strategies(db, market, symbol, candles, timeframe,
+                      regime_timeframes=DEFAULT_TIMEFRAMES, state_labels=None,
+                      window=STABILITY_WINDOW,
+                      min_confirmations=MIN_CONFIRMATIONS):
+    """
+    Strategy code per candle, decided at candle close from the regimes
+    available at that moment.
+    """
+
+    regimes = fetch_regimes(db, market, symbol, regime_timeframes)
+    raw_codes, labels = state_codes([regimes], state_labels)
+
+    close_time = candles["timestamp"] + CANDLE_TIMEFRAMES[timeframe]
+    obs = asof_observations(regimes, close_time, raw_codes, regime_timeframes)
+
+    _, _, strategy = replay(
+        obs,
+        close_time * 1000,
+        regime_timeframes,
+        labels,
+        window,
+        min_confirmations
+    )
+
+    return strategy
+
+
+# =========================================
+# SIMULATION
+# =========================================
+def simulate(candles, strategy, risk_config=DEFAULT_RISK_CONFIG,
+             fee_bps=DEFAULT_FEE_BPS, atr_window=WINDOW_SIZE):
+    """
+    Simulate every strategy (plus the regime-switching portfolio) at once.
+
+    A strategy holds direction * ATR-sized units while the regime selects it
+    and is flat otherwise. Positions are set at the close of bar t and earn
+    the move to bar t + 1; fees are charged on traded notional.
+
+    Returns (names, stats, curves) with curves of shape (len(names), bars).
+    """
+
+    close = candles["close"]
+    capital = float(risk_config["total_capital"])
+
+    atr = rolling_atr(candles["high"], candles["low"], close, atr_window)
+    size = PositionEngine.size_positions(close, atr, risk_config)["position_size"]
+
+    direction = np.array(
+        [STRATEGY_DIRECTION.get(name, 0) for name in STRATEGIES],
+        dtype=np.float64
+    )
+
+    active = strategy[None, :] == np.arange(len(STRATEGIES))[:, None]
+
+    directions = np.vstack([
+        direction[:, None] * active,
+        direction[strategy][None, :]
+    ])
+    names = STRATEGIES + [REGIME_PORTFOLIO]
+
+    units = directions * size[None, :]
+
+    pnl = np.zeros_like(units)
+    pnl[:, 1:] = units[:, :-1] * np.diff(close)[None, :]
+
+    traded = np.abs(np.diff(units, axis=1, prepend=0.0)) * close[None, :]
+    fees = traded * (fee_bps / 10_000)
+
+    equity = capital + np.cumsum(pnl - fees, axis=1)
+    peak = np.maximum.accumulate(equity, axis=1)
+    drawdown = equity / peak - 1.0
+
+    stats = {}
+    for i, name in enumerate(names):
+        if len(close) == 0:
+            break
+
+        stats[name] = {
+            "final_equity": float(equity[i, -1]),
+            "total_return": float(equity[i, -1] / capital - 1.0),
+            "max_drawdown": float(drawdown[i].min()),
+            "turnover": float(traded[i].sum() / capital),
+            "trades": int(np.count_nonzero(traded[i])),
+            "fees": float(fees[i].sum()),
+            "exposure": float(np.count_nonzero(units[i]) / len(close)),
+        }
+
+    return names, stats, {"equity": equity, "drawdown": drawdown}
+
+
+# =========================================
+# UNIVERSE RUN
+# =========================================
+def load_tick_candles(market, symbol, timeframe, start=None, end=None):
+    """
+    Candles rebuilt from the memory-mapped tick log.
+    """
+
+    ticks = tick_log.read(market, symbol, start, end)
+
+    return aggregate_candles(
+        ticks["receive_timestamp"],
+        ticks["price"],
+        ticks["quantity"],
+        CANDLE_TIMEFRAMES[timeframe]
+    )
+
+
+_worker_db = None
+
+
+def _init_worker(mongo_uri, db_name):
+    from pymongo import MongoClient
+
+    global _worker_db
+    _worker_db = MongoClient(mongo_uri)[db_name]
+
+
+def _run_symbol(task):
+
+    if task["source"] == "ticklog":
+        candles = load_tick_candles(
+            task["market"],
+            task["symbol"],
+            task["timeframe"],
+            task["start"],
+            task["end"]
+        )
+    else:
+        candles = load_candles(
+            _worker_db,
+            task["market"],
+            task["symbol"],
+            task["timeframe"],
+            task["start"],
+            task["end"]
+        )
+
+    if len(candles["close"]) < 2:
+        return task["symbol"], None
+
+    strategy = regime_strategies(
+        _worker_db,
+        task["market"],
+        task["symbol"],
+        candles,
+        task["timeframe"],
+        state_labels=task["state_labels"]
+    )
+
+    names, stats, curves = simulate(
+        candles,
+        strategy,
+        task["risk_config"],
+        task["fee_bps"]
+    )
+
+    if task["curves_dir"]:
+        path = os.path.join(
+            task["curves_dir"],
+            f"{task['market']}_{task['symbol']}_{task['timeframe']}.npz"
+                .replace(":", "_")
+        )
+        np.savez_compressed(
+            path,
+            timestamp=candles["timestamp"],
+            names=np.array(names),
+            **curves
+        )
+
+    return task["symbol"], {"bars": len(candles["close"]), "strategies": stats}
+
+
+def run_universe(mongo_uri, db_name, market, timeframe, symbols=None,
+                 start=None, end=None, risk_config=DEFAULT_RISK_CONFIG,
+                 fee_bps=DEFAULT_FEE_BPS, state_labels=None, curves_dir=None,
+                 workers=None, source="mongo"):
+    """
+    Backtest every symbol of a market/timeframe, one process per symbol.
+    """
+
+    if symbols is None and source == "ticklog":
+        symbols = tick_log.symbols(market)
+
+    elif symbols is None:
+        from pymongo import MongoClient
+
+        symbols = sorted(
+            MongoClient(mongo_uri)[db_name]["candles"].distinct(
+                "symbol", {"market": market, "timeframe": timeframe}
+            )
+        )
+
+    if curves_dir:
+        os.makedirs(curves_dir, exist_ok=True)
+
+    tasks = [
+        {
+            "market": market,
+            "symbol": symbol,
+            "timeframe": timeframe,
+            "start": start,
+            "end": end,
+            "risk_config": risk_config,
+            "fee_bps": fee_bps,
+            "state_labels": state_labels,
+            "curves_dir": curves_dir,
+            "source": source
+        }
+        for symbol in symbols
+    ]
+
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_worker,
+        initargs=(mongo_uri, db_name)
+    ) as pool:
+        results = dict(pool.map(_run_symbol, tasks))
+
+    return {symbol: r for symbol, r in results.items() if r is not None}
+
+
+# =========================================
+# CLI
+# =========================================
+def main():
+    from dotenv import load_dotenv
+
+    load_dotenv()
+
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--market", default="CRYPTO")
+    parser.add_argument("--timeframe", default="1m", choices=list(CANDLE_TIMEFRAMES))
+    parser.add_argument("--symbols", help="comma separated; default: all stored")
+    parser.add_argument("--start", type=int, help="epoch ms, inclusive")
+    parser.add_argument("--end", type=int, help="epoch ms, exclusive")
+    parser.add_argument("--labels", help='JSON state labels, e.g. {"0": "BULL"}')
+    parser.add_argument("--capital", type=float, default=DEFAULT_RISK_CONFIG["total_capital"])
+    parser.add_argument("--risk-per-trade", type=float, default=DEFAULT_RISK_CONFIG["risk_per_trade"])
+    parser.add_argument("--atr-multiplier", type=float, default=DEFAULT_RISK_CONFIG["atr_multiplier"])
+    parser.add_argument("--fee-bps", type=float, default=DEFAULT_FEE_BPS)
+    parser.add_argument("--source", default="mongo", choices=["mongo", "ticklog"])
+    parser.add_argument("--workers", type=int)
+    parser.add_argument("--curves", help="directory for per-symbol equity curves (.npz)")
+    parser.add_argument("--out", help="write the report as JSON")
+    args = parser.parse_args()
+
+    state_labels = {
+        int(k): v for k, v in json.loads(args.labels).items()
+    } if args.labels else None
+
+    started = time.perf_counter()
+
+    report = run_universe(
+        os.getenv("MONGO_URI", "mongodb://localhost:27017"),
+        os.getenv("MONGO_DB_NAME", "aetherion"),
+        args.market.upper(),
+        args.timeframe,
+        symbols=args.symbols.upper().split(",") if args.symbols else None,
+        start=args.start,
+        end=args.end,
+        risk_config={
+            "total_capital": args.capital,
+            "risk_per_trade": args.risk_per_trade,
+            "atr_multiplier": args.atr_multiplier,
+        },
+        fee_bps=args.fee_bps,
+        state_labels=state_labels,
+        curves_dir=args.curves,
+        workers=args.workers,
+        source=args.source
+    )
+
+    bars = sum(r["bars"] for r in report.values())
+    print(
+        f"📊 {len(report)} symbols, {bars} bars "
+        f"in {time.perf_counter() - started:.2f}s"
+    )
+
+    for symbol, result in report.items():
+        for name, s in result["strategies"].items():
+            print(
+                f"{symbol:<14} {name:<20} "
+                f"return={s['total_return']:+.2%} "
+                f"maxDD={s['max_drawdown']:.2%} "
+                f"turnover={s['turnover']:.1f}x trades={s['trades']}"
+            )
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
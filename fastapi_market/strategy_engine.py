@@ -1,3 +1,14 @@
+STRATEGY_MAP = {
+    "TRENDING_BULL": "TrendFollowingLong",
+    "TRENDING_BEAR": "TrendFollowingShort",
+    "PULLBACK_IN_UPTREND": "DipBuying",
+    "PULLBACK_IN_DOWNTREND": "RallySelling",
+    "RANGE_BOUND": "MeanReversion",
+    "HIGH_VOL_RISK_OFF": "RiskOff",
+    "MIXED_CONDITION": "Neutral"
+}
+
+
 class StrategyEngine:
 
     def __init__(self):
@@ -10,17 +21,7 @@ class StrategyEngine:
 
         meta_regime = meta_regime_data.get("meta_regime")
 
-        strategy_map = {
-            "TRENDING_BULL": "TrendFollowingLong",
-            "TRENDING_BEAR": "TrendFollowingShort",
-            "PULLBACK_IN_UPTREND": "DipBuying",
-            "PULLBACK_IN_DOWNTREND": "RallySelling",
-            "RANGE_BOUND": "MeanReversion",
-            "HIGH_VOL_RISK_OFF": "RiskOff",
-            "MIXED_CONDITION": "Neutral"
-        }
-
-        selected = strategy_map.get(meta_regime, "Neutral")
+        selected = STRATEGY_MAP.get(meta_regime, "Neutral")
 
         if selected != self.current_strategy:
             print(f"🎯 Strategy Switched → {selected}")
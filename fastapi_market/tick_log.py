@@ -0,0 +1,401 @@
+"""
+Append-only columnar tick log on local disk; the primary store for raw
+trades (Mongo receives them afterwards through mongo_sink).
+
+One directory per market/symbol/UTC day (by receive time), holding one
+fixed-width file per column:
+
+    <TICK_LOG_DIR>/CRYPTO/BTCUSDT/2026-10-19/receive_timestamp.i8
+                                             exchange_timestamp.i8
+                                             price.f8
+                                             quantity.f8
+                                             side.i1
+
+save_tick appends to an in-memory buffer. A buffer that reaches FLUSH_ROWS
+ticks, and every buffer each FLUSH_INTERVAL_SECONDS (flush_loop), is handed
+to a worker thread that writes the buffers out in order, so the event loop
+never touches the disk. A failed write is counted and retried on the next
+flush; up to MAX_PENDING_ROWS rows wait for the disk before the oldest are
+dropped (Mongo still receives every tick through mongo_sink). Each write
+holds an flock on the day's .lock file, so a backfill process appending to
+the same day as the running engine can't interleave rows. Readers map
+the files with numpy.memmap, so candle rebuilds, backfills and backtests
+scan ticks without decoding BSON:
+
+    ticks = tick_log.read("CRYPTO", "BTCUSDT", start, end)
+"""
+
+import asyncio
+import fcntl
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+
+import numpy as np
+
+from fastapi_market.trade_buffer import SIDES
+
+TICK_LOG_DIR = os.getenv("TICK_LOG_DIR", "tick_log")
+
+FLUSH_ROWS = 1024
+DAY_MS = 86_400_000
+FLUSH_INTERVAL_SECONDS = 1.0
+MAX_PENDING_ROWS = 1_000_000
+
+COLUMNS = {
+    "receive_timestamp": np.dtype(np.int64),
+    "exchange_timestamp": np.dtype(np.int64),
+    "price": np.dtype(np.float64),
+    "quantity": np.dtype(np.float64),
+    "side": np.dtype(np.int8),
+}
+
+SIDE_CODES = {side: code for code, side in enumerate(SIDES)}
+
+
+def day_of(ms):
+    return datetime.fromtimestamp(ms / 1000, tz=timezone.utc).strftime("%Y-%m-%d")
+
+
+def _safe(name):
+    # NASDAQ:TSLA -> NASDAQ_TSLA
+    return name.replace(":", "_").replace("/", "_")
+
+
+def column_file(directory, column):
+    return os.path.join(directory, f"{column}.{COLUMNS[column].str[1:]}")
+
+
+class TickLog:
+
+    def __init__(self, root=TICK_LOG_DIR, flush_rows=FLUSH_ROWS):
+        self.root = root
+        self.flush_rows = flush_rows
+
+        # (market, symbol, day) -> {column: [values]}
+        self.buffers = {}
+
+        # Full buffers waiting for the writer thread, oldest first
+        self.ready = deque()
+        self.writer = None
+
+        # One writer at a time, so buffers reach the files in order
+        self.lock = threading.Lock()
+
+        self.stats = {
+            "appended": 0,
+            "written": 0,
+            "flushes": 0,
+            "errors": 0,
+            "dropped": 0,
+            "last_error": None,
+        }
+
+    def directory(self, market, symbol, day):
+        return os.path.join(self.root, market, _safe(symbol), day)
+
+    # =========================================
+    # WRITING
+    # =========================================
+    def append(self, tick):
+        key = (tick["market_type"], tick["symbol"], day_of(tick["receive_timestamp"]))
+        buffer = self.buffers.get(key)
+
+        if buffer is None:
+            buffer = self.buffers[key] = {column: [] for column in COLUMNS}
+
+        buffer["receive_timestamp"].append(tick["receive_timestamp"])
+        buffer["exchange_timestamp"].append(tick["exchange_timestamp"] or 0)
+        buffer["price"].append(tick["price"])
+        buffer["quantity"].append(tick["quantity"])
+        buffer["side"].append(SIDE_CODES.get(tick["side"], 1))
+
+        self.stats["appended"] += 1
+
+        if len(buffer["price"]) >= self.flush_rows:
+            self._hand_off(key)
+
+    def append_columns(self, market, symbol, columns):
+        """
+        Bulk append for backfills: {column: array} in receive_timestamp
+        order. Rows at or before a day's last logged tick are skipped, so
+        re-running a backfill doesn't duplicate ticks. Returns rows written.
+        """
+
+        ts = np.asarray(columns["receive_timestamp"], dtype=np.int64)
+        days = ts // DAY_MS
+        bounds = np.r_[np.flatnonzero(np.r_[True, days[1:] != days[:-1]]), len(ts)]
+
+        written = 0
+
+        for lo, hi in zip(bounds[:-1].tolist(), bounds[1:].tolist()):
+            key = (market, symbol, day_of(int(ts[lo])))
+
+            if key in self.buffers:
+                self.ready.append((key, self.buffers.pop(key)))
+                self._drain()
+
+            written += self._write_arrays(
+                key,
+                {column: values[lo:hi] for column, values in columns.items()},
+                after_logged=True
+            )
+
+        return written
+
+    def _hand_off(self, key):
+        self.ready.append((key, self.buffers.pop(key)))
+
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # Scripts without an event loop write inline
+            self._drain()
+            return
+
+        if self.writer is None or self.writer.done():
+            self.writer = loop.create_task(asyncio.to_thread(self._drain))
+
+    def _drain(self):
+        """
+        Write the ready buffers oldest first. Runs in a worker thread (or
+        inline without a loop); errors are counted, never raised, and the
+        failed buffer stays first in line for the next flush.
+        """
+
+        with self.lock:
+            while self.ready:
+                key, buffer = self.ready[0]
+
+                try:
+                    self._write_arrays(key, buffer)
+
+                except OSError as e:
+                    self.stats["errors"] += 1
+                    self.stats["last_error"] = f"{time.strftime('%H:%M:%S')} {e!r}"
+                    print(f"❌ Tick log write error: {e}")
+
+                    self._trim_ready()
+                    return
+
+                self.ready.popleft()
+
+    def _trim_ready(self):
+        pending = sum(len(buffer["price"]) for _, buffer in self.ready)
+
+        while pending > MAX_PENDING_ROWS and self.ready:
+            _, buffer = self.ready.popleft()
+            pending -= len(buffer["price"])
+            self.stats["dropped"] += len(buffer["price"])
+
+    def _write_arrays(self, key, buffer, after_logged=False):
+        """
+        Append one buffer to its day's column files and return the rows
+        written. With after_logged, rows at or before the day's last logged
+        tick are skipped, checked under the same lock as the append.
+        """
+
+        rows = len(buffer["price"])
+
+        if not rows:
+            return 0
+
+        directory = self.directory(*key)
+        os.makedirs(directory, exist_ok=True)
+
+        # Original symbol, since directory names are sanitized
+        name_file = os.path.join(os.path.dirname(directory), "symbol")
+        if not os.path.exists(name_file):
+            with open(name_file, "w") as f:
+                f.write(key[1])
+
+        with open(os.path.join(directory, ".lock"), "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+
+            # Another process may have appended (or torn a write) since
+            # this one last looked, so align from the sizes on disk each time
+            self._align(directory)
+            before = self._rows(directory)
+
+            if after_logged and before:
+                last = np.fromfile(
+                    column_file(directory, "receive_timestamp"),
+                    dtype=COLUMNS["receive_timestamp"],
+                    count=1,
+                    offset=(before - 1) * COLUMNS["receive_timestamp"].itemsize
+                )[0]
+                skip = int(np.searchsorted(
+                    np.asarray(buffer["receive_timestamp"], dtype=np.int64), last, side="right"
+                ))
+                buffer = {column: values[skip:] for column, values in buffer.items()}
+                rows -= skip
+
+                if not rows:
+                    return 0
+
+            # Every column is appended; a crash between files leaves some
+            # columns longer, which readers trim to the shortest and _align
+            # cuts back before the next append
+            try:
+                for column, dtype in COLUMNS.items():
+                    with open(column_file(directory, column), "ab") as f:
+                        f.write(np.asarray(buffer[column], dtype=dtype).tobytes())
+
+            except OSError:
+                # Cut the columns written before the failure back, so the
+                # retry appends the whole buffer once
+                try:
+                    self._truncate(directory, before)
+                except OSError:
+                    pass
+
+                raise
+
+        self.stats["written"] += rows
+        self.stats["flushes"] += 1
+
+        return rows
+
+    def _align(self, directory):
+        """
+        Truncate every column file to the rows all of them hold, so rows
+        appended after a torn write line up across columns again.
+        """
+
+        self._truncate(directory, self._rows(directory))
+
+    def _rows(self, directory):
+        """
+        Complete rows in a day directory (the shortest column).
+        """
+
+        return min(
+            os.path.getsize(column_file(directory, column)) // dtype.itemsize
+            if os.path.exists(column_file(directory, column)) else 0
+            for column, dtype in COLUMNS.items()
+        )
+
+    def _truncate(self, directory, rows):
+        for column, dtype in COLUMNS.items():
+            path = column_file(directory, column)
+
+            if os.path.exists(path) and os.path.getsize(path) > rows * dtype.itemsize:
+                os.truncate(path, rows * dtype.itemsize)
+
+    def _ready_all(self):
+        for key in list(self.buffers):
+            self.ready.append((key, self.buffers.pop(key)))
+
+    def flush(self):
+        """
+        Write everything buffered now, on this thread (shutdown, scripts).
+        """
+
+        self._ready_all()
+        self._drain()
+
+    async def flush_async(self):
+        self._ready_all()
+        await asyncio.to_thread(self._drain)
+
+    async def flush_loop(self, interval=FLUSH_INTERVAL_SECONDS):
+        while True:
+            await asyncio.sleep(interval)
+            await self.flush_async()
+
+    # =========================================
+    # READING
+    # =========================================
+    def symbols(self, market):
+        path = os.path.join(self.root, market)
+
+        if not os.path.isdir(path):
+            return []
+
+        symbols = []
+        for entry in sorted(os.listdir(path)):
+            # No name file yet (e.g. a crash right after makedirs)
+            try:
+                with open(os.path.join(path, entry, "symbol")) as f:
+                    symbols.append(f.read())
+            except (FileNotFoundError, NotADirectoryError):
+                continue
+
+        return symbols
+
+    def days(self, market, symbol, start=None, end=None):
+        path = os.path.join(self.root, market, _safe(symbol))
+
+        if not os.path.isdir(path):
+            return []
+
+        first = day_of(start) if start is not None else None
+        last = day_of(end - 1) if end is not None else None
+
+        return [
+            day for day in sorted(os.listdir(path))
+            if day != "symbol"
+            and (first is None or day >= first) and (last is None or day <= last)
+        ]
+
+    def open_day(self, market, symbol, day):
+        """
+        {column: read-only memmap} for one day, trimmed to complete rows.
+        """
+
+        directory = self.directory(market, symbol, day)
+        rows = self._rows(directory)
+
+        if rows == 0:
+            return {column: np.empty(0, dtype=dtype) for column, dtype in COLUMNS.items()}
+
+        return {
+            column: np.memmap(
+                column_file(directory, column),
+                dtype=dtype,
+                mode="r",
+                shape=(rows,)
+            )
+            for column, dtype in COLUMNS.items()
+        }
+
+    def read(self, market, symbol, start=None, end=None):
+        """
+        Ticks with start <= receive_timestamp < end (epoch ms) as columns.
+        A single day is returned as memmap slices (no copy); ranges
+        spanning days are concatenated.
+        """
+
+        parts = []
+
+        for day in self.days(market, symbol, start, end):
+            columns = self.open_day(market, symbol, day)
+            ts = columns["receive_timestamp"]
+
+            lo = np.searchsorted(ts, start) if start is not None else 0
+            hi = np.searchsorted(ts, end) if end is not None else len(ts)
+
+            if hi > lo:
+                parts.append({column: values[lo:hi] for column, values in columns.items()})
+
+        if len(parts) == 1:
+            return parts[0]
+
+        return {
+            column: np.concatenate([p[column] for p in parts]) if parts
+            else np.empty(0, dtype=dtype)
+            for column, dtype in COLUMNS.items()
+        }
+
+    def status(self):
+        return {
+            "root": self.root,
+            "buffered": sum(len(b["price"]) for b in self.buffers.values()),
+            "pending_write": sum(len(b["price"]) for _, b in self.ready),
+            **self.stats
+        }
+
+
+tick_log = TickLog()
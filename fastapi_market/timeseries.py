@@ -0,0 +1,519 @@
+"""
+Time-series storage, retention and compaction.
+
+Raw trades and order book data live in native time-series collections
+(timeField "ts", metaField "meta" = {market, symbol}) that expire after
+RAW_RETENTION_DAYS. Candles and features stay regular collections, because
+they are queried and upserted by key. Instead they carry a "ts" date with
+partial TTL indexes per timeframe (TIMEFRAME_RETENTION_DAYS). Timeframes
+that are not listed are kept forever.
+
+Before raw data expires, compaction rolls it into 1-minute aggregates
+(trade_bars_1m, orderbook_bars_1m) that are kept. It works through
+COMPACTION_CHUNK_MS windows and records its progress after each one.
+Order book bars take the best bid/ask from a maintained book: the frames
+carry it, and legacy raw depth diffs are replayed into a book first (the
+first level of a diff is not the top of book).
+
+    python -m fastapi_market.timeseries --migrate   # convert existing data
+    python -m fastapi_market.timeseries --compact   # one compaction pass
+    python -m fastapi_market.timeseries --stats
+"""
+
+import argparse
+import asyncio
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+
+from pymongo import ReplaceOne
+
+from fastapi_market.database import db
+
+_DAY_SECONDS = 86_400
+
+RAW_RETENTION_DAYS = 7
+
+TIMEFRAME_RETENTION_DAYS = {
+    "candles": {"1m": 90},
+    "market_features": {"1m": 90},
+}
+
+TIME_SERIES = {
+    "real_market_ticks": {"granularity": "seconds"},
+    "crypto_orderbooks": {"granularity": "seconds"},
+    "crypto_orderbook_frames": {"granularity": "seconds"},
+}
+
+COMPACTION_INTERVAL_SECONDS = 3600
+
+# Compact this long before the TTL monitor can delete anything
+COMPACTION_LEAD_DAYS = 1
+
+# One aggregation per window, so the first run doesn't scan all history at once
+COMPACTION_CHUNK_MS = 6 * 3600 * 1000
+
+# Raw depth diffs replayed before a window so its book is already built
+BOOK_WARMUP_MS = 10 * 60_000
+
+COPY_BATCH_SIZE = 5000
+
+
+def to_ts(ms):
+    return datetime.fromtimestamp(ms / 1000, tz=timezone.utc)
+
+
+def from_ts(value):
+    # Motor returns naive UTC datetimes
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+
+    return int(value.timestamp() * 1000)
+
+
+def time_series_doc(doc):
+    """
+    Trade or order book document with the time-series fields added.
+    """
+
+    return {
+        **doc,
+        "ts": to_ts(doc["receive_timestamp"]),
+        "meta": {"market": doc["market_type"], "symbol": doc["symbol"]}
+    }
+
+
+def ttl_indexes(collection):
+    """
+    Partial TTL index specs for the index registry.
+    """
+
+    return [
+        {
+            "name": f"ts_ttl_{timeframe}",
+            "keys": [("ts", 1)],
+            "options": {
+                "expireAfterSeconds": days * _DAY_SECONDS,
+                "partialFilterExpression": {"timeframe": timeframe},
+            },
+        }
+        for timeframe, days in TIMEFRAME_RETENTION_DAYS.get(collection, {}).items()
+    ]
+
+
+# =========================================
+# COLLECTIONS
+# =========================================
+async def collection_options(name, database=db):
+    """
+    Collection options, {} for a regular collection, None if missing.
+    """
+
+    async for info in await database.list_collections(filter={"name": name}):
+        return info.get("options", {})
+
+    return None
+
+
+async def create_time_series(name, database=db):
+    await database.create_collection(
+        name,
+        timeseries={
+            "timeField": "ts",
+            "metaField": "meta",
+            "granularity": TIME_SERIES[name]["granularity"],
+        },
+        expireAfterSeconds=RAW_RETENTION_DAYS * _DAY_SECONDS
+    )
+
+
+async def ensure_time_series(database=db):
+    """
+    Create missing time-series collections and keep their retention in
+    sync. Existing regular collections are left for --migrate.
+    """
+
+    expire = RAW_RETENTION_DAYS * _DAY_SECONDS
+
+    for name in TIME_SERIES:
+        options = await collection_options(name, database)
+
+        if options is None:
+            await create_time_series(name, database)
+
+        elif "timeseries" not in options:
+            print(f"⚠️ {name} is a regular collection; run python -m fastapi_market.timeseries --migrate")
+
+        elif options.get("expireAfterSeconds") != expire:
+            await database.command("collMod", name, expireAfterSeconds=expire)
+
+
+# =========================================
+# MIGRATION
+# =========================================
+async def migrate_collection(name, database=db):
+    """
+    Move a regular collection into a new time-series one of the same name.
+    The original is kept as <name>_legacy. Run with ingestion stopped.
+    """
+
+    options = await collection_options(name, database)
+
+    if options is not None and "timeseries" in options:
+        print(f"✅ {name} is already a time-series collection")
+        return 0
+
+    legacy = f"{name}_legacy"
+
+    if options is not None:
+        await database[name].rename(legacy)
+
+    await create_time_series(name, database)
+
+    if options is None:
+        return 0
+
+    copied = 0
+    skipped = 0
+    batch = []
+
+    async for doc in database[legacy].find().batch_size(COPY_BATCH_SIZE):
+        received = doc.get("receive_timestamp") or doc.get("exchange_timestamp")
+
+        # Documents without a time or a symbol can't be placed in a series
+        if received is None or "market_type" not in doc or "symbol" not in doc:
+            skipped += 1
+            continue
+
+        batch.append(time_series_doc({**doc, "receive_timestamp": received}))
+
+        if len(batch) == COPY_BATCH_SIZE:
+            await database[name].insert_many(batch, ordered=False)
+            copied += len(batch)
+            batch = []
+
+    if batch:
+        await database[name].insert_many(batch, ordered=False)
+        copied += len(batch)
+
+    print(f"📦 {name}: copied {copied} documents, skipped {skipped}, original kept as {legacy}")
+    return copied
+
+
+async def backfill_ts(name, database=db):
+    """
+    Add the "ts" date the TTL indexes need to existing candles/features.
+    """
+
+    result = await database[name].update_many(
+        {"ts": {"$exists": False}},
+        [{"$set": {"ts": {"$toDate": "$timestamp"}}}]
+    )
+
+    print(f"📦 {name}: added ts to {result.modified_count} documents")
+    return result.modified_count
+
+
+async def migrate(database=db):
+    for name in TIME_SERIES:
+        await migrate_collection(name, database)
+
+    for name in TIMEFRAME_RETENTION_DAYS:
+        await backfill_ts(name, database)
+
+
+# =========================================
+# COMPACTION
+# =========================================
+def _minute(field="$ts"):
+    return {"$dateTrunc": {"date": field, "unit": "minute"}}
+
+
+def _trade_bars(start, end):
+    return [
+        {"$match": {"ts": {"$gte": start, "$lt": end}}},
+        {"$sort": {"ts": 1}},
+        {"$group": {
+            "_id": {
+                "market": "$meta.market",
+                "symbol": "$meta.symbol",
+                "ts": _minute(),
+            },
+            "open": {"$first": "$price"},
+            "high": {"$max": "$price"},
+            "low": {"$min": "$price"},
+            "close": {"$last": "$price"},
+            "volume": {"$sum": "$quantity"},
+            "buy_volume": {"$sum": {
+                "$cond": [{"$eq": ["$side", "BUY"]}, "$quantity", 0]
+            }},
+            "notional": {"$sum": {"$multiply": ["$price", "$quantity"]}},
+            "trades": {"$sum": 1},
+        }},
+        {"$set": {
+            "market": "$_id.market",
+            "symbol": "$_id.symbol",
+            "ts": "$_id.ts",
+            "timestamp": {"$toLong": "$_id.ts"},
+        }},
+        {"$merge": {"into": "trade_bars_1m", "on": "_id", "whenMatched": "replace"}},
+    ]
+
+
+def _frame_bars(start, end):
+    # Frames already carry the book's best bid/ask
+    return [
+        {"$match": {"ts": {"$gte": start, "$lt": end}}},
+        *_book_bars(),
+    ]
+
+
+def _book_bars():
+    return [
+        {"$set": {"spread": {"$subtract": ["$best_ask", "$best_bid"]}}},
+        {"$sort": {"ts": 1}},
+        {"$group": {
+            "_id": {
+                "market": "$meta.market",
+                "symbol": "$meta.symbol",
+                "ts": _minute(),
+            },
+            "best_bid": {"$last": "$best_bid"},
+            "best_ask": {"$last": "$best_ask"},
+            "avg_spread": {"$avg": "$spread"},
+            "max_spread": {"$max": "$spread"},
+            "snapshots": {"$sum": 1},
+        }},
+        {"$set": {
+            "market": "$_id.market",
+            "symbol": "$_id.symbol",
+            "ts": "$_id.ts",
+            "timestamp": {"$toLong": "$_id.ts"},
+        }},
+        {"$merge": {"into": "orderbook_bars_1m", "on": "_id", "whenMatched": "replace"}},
+    ]
+
+
+class TopOfBook:
+    """
+    Book kept from raw depth diffs, with the best bid and ask updated
+    incrementally; the full side is only rescanned when the best level
+    is removed.
+    """
+
+    def __init__(self):
+        from fastapi_market.market_stream import OrderBookView
+
+        self.view = OrderBookView()
+        self.best_bid = None
+        self.best_ask = None
+
+    def apply(self, bids, asks):
+        self.view.apply(bids, asks)
+
+        self.best_bid = self._best(self.view.bids, bids, self.best_bid, max)
+        self.best_ask = self._best(self.view.asks, asks, self.best_ask, min)
+
+    @staticmethod
+    def _best(levels, changes, best, pick):
+        if best is not None and best not in levels:
+            return pick(levels) if levels else None
+
+        # Levels this diff left in the book
+        added = [price for price in (float(p) for p, _ in changes) if price in levels]
+
+        if added:
+            best = pick(added) if best is None else pick(best, *added)
+
+        return best
+
+
+def _aggregate(pipeline):
+    async def run(database, name, start_ms, end_ms):
+        cursor = database[name].aggregate(pipeline(to_ts(start_ms), to_ts(end_ms)))
+        await cursor.to_list(length=None)
+
+    return run
+
+
+async def _diff_bars(database, name, start_ms, end_ms):
+    """
+    orderbook_bars_1m from raw depth diffs, replayed in time order into a
+    book per symbol (starting BOOK_WARMUP_MS early).
+    """
+
+    books = defaultdict(TopOfBook)
+    bars = {}
+
+    cursor = (
+        database[name]
+        .find(
+            {"ts": {"$gte": to_ts(start_ms - BOOK_WARMUP_MS), "$lt": to_ts(end_ms)}},
+            {"ts": 1, "meta": 1, "bids": 1, "asks": 1}
+        )
+        .sort("ts", 1)
+        .batch_size(COPY_BATCH_SIZE)
+    )
+
+    async for doc in cursor:
+        market, symbol = doc["meta"]["market"], doc["meta"]["symbol"]
+
+        book = books[(market, symbol)]
+        book.apply(doc.get("bids", []), doc.get("asks", []))
+
+        ts_ms = from_ts(doc["ts"])
+
+        if ts_ms < start_ms or book.best_bid is None or book.best_ask is None:
+            continue
+
+        minute = ts_ms // 60_000 * 60_000
+        spread = book.best_ask - book.best_bid
+
+        bar = bars.get((market, symbol, minute))
+
+        if bar is None:
+            bar = bars[(market, symbol, minute)] = {
+                "_id": {"market": market, "symbol": symbol, "ts": to_ts(minute)},
+                "spread_sum": 0.0,
+                "max_spread": spread,
+                "snapshots": 0,
+                "market": market,
+                "symbol": symbol,
+                "ts": to_ts(minute),
+                "timestamp": minute,
+            }
+
+        bar["best_bid"] = book.best_bid
+        bar["best_ask"] = book.best_ask
+        bar["spread_sum"] += spread
+        bar["max_spread"] = max(bar["max_spread"], spread)
+        bar["snapshots"] += 1
+
+    requests = []
+
+    for bar in bars.values():
+        bar["avg_spread"] = bar.pop("spread_sum") / bar["snapshots"]
+        requests.append(ReplaceOne({"_id": bar["_id"]}, bar, upsert=True))
+
+    for i in range(0, len(requests), COPY_BATCH_SIZE):
+        await database["orderbook_bars_1m"].bulk_write(
+            requests[i:i + COPY_BATCH_SIZE], ordered=False
+        )
+
+
+COMPACTIONS = {
+    "real_market_ticks": _aggregate(_trade_bars),
+    "crypto_orderbooks": _diff_bars,
+    "crypto_orderbook_frames": _aggregate(_frame_bars),
+}
+
+
+async def _first_minute(collection):
+    doc = await collection.find_one({}, {"ts": 1}, sort=[("ts", 1)])
+    return from_ts(doc["ts"]) // 60_000 * 60_000 if doc else None
+
+
+async def compact(database=db, now=None):
+    """
+    Roll raw data that will expire within COMPACTION_LEAD_DAYS into 1m
+    bars, one COMPACTION_CHUNK_MS window at a time. Windows end on a whole
+    minute and re-runs replace the same bars.
+    """
+
+    now_ms = int((now or time.time()) * 1000)
+    horizon_ms = (RAW_RETENTION_DAYS - COMPACTION_LEAD_DAYS) * _DAY_SECONDS * 1000
+    end_ms = (now_ms - horizon_ms) // 60_000 * 60_000
+
+    state = database["compaction_state"]
+    compacted = {}
+
+    for name, run in COMPACTIONS.items():
+        done = await state.find_one({"_id": name})
+        start_ms = done["until"] if done else await _first_minute(database[name])
+
+        if start_ms is None or start_ms >= end_ms:
+            continue
+
+        chunk_start = start_ms
+
+        while chunk_start < end_ms:
+            chunk_end = min(chunk_start + COMPACTION_CHUNK_MS, end_ms)
+
+            await run(database, name, chunk_start, chunk_end)
+
+            await state.update_one(
+                {"_id": name},
+                {"$set": {"until": chunk_end}},
+                upsert=True
+            )
+
+            chunk_start = chunk_end
+
+        compacted[name] = (start_ms, end_ms)
+
+    return compacted
+
+
+async def compaction_loop(interval=COMPACTION_INTERVAL_SECONDS):
+    while True:
+        try:
+            compacted = await compact()
+
+            for name, (start_ms, end_ms) in compacted.items():
+                print(f"🗜️ Compacted {name} {start_ms} -> {end_ms}")
+
+        except Exception as e:
+            print(f"❌ Compaction error: {e}")
+
+        await asyncio.sleep(interval)
+
+
+# =========================================
+# CLI
+# =========================================
+async def storage_stats(database=db):
+    names = [*TIME_SERIES, *TIMEFRAME_RETENTION_DAYS, "trade_bars_1m", "orderbook_bars_1m"]
+
+    for name in names:
+        if await collection_options(name, database) is None:
+            continue
+
+        stats = await database.command("collStats", name)
+        print(
+            f"📊 {name:<20} count={stats.get('count', 0):<10} "
+            f"size={stats.get('size', 0) / 1e6:.1f}MB "
+            f"storage={stats.get('storageSize', 0) / 1e6:.1f}MB "
+            f"indexes={stats.get('totalIndexSize', 0) / 1e6:.1f}MB"
+        )
+
+
+async def _main(args):
+    if args.migrate:
+        from fastapi_market.indexes import ensure_indexes
+
+        await migrate()
+        await ensure_time_series()
+        print(await ensure_indexes())
+
+    if args.compact:
+        print(await compact())
+
+    if args.stats:
+        await storage_stats()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--migrate", action="store_true")
+    parser.add_argument("--compact", action="store_true")
+    parser.add_argument("--stats", action="store_true")
+    args = parser.parse_args()
+
+    if not (args.migrate or args.compact):
+        args.stats = True
+
+    asyncio.run(_main(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""
+Recent trades per market/symbol in fixed-size NumPy ring buffers.
+
+save_tick appends every trade, so the snapshot and trades endpoints read
+the newest trades from memory instead of sorting real_market_ticks.
+"""
+
+import numpy as np
+
+CAPACITY = 2048
+MAX_LIMIT = CAPACITY
+
+SIDES = ["SELL", "BUY"]
+_SIDE_CODE = {side: code for code, side in enumerate(SIDES)}
+
+
+class TradeRing:
+
+    def __init__(self, market, symbol, capacity=CAPACITY):
+        self.market = market
+        self.symbol = symbol
+        self.capacity = capacity
+        self.count = 0
+
+        self.price = np.zeros(capacity, dtype=np.float64)
+        self.quantity = np.zeros(capacity, dtype=np.float64)
+        self.side = np.zeros(capacity, dtype=np.int8)
+        self.exchange_timestamp = np.zeros(capacity, dtype=np.int64)
+        self.receive_timestamp = np.zeros(capacity, dtype=np.int64)
+
+    def append(self, tick):
+        i = self.count % self.capacity
+
+        self.price[i] = tick["price"]
+        self.quantity[i] = tick["quantity"]
+        self.side[i] = _SIDE_CODE.get(tick["side"], 1)
+        self.exchange_timestamp[i] = tick["exchange_timestamp"] or 0
+        self.receive_timestamp[i] = tick["receive_timestamp"]
+
+        self.count += 1
+
+    def __len__(self):
+        return min(self.count, self.capacity)
+
+    def last_indices(self, limit, since=None):
+        """
+        Slot indices of the newest `limit` trades (received after `since`
+        when given), newest first.
+        """
+
+        n = min(limit, len(self))
+        idx = (self.count - 1 - np.arange(n)) % self.capacity
+
+        if since is not None:
+            idx = idx[self.receive_timestamp[idx] > since]
+
+        return idx
+
+    def rows(self, idx):
+        prices = self.price[idx].tolist()
+        quantities = self.quantity[idx].tolist()
+        sides = self.side[idx].tolist()
+        exchange_ts = self.exchange_timestamp[idx].tolist()
+        receive_ts = self.receive_timestamp[idx].tolist()
+
+        return [
+            {
+                "market_type": self.market,
+                "symbol": self.symbol,
+                "price": prices[k],
+                "quantity": quantities[k],
+                "side": SIDES[sides[k]],
+                "exchange_timestamp": exchange_ts[k],
+                "receive_timestamp": receive_ts[k]
+            }
+            for k in range(len(idx))
+        ]
+
+
+class TradeBuffer:
+
+    def __init__(self, capacity=CAPACITY):
+        self.capacity = capacity
+        self.rings = {}
+
+    def append(self, tick):
+        key = (tick["market_type"], tick["symbol"])
+        ring = self.rings.get(key)
+
+        if ring is None:
+            ring = self.rings[key] = TradeRing(*key, self.capacity)
+
+        ring.append(tick)
+
+    def latest(self, market, symbol=None, limit=50, since=None):
+        """
+        Newest trades first, at most `limit`, optionally for one symbol and
+        only those received after `since` (epoch ms).
+        """
+
+        limit = max(0, min(limit, MAX_LIMIT))
+
+        rings = [
+            ring for (m, s), ring in self.rings.items()
+            if m == market and (symbol is None or s == symbol)
+        ]
+
+        if len(rings) == 1:
+            ring = rings[0]
+            return ring.rows(ring.last_indices(limit, since))
+
+        # Merge the newest `limit` of every symbol and keep the overall newest
+        candidates = [(ring, ring.last_indices(limit, since)) for ring in rings]
+
+        times = np.concatenate(
+            [ring.receive_timestamp[idx] for ring, idx in candidates]
+        ) if candidates else np.array([], dtype=np.int64)
+
+        order = np.argsort(-times, kind="stable")[:limit]
+
+        owners = np.repeat(
+            np.arange(len(candidates)),
+            [len(idx) for _, idx in candidates]
+        )[order]
+        positions = np.concatenate(
+            [idx for _, idx in candidates]
+        )[order] if candidates else order
+
+        merged = []
+        for owner, position in zip(owners.tolist(), positions.tolist()):
+            merged.extend(candidates[owner][0].rows([position]))
+
+        return merged
+
+    async def warm(self, ticks_repository, per_market=CAPACITY,
+                   markets=("CRYPTO", "NASDAQ", "NYSE")):
+        """
+        Refill from the stored ticks (storage TickRepository) after a restart.
+        """
+
+        for market in markets:
+            ticks = await ticks_repository.latest(market, per_market)
+
+            for tick in reversed(ticks):
+                self.append(tick)
+
+
+trade_buffer = TradeBuffer()
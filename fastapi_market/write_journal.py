@@ -0,0 +1,227 @@
+"""
+Local write-ahead journal for Mongo outages.
+
+When a sink batch cannot be acknowledged within its deadline, the documents
+are appended (as BSON, fsynced) to numbered segment files under
+<JOURNAL_DIR>/<collection>/. Once writes succeed again the sink replays the
+segments oldest first and deletes each one after it has been written.
+
+Replay hands each chunk to the sink's idempotent write (deterministic
+_ids for inserts, keyed upserts for buckets), so a replay that is
+interrupted and repeated does not duplicate anything. File writes, fsyncs
+and segment decoding run in a worker thread, off the event loop.
+
+A segment torn by a crash mid-spill is replayed up to its last complete
+document; the torn tail is moved to <segment>.torn for inspection.
+"""
+
+import asyncio
+import hashlib
+import os
+import threading
+import time
+
+import bson
+from bson import ObjectId
+
+JOURNAL_DIR = os.getenv("WRITE_JOURNAL_DIR", "write_journal")
+
+SEGMENT_MAX_BYTES = 16 * 1024 * 1024
+REPLAY_BATCH_SIZE = 1000
+
+
+def deterministic_id(*fields):
+    """
+    ObjectId derived from the fields that identify a document.
+    """
+
+    key = "|".join(str(field) for field in fields).encode()
+    return ObjectId(hashlib.blake2b(key, digest_size=12).digest())
+
+
+def _decode_prefix(data):
+    """
+    Documents in a segment's bytes up to the first incomplete or invalid
+    one; returns (docs, bytes used).
+    """
+
+    docs = []
+    offset = 0
+
+    while len(data) - offset >= 5:
+        size = int.from_bytes(data[offset:offset + 4], "little", signed=True)
+
+        if size < 5 or offset + size > len(data):
+            break
+
+        try:
+            docs.append(bson.decode(data[offset:offset + size]))
+        except bson.errors.BSONError:
+            break
+
+        offset += size
+
+    return docs, offset
+
+
+class WriteJournal:
+
+    def __init__(self, name, root=JOURNAL_DIR, segment_bytes=SEGMENT_MAX_BYTES):
+        self.name = name
+        self.directory = os.path.join(root, name)
+        self.segment_bytes = segment_bytes
+
+        self.active = None
+
+        # Spills run in worker threads; one file operation at a time
+        self.lock = threading.RLock()
+
+        # Segments may be left over from a previous run
+        self.has_backlog = bool(self.segments())
+
+        self.stats = {
+            "spilled": 0,
+            "replayed": 0,
+            "already_stored": 0,
+            "segments_replayed": 0,
+            "quarantined_bytes": 0,
+        }
+
+    def segments(self):
+        if not os.path.isdir(self.directory):
+            return []
+
+        return sorted(
+            os.path.join(self.directory, entry)
+            for entry in os.listdir(self.directory)
+            if entry.endswith(".bson")
+        )
+
+    # =========================================
+    # SPILL
+    # =========================================
+    def spill(self, docs):
+        """
+        Append and fsync; blocking, so sinks call it through a thread.
+        """
+
+        if not docs:
+            return
+
+        with self.lock:
+            if self.active is None or self.active.tell() >= self.segment_bytes:
+                self._rotate()
+
+            start = self.active.tell()
+
+            try:
+                self.active.write(b"".join(bson.encode(doc) for doc in docs))
+                self.active.flush()
+                os.fsync(self.active.fileno())
+
+            except OSError:
+                # Drop the partial write and start the next spill in a new
+                # segment, so a torn write can only be a segment's tail
+                try:
+                    self.active.truncate(start)
+                except OSError:
+                    pass
+
+                self._close_active()
+                raise
+
+            self.stats["spilled"] += len(docs)
+            self.has_backlog = True
+
+    def _rotate(self):
+        self.close()
+        os.makedirs(self.directory, exist_ok=True)
+
+        segments = self.segments()
+        number = int(os.path.basename(segments[-1]).split(".")[0]) + 1 if segments else 1
+
+        self.active = open(os.path.join(self.directory, f"{number:08d}.bson"), "ab")
+
+    def close(self):
+        with self.lock:
+            self._close_active()
+
+    def _close_active(self):
+        if self.active is None:
+            return
+
+        try:
+            self.active.close()
+        except OSError:
+            pass
+
+        self.active = None
+
+    def _read_segment(self, path):
+        """
+        Documents of one segment; a torn tail is quarantined to
+        <segment>.torn and cut off, so the segment replays cleanly.
+        """
+
+        with self.lock:
+            with open(path, "rb") as f:
+                data = f.read()
+
+            docs, used = _decode_prefix(data)
+
+            if used < len(data):
+                with open(f"{path}.torn", "ab") as f:
+                    f.write(data[used:])
+                    f.flush()
+                    os.fsync(f.fileno())
+
+                os.truncate(path, used)
+
+                self.stats["quarantined_bytes"] += len(data) - used
+                print(
+                    f"⚠️ Journal {self.name}: {len(data) - used} torn bytes "
+                    f"after {len(docs)} documents moved to {path}.torn"
+                )
+
+            return docs
+
+    # =========================================
+    # REPLAY
+    # =========================================
+    async def replay(self, write, deadline, max_segments=1,
+                     batch_size=REPLAY_BATCH_SIZE):
+        """
+        Pass up to max_segments segments, oldest first, in chunks to
+        `await write(chunk)`, which returns how many documents were new.
+        Raises on the first failure; the segment is kept and retried.
+        """
+
+        self.close()
+
+        for path in self.segments()[:max_segments]:
+            docs = await asyncio.to_thread(self._read_segment, path)
+
+            for i in range(0, len(docs), batch_size):
+                chunk = docs[i:i + batch_size]
+                written = await asyncio.wait_for(write(chunk), deadline)
+
+                self.stats["replayed"] += written
+                self.stats["already_stored"] += len(chunk) - written
+
+            os.remove(path)
+            self.stats["segments_replayed"] += 1
+
+        self.has_backlog = bool(self.segments())
+
+    def status(self):
+        segments = self.segments()
+        sizes = [os.path.getsize(path) for path in segments]
+
+        return {
+            "segments": len(segments),
+            "backlog_bytes": sum(sizes),
+            "oldest_segment_age_seconds": round(
+                time.time() - os.path.getmtime(segments[0]), 1
+            ) if segments else None,
+            **self.stats
+        }
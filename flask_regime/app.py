@@ -2,7 +2,9 @@ from flask import Flask, request, jsonify
 import joblib
 import pandas as pd
 import os
-from pymongo import MongoClient
+
+from fastapi_market.state_board import open_reader
+from flask_regime.storage import FeatureReader
 
 app = Flask(__name__)
 
@@ -18,15 +20,24 @@ FEATURE_COLS = [
 
 TIMEFRAMES = ["1m", "5m"]  # Fast Completion Mode
 
+# Features come from market_features_<FEATURE_VERSION> and the models
+# trained on them are named crypto_<tf>_<FEATURE_VERSION>
+FEATURE_VERSION = os.getenv("FEATURE_VERSION", "")
+VERSION_SUFFIX = f"_{FEATURE_VERSION}" if FEATURE_VERSION else ""
+
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 MODEL_DIR = os.path.join(BASE_DIR, "models")
 
-client = MongoClient(MONGO_URI)
-db = client[DB_NAME]
-collection = db["market_features"]
+features = FeatureReader(MONGO_URI, DB_NAME, FEATURE_VERSION)
 
 MODEL_CACHE = {}
 
+# Engine's shared-memory state board (None if disabled). A timeframe is
+# only re-predicted once it shows a feature row newer than the last one
+# read: (market, symbol, timeframe) -> (feature timestamp, result)
+board = open_reader()
+RESULT_CACHE = {}
+
 
 def load_model(timeframe):
     if timeframe in MODEL_CACHE:
@@ -35,15 +46,15 @@ def load_model(timeframe):
     try:
         model_path = os.path.join(
             MODEL_DIR,
-            f"crypto_{timeframe}_hmm.pkl"
+            f"crypto_{timeframe}{VERSION_SUFFIX}_hmm.pkl"
         )
         scaler_path = os.path.join(
             MODEL_DIR,
-            f"crypto_{timeframe}_scaler.pkl"
+            f"crypto_{timeframe}{VERSION_SUFFIX}_scaler.pkl"
         )
         mapping_path = os.path.join(
             MODEL_DIR,
-            f"crypto_{timeframe}_mapping.pkl"
+            f"crypto_{timeframe}{VERSION_SUFFIX}_mapping.pkl"
         )
 
         model = joblib.load(model_path)
@@ -86,18 +97,15 @@ def detect_regime():
             }
             continue
 
-        cursor = (
-            collection
-            .find({
-                "market": market,
-                "symbol": symbol,
-                "timeframe": timeframe
-            })
-            .sort("timestamp", -1)
-            .limit(200)
-        )
+        key = (market, symbol, timeframe)
+        latest = board.feature_timestamp(market, symbol, timeframe) if board else None
+        cached = RESULT_CACHE.get(key)
 
-        data = list(cursor)
+        if latest is not None and cached and cached[0] == latest:
+            results[timeframe] = cached[1]
+            continue
+
+        data = features.series(market, symbol, timeframe, 200, newest=True)
 
         if not data:
             results[timeframe] = {
@@ -140,6 +148,8 @@ def detect_regime():
             "confidence": round(confidence, 4)
         }
 
+        RESULT_CACHE[key] = (data[0]["timestamp"], results[timeframe])
+
     return jsonify({
         "market": market,
         "symbol": symbol,
@@ -0,0 +1,82 @@
+"""
+Feature reads for the regime service, from the backend the market engine
+writes to (STORAGE_BACKEND): Mongo, or the engine's SQLite file
+(SQLITE_PATH), read concurrently thanks to WAL.
+"""
+
+import os
+import sqlite3
+import threading
+
+from pymongo import MongoClient
+
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "mongo").lower()
+SQLITE_PATH = os.getenv("SQLITE_PATH", "aetherion.db")
+
+
+def feature_collection_name(feature_version=""):
+    return f"market_features_{feature_version}" if feature_version else "market_features"
+
+
+class FeatureReader:
+
+    def __init__(self, mongo_uri, db_name, feature_version="",
+                 backend=STORAGE_BACKEND, sqlite_path=SQLITE_PATH):
+        self.backend = backend
+        self.name = feature_collection_name(feature_version)
+
+        if backend == "mongo":
+            self.collection = MongoClient(mongo_uri)[db_name][self.name]
+
+        elif backend == "sqlite":
+            self.sqlite_path = sqlite_path
+            self.local = threading.local()
+
+        else:
+            raise ValueError(f"unknown STORAGE_BACKEND: {backend}")
+
+    def _connection(self):
+        conn = getattr(self.local, "conn", None)
+
+        if conn is None:
+            conn = sqlite3.connect(self.sqlite_path)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA busy_timeout=5000")
+            self.local.conn = conn
+
+        return conn
+
+    def series(self, market, symbol, timeframe, limit, newest=False):
+        """
+        Feature rows of one series: the first `limit` by timestamp, or the
+        newest `limit` newest first.
+        """
+
+        if self.backend == "mongo":
+            cursor = (
+                self.collection
+                .find({
+                    "market": market,
+                    "symbol": symbol,
+                    "timeframe": timeframe
+                })
+                .sort("timestamp", -1 if newest else 1)
+                .limit(limit)
+            )
+            return list(cursor)
+
+        try:
+            rows = self._connection().execute(
+                f'SELECT *, bucket_start AS timestamp FROM "{self.name}" '
+                "WHERE market = ? AND symbol = ? AND timeframe = ? "
+                f"ORDER BY bucket_start {'DESC' if newest else 'ASC'} LIMIT ?",
+                (market, symbol, timeframe, limit)
+            ).fetchall()
+
+        except sqlite3.OperationalError as e:
+            # Table not created yet by the engine
+            if "no such table" in str(e):
+                return []
+            raise
+
+        return [dict(row) for row in rows]
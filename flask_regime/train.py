@@ -1,18 +1,18 @@
 import os
 import joblib
 import pandas as pd
-from pymongo import MongoClient
 from hmmlearn.hmm import GaussianHMM
 
 from flask_regime.scaler import FeatureScaler
+from flask_regime.storage import FeatureReader
 
 
 class RegimeTrainer:
 
-    def __init__(self, mongo_uri, db_name, model_dir="flask_regime/models"):
-        self.client = MongoClient(mongo_uri)
-        self.db = self.client[db_name]
-        self.collection = self.db["market_features"]
+    def __init__(self, mongo_uri, db_name, model_dir="flask_regime/models",
+                 feature_version=""):
+        self.feature_version = feature_version
+        self.features = FeatureReader(mongo_uri, db_name, feature_version)
         self.model_dir = model_dir
 
         if not os.path.exists(model_dir):
@@ -20,18 +20,7 @@ class RegimeTrainer:
 
     def train(self, market, symbol, timeframe, model_name, limit=10000):
 
-        cursor = (
-            self.collection
-            .find({
-                "market": market,
-                "symbol": symbol,
-                "timeframe": timeframe
-            })
-            .sort("timestamp", 1)
-            .limit(limit)
-        )
-
-        data = list(cursor)
+        data = self.features.series(market, symbol, timeframe, limit)
 
         if not data:
             raise ValueError("No feature data found.")
@@ -106,11 +95,17 @@ class RegimeTrainer:
 
 
 if __name__ == "__main__":
-    trainer = RegimeTrainer("mongodb://localhost:27017", "aetherion")
+    feature_version = os.getenv("FEATURE_VERSION", "")
+
+    trainer = RegimeTrainer(
+        "mongodb://localhost:27017",
+        "aetherion",
+        feature_version=feature_version
+    )
 
     trainer.train(
         market="CRYPTO",
         symbol="BTCUSDT",
         timeframe="1m",
-        model_name="crypto_1m"
+        model_name=f"crypto_1m_{feature_version}" if feature_version else "crypto_1m"
     )
\ No newline at end of file
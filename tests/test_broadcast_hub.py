@@ -0,0 +1,121 @@
+import asyncio
+import json
+import unittest
+
+from fastapi_market.broadcast_hub import CONFLATE, DISCONNECT, BroadcastHub
+
+
+class StalledWebSocket:
+    """
+    Accepts, then blocks every send until released.
+    """
+
+    def __init__(self):
+        self.sent = []
+        self.payloads = []
+        self.closed = None
+        self.release = asyncio.Event()
+
+    async def accept(self):
+        pass
+
+    async def send_bytes(self, payload):
+        await self.release.wait()
+        self.payloads.append(payload)
+        self.sent.append(json.loads(payload))
+
+    async def close(self, code):
+        self.closed = code
+
+
+class ConflationTest(unittest.IsolatedAsyncioTestCase):
+
+    async def _connect(self, policy, queue_size):
+        hub = BroadcastHub(policy=policy, queue_size=queue_size)
+        websocket = StalledWebSocket()
+        await hub.connect(websocket)
+
+        # The writer takes the first message and blocks sending it
+        hub.publish({"type": "meta", "seq": 0})
+        await asyncio.sleep(0)
+
+        self.addAsyncCleanup(self._disconnect, hub, websocket)
+        return hub, websocket
+
+    async def _disconnect(self, hub, websocket):
+        hub.disconnect(websocket)
+        await asyncio.sleep(0)
+
+    async def _drain(self, websocket):
+        websocket.release.set()
+        for _ in range(10):
+            await asyncio.sleep(0)
+        return websocket.sent
+
+    async def test_full_queue_replaces_only_the_superseded_message(self):
+        hub, websocket = await self._connect(CONFLATE, queue_size=3)
+
+        hub.publish({"type": "timeframe", "symbol": "BTCUSDT", "timeframe": "1m", "seq": 1})
+        hub.publish({"type": "strategy", "seq": 2})
+        hub.publish({"type": "timeframe", "symbol": "BTCUSDT", "timeframe": "5m", "seq": 3})
+
+        # Queue is full; the 1m update supersedes only the queued 1m update
+        hub.publish({"type": "timeframe", "symbol": "BTCUSDT", "timeframe": "1m", "seq": 4})
+
+        sent = await self._drain(websocket)
+
+        self.assertEqual([m["seq"] for m in sent], [0, 2, 3, 4])
+        self.assertEqual(hub.stats["conflated"], 1)
+        self.assertIn(websocket, hub.clients)
+
+    async def test_full_queue_without_superseded_message_disconnects(self):
+        hub, websocket = await self._connect(CONFLATE, queue_size=2)
+
+        hub.publish({"type": "timeframe", "timeframe": "1m", "seq": 1})
+        hub.publish({"type": "strategy", "seq": 2})
+        hub.publish({"type": "meta", "seq": 3})
+        await asyncio.sleep(0)
+
+        self.assertNotIn(websocket, hub.clients)
+        self.assertEqual(websocket.closed, 1013)
+        self.assertEqual(hub.stats["conflated"], 0)
+
+    async def test_disconnect_policy_never_conflates(self):
+        hub, websocket = await self._connect(DISCONNECT, queue_size=1)
+
+        hub.publish({"type": "decision", "symbol": "BTCUSDT", "seq": 1})
+        hub.publish({"type": "decision", "symbol": "BTCUSDT", "seq": 2})
+        await asyncio.sleep(0)
+
+        self.assertNotIn(websocket, hub.clients)
+        self.assertEqual(hub.stats["slow_disconnects"], 1)
+
+
+class SerializationTest(unittest.IsolatedAsyncioTestCase):
+
+    async def test_every_client_gets_the_same_encoded_payload(self):
+        hub = BroadcastHub()
+        sockets = [StalledWebSocket() for _ in range(3)]
+
+        for websocket in sockets:
+            websocket.release.set()
+            await hub.connect(websocket)
+            self.addAsyncCleanup(self._disconnect, hub, websocket)
+
+        hub.publish({"type": "meta", "symbol": "ÉTH"})
+        for _ in range(5):
+            await asyncio.sleep(0)
+
+        payloads = [websocket.payloads[0] for websocket in sockets]
+
+        self.assertIsInstance(payloads[0], bytes)
+        self.assertTrue(all(p is payloads[0] for p in payloads))
+        self.assertEqual(json.loads(payloads[0])["symbol"], "ÉTH")
+
+    async def _disconnect(self, hub, websocket):
+        hub.disconnect(websocket)
+        await asyncio.sleep(0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,56 @@
+import unittest
+from unittest import mock
+
+from fastapi_market.candle_engine import MultiTimeframeCandleEngine
+
+HOUR = 3_600_000
+MINUTE = 60_000
+
+
+class RecordingStream:
+
+    def __init__(self):
+        self.published = {}
+
+    def publish(self, channel, market, symbol, data):
+        self.published[channel] = data
+
+
+class FlushTest(unittest.IsolatedAsyncioTestCase):
+
+    async def test_shutdown_flush_marks_only_ended_candles_closed(self):
+        engine = MultiTimeframeCandleEngine(None)
+        engine.stream = RecordingStream()
+        engine.feature_engine = mock.AsyncMock()
+
+        # Tick at 10:28, flush at 10:31: the 1m, 5m and 15m buckets have
+        # ended, the 1h bucket hasn't
+        now_ms = 10 * HOUR + 31 * MINUTE
+
+        with mock.patch("fastapi_market.candle_engine.candle_sink") as sink, \
+                mock.patch("fastapi_market.candle_engine.time.time", return_value=now_ms / 1000):
+            await engine.process_tick({
+                "market": "CRYPTO", "symbol": "BTCUSDT",
+                "price": 100.0, "volume": 1.0, "receive_timestamp": 10 * HOUR + 28 * MINUTE,
+            })
+            engine.stream.published.clear()
+
+            await engine.flush_all()
+
+        published = engine.stream.published
+        stored = {doc["timeframe"]: doc["partial"] for (doc,), _ in sink.submit.call_args_list}
+
+        self.assertEqual(
+            {channel: (data["partial"], data["closed"]) for channel, data in published.items()},
+            {
+                "candles.1m": (False, True),
+                "candles.5m": (False, True),
+                "candles.15m": (False, True),
+                "candles.1h": (True, False),
+            }
+        )
+        self.assertEqual(stored, {"1m": False, "5m": False, "15m": False, "1h": True})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,90 @@
+import unittest
+
+import numpy as np
+
+from fastapi_market.downsample import lttb, minmax, ohlc_buckets
+
+
+class MinMaxTest(unittest.TestCase):
+
+    def test_keeps_min_and_max_of_every_bucket_in_time_order(self):
+        y = np.array([5, 1, 9, 3, 2, 8, 7, 0], dtype=np.float64)
+
+        idx = minmax(y, 4)
+
+        self.assertEqual(idx.tolist(), [1, 2, 5, 7])
+
+    def test_nan_in_a_bucket_does_not_drop_it(self):
+        # Bucket 0 is [nan, 3, 1, 4]; a NaN minimum used to lose it
+        y = np.array([np.nan, 3, 1, 4, 10, 20, 15, 12], dtype=np.float64)
+
+        idx = minmax(y, 4)
+
+        self.assertFalse(np.isnan(y[idx]).any())
+        self.assertIn(2, idx.tolist())
+        self.assertIn(5, idx.tolist())
+        self.assertTrue((np.diff(idx) > 0).all())
+
+    def test_all_nan(self):
+        self.assertEqual(len(minmax(np.full(10, np.nan), 4)), 0)
+
+    def test_short_series_is_returned_whole(self):
+        y = np.array([1.0, np.nan, 3.0])
+        self.assertEqual(minmax(y, 10).tolist(), [0, 1, 2])
+
+
+class LTTBTest(unittest.TestCase):
+
+    def test_keeps_endpoints_and_spike(self):
+        x = np.arange(100, dtype=np.float64)
+        y = np.zeros(100)
+        y[37] = 50
+
+        idx = lttb(x, y, 10)
+
+        self.assertEqual(len(idx), 10)
+        self.assertEqual(idx[0], 0)
+        self.assertEqual(idx[-1], 99)
+        self.assertIn(37, idx.tolist())
+        self.assertTrue((np.diff(idx) > 0).all())
+
+    def test_nan_values_are_never_picked(self):
+        rng = np.random.default_rng(3)
+        x = np.arange(200, dtype=np.float64)
+        y = rng.normal(size=200)
+        y[[0, 5, 50, 51, 52, 199]] = np.nan
+        y[120] = 40
+
+        idx = lttb(x, y, 20)
+
+        self.assertEqual(len(idx), 20)
+        self.assertFalse(np.isnan(y[idx]).any())
+        self.assertEqual(idx[0], 1)
+        self.assertEqual(idx[-1], 198)
+        self.assertIn(120, idx.tolist())
+
+
+class OHLCBucketsTest(unittest.TestCase):
+
+    def test_merges_consecutive_candles(self):
+        columns = {
+            "timestamp": np.arange(4) * 60_000,
+            "open": np.array([1.0, 2.0, 3.0, 4.0]),
+            "high": np.array([2.0, 5.0, 4.0, 6.0]),
+            "low": np.array([0.5, 1.5, 2.5, 0.1]),
+            "close": np.array([2.0, 3.0, 4.0, 5.0]),
+            "volume": np.array([1.0, 1.0, 2.0, 3.0]),
+        }
+
+        merged = ohlc_buckets(columns, 2)
+
+        self.assertEqual(merged["timestamp"].tolist(), [0, 120_000])
+        self.assertEqual(merged["open"].tolist(), [1.0, 3.0])
+        self.assertEqual(merged["high"].tolist(), [5.0, 6.0])
+        self.assertEqual(merged["low"].tolist(), [0.5, 0.1])
+        self.assertEqual(merged["close"].tolist(), [3.0, 5.0])
+        self.assertEqual(merged["volume"].tolist(), [2.0, 5.0])
+
+
+if __name__ == "__main__":
+    unittest.main()
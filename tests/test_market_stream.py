@@ -0,0 +1,123 @@
+import asyncio
+import json
+import unittest
+from unittest import mock
+
+from fastapi_market.market_stream import (
+    MAX_PENDING_REPLIES,
+    MarketStream,
+    OrderBookView,
+    _Subscriber
+)
+
+
+def _book(bids, asks, ts):
+    return {
+        "market_type": "CRYPTO",
+        "symbol": "BTCUSDT",
+        "bids": bids,
+        "asks": asks,
+        "exchange_timestamp": ts,
+        "receive_timestamp": ts + 1
+    }
+
+
+class OrderBookPublishTest(unittest.TestCase):
+
+    def test_unsubscribed_book_skips_top_levels_but_serves_late_subscriber(self):
+        stream = MarketStream()
+
+        with mock.patch.object(OrderBookView, "top", wraps=OrderBookView.top, autospec=True) as top:
+            stream.publish_orderbook(_book([["100", "1"], ["99", "2"]], [["101", "1"]], 1))
+            stream.publish_orderbook(_book([["100", "0"]], [["102", "3"]], 2))
+
+            self.assertEqual(top.call_count, 0)
+
+        sub = _Subscriber(websocket=None, max_rate=10)
+        stream._subscribe(sub, "orderbook", ["BTCUSDT"], depth=5)
+
+        frame = json.loads(sub.pending[("orderbook", "CRYPTO", "BTCUSDT")])
+
+        self.assertEqual(frame["seq"], 2)
+        self.assertEqual(frame["data"]["bids"], [[99.0, 2.0]])
+        self.assertEqual(frame["data"]["asks"], [[101.0, 1.0], [102.0, 3.0]])
+        self.assertEqual(frame["data"]["exchange_timestamp"], 2)
+
+    def test_subscribed_book_is_published_with_depth(self):
+        stream = MarketStream()
+        sub = _Subscriber(websocket=None, max_rate=10)
+        stream._subscribe(sub, "orderbook", ["*"], depth=1)
+
+        stream.publish_orderbook(_book([["100", "1"], ["99", "2"]], [["101", "1"]], 1))
+
+        frame = json.loads(sub.pending[("orderbook", "CRYPTO", "BTCUSDT")])
+
+        self.assertEqual(frame["seq"], 1)
+        self.assertEqual(frame["data"]["bids"], [[100.0, 1.0]])
+
+
+class UnreadWebSocket:
+    """
+    Accepts, then never completes a send (the client isn't reading).
+    """
+
+    def __init__(self):
+        self.closed = None
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, text):
+        await asyncio.Event().wait()
+
+    async def close(self, code):
+        self.closed = code
+
+
+class ClientProtocolTest(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.stream = MarketStream()
+        self.websocket = UnreadWebSocket()
+        await self.stream.connect(self.websocket)
+        self.addAsyncCleanup(self._disconnect)
+
+    async def _disconnect(self):
+        self.stream.disconnect(self.websocket)
+        await asyncio.sleep(0)
+
+    def _subscribe(self, depth):
+        self.stream.handle(self.websocket, json.dumps({
+            "action": "subscribe",
+            "channel": "orderbook",
+            "symbols": ["BTCUSDT"],
+            "depth": depth
+        }))
+
+    async def test_depth_is_clamped_to_at_least_one_level(self):
+        sub = self.stream.subscribers[self.websocket]
+
+        for depth in (0, -5):
+            self._subscribe(depth)
+            self.assertEqual(sub.topics[("orderbook", "BTCUSDT")], 1)
+
+        self._subscribe(500)
+        self.assertEqual(sub.topics[("orderbook", "BTCUSDT")], 20)
+
+    async def test_unread_replies_are_bounded(self):
+        # The writer takes the first reply and blocks sending it
+        self.stream.handle(self.websocket, json.dumps({"action": "set_rate", "max_rate": 1}))
+        await asyncio.sleep(0)
+
+        for _ in range(MAX_PENDING_REPLIES + 1):
+            self.stream.handle(self.websocket, json.dumps({"action": "set_rate", "max_rate": 1}))
+
+        await asyncio.sleep(0)
+
+        self.assertNotIn(self.websocket, self.stream.subscribers)
+        self.assertEqual(self.websocket.closed, 1013)
+        self.assertEqual(self.stream.stats["slow_disconnects"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,153 @@
+import os
+import random
+import tempfile
+import unittest
+from unittest import mock
+
+from fastapi_market.market_stream import OrderBookView
+from fastapi_market.orderbook_store import (
+    DELTA_FRAME_MS,
+    SNAPSHOT_DEPTH,
+    SNAPSHOT_INTERVAL_MS,
+    OrderBookStore,
+    pack_updates,
+    unpack_updates
+)
+from fastapi_market.storage.sqlite import SQLiteStorage
+
+START = 1_700_000_000_000
+
+
+def _floats(levels):
+    return [[float(price), float(quantity)] for price, quantity in levels]
+
+
+class PackTest(unittest.TestCase):
+
+    def test_round_trip_is_lossless(self):
+        updates = [
+            (START, [["100.01", "1.5"], ["99.99", "0.00012345"]], [["100.02", "3"]]),
+            # Deletes and a price below the previous one
+            (START + 37, [["100.01", "0.00000000"]], [["100.02", "0"], ["100.50", "12.25"]]),
+            # Empty sides
+            (START + 100, [], [["101.00", "0.5"]]),
+            (START + 101, [["98.00", "7"]], []),
+            (START + 250, [], []),
+        ]
+
+        unpacked = unpack_updates(pack_updates(updates))
+
+        self.assertEqual(
+            unpacked,
+            [(ts, _floats(bids), _floats(asks)) for ts, bids, asks in updates]
+        )
+
+    def test_frame_without_levels(self):
+        updates = [(START, [], []), (START + 5, [], [])]
+
+        frame = pack_updates(updates)
+
+        self.assertEqual(frame["levels"], 0)
+        self.assertEqual(unpack_updates(frame), [(START, [], []), (START + 5, [], [])])
+
+    def test_common_tick_and_lot_are_factored_out(self):
+        frame = pack_updates([(START, [["100.10", "0.2"], ["100.30", "0.4"]], [])])
+
+        self.assertEqual(frame["tick"], 10_000_000)
+        self.assertEqual(frame["lot"], 20_000_000)
+
+
+class FrameCollector:
+
+    def __init__(self):
+        self.frames = []
+
+    def submit(self, frame):
+        self.frames.append(frame)
+
+
+def _diffs(seed, n, step_ms=100):
+    """
+    Random depth diffs around 100.00, about a fifth of them deletes.
+    """
+
+    rng = random.Random(seed)
+
+    for i in range(n):
+        def levels(low, high):
+            return [
+                [
+                    f"{rng.randint(low, high) / 100:.2f}",
+                    "0" if rng.random() < 0.2 else f"{rng.randint(1, 5000) / 1000:.3f}"
+                ]
+                for _ in range(rng.randint(0, 4))
+            ]
+
+        yield {
+            "market_type": "CRYPTO",
+            "symbol": "BTCUSDT",
+            "bids": levels(9960, 9999),
+            "asks": levels(10001, 10040),
+            "exchange_timestamp": START + i * step_ms - 2,
+            "receive_timestamp": START + i * step_ms,
+        }
+
+
+class ReconstructTest(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.workdir = tempfile.TemporaryDirectory()
+        self.storage = SQLiteStorage(os.path.join(self.workdir.name, "aetherion.db"))
+        await self.storage.open()
+
+        patch = mock.patch("fastapi_market.orderbook_store.get_storage", return_value=self.storage)
+        patch.start()
+        self.addCleanup(patch.stop)
+
+    async def asyncTearDown(self):
+        await self.storage.close()
+        self.workdir.cleanup()
+
+    async def test_snapshot_plus_deltas_match_the_live_book(self):
+        sink = FrameCollector()
+        store = OrderBookStore(sink=sink)
+
+        live = OrderBookView()
+        books = {}
+
+        # 70 s of diffs: three snapshots and several delta frames between
+        for diff in _diffs(seed=3, n=700):
+            store.record(diff)
+            live.apply(diff["bids"], diff["asks"])
+            books[diff["receive_timestamp"]] = live.top(SNAPSHOT_DEPTH)
+
+        store.flush()
+        await self.storage.frames.write_many(sink.frames)
+
+        kinds = [frame["kind"] for frame in sink.frames]
+        self.assertEqual(kinds.count("snapshot"), 3)
+        self.assertGreater(kinds.count("deltas"), 2 * SNAPSHOT_INTERVAL_MS // DELTA_FRAME_MS)
+
+        times = sorted(books)
+
+        # Exact diff times, times between diffs, and both sides of a snapshot
+        probes = times[::37] + [t + 50 for t in times[::53]] + [
+            START + SNAPSHOT_INTERVAL_MS - 100,
+            START + SNAPSHOT_INTERVAL_MS,
+            times[-1],
+        ]
+
+        for timestamp in probes:
+            book = await store.reconstruct("CRYPTO", "BTCUSDT", timestamp)
+            expected = books[max(t for t in times if t <= timestamp)]
+
+            self.assertEqual((book["bids"], book["asks"]), expected, f"at {timestamp}")
+
+    async def test_nothing_before_the_first_snapshot(self):
+        store = OrderBookStore(sink=FrameCollector())
+
+        self.assertIsNone(await store.reconstruct("CRYPTO", "BTCUSDT", START))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,214 @@
+import unittest
+from collections import deque
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+
+from fastapi_market import decision_engine
+from fastapi_market.regime_batch import (
+    BatchRegimeEngine,
+    DEFAULT_LABELS,
+    EMPTY,
+    META_REGIMES,
+    STRATEGIES
+)
+from fastapi_market.regime_fusion import RegimeFusion
+from fastapi_market.regime_stability import (
+    STABILITY_WINDOW,
+    MIN_CONFIRMATIONS,
+    majority_state
+)
+from fastapi_market.strategy_engine import StrategyEngine
+
+TIMEFRAMES = ["1m", "5m", "15m", "1h"]
+POLL_SECONDS = 10
+START = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+BULL, BEAR, SIDEWAYS, CRISIS = range(4)
+
+
+def random_observations(rng, n_ticks, n_symbols):
+    """
+    Sticky random walk over state codes with ~5% missing timeframes.
+    """
+
+    shape = (n_ticks, n_symbols, len(TIMEFRAMES))
+    obs = np.empty(shape, dtype=np.int16)
+    obs[0] = rng.integers(0, len(DEFAULT_LABELS), shape[1:])
+
+    for t in range(1, n_ticks):
+        flip = rng.random(shape[1:]) < 0.3
+        fresh = rng.integers(0, len(DEFAULT_LABELS), shape[1:])
+        obs[t] = np.where(flip, fresh, obs[t - 1])
+
+    missing = rng.random(shape) < 0.05
+    return np.where(missing, EMPTY, obs)
+
+
+def run_scalar(symbols, observations, window, min_confirmations):
+    """
+    The poller's chain, one symbol at a time:
+    majority_state -> RegimeFusion -> StrategyEngine -> generate_decision
+    """
+
+    decision_engine._last_decision_cache.clear()
+    fusion = RegimeFusion()
+
+    buffers = {
+        s: {tf: deque(maxlen=window) for tf in TIMEFRAMES}
+        for s in symbols
+    }
+    stable = {s: {tf: None for tf in TIMEFRAMES} for s in symbols}
+    engines = {s: StrategyEngine() for s in symbols}
+
+    rows = []
+
+    for t, tick in enumerate(observations):
+        now = START + timedelta(seconds=t * POLL_SECONDS)
+
+        for i, symbol in enumerate(symbols):
+            for j, tf in enumerate(TIMEFRAMES):
+                code = tick[i, j]
+                if code == EMPTY:
+                    continue
+
+                buffers[symbol][tf].append(DEFAULT_LABELS[code])
+                confirmed = majority_state(
+                    buffers[symbol][tf], window, min_confirmations
+                )
+
+                if confirmed is not None:
+                    stable[symbol][tf] = confirmed
+
+            meta = fusion.fuse(stable[symbol])
+            strategy = engines[symbol].select_strategy(meta)["strategy"]
+
+            decision = decision_engine.generate_decision(
+                market="CRYPTO",
+                symbol=symbol,
+                meta_regime=meta["meta_regime"],
+                strategy=strategy,
+                confidence=meta["confidence"],
+                now=now
+            )
+
+            rows.append((
+                meta["meta_regime"],
+                meta["confidence"],
+                strategy,
+                decision is not None
+            ))
+
+    return rows
+
+
+def run_batch(symbols, observations, window, min_confirmations):
+
+    engine = BatchRegimeEngine(
+        symbols,
+        TIMEFRAMES,
+        window=window,
+        min_confirmations=min_confirmations
+    )
+    rows = []
+
+    for t, tick in enumerate(observations):
+        now = START + timedelta(seconds=t * POLL_SECONDS)
+        result = engine.step(tick, now)
+
+        for i in range(len(symbols)):
+            rows.append((
+                META_REGIMES[result["meta"][i]],
+                float(result["confidence"][i]),
+                STRATEGIES[result["strategy"][i]],
+                bool(result["decided"][i])
+            ))
+
+    return rows
+
+
+class BatchParityTest(unittest.TestCase):
+    """
+    BatchRegimeEngine against the scalar chain, symbol-tick for symbol-tick.
+    """
+
+    def setUp(self):
+        saved = dict(decision_engine._last_decision_cache)
+
+        def restore():
+            decision_engine._last_decision_cache.clear()
+            decision_engine._last_decision_cache.update(saved)
+
+        self.addCleanup(restore)
+
+    def assertParity(self, observations, window, min_confirmations):
+        symbols = [f"SYM{i}" for i in range(observations.shape[1])]
+
+        scalar = run_scalar(symbols, observations, window, min_confirmations)
+        batch = run_batch(symbols, observations, window, min_confirmations)
+
+        self.assertEqual(len(scalar), len(batch))
+
+        for n, (a, b) in enumerate(zip(scalar, batch)):
+            tick, symbol = divmod(n, len(symbols))
+            self.assertEqual(a, b, f"tick {tick}, {symbols[symbol]}")
+
+        # The run has to reach the decision gates to mean anything
+        self.assertTrue(any(row[3] for row in scalar))
+
+    def test_random_walk_default_window(self):
+        rng = np.random.default_rng(7)
+        observations = random_observations(rng, 120, 40)
+
+        self.assertParity(observations, STABILITY_WINDOW, MIN_CONFIRMATIONS)
+
+    def test_random_walk_with_tied_majorities(self):
+        # 4/2 lets two states tie at the top of a full window
+        rng = np.random.default_rng(11)
+        observations = random_observations(rng, 120, 40)
+
+        self.assertParity(observations, 4, 2)
+
+    def test_tie_goes_to_the_state_seen_first(self):
+        # BEAR enters the window first, then BULL catches up to 2-2
+        column = [BEAR, BULL, BEAR, BULL, BULL, BEAR, BEAR]
+        observations = np.full((len(column), 1, len(TIMEFRAMES)), BULL, dtype=np.int16)
+        observations[:, 0, 0] = column
+
+        engine = BatchRegimeEngine(["SYM0"], TIMEFRAMES, window=4, min_confirmations=2)
+
+        confirmed = [
+            int(engine.step(tick, START + timedelta(seconds=10 * t))["confirmed"][0, 0])
+            for t, tick in enumerate(observations)
+        ]
+
+        # Window [BEAR, BULL, BEAR, BULL] -> BEAR, then [BULL, BEAR, BULL, BULL]
+        # -> BULL, [BEAR, BULL, BULL, BEAR] -> BEAR first seen, then
+        # [BULL, BULL, BEAR, BEAR] -> BULL
+        self.assertEqual(confirmed, [EMPTY, EMPTY, EMPTY, BEAR, BULL, BEAR, BULL])
+        self.assertParity(observations, 4, 2)
+
+    def test_missing_timeframes_skip_the_buffer(self):
+        observations = np.full((12, 3, len(TIMEFRAMES)), BULL, dtype=np.int16)
+        observations[:, 1] = BEAR
+        observations[:, 2] = CRISIS
+        observations[::3, 0, 1] = EMPTY
+        observations[1::2, 1, 3] = EMPTY
+        observations[:7, 2, 3] = EMPTY
+
+        self.assertParity(observations, STABILITY_WINDOW, MIN_CONFIRMATIONS)
+
+    def test_cooldown_blocks_a_quick_strategy_flip(self):
+        engine = BatchRegimeEngine(["SYM0"], TIMEFRAMES, window=1, min_confirmations=1)
+
+        bull = np.full((1, len(TIMEFRAMES)), BULL, dtype=np.int16)
+        bear = np.full((1, len(TIMEFRAMES)), BEAR, dtype=np.int16)
+
+        self.assertTrue(engine.step(bull, START)["decided"][0])
+        self.assertFalse(engine.step(bull, START + timedelta(minutes=1))["decided"][0])
+        self.assertFalse(engine.step(bear, START + timedelta(minutes=2))["decided"][0])
+        self.assertTrue(engine.step(bear, START + timedelta(minutes=6))["decided"][0])
+
+
+if __name__ == "__main__":
+    unittest.main()
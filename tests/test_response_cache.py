@@ -0,0 +1,134 @@
+import asyncio
+import unittest
+
+from fastapi_market.response_cache import ResponseCache
+
+
+class SlowLoader:
+    """
+    Loader that blocks until released and counts its calls.
+    """
+
+    def __init__(self, value=b"body"):
+        self.value = value
+        self.calls = 0
+        self.release = asyncio.Event()
+
+    async def __call__(self):
+        self.calls += 1
+        await self.release.wait()
+        return self.value
+
+
+class SingleFlightTest(unittest.IsolatedAsyncioTestCase):
+
+    async def test_concurrent_misses_share_one_load(self):
+        cache = ResponseCache()
+        loader = SlowLoader()
+
+        tasks = [asyncio.create_task(cache.get_or_load("k", loader)) for _ in range(5)]
+        await asyncio.sleep(0)
+        loader.release.set()
+
+        self.assertEqual(await asyncio.gather(*tasks), [b"body"] * 5)
+        self.assertEqual(loader.calls, 1)
+        self.assertEqual(cache.stats["misses"], 1)
+        self.assertEqual(cache.stats["coalesced"], 4)
+
+        self.assertEqual(await cache.get_or_load("k", loader), b"body")
+        self.assertEqual(cache.stats["hits"], 1)
+
+    async def test_loader_error_reaches_every_waiter(self):
+        cache = ResponseCache()
+        started = asyncio.Event()
+
+        async def failing():
+            started.set()
+            await asyncio.sleep(0)
+            raise RuntimeError("down")
+
+        leader = asyncio.create_task(cache.get_or_load("k", failing))
+        await started.wait()
+        waiter = asyncio.create_task(cache.get_or_load("k", failing))
+
+        results = await asyncio.gather(leader, waiter, return_exceptions=True)
+
+        self.assertTrue(all(isinstance(r, RuntimeError) for r in results))
+        self.assertEqual(cache.inflight, {})
+
+    async def test_cancelled_leader_hands_the_load_to_a_waiter(self):
+        cache = ResponseCache()
+        loader = SlowLoader()
+
+        leader = asyncio.create_task(cache.get_or_load("k", loader))
+        await asyncio.sleep(0)
+        waiters = [asyncio.create_task(cache.get_or_load("k", loader)) for _ in range(3)]
+        await asyncio.sleep(0)
+
+        # Client of the first request disconnects
+        leader.cancel()
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)
+
+        loader.release.set()
+
+        self.assertEqual(await asyncio.gather(*waiters), [b"body"] * 3)
+        self.assertTrue(leader.cancelled())
+        self.assertEqual(loader.calls, 2)
+        self.assertEqual(cache.stats["takeovers"], 3)
+        self.assertIn("k", cache.entries)
+
+    async def test_load_overlapping_invalidation_is_not_cached(self):
+        cache = ResponseCache()
+        loader = SlowLoader()
+
+        task = asyncio.create_task(cache.get_or_load("k", loader, tags=("trades:CRYPTO",)))
+        await asyncio.sleep(0)
+
+        cache.invalidate("trades:CRYPTO")
+        loader.release.set()
+
+        self.assertEqual(await task, b"body")
+        self.assertNotIn("k", cache.entries)
+
+
+class ByteBudgetTest(unittest.IsolatedAsyncioTestCase):
+
+    async def _load(self, cache, key, size):
+        async def loader():
+            return b"x" * size
+
+        return await cache.get_or_load(key, loader, ttl=60)
+
+    async def test_oldest_entries_are_evicted_over_the_budget(self):
+        cache = ResponseCache(max_bytes=250)
+
+        for key in ("a", "b", "c"):
+            await self._load(cache, key, 100)
+
+        self.assertEqual(list(cache.entries), ["b", "c"])
+        self.assertEqual(cache.size, 200)
+        self.assertEqual(cache.stats["evictions"], 1)
+
+    async def test_body_over_the_budget_is_served_but_not_cached(self):
+        cache = ResponseCache(max_bytes=250)
+        await self._load(cache, "a", 100)
+
+        self.assertEqual(len(await self._load(cache, "big", 300)), 300)
+        self.assertEqual(list(cache.entries), ["a"])
+        self.assertEqual(cache.size, 100)
+
+    async def test_invalidation_releases_bytes(self):
+        cache = ResponseCache()
+
+        async def loader():
+            return b"x" * 10
+
+        await cache.get_or_load("k", loader, tags=("orderbook:CRYPTO",))
+        cache.invalidate("orderbook:CRYPTO")
+
+        self.assertEqual(cache.size, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,59 @@
+import os
+import tempfile
+import unittest
+
+from fastapi_market.storage.sqlite import SQLiteStorage
+
+
+def _candle(bucket_start, close, partial):
+    return {
+        "market": "CRYPTO", "symbol": "BTCUSDT", "timeframe": "1m",
+        "bucket_start": bucket_start,
+        "open": 1.0, "high": 2.0, "low": 0.5, "close": close, "volume": 3.0,
+        "partial": partial,
+    }
+
+
+class SQLiteCandlesTest(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.workdir = tempfile.TemporaryDirectory()
+        self.storage = SQLiteStorage(os.path.join(self.workdir.name, "aetherion.db"))
+        await self.storage.open()
+
+    async def asyncTearDown(self):
+        await self.storage.close()
+        self.workdir.cleanup()
+
+    async def _series(self):
+        return await self.storage.candles.series("CRYPTO", "BTCUSDT", "1m")
+
+    async def test_upsert_keeps_one_row_per_bucket(self):
+        await self.storage.candles.write_many([_candle(0, 1.0, True)])
+        await self.storage.candles.write_many([_candle(0, 1.5, False), _candle(60_000, 2.0, True)])
+
+        rows = await self._series()
+
+        self.assertEqual([(r["bucket_start"], r["close"], r["partial"]) for r in rows],
+                         [(0, 1.5, False), (60_000, 2.0, True)])
+
+    async def test_replayed_partial_does_not_replace_a_complete_bucket(self):
+        await self.storage.candles.write_many([_candle(0, 1.5, False)])
+
+        # Journal replay of the partial flushed at shutdown
+        await self.storage.candles.write_many([_candle(0, 1.0, True)])
+
+        rows = await self._series()
+
+        self.assertEqual([(r["close"], r["partial"]) for r in rows], [(1.5, False)])
+
+    async def test_partials_are_restored_for_the_current_bucket(self):
+        await self.storage.candles.write_many([_candle(0, 1.0, True), _candle(60_000, 2.0, True)])
+
+        rows = await self.storage.candles.partials("1m", 60_000)
+
+        self.assertEqual([r["close"] for r in rows], [2.0])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,140 @@
+import os
+import tempfile
+import unittest
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from unittest import mock
+
+from fastapi_market import decision_engine, regime_poller, state_snapshot
+
+
+def _reset_pipeline():
+    for tf in regime_poller.TIMEFRAMES:
+        regime_poller.state_buffers[tf].clear()
+        regime_poller.stable_state[tf] = None
+
+    regime_poller.last_meta_regime = None
+    regime_poller.last_strategy = None
+    regime_poller.strategy_engine.current_strategy = None
+
+    decision_engine._last_decision_cache.clear()
+    decision_engine._latest_decisions.clear()
+
+
+class SnapshotRoundTripTest(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.workdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.workdir.name, "engine_state.msgpack")
+
+        patches = [
+            mock.patch.object(state_snapshot, "SNAPSHOT_PATH", self.path),
+            mock.patch.object(state_snapshot, "SNAPSHOT_MYSQL", False),
+            mock.patch.object(state_snapshot, "_last_digest", None),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+        self.addCleanup(self.workdir.cleanup)
+        self.addCleanup(_reset_pipeline)
+        _reset_pipeline()
+
+    def _populate(self):
+        regime_poller.state_buffers["1m"].extend([1, 1, 2])
+        regime_poller.stable_state["1m"] = 1
+        regime_poller.stable_state["5m"] = 2
+        regime_poller.last_meta_regime = "TRENDING"
+        regime_poller.last_strategy = "MOMENTUM"
+        regime_poller.strategy_engine.current_strategy = "MOMENTUM"
+
+        now = datetime(2026, 1, 2, 3, 4, 5, 678000, tzinfo=timezone.utc)
+        decision_engine.restore_cooldown("BTCUSDT", "MOMENTUM", now)
+        decision_engine.remember_decision({
+            "market": "CRYPTO",
+            "symbol": "BTCUSDT",
+            "meta_regime": "TRENDING",
+            "strategy": "MOMENTUM",
+            "action": "BUY",
+            "confidence": 0.8,
+            "created_at": now
+        })
+
+        return now
+
+    async def test_save_then_restore_recovers_pipeline_state(self):
+        now = self._populate()
+        before = state_snapshot.capture()
+
+        self.assertTrue(await state_snapshot.save_state())
+        _reset_pipeline()
+
+        source = await state_snapshot.restore_state(rebuild=False)
+
+        self.assertEqual(source, "disk")
+        self.assertEqual(state_snapshot.capture(), before)
+        self.assertEqual(list(regime_poller.state_buffers["1m"]), [1, 1, 2])
+        self.assertEqual(regime_poller.last_meta_regime, "TRENDING")
+        self.assertEqual(regime_poller.strategy_engine.current_strategy, "MOMENTUM")
+        self.assertEqual(decision_engine._last_decision_cache["BTCUSDT"]["timestamp"], now)
+        self.assertEqual(decision_engine.get_cached_decision("CRYPTO", "BTCUSDT")["created_at"], now)
+
+    async def test_unchanged_state_is_not_rewritten(self):
+        self._populate()
+
+        self.assertTrue(await state_snapshot.save_state())
+        self.assertFalse(await state_snapshot.save_state())
+        self.assertTrue(await state_snapshot.save_state(force=True))
+
+    async def test_restore_after_restart_does_not_rewrite_same_state(self):
+        self._populate()
+        await state_snapshot.save_state()
+
+        state_snapshot._last_digest = None
+        await state_snapshot.restore_state(rebuild=False)
+
+        self.assertFalse(await state_snapshot.save_state())
+
+    async def test_other_version_is_ignored(self):
+        with open(self.path, "wb") as f:
+            f.write(state_snapshot.encode({"version": state_snapshot.SNAPSHOT_VERSION + 1}))
+
+        self.assertIsNone(await state_snapshot.restore_state(rebuild=False))
+
+    async def test_missing_snapshot_rebuilds_from_storage(self):
+        detected = datetime(2026, 1, 2, tzinfo=timezone.utc)
+
+        regimes = SimpleNamespace(
+            recent_timeframe=mock.AsyncMock(return_value=[
+                {"timeframe": "5m", "state": 2},
+                {"timeframe": "5m", "state": 0},
+                {"timeframe": "1m", "state": 1},
+            ]),
+            latest_meta=mock.AsyncMock(return_value="RANGING"),
+            latest_strategy=mock.AsyncMock(return_value="MEAN_REVERSION"),
+        )
+        decisions = SimpleNamespace(recent=mock.AsyncMock(return_value=[{
+            "market": "CRYPTO",
+            "symbol": "BTCUSDT",
+            "meta_regime": "RANGING",
+            "strategy": "MEAN_REVERSION",
+            "action": "SELL",
+            "confidence": 0.7,
+            "created_at": detected
+        }]))
+        storage = SimpleNamespace(regimes=regimes, decisions=decisions)
+
+        with mock.patch.object(regime_poller, "get_storage", return_value=storage):
+            # The poller's startup call
+            source = await regime_poller.restore_snapshot()
+
+        self.assertEqual(source, "tables")
+        self.assertEqual(regime_poller.stable_state["5m"], 2)
+        self.assertEqual(regime_poller.stable_state["1m"], 1)
+        self.assertEqual(regime_poller.last_meta_regime, "RANGING")
+        self.assertEqual(regime_poller.strategy_engine.current_strategy, "MEAN_REVERSION")
+        self.assertEqual(decision_engine.get_cached_decision("CRYPTO", "BTCUSDT")["action"], "SELL")
+
+
+if __name__ == "__main__":
+    unittest.main()
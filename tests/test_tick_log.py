@@ -0,0 +1,248 @@
+import asyncio
+import builtins
+import os
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+import numpy as np
+
+from fastapi_market import tick_log as tick_log_module
+from fastapi_market.tick_log import SIDE_CODES, COLUMNS, TickLog, column_file, day_of
+
+START = 1_760_000_000_000
+
+
+def _tick(i):
+    return {
+        "market_type": "CRYPTO",
+        "symbol": "BTCUSDT",
+        "price": 100.0 + i,
+        "quantity": 0.5 + i,
+        "side": "BUY" if i % 2 else "SELL",
+        "exchange_timestamp": START + i * 10 - 1,
+        "receive_timestamp": START + i * 10,
+    }
+
+
+class TickLogTest(unittest.TestCase):
+
+    def setUp(self):
+        self.workdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.workdir.cleanup)
+
+    def _log(self):
+        return TickLog(root=self.workdir.name, flush_rows=4)
+
+    def _directory(self, log):
+        return log.directory("CRYPTO", "BTCUSDT", day_of(START))
+
+    def _assert_rows(self, ticks, expected):
+        self.assertEqual(ticks["receive_timestamp"].tolist(), [START + i * 10 for i in expected])
+        self.assertEqual(ticks["price"].tolist(), [100.0 + i for i in expected])
+        self.assertEqual(ticks["quantity"].tolist(), [0.5 + i for i in expected])
+        self.assertEqual(ticks["exchange_timestamp"].tolist(), [START + i * 10 - 1 for i in expected])
+        self.assertEqual(ticks["side"].tolist(), [SIDE_CODES[_tick(i)["side"]] for i in expected])
+
+    def test_round_trip_and_range(self):
+        log = self._log()
+
+        for i in range(10):
+            log.append(_tick(i))
+        log.flush()
+
+        self._assert_rows(log.read("CRYPTO", "BTCUSDT"), range(10))
+        self._assert_rows(log.read("CRYPTO", "BTCUSDT", START + 20, START + 50), range(2, 5))
+        self.assertEqual(log.symbols("CRYPTO"), ["BTCUSDT"])
+
+    def test_torn_write_is_trimmed_and_later_appends_stay_aligned(self):
+        log = self._log()
+
+        for i in range(4):
+            log.append(_tick(i))
+
+        directory = self._directory(log)
+
+        # Crash mid-flush: two columns got a whole extra row, one half a row
+        for column in ("receive_timestamp", "exchange_timestamp"):
+            with open(column_file(directory, column), "ab") as f:
+                f.write(np.int64(START + 999).tobytes())
+
+        with open(column_file(directory, "price"), "ab") as f:
+            f.write(b"\x00" * 3)
+
+        # Readers see the complete rows only
+        self._assert_rows(self._log().read("CRYPTO", "BTCUSDT"), range(4))
+
+        # A restarted process appends after the common rows
+        restarted = self._log()
+        for i in range(4, 8):
+            restarted.append(_tick(i))
+        restarted.flush()
+
+        self._assert_rows(restarted.read("CRYPTO", "BTCUSDT"), range(8))
+
+        for column, dtype in COLUMNS.items():
+            self.assertEqual(os.path.getsize(column_file(directory, column)), 8 * dtype.itemsize)
+
+    def test_backfill_skips_logged_rows(self):
+        log = self._log()
+
+        for i in range(4):
+            log.append(_tick(i))
+
+        ticks = [_tick(i) for i in range(2, 8)]
+        columns = {
+            column: np.array([
+                SIDE_CODES[t["side"]] if column == "side" else t[column]
+                for t in ticks
+            ])
+            for column in COLUMNS
+        }
+
+        self.assertEqual(log.append_columns("CRYPTO", "BTCUSDT", columns), 4)
+        self._assert_rows(log.read("CRYPTO", "BTCUSDT"), range(8))
+
+    def test_another_writer_tearing_the_day_is_realigned(self):
+        engine = self._log()
+        backfill = self._log()
+
+        for i in range(4):
+            engine.append(_tick(i))
+        engine.flush()
+
+        # A backfill process appends to the same day, then crashes mid-write
+        columns = {
+            column: np.array([SIDE_CODES[_tick(4)["side"]] if column == "side" else _tick(4)[column]])
+            for column in COLUMNS
+        }
+        self.assertEqual(backfill.append_columns("CRYPTO", "BTCUSDT", columns), 1)
+
+        directory = self._directory(engine)
+        with open(column_file(directory, "price"), "ab") as f:
+            f.write(np.float64(1.0).tobytes())
+
+        # The engine's next flush appends after the complete rows
+        for i in range(5, 8):
+            engine.append(_tick(i))
+        engine.flush()
+
+        self._assert_rows(engine.read("CRYPTO", "BTCUSDT"), range(8))
+
+        for column, dtype in COLUMNS.items():
+            self.assertEqual(os.path.getsize(column_file(directory, column)), 8 * dtype.itemsize)
+
+
+class TickLogWriterTest(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.workdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.workdir.cleanup)
+
+    def _log(self, root=None):
+        return TickLog(root=root or self.workdir.name, flush_rows=4)
+
+    async def test_full_buffers_are_written_off_the_event_loop(self):
+        log = self._log()
+        threads = []
+        write_arrays = log._write_arrays
+
+        def recording(key, buffer):
+            threads.append(threading.current_thread())
+            return write_arrays(key, buffer)
+
+        log._write_arrays = recording
+
+        for i in range(8):
+            log.append(_tick(i))
+
+        self.assertEqual(threads, [])
+
+        await log.writer
+        await log.flush_async()
+
+        self.assertEqual(len(threads), 2)
+        self.assertNotIn(threading.main_thread(), threads)
+        self.assertEqual(log.read("CRYPTO", "BTCUSDT")["price"].tolist(), [100.0 + i for i in range(8)])
+
+    async def test_write_errors_are_counted_and_retried_without_losing_rows(self):
+        # The log root is a file: every write fails until it is replaced
+        root = os.path.join(self.workdir.name, "tick_log")
+        with open(root, "w") as f:
+            f.write("not a directory")
+
+        log = self._log(root)
+
+        for i in range(6):
+            log.append(_tick(i))
+
+        await log.writer
+        await log.flush_async()
+
+        self.assertEqual(log.stats["errors"], 2)
+        self.assertEqual(log.status()["pending_write"], 6)
+
+        os.remove(root)
+        await log.flush_async()
+
+        self.assertEqual(log.read("CRYPTO", "BTCUSDT")["price"].tolist(), [100.0 + i for i in range(6)])
+        self.assertEqual(log.status()["pending_write"], 0)
+
+    async def test_failure_between_columns_is_rolled_back_before_the_retry(self):
+        log = self._log()
+        real_open = builtins.open
+        failed = []
+
+        def flaky_open(path, *args, **kwargs):
+            if str(path).endswith("quantity.f8") and not failed:
+                failed.append(path)
+                raise OSError(28, "No space left on device")
+            return real_open(path, *args, **kwargs)
+
+        log.append(_tick(0))
+        log.flush()
+
+        with mock.patch("builtins.open", flaky_open):
+            for i in range(1, 5):
+                log.append(_tick(i))
+            await log.writer
+
+        self.assertEqual(log.stats["errors"], 1)
+
+        await log.flush_async()
+
+        directory = log.directory("CRYPTO", "BTCUSDT", day_of(START))
+        for column, dtype in COLUMNS.items():
+            self.assertEqual(os.path.getsize(column_file(directory, column)), 5 * dtype.itemsize)
+
+        self.assertEqual(log.read("CRYPTO", "BTCUSDT")["price"].tolist(), [100.0 + i for i in range(5)])
+
+    async def test_oldest_rows_are_dropped_past_the_pending_limit(self):
+        root = os.path.join(self.workdir.name, "tick_log")
+        with open(root, "w") as f:
+            f.write("not a directory")
+
+        log = self._log(root)
+
+        with mock.patch.object(tick_log_module, "MAX_PENDING_ROWS", 8):
+            for i in range(12):
+                log.append(_tick(i))
+                await asyncio.sleep(0)
+            await log.writer
+
+        self.assertEqual(log.stats["dropped"], 4)
+        self.assertEqual(log.status()["pending_write"], 8)
+
+    def test_symbols_skips_directories_without_a_name_file(self):
+        log = self._log()
+        log.append(_tick(0))
+        log.flush()
+
+        os.makedirs(os.path.join(self.workdir.name, "CRYPTO", "ETHUSDT", day_of(START)))
+
+        self.assertEqual(log.symbols("CRYPTO"), ["BTCUSDT"])
+
+
+if __name__ == "__main__":
+    unittest.main()
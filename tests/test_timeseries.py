@@ -0,0 +1,102 @@
+import random
+import unittest
+
+from fastapi_market.timeseries import TopOfBook, _diff_bars, to_ts
+
+
+class FakeCursor:
+
+    def __init__(self, docs):
+        self.docs = docs
+
+    def sort(self, field, direction):
+        self.docs = sorted(self.docs, key=lambda d: d[field], reverse=direction < 0)
+        return self
+
+    def batch_size(self, size):
+        return self
+
+    def __aiter__(self):
+        self._it = iter(self.docs)
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self._it)
+        except StopIteration:
+            raise StopAsyncIteration
+
+
+class FakeCollection:
+
+    def __init__(self, docs=()):
+        self.docs = list(docs)
+        self.replaced = []
+
+    def find(self, query, projection=None):
+        ts = query["ts"]
+        return FakeCursor([d for d in self.docs if ts["$gte"] <= d["ts"] < ts["$lt"]])
+
+    async def bulk_write(self, requests, ordered=True):
+        self.replaced.extend(r._doc for r in requests)
+
+
+class TopOfBookTest(unittest.TestCase):
+
+    def test_matches_a_full_scan_of_the_book(self):
+        rng = random.Random(11)
+        book = TopOfBook()
+
+        for _ in range(2000):
+            bids = [[f"{rng.randint(90, 100)}.0", rng.choice(["0", "1.5"])] for _ in range(3)]
+            asks = [[f"{rng.randint(101, 111)}.0", rng.choice(["0", "2"])] for _ in range(3)]
+            book.apply(bids, asks)
+
+            self.assertEqual(book.best_bid, max(book.view.bids) if book.view.bids else None)
+            self.assertEqual(book.best_ask, min(book.view.asks) if book.view.asks else None)
+
+    def test_first_level_of_a_diff_is_not_the_top(self):
+        book = TopOfBook()
+        book.apply([["100", "1"], ["99", "1"]], [["101", "1"], ["102", "1"]])
+
+        # A diff that removes a deep level and touches the second bid
+        book.apply([["98", "0"], ["99", "3"]], [["105", "0"]])
+
+        self.assertEqual((book.best_bid, book.best_ask), (100.0, 101.0))
+
+
+class DiffBarsTest(unittest.IsolatedAsyncioTestCase):
+
+    async def test_bars_use_the_maintained_book(self):
+        minute = 1_700_000_040_000 // 60_000 * 60_000
+        meta = {"market": "CRYPTO", "symbol": "BTCUSDT"}
+
+        raw = FakeCollection([
+            # Warm-up before the window builds the book
+            {"ts": to_ts(minute - 1000), "meta": meta,
+             "bids": [["100", "1"], ["99", "1"]], "asks": [["101", "1"]]},
+            # First levels are a removal and a deeper level
+            {"ts": to_ts(minute + 1000), "meta": meta,
+             "bids": [["95", "0"], ["99", "2"]], "asks": [["103", "1"]]},
+            {"ts": to_ts(minute + 2000), "meta": meta,
+             "bids": [["100", "0"]], "asks": [["104", "0"], ["101", "0"]]},
+        ])
+        bars = FakeCollection()
+
+        await _diff_bars(
+            {"crypto_orderbooks": raw, "orderbook_bars_1m": bars},
+            "crypto_orderbooks", minute, minute + 60_000
+        )
+
+        self.assertEqual(len(bars.replaced), 1)
+        bar = bars.replaced[0]
+
+        self.assertEqual(bar["timestamp"], minute)
+        self.assertEqual(bar["snapshots"], 2)
+        self.assertEqual((bar["best_bid"], bar["best_ask"]), (99.0, 103.0))
+        self.assertEqual(bar["max_spread"], 4.0)
+        self.assertEqual(bar["avg_spread"], 2.5)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,345 @@
+import asyncio
+import os
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+from unittest import mock
+
+import bson
+from pymongo.errors import BulkWriteError, PyMongoError
+
+from fastapi_market.bucket_sink import BucketSink, replay_filter
+from fastapi_market.mongo_sink import MongoSink
+from fastapi_market.write_journal import WriteJournal, deterministic_id
+
+
+def _docs(start, n):
+    return [{"_id": deterministic_id("tick", i), "seq": i} for i in range(start, start + n)]
+
+
+class FakeCursor:
+
+    def __init__(self, docs):
+        self.docs = iter(docs)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self.docs)
+        except StopIteration:
+            raise StopAsyncIteration
+
+
+class FakeCollection:
+    """
+    Insert-only collection that can be switched down.
+    """
+
+    def __init__(self):
+        self.stored = {}
+        self.order = []
+        self.down = False
+
+    async def insert_many(self, batch, ordered=True):
+        if self.down:
+            raise PyMongoError("down")
+
+        for doc in batch:
+            self.stored[doc["_id"]] = doc
+            self.order.append(doc["seq"])
+
+    def find(self, query, projection=None):
+        ids = set(query["_id"]["$in"])
+        return FakeCursor([{"_id": i} for i in self.stored if i in ids])
+
+
+class JournalTest(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.workdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.workdir.cleanup)
+
+    def _journal(self, segment_bytes=200):
+        return WriteJournal("ticks", root=self.workdir.name, segment_bytes=segment_bytes)
+
+    async def test_replay_is_oldest_first_across_segments(self):
+        journal = self._journal()
+
+        for start in range(0, 30, 5):
+            journal.spill(_docs(start, 5))
+
+        self.assertGreater(len(journal.segments()), 1)
+
+        replayed = []
+
+        async def write(chunk):
+            replayed.extend(doc["seq"] for doc in chunk)
+            return len(chunk)
+
+        await journal.replay(write, deadline=1, max_segments=100, batch_size=4)
+
+        self.assertEqual(replayed, list(range(30)))
+        self.assertEqual(journal.segments(), [])
+        self.assertFalse(journal.has_backlog)
+
+    async def test_failed_replay_keeps_the_segment(self):
+        journal = self._journal(segment_bytes=1 << 20)
+        journal.spill(_docs(0, 10))
+
+        calls = []
+
+        async def flaky(chunk):
+            calls.append(len(chunk))
+            if len(calls) == 2:
+                raise PyMongoError("down again")
+            return len(chunk)
+
+        with self.assertRaises(PyMongoError):
+            await journal.replay(flaky, deadline=1, batch_size=4)
+
+        self.assertEqual(len(journal.segments()), 1)
+        self.assertTrue(WriteJournal("ticks", root=self.workdir.name).has_backlog)
+
+        await journal.replay(flaky, deadline=1, batch_size=4)
+        self.assertEqual(journal.segments(), [])
+
+    async def test_sink_spills_while_down_and_replays_in_order(self):
+        collection = FakeCollection()
+        sink = MongoSink(collection, self._journal(), batch_size=4)
+
+        for doc in _docs(0, 10):
+            sink.submit(doc)
+        self.assertTrue(await sink.flush())
+
+        collection.down = True
+        for doc in _docs(10, 10):
+            sink.submit(doc)
+
+        self.assertFalse(await sink.flush())
+        self.assertEqual(len(sink.queue), 0)
+        self.assertTrue(sink.journal.has_backlog)
+
+        collection.down = False
+
+        # Written live meanwhile; replay must not duplicate it
+        await collection.insert_many(_docs(12, 1))
+
+        while sink.journal.has_backlog:
+            self.assertTrue(await sink.replay())
+
+        self.assertEqual(collection.order, list(range(10)) + [12, 10, 11] + list(range(13, 20)))
+        self.assertEqual(sink.journal.stats["already_stored"], 1)
+        sink.journal.close()
+
+    async def test_spill_does_not_block_the_event_loop(self):
+        journal = self._journal()
+        collection = FakeCollection()
+        collection.down = True
+        sink = MongoSink(collection, journal, batch_size=4)
+
+        loop_thread_spills = []
+        spill = journal.spill
+
+        def tracked(docs):
+            loop_thread_spills.append(_in_loop_thread())
+            spill(docs)
+
+        journal.spill = tracked
+
+        for doc in _docs(0, 4):
+            sink.submit(doc)
+        await sink.flush()
+
+        self.assertEqual(loop_thread_spills, [False])
+        journal.close()
+
+    async def test_torn_segment_replays_its_complete_documents(self):
+        journal = self._journal(segment_bytes=1 << 20)
+        journal.spill(_docs(0, 5))
+        journal.close()
+
+        # Crash mid-spill: the next document is only half written
+        path = journal.segments()[0]
+        complete = os.path.getsize(path)
+
+        with open(path, "ab") as f:
+            f.write(bson.encode(_docs(5, 1)[0])[:9])
+
+        replayed = []
+
+        async def write(chunk):
+            replayed.extend(doc["seq"] for doc in chunk)
+            return len(chunk)
+
+        await journal.replay(write, deadline=1)
+
+        self.assertEqual(replayed, list(range(5)))
+        self.assertEqual(journal.segments(), [])
+        self.assertEqual(os.path.getsize(f"{path}.torn"), 9)
+        self.assertEqual(journal.stats["quarantined_bytes"], 9)
+        self.assertEqual(complete, 5 * len(bson.encode(_docs(0, 1)[0])))
+
+    async def test_sink_task_survives_a_bad_segment(self):
+        collection = FakeCollection()
+        journal = self._journal(segment_bytes=1 << 20)
+        journal.spill(_docs(0, 3))
+        journal.close()
+
+        sink = MongoSink(collection, journal, batch_size=4, flush_interval=0.01)
+
+        reads = []
+
+        def unreadable(path):
+            reads.append(path)
+            raise OSError(5, "Input/output error")
+
+        with mock.patch.object(journal, "_read_segment", unreadable), \
+                mock.patch("fastapi_market.mongo_sink.RETRY_BACKOFF_SECONDS", 0.01):
+            task = asyncio.create_task(sink.run())
+            await asyncio.sleep(0.1)
+
+            # Still draining live writes while the segment keeps failing
+            for doc in _docs(10, 2):
+                sink.submit(doc)
+            await asyncio.sleep(0.1)
+
+        self.assertFalse(task.done())
+        self.assertGreater(len(reads), 1)
+        self.assertIn("OSError", sink.stats["last_error"])
+        self.assertEqual(collection.order, [10, 11])
+
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+    async def test_unwritable_journal_keeps_documents_queued(self):
+        collection = FakeCollection()
+        collection.down = True
+        journal = self._journal()
+        sink = MongoSink(collection, journal, batch_size=4)
+
+        for doc in _docs(0, 10):
+            sink.submit(doc)
+
+        with mock.patch.object(journal, "spill", side_effect=OSError(28, "No space left on device")):
+            self.assertFalse(await sink.flush())
+
+        self.assertEqual([doc["seq"] for doc in sink.queue], list(range(10)))
+        self.assertIn("No space left", sink.stats["last_error"])
+
+        collection.down = False
+        self.assertTrue(await sink.flush())
+        self.assertEqual(collection.order, list(range(10)))
+
+    def test_failed_spill_leaves_no_torn_write_behind(self):
+        journal = self._journal(segment_bytes=1 << 20)
+        journal.spill(_docs(0, 2))
+        path = journal.segments()[0]
+        size = os.path.getsize(path)
+
+        with mock.patch("os.fsync", side_effect=OSError(5, "Input/output error")):
+            with self.assertRaises(OSError):
+                journal.spill(_docs(2, 2))
+
+        self.assertEqual(os.path.getsize(path), size)
+        self.assertIsNone(journal.active)
+
+        # The next spill starts a new segment
+        journal.spill(_docs(4, 1))
+        self.assertEqual(len(journal.segments()), 2)
+        journal.close()
+
+
+def _in_loop_thread():
+    try:
+        asyncio.get_running_loop()
+        return True
+    except RuntimeError:
+        return False
+
+
+class BucketCollection:
+
+    def __init__(self, duplicate_indexes=()):
+        self.duplicate_indexes = duplicate_indexes
+        self.operations = []
+
+    async def bulk_write(self, operations, ordered=True):
+        self.operations.extend(operations)
+
+        if self.duplicate_indexes:
+            raise BulkWriteError({"writeErrors": [
+                {"index": i, "code": 11000} for i in self.duplicate_indexes
+            ]})
+
+
+def _candle(bucket_start, partial, updated_at):
+    return {
+        "market": "CRYPTO", "symbol": "BTCUSDT", "timeframe": "1m",
+        "bucket_start": bucket_start, "close": 1.0,
+        "partial": partial, "updated_at": updated_at,
+    }
+
+
+class BucketReplayTest(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.workdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.workdir.cleanup)
+
+    def _sink(self, collection):
+        return BucketSink(collection, WriteJournal("candles", root=self.workdir.name))
+
+    def test_replay_filter_skips_newer_and_complete_rows(self):
+        at = datetime(2026, 1, 1)
+
+        partial = replay_filter(_candle(0, True, at))
+        self.assertEqual(partial["$nor"], [
+            {"updated_at": {"$gt": at}},
+            {"partial": {"$ne": True}},
+        ])
+
+        complete = replay_filter(_candle(0, False, at))
+        self.assertEqual(complete["$nor"], [{"updated_at": {"$gt": at}}])
+
+        legacy = replay_filter({**_candle(0, False, None)})
+        self.assertNotIn("$nor", legacy)
+        self.assertEqual(legacy["bucket_start"], 0)
+
+    async def test_replay_counts_rows_kept_by_a_newer_write_as_stored(self):
+        at = datetime(2026, 1, 1)
+        collection = BucketCollection(duplicate_indexes=[0])
+        sink = self._sink(collection)
+
+        written = await sink.write_missing([
+            _candle(0, True, at),
+            _candle(60_000, False, at),
+            _candle(60_000, False, at + timedelta(seconds=1)),
+        ])
+
+        self.assertEqual(written, 1)
+        self.assertEqual(len(collection.operations), 2)
+        self.assertEqual(collection.operations[1]._doc["$set"]["updated_at"], at + timedelta(seconds=1))
+
+    async def test_other_replay_errors_fail_the_chunk(self):
+        collection = BucketCollection()
+
+        async def failing(operations, ordered=True):
+            raise BulkWriteError({"writeErrors": [{"index": 0, "code": 121}]})
+
+        collection.bulk_write = failing
+        sink = self._sink(collection)
+
+        with self.assertRaises(PyMongoError):
+            await sink.write_missing([_candle(0, True, datetime(2026, 1, 1))])
+
+    def test_submit_stamps_updated_at(self):
+        sink = self._sink(None)
+        sink.submit(_candle(0, False, None))
+
+        self.assertIsInstance(sink.queue[0]["updated_at"], datetime)
+
+
+if __name__ == "__main__":
+    unittest.main()